@@ -27,14 +27,23 @@
 
 import asyncio
 import picolog
+import time
+import struct
+import random
+import protocol
 
 from aioble import scan
+from ring_buffer import RingBuffer
 import bluetooth
 
 class BleCentral:
     __ADVERTISING_NAME = "vt2-robot"
     __ADVERTISING_UUID = 0xF910
 
+    # Connection interval profiles (minimum and maximum interval in microseconds)
+    __LOW_LATENCY_INTERVAL_US = (7500, 15000)
+    __RELAXED_INTERVAL_US = (50000, 100000)
+
     def __init__(self):
         # Remote device advertising definitions
         self._peripheral_advertising_uuid = bluetooth.UUID(BleCentral.__ADVERTISING_UUID)
@@ -48,19 +57,58 @@ class BleCentral:
         self._discovered = False
         self._connected = False
 
+        # If set, only the robot advertising this turtle ID is connected to
+        self._turtle_id = None
+
+        # The last robot connected to (so it can be reconnected to without scanning)
+        # and the connection timeouts for a reconnection and after a scan
+        self._last_device = None
+        self._connection = None
+        self._reconnect_timeout_ms = 2000
+        self._connect_timeout_ms = 10000
+
         # Maximum number of elements to store in the queues (note: maximum is 128 since command sequence is 8 bits)
         # Note: Queue elements are 20 bytes long
         self._max_queue_elements = 50
 
-        # Transmission queue for sending service data from central
-        self._c2p_queue = []
+        # Transmission queue for sending service data from central and reception queue for
+        # receiving service data to central.  These are preallocated ring buffers of 20
+        # byte slots; a popped packet is a view of its slot (valid until the next pop)
+        self._c2p_queue = RingBuffer(self._max_queue_elements)
+        self._p2c_queue = RingBuffer(self._max_queue_elements)
 
-        # Reception queue for receiving service data to central
-        self._p2c_queue = []
-
-        # Events to signal queue and notification events
+        # Events to signal queue events
         self._p2c_queue_event = asyncio.Event()
-        self._p2c_notification_event = asyncio.Event()
+        self._c2p_queue_event = asyncio.Event()
+
+        # Commands are written (with response, so the peripheral acknowledges them)
+        # as soon as they are queued.  If nothing has been written for the keepalive
+        # interval a NOP is sent so the peripheral knows the link is still up.  The NOP
+        # is flagged rather than queued, so it is never held up behind commands
+        self._keepalive_interval_ms = 1000
+        self._keepalive_pending = False
+        self._keepalive_packet = bytes(20)
+
+        # Session ID written to the peripheral when connecting (before any commands).  It
+        # is chosen at random when the communicator starts, so the robot keeps its record
+        # of completed commands when the communicator reconnects but not after a restart
+        self._session_packet = bytearray(protocol.PACKET_LENGTH)
+        struct.pack_into(protocol.SESSION, self._session_packet, 0, 0, protocol.SESSION_MARKER, random.getrandbits(32))
+        self._write_attempts = 3
+        self._last_c2p_ms = time.ticks_ms()
+
+        # Requested connection interval.  aioble can only set the interval when
+        # connecting; the robot reports the values actually in use
+        self._low_latency = True
+
+        # Flow control.  The peripheral reports a credit limit in every packet it
+        # sends; commands are only written whilst the number sent is below the limit
+        # so the peripheral's queue cannot overflow.  Until the first report arrives
+        # a small initial window is used (the peripheral's queue is empty on connection)
+        self._initial_credit_limit = 4
+        self._c2p_credit_limit = self._initial_credit_limit
+        self._c2p_sent = 0
+        self._peripheral_queue_depth = 0
 
         # Tx/Rx characteristic objects
         self._tx_p2c_characteristic = None
@@ -73,10 +121,50 @@ class BleCentral:
     @property
     def p2c_queue(self):
         return self._c2p_queue
+
+    @property
+    def credits(self) -> int:
+        # Number of commands that can be sent before the peripheral's queue is full
+        credits = (self._c2p_credit_limit - self._c2p_sent) & 0xFF
+        return credits if credits < 128 else 0
+
+    @property
+    def peripheral_queue_depth(self) -> int:
+        # Number of commands waiting in the peripheral's queue (as last reported)
+        return self._peripheral_queue_depth
     
+    @property
+    def turtle_id(self):
+        return self._turtle_id
+
+    @turtle_id.setter
+    def turtle_id(self, turtle_id):
+        # Connect only to the robot with this turtle ID (or any robot if None)
+        self._turtle_id = turtle_id
+        self._last_device = None
+
+    @property
+    def low_latency(self) -> bool:
+        return self._low_latency
+
+    @low_latency.setter
+    def low_latency(self, low_latency: bool):
+        # Takes effect from the next connection
+        self._low_latency = low_latency
+
+    @property
+    def queue_stats(self) -> dict:
+        # Queue high water marks and dropped packet counts (used to tune the queue sizes)
+        return {
+            "c2p_high_water_mark": self._c2p_queue.high_water_mark,
+            "c2p_dropped": self._c2p_queue.dropped,
+            "p2c_high_water_mark": self._p2c_queue.high_water_mark,
+            "p2c_dropped": self._p2c_queue.dropped,
+        }
+
     def add_to_c2p_queue(self, data):
-        if len(self._c2p_queue) < self._max_queue_elements:
-            self._c2p_queue.append(data)
+        if self._c2p_queue.push(data):
+            self._c2p_queue_event.set()
         else:
             picolog.info("BleCentral::add_to_c2p_queue - C2P queue is full - data not added")
 
@@ -90,7 +178,9 @@ class BleCentral:
 
         tasks = [
             asyncio.create_task(self.__maintain_connection()),
-            asyncio.create_task(self.__handle_commands()),
+            asyncio.create_task(self.__receive_p2c()),
+            asyncio.create_task(self.__transmit_c2p()),
+            asyncio.create_task(self.__keepalive()),
         ]
         await asyncio.gather(*tasks)
 
@@ -102,10 +192,18 @@ class BleCentral:
                     picolog.debug(f"BleCentral::__scan_for_peripheral - Found peripheral with matching advertising name of {self._peripheral_advertising_name}")
                     if self._peripheral_advertising_uuid in result.services():
                         picolog.debug("BleCentral::__scan_for_peripheral - Peripheral advertises expected service UUID")
-                        return result.device
+                        if self._turtle_id is None or self.__advertised_turtle_id(result) == self._turtle_id:
+                            return result.device
         # Nothing found after specified scanning duration
         return None 
 
+    # Get the turtle ID from the status in the advertising manufacturer data (or None)
+    def __advertised_turtle_id(self, result):
+        for _, data in result.manufacturer(protocol.ADVERTISING_COMPANY_ID):
+            if len(data) >= struct.calcsize(protocol.ADVERTISING_STATUS):
+                return struct.unpack_from(protocol.ADVERTISING_STATUS, data)[0]
+        return None
+
     async def __on_discovery(self):
         picolog.debug("BleCentral::__on_connected - Connected to peripheral")
 
@@ -159,9 +257,20 @@ class BleCentral:
             self._connected = False
             return
 
-        # Subscribe to characteristic notifications
-        await self._tx_p2c_characteristic.subscribe(notify = True)
+        # Subscribe to characteristic indications (the peripheral sends responses
+        # as indications which are acknowledged by the BLE stack)
+        await self._tx_p2c_characteristic.subscribe(notify = False, indicate = True)
+
+        # Tell the peripheral which session this is before any commands are sent
+        if not await self.__write(self._session_packet):
+            picolog.debug(f"BleCentral::__on_connected - FATAL: Peripheral did not acknowledge the session ID after {self._write_attempts} writes")
+            self._discovered = False
+            self._connected = False
+            return
+        self._last_c2p_ms = time.ticks_ms()
+        self.__reset_credits()
         self._connected = True
+        self._c2p_queue_event.set()
 
     async def __maintain_connection(self):
         picolog.info("BleCentral::__maintain_connection - Running maintain connection task")
@@ -171,6 +280,16 @@ class BleCentral:
                 # Clear the queues
                 self._c2p_queue.clear()
                 self._p2c_queue.clear()
+                self._keepalive_pending = False
+
+                # After a dropout, connect straight to the last robot without scanning (it
+                # advertises rapidly for a short time after losing the connection)
+                if self._last_device is not None:
+                    device = self._last_device
+                    self._last_device = None
+                    picolog.info(f"BleCentral::__maintain_connection - Reconnecting to peripheral with address {device.addr_hex()}")
+                    if await self.__connect(device, self._reconnect_timeout_ms):
+                        continue
 
                 # Scan for the peripheral
                 picolog.info("BleCentral::__maintain_connection - Scanning for BLE peripheral...")
@@ -179,73 +298,134 @@ class BleCentral:
                 if not device:
                     picolog.debug("BleCentral::__maintain_connection - Peripheral not found")
                 else:
-                    try:
-                        picolog.debug(f"BleCentral::__maintain_connection - Peripheral with address {device.addr_hex()} discovered.  Attempting to connect")
-                        self._connection = await device.connect()
-                        picolog.info(f"BleCentral::__maintain_connection - Connected to peripheral with address {device.addr_hex()}")
-                        self._discovered = True
-
-                        # Perform any connection setup
-                        await self.__on_discovery()
-                        
-                    except asyncio.TimeoutError:
-                        picolog.debug("BleCentral::__maintain_connection - Connection attempt timed out!")
-                        self._discovered = False
-                        self._connected = False
+                    picolog.debug(f"BleCentral::__maintain_connection - Peripheral with address {device.addr_hex()} discovered.  Attempting to connect")
+                    await self.__connect(device, self._connect_timeout_ms)
 
                 # Wait for 1 second before checking again
                 await asyncio.sleep(1)
             else:
                 # Wait for disconnection
-                await asyncio.sleep(1)
+                await asyncio.sleep(0.25)
+                if self._connection is not None and not self._connection.is_connected():
+                    picolog.info("BleCentral::__maintain_connection - Connection to peripheral lost")
+                    self.disconnect()
+
+    async def __connect(self, device, timeout_ms: int) -> bool:
+        try:
+            if self._low_latency:
+                min_interval_us, max_interval_us = BleCentral.__LOW_LATENCY_INTERVAL_US
+            else:
+                min_interval_us, max_interval_us = BleCentral.__RELAXED_INTERVAL_US
+            self._connection = await device.connect(timeout_ms=timeout_ms, min_conn_interval_us=min_interval_us, max_conn_interval_us=max_interval_us)
+            picolog.info(f"BleCentral::__connect - Connected to peripheral with address {device.addr_hex()}")
+            self._discovered = True
+
+            # Perform any connection setup
+            await self.__on_discovery()
+
+        except asyncio.TimeoutError:
+            picolog.debug("BleCentral::__connect - Connection attempt timed out!")
+            self._discovered = False
+            self._connected = False
+
+        # Remember the peripheral so it can be reconnected to without scanning
+        if self._connected:
+            self._last_device = device
+        return self._connected
 
-    async def __handle_commands(self):
-        picolog.info("BleCentral::__handle_commands - Running handle commands task")
+    async def __receive_p2c(self):
+        picolog.info("BleCentral::__receive_p2c - Running receive task")
         while True:
             while self._connected:
-                # Wait for a notification to be received
-                # Note: With BLEak, the notification triggers an interrupt, but with aioBLE we have to
-                # await the notification
+                # Wait for a response to be received
+                # Note: With BLEak, the indication triggers an interrupt, but with aioBLE we have to
+                # await the indication
                 try:
-                    service_data = await self._tx_p2c_characteristic.notified()
+                    service_data = await self._tx_p2c_characteristic.indicated(timeout_ms=1000)
+                except asyncio.TimeoutError:
+                    continue
                 except Exception:
-                    picolog.info("BleCentral::__handle_commands - Device disconnected")
+                    picolog.info("BleCentral::__receive_p2c - Device disconnected")
                     self.disconnect()
-
-                if self._connected:
-                    if len(service_data) == 20:
-                        # Check the first byte to see if it is a valid commmand response
-                        # If the first byte is 0x00, then it is a NOP response
-                        if service_data[0] != 0x00:
-                            # Queue the data packet for processing
-                            if len(self._p2c_queue) < self._max_queue_elements:
-                                self._p2c_queue.append(service_data)
-                                #picolog.info(f"Received data from peripheral: {service_data}, appended to queue ({len(self._p2c_queue)} elements)")
-                                self._p2c_queue_event.set()
-                    else:
-                        picolog.info(f"BleCentral::__handle_commands - Received data from peripheral: {service_data} - invalid length")
-
-                    # Notify the main async task that data has been received
-                    self._p2c_notification_event.set()
-    
-                    # Send any data in the c2p queue to the peripheral
-                    if len(self._c2p_queue) > 0:
-                        # Send all waiting data
-                        while len(self._c2p_queue) > 0:
-                            data_packet = self._c2p_queue.pop(0)
-                            #picolog.info(f"Sending data to peripheral: {data_packet}")
-                            await self._rx_c2p_characteristic.write(data_packet)
-                    else:
-                        # If the queue is empty, send a nop
-                        data_packet = bytearray(20)
-                        await self._rx_c2p_characteristic.write(data_packet)
-
-                    # Clear the notification event
-                    self._p2c_notification_event.clear()
+                    break
+
+                if len(service_data) == 20:
+                    # Every packet (including NOPs) carries the peripheral's credit limit
+                    self.__update_credits(service_data)
+
+                    # Check the first byte to see if it is a valid commmand response
+                    # If the first byte is 0x00, then it is a NOP response
+                    if service_data[0] != 0x00:
+                        # Queue the data packet for processing
+                        if self._p2c_queue.push(service_data):
+                            self._p2c_queue_event.set()
+                else:
+                    picolog.info(f"BleCentral::__receive_p2c - Received data from peripheral: {service_data} - invalid length")
             else:
                 # If we are not connected, wait for 250ms
                 await asyncio.sleep(0.25)
 
+    async def __transmit_c2p(self):
+        picolog.info("BleCentral::__transmit_c2p - Running transmit task")
+        while True:
+            await self._c2p_queue_event.wait()
+            self._c2p_queue_event.clear()
+
+            # Send all waiting data (that there is credit for)
+            while self._connected:
+                data_packet = self.__next_c2p_packet()
+                if data_packet is None:
+                    break
+                if not await self.__write(data_packet):
+                    picolog.info(f"BleCentral::__transmit_c2p - Peripheral did not acknowledge {self._write_attempts} writes")
+                    self.disconnect()
+
+    def __next_c2p_packet(self):
+        # Keepalives (sequence 0) don't use credit, so they are never held up behind commands
+        if self._keepalive_pending:
+            self._keepalive_pending = False
+            return self._keepalive_packet
+
+        if len(self._c2p_queue) > 0 and self.credits > 0:
+            self._c2p_sent = (self._c2p_sent + 1) & 0xFF
+            return self._c2p_queue.pop()
+        return None
+
+    def __reset_credits(self):
+        self._c2p_credit_limit = self._initial_credit_limit
+        self._c2p_sent = 0
+        self._peripheral_queue_depth = 0
+
+    def __update_credits(self, service_data):
+        self._peripheral_queue_depth = service_data[protocol.QUEUE_DEPTH_OFFSET]
+        credit_limit = service_data[protocol.CREDIT_LIMIT_OFFSET]
+        if credit_limit != self._c2p_credit_limit:
+            self._c2p_credit_limit = credit_limit
+            # Wake the transmit task in case it is waiting for credit
+            if len(self._c2p_queue) > 0:
+                self._c2p_queue_event.set()
+
+    async def __write(self, data_packet) -> bool:
+        # Write with response so the peripheral acknowledges the packet at the
+        # link level, retrying if it doesn't
+        for attempt in range(1, self._write_attempts + 1):
+            try:
+                await self._rx_c2p_characteristic.write(data_packet, response=True, timeout_ms=1000)
+                self._last_c2p_ms = time.ticks_ms()
+                return True
+            except Exception as e:
+                picolog.debug(f"BleCentral::__write - Write failed after attempt {attempt} - {e}")
+        return False
+
+    async def __keepalive(self):
+        picolog.info("BleCentral::__keepalive - Running keepalive task")
+        while True:
+            await asyncio.sleep_ms(self._keepalive_interval_ms // 2)
+            if self._connected and time.ticks_diff(time.ticks_ms(), self._last_c2p_ms) >= self._keepalive_interval_ms:
+                # Nothing sent recently - send a NOP
+                self._keepalive_pending = True
+                self._c2p_queue_event.set()
+
 if __name__ == "__main__":
     from main import main
     main()
\ No newline at end of file
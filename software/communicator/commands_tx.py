@@ -28,11 +28,12 @@
 import asyncio
 import picolog
 import struct
+import protocol
 from ble_central import BleCentral
 
-# Note: The commands are defined in the BLE peripheral firmware
-# and the ControlRx class must match the ControlTx class otherwise
-# bad things will happen :)
+# Note: The command IDs and packet formats are generated from
+# protocol/schema.py (see protocol.py) - change the schema rather
+# than editing the formats here
 
 class CommandsTx:
     def __init__(self, ble_central: BleCentral):
@@ -51,14 +52,14 @@ class CommandsTx:
     async def __wait_for_command_response(self, seq_id: int):
         while True:
             await self._ble_central._p2c_queue_event.wait()
-            try:
-                data = self._ble_central._p2c_queue.pop(0)
-            except IndexError:
+            # The response is a view of the queue's slot (valid until the next pop)
+            data = self._ble_central._p2c_queue.pop()
+            if data is None:
                 picolog.error("CommandsTx::_wait_for_command_response - Got P2C queue event but the queue was empty?")
-                seq_id_rx = 0
                 return None
 
-            self._ble_central._p2c_queue_event.clear()
+            if len(self._ble_central._p2c_queue) == 0:
+                self._ble_central._p2c_queue_event.clear()
             seq_id_rx = data[0]
 
             # Check if the sequence ID matches
@@ -79,7 +80,7 @@ class CommandsTx:
             picolog.info("CommandsTx::motors - Not connected to a robot")
             return False
         
-        command_id = 1
+        command_id = protocol.CMD_MOTORS
 
         # Command to enable or disable the motors
         if enable:
@@ -89,7 +90,7 @@ class CommandsTx:
 
         # Generate a sequence ID and queue the command
         seq_id = self.__next_seq()
-        data = struct.pack("<BBB", seq_id, command_id, parameter)
+        data = struct.pack(protocol.MOTORS_REQUEST, seq_id, command_id, parameter)
         self._ble_central.add_to_c2p_queue(data)
         picolog.info(f"CommandsTx::motors - Command ID = {command_id}, Sequence ID = {seq_id}, enable = {enable}")
         
@@ -109,12 +110,12 @@ class CommandsTx:
             picolog.error("CommandsTx::forward - Not connected to a robot")
             return False, 0.0, 0.0, 0.0
         
-        command_id = 2
+        command_id = protocol.CMD_FORWARD
 
         # Command to move the robot forward
         # Generate a sequence ID and queue the command
         seq_id = self.__next_seq()
-        data = struct.pack("<BBf", seq_id, command_id, distance_mm)
+        data = struct.pack(protocol.FORWARD_REQUEST, seq_id, command_id, distance_mm)
         self._ble_central.add_to_c2p_queue(data)
         picolog.info(f"CommandsTx::forward - Command ID = {command_id}, Sequence ID = {seq_id}, distance = {distance_mm}")
 
@@ -128,7 +129,7 @@ class CommandsTx:
 
         # Extract the position and heading from the response
         try:
-            seq_id, x, y, heading = struct.unpack("<Bfff", response[:13])
+            seq_id, x, y, heading = struct.unpack_from(protocol.FORWARD_RESPONSE, response)
         except ValueError as e:
             picolog.error(f"CommandsTx::forward - Error unpacking response: {e}")
             return False, 0.0, 0.0, 0.0
@@ -144,12 +145,12 @@ class CommandsTx:
             picolog.error("CommandsTx::backward - Not connected to a robot")
             return False, 0.0, 0.0, 0.0
         
-        command_id = 3
+        command_id = protocol.CMD_BACKWARD
 
         # Command to move the robot backward
         # Generate a sequence ID and queue the command
         seq_id = self.__next_seq()
-        data = struct.pack("<BBf", seq_id, command_id, distance_mm)
+        data = struct.pack(protocol.BACKWARD_REQUEST, seq_id, command_id, distance_mm)
         self._ble_central.add_to_c2p_queue(data)
         picolog.info(f"CommandsTx::backward - Command ID = {command_id}, Sequence ID = {seq_id}, distance = {distance_mm}")
         
@@ -163,7 +164,7 @@ class CommandsTx:
 
         # Extract the position and heading from the response
         try:
-            seq_id, x, y, heading = struct.unpack("<Bfff", response[:13])
+            seq_id, x, y, heading = struct.unpack_from(protocol.BACKWARD_RESPONSE, response)
         except ValueError as e:
             picolog.error(f"CommandsTx::backward - Error unpacking response: {e}")
             return False, 0.0, 0.0, 0.0
@@ -179,12 +180,12 @@ class CommandsTx:
             picolog.error("CommandsTx::left - Not connected to a robot")
             return False, 0.0, 0.0, 0.0
         
-        command_id = 4
+        command_id = protocol.CMD_LEFT
 
         # Command to turn the robot left
         # Generate a sequence ID and queue the command
         seq_id = self.__next_seq()
-        data = struct.pack("<BBf", seq_id, command_id, angle_degrees)
+        data = struct.pack(protocol.LEFT_REQUEST, seq_id, command_id, angle_degrees)
         self._ble_central.add_to_c2p_queue(data)
         picolog.info(f"CommandsTx::left - Command ID = {command_id}, Sequence ID = {seq_id}, angle = {angle_degrees}")
         
@@ -198,7 +199,7 @@ class CommandsTx:
 
         # Extract the position and heading from the response
         try:
-            seq_id, x, y, heading = struct.unpack("<Bfff", response[:13])
+            seq_id, x, y, heading = struct.unpack_from(protocol.LEFT_RESPONSE, response)
         except ValueError as e:
             picolog.error(f"CommandsTx::left - Error unpacking response: {e}")
             return False, 0.0, 0.0, 0.0
@@ -214,12 +215,12 @@ class CommandsTx:
             picolog.error("CommandsTx::right - Not connected to a robot")
             return False, 0.0, 0.0, 0.0
         
-        command_id = 5
+        command_id = protocol.CMD_RIGHT
 
         # Command to turn the robot right
         # Generate a sequence ID and queue the command
         seq_id = self.__next_seq()
-        data = struct.pack("<BBf", seq_id, command_id, angle_degrees)
+        data = struct.pack(protocol.RIGHT_REQUEST, seq_id, command_id, angle_degrees)
         self._ble_central.add_to_c2p_queue(data)
         picolog.info(f"CommandsTx::right - Command ID = {command_id}, Sequence ID = {seq_id}, angle = {angle_degrees}")
         
@@ -233,7 +234,7 @@ class CommandsTx:
 
         # Extract the position and heading from the response
         try:
-            seq_id, x, y, heading = struct.unpack("<Bfff", response[:13])
+            seq_id, x, y, heading = struct.unpack_from(protocol.RIGHT_RESPONSE, response)
         except ValueError as e:
             picolog.error(f"CommandsTx::right - Error unpacking response: {e}")
             return False, 0.0, 0.0, 0.0
@@ -249,12 +250,12 @@ class CommandsTx:
             picolog.error("CommandsTx::circle - Not connected to a robot")
             return False, 0.0, 0.0, 0.0
         
-        command_id = 6
+        command_id = protocol.CMD_CIRCLE
 
         # Command to turn the robot left on an arc
         # Generate a sequence ID and queue the command
         seq_id = self.__next_seq()
-        data = struct.pack("<BBff", seq_id, command_id, radius_mm, extent_degrees)
+        data = struct.pack(protocol.CIRCLE_REQUEST, seq_id, command_id, radius_mm, extent_degrees)
         self._ble_central.add_to_c2p_queue(data)
         picolog.info(f"CommandsTx::circle - Command ID = {command_id}, Sequence ID = {seq_id}, radius = {radius_mm}, extent = {extent_degrees}")
         
@@ -268,7 +269,7 @@ class CommandsTx:
 
         # Extract the position and heading from the response
         try:
-            seq_id, x, y, heading = struct.unpack("<Bfff", response[:13])
+            seq_id, x, y, heading = struct.unpack_from(protocol.CIRCLE_RESPONSE, response)
         except ValueError as e:
             picolog.error(f"CommandsTx::circle - Error unpacking response: {e}")
             return False, 0.0, 0.0, 0.0
@@ -284,12 +285,12 @@ class CommandsTx:
             picolog.error("CommandsTx::setheading - Not connected to a robot")
             return False
         
-        command_id = 7
+        command_id = protocol.CMD_SETHEADING
 
         # Command to set the robot heading
         # Generate a sequence ID and queue the command
         seq_id = self.__next_seq()
-        data = struct.pack("<BBf", seq_id, command_id, angle_degrees)
+        data = struct.pack(protocol.SETHEADING_REQUEST, seq_id, command_id, angle_degrees)
         self._ble_central.add_to_c2p_queue(data)
         picolog.info(f"CommandsTx::setheading - Command ID = {command_id}, Sequence ID = {seq_id}, angle = {angle_degrees}")
         
@@ -309,12 +310,12 @@ class CommandsTx:
             picolog.error("CommandsTx::setx - Not connected to a robot")
             return False, 0.0, 0.0, 0.0
         
-        command_id = 8
+        command_id = protocol.CMD_SETX
 
         # Command to set the robot X position
         # Generate a sequence ID and queue the command
         seq_id = self.__next_seq()
-        data = struct.pack("<BBf", seq_id, command_id, x_mm)
+        data = struct.pack(protocol.SETX_REQUEST, seq_id, command_id, x_mm)
         self._ble_central.add_to_c2p_queue(data)
         picolog.info(f"CommandsTx::setx - Command ID = {command_id}, Sequence ID = {seq_id}, x = {x_mm}")
         
@@ -328,7 +329,7 @@ class CommandsTx:
 
         # Extract the position and heading from the response
         try:
-            seq_id, x, y, heading = struct.unpack("<Bfff", response[:13])
+            seq_id, x, y, heading = struct.unpack_from(protocol.SETX_RESPONSE, response)
         except ValueError as e:
             picolog.error(f"CommandsTx::setx - Error unpacking response: {e}")
             return False, 0.0, 0.0, 0.0
@@ -344,12 +345,12 @@ class CommandsTx:
             picolog.error("CommandsTx::sety - Not connected to a robot")
             return False, 0.0, 0.0, 0.0
         
-        command_id = 9
+        command_id = protocol.CMD_SETY
 
         # Command to set the robot Y position
         # Generate a sequence ID and queue the command
         seq_id = self.__next_seq()
-        data = struct.pack("<BBf", seq_id, command_id, y_mm)
+        data = struct.pack(protocol.SETY_REQUEST, seq_id, command_id, y_mm)
         self._ble_central.add_to_c2p_queue(data)
         picolog.info(f"CommandsTx::sety - Command ID = {command_id}, Sequence ID = {seq_id}, y = {y_mm}")
         
@@ -363,7 +364,7 @@ class CommandsTx:
 
         # Extract the position and heading from the response
         try:
-            seq_id, x, y, heading = struct.unpack("<Bfff", response[:13])
+            seq_id, x, y, heading = struct.unpack_from(protocol.SETY_RESPONSE, response)
         except ValueError as e:
             picolog.error(f"CommandsTx::sety - Error unpacking response: {e}")
             return False, 0.0, 0.0, 0.0
@@ -374,17 +375,17 @@ class CommandsTx:
         picolog.info(f"CommandsTx::sety - X = {x}, Y = {y}, heading = {heading}")
         return True, x, y, heading
     
-    async def goto(self, x_mm: float, y_mm: float) -> tuple[bool, float, float, float]:
+    async def setposition(self, x_mm: float, y_mm: float) -> tuple[bool, float, float, float]:
         if not self._ble_central.connected:
             picolog.error("CommandsTx::setposition - Not connected to a robot")
             return False, 0.0, 0.0, 0.0
         
-        command_id = 10
+        command_id = protocol.CMD_SETPOSITION
 
         # Command to set the robot position
         # Generate a sequence ID and queue the command
         seq_id = self.__next_seq()
-        data = struct.pack("<BBff", seq_id, command_id, x_mm, y_mm)
+        data = struct.pack(protocol.SETPOSITION_REQUEST, seq_id, command_id, x_mm, y_mm)
         self._ble_central.add_to_c2p_queue(data)
         picolog.info(f"CommandsTx::setposition - Command ID = {command_id}, Sequence ID = {seq_id}, x = {x_mm}, y = {y_mm}")
         
@@ -398,7 +399,7 @@ class CommandsTx:
 
         # Extract the position and heading from the response
         try:
-            seq_id, x, y, heading = struct.unpack("<Bfff", response[:13])
+            seq_id, x, y, heading = struct.unpack_from(protocol.SETPOSITION_RESPONSE, response)
         except ValueError as e:
             picolog.error(f"CommandsTx::setposition - Error unpacking response: {e}")
             return False, 0.0, 0.0, 0.0
@@ -414,12 +415,12 @@ class CommandsTx:
             picolog.error("CommandsTx::towards - Not connected to a robot")
             return False, 0.0, 0.0, 0.0
         
-        command_id = 11
+        command_id = protocol.CMD_TOWARDS
 
         # Command to move the robot towards a point
         # Generate a sequence ID and queue the command
         seq_id = self.__next_seq()
-        data = struct.pack("<BBff", seq_id, command_id, x_mm, y_mm)
+        data = struct.pack(protocol.TOWARDS_REQUEST, seq_id, command_id, x_mm, y_mm)
         self._ble_central.add_to_c2p_queue(data)
         picolog.info(f"CommandsTx::towards - Command ID = {command_id}, Sequence ID = {seq_id}, x = {x_mm}, y = {y_mm}")
         
@@ -433,7 +434,7 @@ class CommandsTx:
 
         # Extract the position and heading from the response
         try:
-            seq_id, x, y, heading = struct.unpack("<Bfff", response[:13])
+            seq_id, x, y, heading = struct.unpack_from(protocol.TOWARDS_RESPONSE, response)
         except ValueError as e:
             picolog.error(f"CommandsTx::towards - Error unpacking response: {e}")
             return False, 0.0, 0.0, 0.0
@@ -449,12 +450,12 @@ class CommandsTx:
             picolog.error("CommandsTx::reset_origin - Not connected to a robot")
             return False
         
-        command_id = 12
+        command_id = protocol.CMD_RESET_ORIGIN
 
         # Command to reset the x,y origin and heading
         # Generate a sequence ID and queue the command
         seq_id = self.__next_seq()
-        data = struct.pack("<BB", seq_id, command_id)
+        data = struct.pack(protocol.RESET_ORIGIN_REQUEST, seq_id, command_id)
         self._ble_central.add_to_c2p_queue(data)
         picolog.info(f"CommandsTx::reset_origin - Command ID = {command_id}, Sequence ID = {seq_id}")
         
@@ -474,12 +475,12 @@ class CommandsTx:
             picolog.error("CommandsTx::heading - Not connected to a robot")
             return False, 0.0
         
-        command_id = 13
+        command_id = protocol.CMD_HEADING
 
         # Command to get the robot heading
         # Generate a sequence ID and queue the command
         seq_id = self.__next_seq()
-        data = struct.pack("<BB", seq_id, command_id)
+        data = struct.pack(protocol.HEADING_REQUEST, seq_id, command_id)
         self._ble_central.add_to_c2p_queue(data)
         picolog.info(f"CommandsTx::heading - Command ID = {command_id}, Sequence ID = {seq_id}")
         
@@ -493,7 +494,7 @@ class CommandsTx:
 
         # Extract the heading from the response
         try:
-            seq_id, heading = struct.unpack("<Bf", response[:5])
+            seq_id, heading = struct.unpack_from(protocol.HEADING_RESPONSE, response)
         except ValueError as e:
             picolog.error(f"CommandsTx::heading - Error unpacking response: {e}")
             return False, 0.0
@@ -507,12 +508,12 @@ class CommandsTx:
             picolog.error("CommandsTx::position - Not connected to a robot")
             return False, 0.0, 0.0
         
-        command_id = 14
+        command_id = protocol.CMD_POSITION
 
         # Command to get the robot position
         # Generate a sequence ID and queue the command
         seq_id = self.__next_seq()
-        data = struct.pack("<BB", seq_id, command_id)
+        data = struct.pack(protocol.POSITION_REQUEST, seq_id, command_id)
         self._ble_central.add_to_c2p_queue(data)
         picolog.info(f"CommandsTx::position - Command ID = {command_id}, Sequence ID = {seq_id}")
         
@@ -526,7 +527,7 @@ class CommandsTx:
 
         # Extract the position from the response
         try:
-            seq_id, x, y = struct.unpack("<Bff", response[:9])
+            seq_id, x, y = struct.unpack_from(protocol.POSITION_RESPONSE, response)
         except ValueError as e:
             picolog.error(f"CommandsTx::position - Error unpacking response: {e}")
             return False, 0.0, 0.0
@@ -541,12 +542,12 @@ class CommandsTx:
             picolog.error("CommandsTx::penup - Not connected to a robot")
             return False
         
-        command_id = 15
+        command_id = protocol.CMD_PENUP
 
         # Command to raise the pen
         # Generate a sequence ID and queue the command
         seq_id = self.__next_seq()
-        data = struct.pack("<BB", seq_id, command_id)
+        data = struct.pack(protocol.PENUP_REQUEST, seq_id, command_id)
         self._ble_central.add_to_c2p_queue(data)
         picolog.info(f"CommandsTx::penup - Command ID = {command_id}, Sequence ID = {seq_id}")
         
@@ -566,12 +567,12 @@ class CommandsTx:
             picolog.error("CommandsTx::pendown - Not connected to a robot")
             return False
         
-        command_id = 16
+        command_id = protocol.CMD_PENDOWN
 
         # Command to raise the pen
         # Generate a sequence ID and queue the command
         seq_id = self.__next_seq()
-        data = struct.pack("<BB", seq_id, command_id)
+        data = struct.pack(protocol.PENDOWN_REQUEST, seq_id, command_id)
         self._ble_central.add_to_c2p_queue(data)
         picolog.info(f"CommandsTx::pendown - Command ID = {command_id}, Sequence ID = {seq_id}")
         
@@ -591,12 +592,12 @@ class CommandsTx:
             picolog.error("CommandsTx::eyes - Not connected to a robot")
             return False
         
-        command_id = 17
+        command_id = protocol.CMD_EYES
 
         # Command to set the eye colour
         # Generate a sequence ID and queue the command
         seq_id = self.__next_seq()
-        data = struct.pack("<BBBBBB", seq_id, command_id, eye_id, red, green, blue)
+        data = struct.pack(protocol.EYES_REQUEST, seq_id, command_id, eye_id, red, green, blue)
         self._ble_central.add_to_c2p_queue(data)
         picolog.info(f"CommandsTx::eyes - Command ID = {command_id}, Sequence ID = {seq_id}, eye_id = {eye_id}, red = {red}, green = {green}, blue = {blue}")
         
@@ -616,12 +617,12 @@ class CommandsTx:
             picolog.error("CommandsTx::power - Not connected to a robot")
             return False, 0, 0, 0
         
-        command_id = 18
+        command_id = protocol.CMD_POWER
 
         # Command to get the robot power
         # Generate a sequence ID and queue the command
         seq_id = self.__next_seq()
-        data = struct.pack("<BB", seq_id, command_id)
+        data = struct.pack(protocol.POWER_REQUEST, seq_id, command_id)
         self._ble_central.add_to_c2p_queue(data)
         picolog.info(f"CommandsTx::power - Command ID = {command_id}, Sequence ID = {seq_id}")
         
@@ -635,7 +636,7 @@ class CommandsTx:
 
         # Extract the power from the response
         try:
-            seq_id, mv, ma, mw = struct.unpack("<Blll", response[:13])
+            seq_id, mv, ma, mw = struct.unpack_from(protocol.POWER_RESPONSE, response)
         except ValueError as e:
             picolog.error(f"CommandsTx::power - Error unpacking response: {e}")
             return False, 0, 0, 0
@@ -647,12 +648,12 @@ class CommandsTx:
             picolog.error("CommandsTx::isdown - Not connected to a robot")
             return False, False
         
-        command_id = 19
+        command_id = protocol.CMD_ISDOWN
 
         # Command to get the pen status (True = down, False = up)
         # Generate a sequence ID and queue the command
         seq_id = self.__next_seq()
-        data = struct.pack("<BB", seq_id, command_id)
+        data = struct.pack(protocol.ISDOWN_REQUEST, seq_id, command_id)
         self._ble_central.add_to_c2p_queue(data)
         picolog.info(f"CommandsTx::isdown - Command ID = {command_id}, Sequence ID = {seq_id}")
         
@@ -666,7 +667,7 @@ class CommandsTx:
 
         # Extract the pen status from the response
         try:
-            seq_id, pen_down = struct.unpack("<BB", response[:2])
+            seq_id, pen_down = struct.unpack_from(protocol.ISDOWN_RESPONSE, response)
         except ValueError as e:
             picolog.error(f"CommandsTx::isdown - Error unpacking response: {e}")
             return False, False
@@ -678,12 +679,12 @@ class CommandsTx:
             picolog.error("CommandsTx::set_linear_velocity - Not connected to a robot")
             return False
         
-        command_id = 20
+        command_id = protocol.CMD_SET_LINEAR_VELOCITY
 
         # Command to set the linear velocity
         # Generate a sequence ID and queue the command
         seq_id = self.__next_seq()
-        data = struct.pack("<BBll", seq_id, command_id, target_speed, acceleration)
+        data = struct.pack(protocol.SET_LINEAR_VELOCITY_REQUEST, seq_id, command_id, target_speed, acceleration)
         self._ble_central.add_to_c2p_queue(data)
         picolog.info(f"CommandsTx::set_linear_velocity - Command ID = {command_id}, Sequence ID = {seq_id}, target_speed = {target_speed}, acceleration = {acceleration}")
         
@@ -703,12 +704,12 @@ class CommandsTx:
             picolog.error("CommandsTx::set_rotational_velocity - Not connected to a robot")
             return False
         
-        command_id = 21
+        command_id = protocol.CMD_SET_ROTATIONAL_VELOCITY
 
         # Command to set the rotational velocity
         # Generate a sequence ID and queue the command
         seq_id = self.__next_seq()
-        data = struct.pack("<BBll", seq_id, command_id, target_speed, acceleration)
+        data = struct.pack(protocol.SET_ROTATIONAL_VELOCITY_REQUEST, seq_id, command_id, target_speed, acceleration)
         self._ble_central.add_to_c2p_queue(data)
         picolog.info(f"CommandsTx::set_rotational_velocity - Command ID = {command_id}, Sequence ID = {seq_id}, target_speed = {target_speed}, acceleration = {acceleration}")
         
@@ -728,12 +729,12 @@ class CommandsTx:
             picolog.error("CommandsTx::get_linear_velocity - Not connected to a robot")
             return False, 0, 0
         
-        command_id = 22
+        command_id = protocol.CMD_GET_LINEAR_VELOCITY
 
         # Command to get the linear velocity
         # Generate a sequence ID and queue the command
         seq_id = self.__next_seq()
-        data = struct.pack("<BB", seq_id, command_id)
+        data = struct.pack(protocol.GET_LINEAR_VELOCITY_REQUEST, seq_id, command_id)
         self._ble_central.add_to_c2p_queue(data)
         picolog.info(f"CommandsTx::get_linear_velocity - Command ID = {command_id}, Sequence ID = {seq_id}")
         
@@ -747,7 +748,7 @@ class CommandsTx:
 
         # Extract the linear velocity from the response
         try:
-            seq_id, target_speed, acceleration = struct.unpack("<Bll", response[:9])
+            seq_id, target_speed, acceleration = struct.unpack_from(protocol.GET_LINEAR_VELOCITY_RESPONSE, response)
         except ValueError as e:
             picolog.error(f"CommandsTx::get_linear_velocity - Error unpacking response: {e}")
             return False, 0, 0
@@ -759,12 +760,12 @@ class CommandsTx:
             picolog.error("CommandsTx::get_rotational_velocity - Not connected to a robot")
             return False, 0, 0
         
-        command_id = 23
+        command_id = protocol.CMD_GET_ROTATIONAL_VELOCITY
 
         # Command to get the rotational velocity
         # Generate a sequence ID and queue the command
         seq_id = self.__next_seq()
-        data = struct.pack("<BB", seq_id, command_id)
+        data = struct.pack(protocol.GET_ROTATIONAL_VELOCITY_REQUEST, seq_id, command_id)
         self._ble_central.add_to_c2p_queue(data)
         picolog.info(f"CommandsTx::get_rotational_velocity - Command ID = {command_id}, Sequence ID = {seq_id}")
         
@@ -778,7 +779,7 @@ class CommandsTx:
 
         # Extract the rotational velocity from the response
         try:
-            seq_id, target_speed, acceleration = struct.unpack("<Bll", response[:9])
+            seq_id, target_speed, acceleration = struct.unpack_from(protocol.GET_ROTATIONAL_VELOCITY_RESPONSE, response)
         except ValueError as e:
             picolog.error(f"CommandsTx::get_rotational_velocity - Error unpacking response: {e}")
             return False, 0, 0
@@ -790,11 +791,11 @@ class CommandsTx:
             picolog.error("CommandsTx::set_wheel_diameter_calibration - Not connected to a robot")
             return False
         
-        command_id = 24
+        command_id = protocol.CMD_SET_WHEEL_DIAMETER_CALIBRATION
 
         # Command to set the wheel diameter calibration
         seq_id = self.__next_seq()
-        data = struct.pack("<BBi", seq_id, command_id, wheel_diameter)
+        data = struct.pack(protocol.SET_WHEEL_DIAMETER_CALIBRATION_REQUEST, seq_id, command_id, wheel_diameter)
         self._ble_central.add_to_c2p_queue(data)
         picolog.info(f"CommandsTx::set_wheel_diameter_calibration - Command ID = {command_id}, Sequence ID = {seq_id}, wheel_diameter = {wheel_diameter}")
         
@@ -812,11 +813,11 @@ class CommandsTx:
             picolog.error("CommandsTx::set_axel_distance_calibration - Not connected to a robot")
             return False
         
-        command_id = 25
+        command_id = protocol.CMD_SET_AXEL_DISTANCE_CALIBRATION
 
         # Command to set the axel distance calibration
         seq_id = self.__next_seq()
-        data = struct.pack("<BBi", seq_id, command_id, axel_distance)
+        data = struct.pack(protocol.SET_AXEL_DISTANCE_CALIBRATION_REQUEST, seq_id, command_id, axel_distance)
         self._ble_central.add_to_c2p_queue(data)
         picolog.info(f"CommandsTx::set_axel_distance_calibration - Command ID = {command_id}, Sequence ID = {seq_id}, axel_distance = {axel_distance}")
         
@@ -834,11 +835,11 @@ class CommandsTx:
             picolog.error("CommandsTx::get_wheel_diameter_calibration - Not connected to a robot")
             return False, 0
         
-        command_id = 26
+        command_id = protocol.CMD_GET_WHEEL_DIAMETER_CALIBRATION
 
         # Command to get the wheel diameter calibration
         seq_id = self.__next_seq()
-        data = struct.pack("<BB", seq_id, command_id)
+        data = struct.pack(protocol.GET_WHEEL_DIAMETER_CALIBRATION_REQUEST, seq_id, command_id)
         self._ble_central.add_to_c2p_queue(data)
         picolog.info(f"CommandsTx::get_wheel_diameter_calibration - Command ID = {command_id}, Sequence ID = {seq_id}")
         
@@ -850,7 +851,7 @@ class CommandsTx:
             return False, 0
 
         try:
-            seq_id, cali_wheel = struct.unpack("<Bi", response[:5])
+            seq_id, cali_wheel = struct.unpack_from(protocol.GET_WHEEL_DIAMETER_CALIBRATION_RESPONSE, response)
         except ValueError as e:
             picolog.error(f"CommandsTx::get_wheel_diameter_calibration - Error unpacking response: {e}")
             return False, 0
@@ -862,11 +863,11 @@ class CommandsTx:
             picolog.error("CommandsTx::get_axel_distance_calibration - Not connected to a robot")
             return False, 0
         
-        command_id = 27
+        command_id = protocol.CMD_GET_AXEL_DISTANCE_CALIBRATION
 
         # Command to get the axel distance calibration
         seq_id = self.__next_seq()
-        data = struct.pack("<BB", seq_id, command_id)
+        data = struct.pack(protocol.GET_AXEL_DISTANCE_CALIBRATION_REQUEST, seq_id, command_id)
         self._ble_central.add_to_c2p_queue(data)
         picolog.info(f"CommandsTx::get_axel_distance_calibration - Command ID = {command_id}, Sequence ID = {seq_id}")
         
@@ -878,7 +879,7 @@ class CommandsTx:
             return False, 0
 
         try:
-            seq_id, cali_axel = struct.unpack("<Bi", response[:5])
+            seq_id, cali_axel = struct.unpack_from(protocol.GET_AXEL_DISTANCE_CALIBRATION_RESPONSE, response)
         except ValueError as e:
             picolog.error(f"CommandsTx::get_axel_distance_calibration - Error unpacking response: {e}")
             return False, 0
@@ -890,11 +891,11 @@ class CommandsTx:
             picolog.error("CommandsTx::set_turtle_id - Not connected to a robot")
             return False
         
-        command_id = 28
+        command_id = protocol.CMD_SET_TURTLE_ID
 
         # Command to set the turtle ID
         seq_id = self.__next_seq()
-        data = struct.pack("<BBB", seq_id, command_id, turtle_id)
+        data = struct.pack(protocol.SET_TURTLE_ID_REQUEST, seq_id, command_id, turtle_id)
         self._ble_central.add_to_c2p_queue(data)
         picolog.info(f"CommandsTx::set_turtle_id - Command ID = {command_id}, Sequence ID = {seq_id}, turtle_id = {turtle_id}")
         
@@ -912,11 +913,11 @@ class CommandsTx:
             picolog.error("CommandsTx::get_turtle_id - Not connected to a robot")
             return False, 0
         
-        command_id = 29
+        command_id = protocol.CMD_GET_TURTLE_ID
 
         # Command to get the turtle ID
         seq_id = self.__next_seq()
-        data = struct.pack("<BB", seq_id, command_id)
+        data = struct.pack(protocol.GET_TURTLE_ID_REQUEST, seq_id, command_id)
         self._ble_central.add_to_c2p_queue(data)
         picolog.info(f"CommandsTx::get_turtle_id - Command ID = {command_id}, Sequence ID = {seq_id}")
         
@@ -928,7 +929,7 @@ class CommandsTx:
             return False, 0
 
         try:
-            seq_id, turtle_id = struct.unpack("<BB", response[:2])
+            seq_id, turtle_id = struct.unpack_from(protocol.GET_TURTLE_ID_RESPONSE, response)
         except ValueError as e:
             picolog.error(f"CommandsTx::get_turtle_id - Error unpacking response: {e}")
             return False, 0
@@ -940,11 +941,11 @@ class CommandsTx:
             picolog.error("CommandsTx::load_config - Not connected to a robot")
             return False
         
-        command_id = 30
+        command_id = protocol.CMD_LOAD_CONFIG
 
         # Command to load the configuration
         seq_id = self.__next_seq()
-        data = struct.pack("<BB", seq_id, command_id)
+        data = struct.pack(protocol.LOAD_CONFIG_REQUEST, seq_id, command_id)
         self._ble_central.add_to_c2p_queue(data)
         picolog.info(f"CommandsTx::load_config - Command ID = {command_id}, Sequence ID = {seq_id}")
         
@@ -962,11 +963,11 @@ class CommandsTx:
             picolog.error("CommandsTx::save_config - Not connected to a robot")
             return False
         
-        command_id = 31
+        command_id = protocol.CMD_SAVE_CONFIG
 
         # Command to save the configuration
         seq_id = self.__next_seq()
-        data = struct.pack("<BB", seq_id, command_id)
+        data = struct.pack(protocol.SAVE_CONFIG_REQUEST, seq_id, command_id)
         self._ble_central.add_to_c2p_queue(data)
         picolog.info(f"CommandsTx::save_config - Command ID = {command_id}, Sequence ID = {seq_id}")
         
@@ -984,11 +985,11 @@ class CommandsTx:
             picolog.error("CommandsTx::reset_config - Not connected to a robot")
             return False
         
-        command_id = 32
+        command_id = protocol.CMD_RESET_CONFIG
 
         # Command to reset the configuration
         seq_id = self.__next_seq()
-        data = struct.pack("<BB", seq_id, command_id)
+        data = struct.pack(protocol.RESET_CONFIG_REQUEST, seq_id, command_id)
         self._ble_central.add_to_c2p_queue(data)
         picolog.info(f"CommandsTx::reset_config - Command ID = {command_id}, Sequence ID = {seq_id}")
         
@@ -29,6 +29,7 @@ import asyncio
 import picolog
 from machine import UART
 import struct
+import protocol
 from commands_tx import CommandsTx
 
 class SerialComms:
@@ -103,85 +104,39 @@ class SerialComms:
         command_response = 0
         result_code = 0
 
+        # The serial commands (and the BLE commands they map to) are defined in
+        # protocol/schema.py - see SERIAL_COMMANDS in protocol.py for the table.
         # Note: Command IDs start from 32 to avoid clashing with ASCII control characters
 
-        # Command ID 32: Motors [0=Off, 1=On]
-        # Command ID 33: Forward [mm]
-        # Command ID 34: Backward [mm]
-        # Command ID 35: Left [degrees]
-        # Command ID 36: Right [degrees]
-        # Command ID 37: Penup
-        # Command ID 38: Pendown
-        # Command ID 39: Eyes [red] [green] [blue]
-        # Command ID 40: Is pen up?
-        # Command ID 41: power_mv
-        # Command ID 42: power_ma
-        # Command ID 43: power_mw
-
         # Result codes:
-        # -1: Error
-        #  0: OK 
-
-        # How will this send a negative command response?  it won't...
-
-        if command_id == 32: # Motors
-            if parameters[0] == 0:
-                if not await self._commands_tx.motors(False):
-                    result_code = 1
-            else:
-                if not await self._commands_tx.motors(True):
-                    result_code = 1
-        elif command_id == 33: # Forward
-            success_flag,_,_,_ = await self._commands_tx.forward(parameters[0])
-            if not success_flag:
-                result_code = 1
-        elif command_id == 34: # Backward
-            success_flag,_,_,_ = await self._commands_tx.backward(parameters[0])
-            if not success_flag:
-                result_code = 1
-        elif command_id == 35: # Left
-            success_flag,_,_,_ = await self._commands_tx.left(parameters[0])
-            if not success_flag:
-                result_code = 1
-        elif command_id == 36: # Right
-            success_flag,_,_,_ = await self._commands_tx.right(parameters[0])
-            if not success_flag:
-                result_code = 1
-        elif command_id == 37: # Penup
-            if not await self._commands_tx.penup():
-                result_code = 1
-        elif command_id == 38: # Pendown
-            if not await self._commands_tx.pendown():
-                result_code = 1
-        elif command_id == 39: # Eyes
-            if not await self._commands_tx.eyes(parameters[0], parameters[1], parameters[2], parameters[3]):
-                result_code = 1
-        elif command_id == 40: # is pen up?
-            success_flag, pen_state = await self._commands_tx.isdown()
-            if not success_flag:
-                result_code = 1
-            if pen_state:
-                command_response = 0 # Pen is down
-            else:
-                command_response = 1 # Pen is up
-        elif command_id == 41: # power_mv
-            success_flag, power_mv, power_ma, power_mw = await self._commands_tx.power()
-            if not success_flag:
-                result_code = 1
-            else:
-                command_response = power_mv
-        elif command_id == 42: # power_ma
-            success_flag, power_mv, power_ma, power_mw = await self._commands_tx.power()
-            if not success_flag:
-                result_code = 1
-            else:
-                command_response = power_ma
-        elif command_id == 43: # power_mw
-            success_flag, power_mv, power_ma, power_mw = await self._commands_tx.power()
-            if not success_flag:
-                result_code = 1
-            else:
-                command_response = power_mw
+        #  0: OK
+        #  1: Error
+
+        if command_id not in protocol.SERIAL_COMMANDS:
+            picolog.debug(f"SerialComms::__dispatch_command - Unknown command ID {command_id}")
+            return 1, 0
+
+        name, parameter_count, response_field, inverted = protocol.SERIAL_COMMANDS[command_id]
+        if len(parameters) < parameter_count:
+            picolog.debug(f"SerialComms::__dispatch_command - Command ID {command_id} expects {parameter_count} parameters")
+            return 1, 0
+
+        # Commands return either a success flag or a tuple of the success
+        # flag followed by the response fields
+        result = await getattr(self._commands_tx, name)(*parameters[:parameter_count])
+        if isinstance(result, tuple):
+            success_flag = result[0]
+            fields = result[1:]
+        else:
+            success_flag = result
+            fields = ()
+
+        if not success_flag:
+            result_code = 1
+        elif response_field >= 0:
+            command_response = int(round(fields[response_field]))
+            if inverted:
+                command_response = 1 - command_response
 
         return result_code, command_response
     
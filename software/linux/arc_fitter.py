@@ -0,0 +1,175 @@
+#************************************************************************
+#
+#   arc_fitter.py
+#
+#   Fits runs of short lines to native circle commands
+#   Valiant Turtle 2 - Communicator Linux Firmware
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+import math
+from display_list import DisplayList, Stroke, ANGLE_TOLERANCE
+
+# How far (in mm) an arc may stray from the lines it replaces
+DEFAULT_TOLERANCE = 0.25
+
+class ArcFitter:
+    """
+    A compile stage for display lists: runs of short lines (as imported artwork and
+    polygon circles are made of) are replaced by arcs, which the robot draws with a
+    single native circle command rather than a turn and a move per line:
+
+        display_list = ArcFitter().fit(recorder.display_list()).optimised()
+
+    A run becomes an arc if every corner and the middle of every line lies within
+    tolerance mm of the circle and the run turns steadily one way.  Runs of fewer
+    than min_segments lines, and arcs wider than max_radius mm, are left as lines.
+    """
+    def __init__(self, tolerance: float = DEFAULT_TOLERANCE, min_segments: int = 3, max_radius: float = 5000):
+        if min_segments < 3:
+            raise ValueError("ArcFitter::__init__ - At least 3 segments are needed to fit an arc")
+        self._tolerance = tolerance
+        self._min_segments = min_segments
+        self._max_radius = max_radius
+
+    def fit(self, display_list: DisplayList) -> DisplayList:
+        """Return a copy of the display list with arcs fitted to its strokes"""
+        fitted = DisplayList()
+        fitted.prologue = list(display_list.prologue)
+        fitted.epilogue = list(display_list.epilogue)
+        fitted.park = display_list.park
+        fitted.strokes = [self.fit_stroke(stroke) for stroke in display_list.strokes]
+        return fitted
+
+    def fit_stroke(self, stroke: Stroke) -> Stroke:
+        """Return a copy of the stroke with arcs fitted to its runs of lines"""
+        fitted = Stroke(*stroke.start, list(stroke.commands))
+        points = [stroke.start]
+        for segment in stroke.segments:
+            if segment[0] == "line":
+                points.append(segment[1:])
+                continue
+
+            # Arcs are kept as they are, ending the run of lines before them
+            self.__fit_run(fitted, points)
+            fitted.arc(*segment[1:4])
+            points = [fitted.end]
+        self.__fit_run(fitted, points)
+        return fitted
+
+    def __fit_run(self, stroke: Stroke, points: list):
+        # Add the lines joining the points to the stroke, as arcs where they fit.  Each
+        # arc is fitted from where the last one actually finished, so errors don't add up
+        points = list(points)
+        start = 0
+        while start < len(points) - 1:
+            points[start] = stroke.end
+            end, arc = self.__longest_arc(points, start)
+            if arc is None:
+                stroke.line_to(*points[start + 1])
+                start += 1
+            else:
+                stroke.arc(*arc)
+                start = end
+
+    def __longest_arc(self, points: list, start: int) -> tuple[int, tuple]:
+        # Find the furthest point that an arc from points[start] can reach (by doubling
+        # the run until it no longer fits and then bisecting).  Returns (end, arc) or
+        # (start, None) if no arc fits
+        end = start + self._min_segments
+        if end >= len(points):
+            return start, None
+        arc = self.__arc(points, start, end)
+        if arc is None:
+            return start, None
+
+        step = 1
+        bad = len(points)
+        while end + step < len(points):
+            candidate = self.__arc(points, start, end + step)
+            if candidate is None:
+                bad = end + step
+                break
+            end, arc = end + step, candidate
+            step *= 2
+
+        while bad - end > 1:
+            middle = (end + bad) // 2
+            candidate = self.__arc(points, start, middle)
+            if candidate is None:
+                bad = middle
+            else:
+                end, arc = middle, candidate
+        return end, arc
+
+    def __arc(self, points: list, start: int, end: int) -> tuple[float, float, float]:
+        # Fit an arc from points[start] through points[end].  Returns the (heading,
+        # radius, extent) to draw it with or None if the points don't lie on an arc
+        # Take the circle through the ends and the middle, or (for a closed run) through
+        # the start and the points a third and two thirds of the way along
+        centre = ArcFitter.__centre(points[start], points[(start + end) // 2], points[end])
+        if centre is None:
+            third = (end - start) // 3
+            centre = ArcFitter.__centre(points[start], points[start + third], points[start + 2 * third])
+        if centre is None:
+            return None
+        x0, y0 = points[start]
+        radius = math.hypot(x0 - centre[0], y0 - centre[1])
+        if radius > self._max_radius:
+            return None
+
+        sweep = 0.0
+        angle = math.degrees(math.atan2(y0 - centre[1], x0 - centre[0]))
+        for index in range(start, end):
+            (x1, y1), (x2, y2) = points[index], points[index + 1]
+            if abs(math.hypot(x2 - centre[0], y2 - centre[1]) - radius) > self._tolerance:
+                return None
+            if abs(math.hypot((x1 + x2) / 2 - centre[0], (y1 + y2) / 2 - centre[1]) - radius) > self._tolerance:
+                return None
+
+            # Every line must turn the same way round the centre
+            next_angle = math.degrees(math.atan2(y2 - centre[1], x2 - centre[0]))
+            turn = (next_angle - angle + 180) % 360 - 180
+            if turn == 0 or (sweep != 0 and (turn > 0) != (sweep > 0)):
+                return None
+            sweep += turn
+            angle = next_angle
+
+        if abs(sweep) > 360 + ANGLE_TOLERANCE:
+            return None
+
+        # Leave the start point at a tangent, with the centre to the left (anticlockwise)
+        # or to the right (clockwise, a negative radius)
+        start_angle = math.degrees(math.atan2(y0 - centre[1], x0 - centre[0]))
+        if sweep > 0:
+            return (start_angle + 90) % 360, radius, sweep
+        return (start_angle - 90) % 360, -radius, -sweep
+
+    @staticmethod
+    def __centre(a: tuple, b: tuple, c: tuple) -> tuple[float, float]:
+        # The centre of the circle through three points (None if they are in a line)
+        (ax, ay), (bx, by), (cx, cy) = a, b, c
+        d = 2 * (ax * (by - cy) + bx * (cy - ay) + cx * (ay - by))
+        if abs(d) < 1e-9:
+            return None
+        a_squared, b_squared, c_squared = ax * ax + ay * ay, bx * bx + by * by, cx * cx + cy * cy
+        return ((a_squared * (by - cy) + b_squared * (cy - ay) + c_squared * (ay - by)) / d,
+                (a_squared * (cx - bx) + b_squared * (ax - cx) + c_squared * (bx - ax)) / d)
@@ -0,0 +1,572 @@
+#************************************************************************
+#
+#   artwork_import.py
+#
+#   Import of SVG and G-code artwork as display lists
+#   Valiant Turtle 2 - Communicator Linux Firmware
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+import logging
+import math
+import os
+import re
+import xml.etree.ElementTree as ElementTree
+from abstract_turtle import TurtleInterface
+from display_list import DisplayList, Stroke
+
+# Drawing area (mm) - A1 landscape, as used by ScreenTurtle
+A1_WIDTH = 841
+A1_HEIGHT = 594
+
+# How far (in mm on the page) flattened curves may stray from the true curve
+DEFAULT_TOLERANCE = 0.1
+
+SVG_EXTENSIONS = (".svg",)
+GCODE_EXTENSIONS = (".gcode", ".gco", ".g", ".nc", ".ngc", ".tap")
+
+class ArtworkError(Exception):
+    pass
+
+# Artwork is read as a stream of pen moves: ("move", x, y) moves to (x, y) with the
+# pen up and ("line", x, y) draws a line to (x, y).  Each stage below is a generator,
+# so a file is never held in memory as a whole
+
+def _flatten_cubic(p0: tuple, p1: tuple, p2: tuple, p3: tuple, tolerance: float):
+    # Yield points along a cubic Bézier curve (excluding p0), splitting it in half until
+    # the control points are within tolerance of the chord
+    stack = [(p0, p1, p2, p3, 0)]
+    while stack:
+        p0, p1, p2, p3, depth = stack.pop()
+        dx, dy = p3[0] - p0[0], p3[1] - p0[1]
+        length = math.hypot(dx, dy)
+        if length > 0:
+            flatness = max(abs((p1[0] - p0[0]) * dy - (p1[1] - p0[1]) * dx), abs((p2[0] - p0[0]) * dy - (p2[1] - p0[1]) * dx)) / length
+        else:
+            flatness = max(math.hypot(p1[0] - p0[0], p1[1] - p0[1]), math.hypot(p2[0] - p0[0], p2[1] - p0[1]))
+
+        if flatness <= tolerance or depth >= 16:
+            yield p3
+            continue
+
+        # de Casteljau subdivision (the second half is pushed first so the first half comes out first)
+        p01 = ((p0[0] + p1[0]) / 2, (p0[1] + p1[1]) / 2)
+        p12 = ((p1[0] + p2[0]) / 2, (p1[1] + p2[1]) / 2)
+        p23 = ((p2[0] + p3[0]) / 2, (p2[1] + p3[1]) / 2)
+        p012 = ((p01[0] + p12[0]) / 2, (p01[1] + p12[1]) / 2)
+        p123 = ((p12[0] + p23[0]) / 2, (p12[1] + p23[1]) / 2)
+        middle = ((p012[0] + p123[0]) / 2, (p012[1] + p123[1]) / 2)
+        stack.append((middle, p123, p23, p3, depth + 1))
+        stack.append((p0, p01, p012, middle, depth + 1))
+
+def _flatten_arc(centre: tuple, rx: float, ry: float, rotation: float, start_angle: float, sweep: float, tolerance: float):
+    # Yield points along an elliptical arc (excluding its start), with the number of
+    # lines chosen so that none strays more than tolerance from the arc
+    radius = max(rx, ry)
+    if radius <= tolerance:
+        steps = 1
+    else:
+        step_angle = 2 * math.acos(1 - tolerance / radius)
+        steps = max(1, math.ceil(abs(sweep) / step_angle))
+
+    cos_rotation, sin_rotation = math.cos(rotation), math.sin(rotation)
+    for step in range(1, steps + 1):
+        angle = start_angle + sweep * step / steps
+        x, y = rx * math.cos(angle), ry * math.sin(angle)
+        yield centre[0] + x * cos_rotation - y * sin_rotation, centre[1] + x * sin_rotation + y * cos_rotation
+
+def _svg_arc(start: tuple, rx: float, ry: float, rotation_degrees: float, large_arc: bool, sweep_flag: bool, end: tuple, tolerance: float):
+    # Yield points along an SVG arc (converting from SVG's end point parameters to a
+    # centre and angles, see "Elliptical arc implementation notes" in the SVG specification)
+    rx, ry = abs(rx), abs(ry)
+    if rx == 0 or ry == 0:
+        yield end
+        return
+    if start == end:
+        return
+
+    rotation = math.radians(rotation_degrees)
+    cos_rotation, sin_rotation = math.cos(rotation), math.sin(rotation)
+    dx, dy = (start[0] - end[0]) / 2, (start[1] - end[1]) / 2
+    x1 = cos_rotation * dx + sin_rotation * dy
+    y1 = -sin_rotation * dx + cos_rotation * dy
+
+    # Scale the radii up if they are too small to reach the end point
+    scale = (x1 * x1) / (rx * rx) + (y1 * y1) / (ry * ry)
+    if scale > 1:
+        rx, ry = rx * math.sqrt(scale), ry * math.sqrt(scale)
+
+    numerator = rx * rx * ry * ry - rx * rx * y1 * y1 - ry * ry * x1 * x1
+    denominator = rx * rx * y1 * y1 + ry * ry * x1 * x1
+    factor = math.sqrt(max(0.0, numerator / denominator))
+    if large_arc == sweep_flag:
+        factor = -factor
+    cx1, cy1 = factor * rx * y1 / ry, -factor * ry * x1 / rx
+    centre = (cos_rotation * cx1 - sin_rotation * cy1 + (start[0] + end[0]) / 2,
+              sin_rotation * cx1 + cos_rotation * cy1 + (start[1] + end[1]) / 2)
+
+    start_angle = math.atan2((y1 - cy1) / ry, (x1 - cx1) / rx)
+    end_angle = math.atan2((-y1 - cy1) / ry, (-x1 - cx1) / rx)
+    sweep = end_angle - start_angle
+    if sweep_flag and sweep < 0:
+        sweep += 2 * math.pi
+    elif not sweep_flag and sweep > 0:
+        sweep -= 2 * math.pi
+
+    points = list(_flatten_arc(centre, rx, ry, rotation, start_angle, sweep, tolerance))
+    points[-1] = end  # Finish exactly at the end point
+    yield from points
+
+class _PathScanner:
+    # Reads the commands, numbers and flags of SVG path data
+    _NUMBER = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+    _SEPARATORS = re.compile(r"[\s,]*")
+
+    def __init__(self, data: str):
+        self._data = data
+        self._position = 0
+
+    def __skip(self):
+        self._position = _PathScanner._SEPARATORS.match(self._data, self._position).end()
+
+    def at_end(self) -> bool:
+        self.__skip()
+        return self._position >= len(self._data)
+
+    def has_number(self) -> bool:
+        self.__skip()
+        return _PathScanner._NUMBER.match(self._data, self._position) is not None
+
+    def command(self) -> str:
+        self.__skip()
+        command = self._data[self._position]
+        if command not in "MmLlHhVvCcSsQqTtAaZz":
+            raise ArtworkError(f"Unexpected '{command}' in path data at position {self._position}")
+        self._position += 1
+        return command
+
+    def number(self) -> float:
+        self.__skip()
+        match = _PathScanner._NUMBER.match(self._data, self._position)
+        if match is None:
+            raise ArtworkError(f"Expected a number in path data at position {self._position}")
+        self._position = match.end()
+        return float(match.group())
+
+    def flag(self) -> bool:
+        # Flags are single characters, which may be written without separators ("a1 1 0 011 1")
+        self.__skip()
+        flag = self._data[self._position:self._position + 1]
+        if flag not in ("0", "1"):
+            raise ArtworkError(f"Expected an arc flag in path data at position {self._position}")
+        self._position += 1
+        return flag == "1"
+
+def svg_path_moves(data: str, tolerance: float):
+    """Yield the pen moves of SVG path data (in the path's own coordinates)"""
+    scanner = _PathScanner(data)
+    x = y = 0.0
+    start_x = start_y = 0.0
+    last_control = None  # (command type, control point) for the S and T commands
+    command = None
+
+    while not scanner.at_end():
+        if command is None or not scanner.has_number():
+            command = scanner.command()
+        elif command in "Zz":
+            raise ArtworkError("Unexpected number after a close path command")
+
+        relative = command.islower()
+        kind = command.upper()
+        base_x, base_y = (x, y) if relative else (0.0, 0.0)
+        control = None
+
+        if kind == "M":
+            x, y = base_x + scanner.number(), base_y + scanner.number()
+            start_x, start_y = x, y
+            yield "move", x, y
+            # Further coordinate pairs are lines
+            command = "l" if relative else "L"
+        elif kind == "L":
+            x, y = base_x + scanner.number(), base_y + scanner.number()
+            yield "line", x, y
+        elif kind == "H":
+            x = base_x + scanner.number()
+            yield "line", x, y
+        elif kind == "V":
+            y = base_y + scanner.number()
+            yield "line", x, y
+        elif kind in "CS":
+            if kind == "C":
+                control1 = (base_x + scanner.number(), base_y + scanner.number())
+            elif last_control is not None and last_control[0] == "C":
+                control1 = (2 * x - last_control[1][0], 2 * y - last_control[1][1])
+            else:
+                control1 = (x, y)
+            control2 = (base_x + scanner.number(), base_y + scanner.number())
+            end = (base_x + scanner.number(), base_y + scanner.number())
+            for point in _flatten_cubic((x, y), control1, control2, end, tolerance):
+                yield "line", *point
+            x, y = end
+            control = ("C", control2)
+        elif kind in "QT":
+            if kind == "Q":
+                quadratic = (base_x + scanner.number(), base_y + scanner.number())
+            elif last_control is not None and last_control[0] == "Q":
+                quadratic = (2 * x - last_control[1][0], 2 * y - last_control[1][1])
+            else:
+                quadratic = (x, y)
+            end = (base_x + scanner.number(), base_y + scanner.number())
+            # A quadratic curve is a cubic with control points two thirds of the way to its control point
+            control1 = (x + 2 * (quadratic[0] - x) / 3, y + 2 * (quadratic[1] - y) / 3)
+            control2 = (end[0] + 2 * (quadratic[0] - end[0]) / 3, end[1] + 2 * (quadratic[1] - end[1]) / 3)
+            for point in _flatten_cubic((x, y), control1, control2, end, tolerance):
+                yield "line", *point
+            x, y = end
+            control = ("Q", quadratic)
+        elif kind == "A":
+            rx, ry, rotation = scanner.number(), scanner.number(), scanner.number()
+            large_arc, sweep = scanner.flag(), scanner.flag()
+            end = (base_x + scanner.number(), base_y + scanner.number())
+            for point in _svg_arc((x, y), rx, ry, rotation, large_arc, sweep, end, tolerance):
+                yield "line", *point
+            x, y = end
+        else:
+            # Close path
+            if (x, y) != (start_x, start_y):
+                yield "line", start_x, start_y
+            x, y = start_x, start_y
+
+        last_control = control
+
+def _parse_transform(transform: str) -> tuple:
+    # Parse an SVG transform attribute into a matrix (a, b, c, d, e, f)
+    matrix = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+    for name, arguments in re.findall(r"(matrix|translate|scale|rotate|skewX|skewY)\s*\(([^)]*)\)", transform):
+        values = [float(value) for value in _PathScanner._NUMBER.findall(arguments)]
+        if name == "matrix" and len(values) == 6:
+            step = tuple(values)
+        elif name == "translate" and values:
+            step = (1.0, 0.0, 0.0, 1.0, values[0], values[1] if len(values) > 1 else 0.0)
+        elif name == "scale" and values:
+            step = (values[0], 0.0, 0.0, values[1] if len(values) > 1 else values[0], 0.0, 0.0)
+        elif name == "rotate" and values:
+            angle = math.radians(values[0])
+            cos_angle, sin_angle = math.cos(angle), math.sin(angle)
+            cx, cy = (values[1], values[2]) if len(values) == 3 else (0.0, 0.0)
+            step = (cos_angle, sin_angle, -sin_angle, cos_angle,
+                    cx - cos_angle * cx + sin_angle * cy, cy - sin_angle * cx - cos_angle * cy)
+        elif name == "skewX" and values:
+            step = (1.0, 0.0, math.tan(math.radians(values[0])), 1.0, 0.0, 0.0)
+        elif name == "skewY" and values:
+            step = (1.0, math.tan(math.radians(values[0])), 0.0, 1.0, 0.0, 0.0)
+        else:
+            raise ArtworkError(f"Invalid transform '{name}({arguments})'")
+        matrix = _multiply(matrix, step)
+    return matrix
+
+def _multiply(m: tuple, n: tuple) -> tuple:
+    # The matrix that applies n and then m
+    return (m[0] * n[0] + m[2] * n[1], m[1] * n[0] + m[3] * n[1],
+            m[0] * n[2] + m[2] * n[3], m[1] * n[2] + m[3] * n[3],
+            m[0] * n[4] + m[2] * n[5] + m[4], m[1] * n[4] + m[3] * n[5] + m[5])
+
+def _attribute(element, name: str) -> float:
+    value = _PathScanner._NUMBER.match(element.get(name, "0").strip())
+    return float(value.group()) if value else 0.0
+
+def _shape_path(tag: str, element) -> str:
+    # Return the path data for a basic shape (or None if the element isn't one)
+    if tag == "path":
+        return element.get("d", "")
+    if tag == "line":
+        return f"M {_attribute(element, 'x1')} {_attribute(element, 'y1')} L {_attribute(element, 'x2')} {_attribute(element, 'y2')}"
+    if tag in ("polyline", "polygon"):
+        points = element.get("points", "").strip()
+        if not points:
+            return ""
+        return f"M {points}" + (" Z" if tag == "polygon" else "")
+    if tag == "rect":
+        x, y = _attribute(element, "x"), _attribute(element, "y")
+        width, height = _attribute(element, "width"), _attribute(element, "height")
+        return f"M {x} {y} h {width} v {height} h {-width} Z"
+    if tag in ("circle", "ellipse"):
+        cx, cy = _attribute(element, "cx"), _attribute(element, "cy")
+        if tag == "circle":
+            rx = ry = _attribute(element, "r")
+        else:
+            rx, ry = _attribute(element, "rx"), _attribute(element, "ry")
+        return f"M {cx + rx} {cy} A {rx} {ry} 0 1 1 {cx - rx} {cy} A {rx} {ry} 0 1 1 {cx + rx} {cy} Z"
+    return None
+
+def svg_moves(path: str, tolerance: float):
+    """
+    Yield the pen moves of the paths and basic shapes (line, polyline, polygon, rect,
+    circle and ellipse) in an SVG file, in the file's user units with y downwards.
+    Transforms are applied; definitions, clip paths, masks and the like are skipped.
+    """
+    hidden = ("defs", "clipPath", "mask", "marker", "pattern", "symbol", "metadata", "style")
+    transforms = [(1.0, 0.0, 0.0, 1.0, 0.0, 0.0)]
+    hidden_depth = 0
+
+    try:
+        for event, element in ElementTree.iterparse(path, events=("start", "end")):
+            tag = element.tag.rsplit("}", 1)[-1]
+            if event == "start":
+                transforms.append(_multiply(transforms[-1], _parse_transform(element.get("transform", ""))))
+                if tag in hidden:
+                    hidden_depth += 1
+                continue
+
+            matrix = transforms.pop()
+            if tag in hidden:
+                hidden_depth -= 1
+            elif hidden_depth == 0:
+                data = _shape_path(tag, element)
+                if tag == "use":
+                    logging.warning("svg_moves - <use> elements are not supported and have been skipped")
+                elif data:
+                    # Flatten in the element's own coordinates, to the tolerance scaled to match
+                    scale = math.sqrt(abs(matrix[0] * matrix[3] - matrix[1] * matrix[2]))
+                    if scale > 0:
+                        a, b, c, d, e, f = matrix
+                        for kind, x, y in svg_path_moves(data, tolerance / scale):
+                            yield kind, a * x + c * y + e, b * x + d * y + f
+
+            # Discard elements once they have been read
+            element.clear()
+    except ElementTree.ParseError as e:
+        raise ArtworkError(f"Unable to read {path}: {e}")
+
+def gcode_moves(path: str, tolerance: float):
+    """
+    Yield the pen moves of a G-code file (in mm).  The supported subset is G0 (pen up
+    moves), G1 (lines), G2/G3 (clockwise and anticlockwise arcs, by I/J centre offset
+    or R radius), G20/G21 (inches or mm) and G90/G91 (absolute or relative).  The pen
+    is down for G1-G3 unless it has been lifted by M5 or a positive Z (M3 or a Z of
+    zero or less puts it back down).
+    """
+    words = re.compile(r"([A-Z])\s*([-+]?(?:\d+\.?\d*|\.\d+))")
+    x = y = 0.0
+    motion = None
+    absolute = True
+    units = 1.0
+    pen_down = True
+
+    with open(path, "r") as gcode_file:
+        for line_number, line in enumerate(gcode_file, 1):
+            line = re.sub(r"\(.*?\)", "", line.split(";", 1)[0]).upper()
+            fields = {}
+            codes = []
+            for letter, value in words.findall(line):
+                if letter in "GM":
+                    codes.append(f"{letter}{float(value):g}")
+                else:
+                    fields[letter] = float(value)
+
+            for code in codes:
+                if code in ("G0", "G1", "G2", "G3"):
+                    motion = code
+                elif code == "G20":
+                    units = 25.4
+                elif code == "G21":
+                    units = 1.0
+                elif code == "G90":
+                    absolute = True
+                elif code == "G91":
+                    absolute = False
+                elif code in ("M3", "M4"):
+                    pen_down = True
+                elif code in ("M5", "M2", "M30"):
+                    pen_down = False
+
+            if "Z" in fields:
+                z = fields["Z"] * units
+                pen_down = z <= 0 if absolute else (pen_down if z == 0 else z < 0)
+
+            if motion is None or ("X" not in fields and "Y" not in fields):
+                continue
+
+            if absolute:
+                end_x = fields["X"] * units if "X" in fields else x
+                end_y = fields["Y"] * units if "Y" in fields else y
+            else:
+                end_x = x + fields.get("X", 0.0) * units
+                end_y = y + fields.get("Y", 0.0) * units
+
+            if motion == "G0" or not pen_down:
+                yield "move", end_x, end_y
+            elif motion == "G1":
+                yield "line", end_x, end_y
+            else:
+                clockwise = motion == "G2"
+                if "R" in fields:
+                    centre = _radius_centre((x, y), (end_x, end_y), fields["R"] * units, clockwise)
+                    if centre is None:
+                        raise ArtworkError(f"Line {line_number}: the arc radius is too small to reach the end point")
+                else:
+                    centre = (x + fields.get("I", 0.0) * units, y + fields.get("J", 0.0) * units)
+
+                radius = math.hypot(x - centre[0], y - centre[1])
+                start_angle = math.atan2(y - centre[1], x - centre[0])
+                sweep = math.atan2(end_y - centre[1], end_x - centre[0]) - start_angle
+                if clockwise and sweep >= 0:
+                    sweep -= 2 * math.pi
+                elif not clockwise and sweep <= 0:
+                    sweep += 2 * math.pi
+
+                for point_x, point_y in _flatten_arc(centre, radius, radius, 0.0, start_angle, sweep, tolerance):
+                    yield "line", point_x, point_y
+            x, y = end_x, end_y
+
+def _radius_centre(start: tuple, end: tuple, radius: float, clockwise: bool) -> tuple:
+    # The centre of a G2/G3 arc given by radius (a negative radius is the longer way round)
+    dx, dy = end[0] - start[0], end[1] - start[1]
+    chord = math.hypot(dx, dy)
+    if chord == 0 or abs(radius) < chord / 2:
+        return None
+    offset = math.sqrt(radius * radius - chord * chord / 4)
+    if clockwise == (radius > 0):
+        offset = -offset
+    return (start[0] + dx / 2 - offset * dy / chord, start[1] + dy / 2 + offset * dx / chord)
+
+def drawn_bounds(moves) -> tuple:
+    """Return the (min x, min y, max x, max y) of the lines drawn by the moves (None if nothing is drawn)"""
+    bounds = None
+    x = y = 0.0
+    for kind, next_x, next_y in moves:
+        if kind == "line":
+            if bounds is None:
+                bounds = (x, y, x, y)
+            bounds = (min(bounds[0], x, next_x), min(bounds[1], y, next_y),
+                      max(bounds[2], x, next_x), max(bounds[3], y, next_y))
+        x, y = next_x, next_y
+    return bounds
+
+def fit_to_page(moves, bounds: tuple, width: float, height: float, flip_y: bool):
+    """Yield the moves scaled (keeping their aspect ratio) and centred to fill a width x height page centred on the origin"""
+    scale = _page_scale(bounds, width, height)
+    centre_x, centre_y = (bounds[0] + bounds[2]) / 2, (bounds[1] + bounds[3]) / 2
+    y_scale = -scale if flip_y else scale
+    for kind, x, y in moves:
+        yield kind, (x - centre_x) * scale, (y - centre_y) * y_scale
+
+def _page_scale(bounds: tuple, width: float, height: float) -> float:
+    artwork_width, artwork_height = bounds[2] - bounds[0], bounds[3] - bounds[1]
+    scales = []
+    if artwork_width > 0:
+        scales.append(width / artwork_width)
+    if artwork_height > 0:
+        scales.append(height / artwork_height)
+    return min(scales) if scales else 1.0
+
+def moves_to_strokes(moves):
+    """Yield the moves as strokes (one for each run of lines)"""
+    stroke = None
+    x = y = 0.0
+    for kind, next_x, next_y in moves:
+        if kind == "move":
+            if stroke is not None:
+                yield stroke
+                stroke = None
+        else:
+            if stroke is None:
+                stroke = Stroke(x, y)
+            stroke.line_to(next_x, next_y)
+        x, y = next_x, next_y
+    if stroke is not None:
+        yield stroke
+
+class ArtworkImporter:
+    """
+    Imports SVG or G-code artwork (chosen by file extension) as display list strokes,
+    scaled to fit an A1 landscape page (less a margin) centred on where the turtle
+    starts.  The file is read twice, once to find the size of the artwork and once
+    to produce the strokes, and is streamed each time:
+
+        importer = ArtworkImporter()
+        for stroke in importer.strokes("drawing.svg"):
+            ...
+
+    Curves are flattened into lines no more than tolerance mm from the curve (see
+    ArcFitter to turn them back into native arcs).
+    """
+    def __init__(self, width: float = A1_WIDTH, height: float = A1_HEIGHT, margin: float = 20, tolerance: float = DEFAULT_TOLERANCE):
+        if width <= 2 * margin or height <= 2 * margin:
+            raise ValueError("ArtworkImporter::__init__ - The margin leaves no room to draw")
+        self._width = width - 2 * margin
+        self._height = height - 2 * margin
+        self._tolerance = tolerance
+
+    def strokes(self, path: str):
+        """
+        Return a generator of the strokes of the artwork in a file.  The artwork is sized
+        straight away, so errors in the file are raised before any strokes are drawn
+        """
+        extension = os.path.splitext(path)[1].lower()
+        if extension in SVG_EXTENSIONS:
+            moves, flip_y = svg_moves, True
+        elif extension in GCODE_EXTENSIONS:
+            moves, flip_y = gcode_moves, False
+        else:
+            raise ArtworkError(f"{path} is not an SVG or G-code file (unknown extension '{extension}')")
+
+        # Size the artwork (again, more finely, if the curves were flattened too coarsely
+        # for the scale), then read it flattened to the tolerance at the page scale
+        source_tolerance = self._tolerance
+        for _ in range(3):
+            bounds = drawn_bounds(moves(path, source_tolerance))
+            if bounds is None:
+                logging.warning(f"ArtworkImporter::strokes - {path} has nothing to draw")
+                return iter(())
+            scale = _page_scale(bounds, self._width, self._height)
+            if source_tolerance * scale <= self._tolerance * 10:
+                break
+            source_tolerance = self._tolerance / scale
+
+        logging.info(f"ArtworkImporter::strokes - Scaling {path} by {scale:.4f} to fit the page")
+        return moves_to_strokes(fit_to_page(moves(path, self._tolerance / scale), bounds, self._width, self._height, flip_y))
+
+    def display_list(self, path: str) -> DisplayList:
+        """Return the artwork in a file as a display list (the motors are turned on to draw it)"""
+        display_list = DisplayList()
+        display_list.prologue = [("motors", True)]
+        display_list.strokes = list(self.strokes(path))
+        display_list.epilogue = [("motors", False)]
+        return display_list
+
+class Artwork():
+    """
+    Draws an SVG or G-code file like the built-in drawings (Cat, Logotype...).  The
+    strokes are streamed from the file to the turtle as they are read.
+    """
+    def __init__(self, t: TurtleInterface, speed: int, path: str, importer: ArtworkImporter = None):
+        self._t = t
+        self._speed = speed
+        self._path = path
+        self._importer = ArtworkImporter() if importer is None else importer
+
+    def render(self):
+        display_list = DisplayList()
+        display_list.prologue = [("motors", True), ("speed", self._speed), ("eyes", 0, 0, 255, 0)]
+        display_list.strokes = self._importer.strokes(self._path)
+        display_list.epilogue = [("motors", False), ("eyes", 0, 0, 0, 0)]
+        display_list.replay(self._t)
@@ -0,0 +1,1665 @@
+#************************************************************************
+#
+#   async_commands_tx.py
+#
+#   Command Tx handling (asyncio API)
+#   Valiant Turtle 2 - Communicator firmware
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+import asyncio
+import logging
+import time
+import zlib
+from ble_central import BleCentral, PendingResponse, CommandRefusedError
+from bulk_transfer import BulkTransfer
+import protocol
+
+# Note: The command IDs and packet formats are generated from
+# protocol/schema.py (see protocol.py) - change the schema rather
+# than editing the formats here
+
+# Commands that can be submitted without waiting for their response (see submit)
+SUBMITTABLE_COMMANDS = frozenset(name for name in protocol.COMMAND_NAMES.values() if name != "nop" and not name.startswith("program_"))
+
+class AsyncCommandsTx:
+    """
+    Sends commands to the robot from an asyncio application.  The BLE central runs
+    as a task on the caller's event loop, so commands can be awaited directly:
+
+        commands = AsyncCommandsTx()
+        await commands.connect()
+        if await commands.wait_for_connection(30):
+            success, x, y, heading = await commands.forward(100)
+
+    CommandsTx is a synchronous facade over this class for scripts that don't use
+    asyncio.  Commands can be awaited from several tasks at once; they are all sent
+    straight away (subject to the robot's flow control credit) and each response
+    is routed to its command by sequence ID.
+
+    Commands can also be submitted without waiting (for example to stream the
+    segments of a drawing), which keeps the robot's queue topped up rather than
+    paying a round trip between consecutive commands:
+
+        commands.submit("forward", 100)
+        commands.submit("left", 90)
+        if not await commands.flush():
+            logging.error("A submitted command failed")
+    """
+    def __init__(self):
+        self._ble_central = BleCentral()
+        self._bulk_transfer = BulkTransfer()
+        self._command_sequence = 1
+        self._central_task = None
+
+        self._long_timeout = 60.0
+
+        # Motions are expected to finish within their expected duration (reported by
+        # the robot when they start) multiplied by this factor, plus the short timeout
+        self._motion_timeout_factor = 1.25
+
+        # Motion commands aren't retransmitted until they have been waiting this long
+        # for the robot to acknowledge that the motion has started.  setposition, towards,
+        # setx and sety turn before they are acknowledged (and the robot can't respond
+        # whilst it is turning), so the measured round trip is far too short for them
+        self._motion_ack_timeout = 10.0
+
+        # If a response hasn't arrived after the retry interval the command is sent
+        # again (with the same sequence ID, so the robot will not execute it twice).
+        # The interval doubles after each retry up to the maximum.  The retry interval
+        # and the timeout for commands that respond straight away are set from the
+        # measured link quality (see LinkQuality)
+        self._link_quality = self._ble_central.link_quality
+
+        # Submitted commands are started in order by the submission task.  At most
+        # _max_outstanding are in flight at once, which is enough to keep the robot's
+        # queue full without overflowing the C2P queue.  If a submitted command fails
+        # the commands after it are cancelled until flush() is called
+        self._submissions = None
+        self._submission_task = None
+        self._outstanding = set()
+        self._max_outstanding = 32
+        self._submit_failed = False
+
+    async def connect(self, turtle_id: int = None):
+        # Start the BLE central (it connects in the background - see wait_for_connection)
+        if self._central_task is None:
+            logging.info("AsyncCommandsTx::connect - Starting the BLE central role")
+            # Connect only to the robot advertising this turtle ID (or to any robot)
+            self._ble_central.turtle_id = turtle_id
+            self._central_task = asyncio.create_task(self._ble_central.run())
+
+    async def wait_for_connection(self, timeout: float = None) -> bool:
+        # Wait until a robot is connected.  Returns False if the timeout expires first
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._ble_central.connected:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.1)
+        return True
+
+    async def disconnect(self):
+        if self._central_task is not None:
+            logging.info("AsyncCommandsTx::disconnect - Disconnecting BLE")
+            self._ble_central.disconnect()
+            await self.__cancel_submissions()
+
+            # Stop the BLE central tasks
+            self._central_task.cancel()
+            try:
+                await self._central_task
+            except asyncio.CancelledError:
+                pass
+            self._central_task = None
+            logging.info("AsyncCommandsTx::disconnect - Stopped the BLE central role")
+
+    async def scan(self, timeout: float = 5.0) -> list[dict]:
+        # Find the robots in range and their advertised status (without connecting)
+        return await self._ble_central.scan(timeout)
+
+    @property
+    def connected(self) -> bool:
+        return self._ble_central.connected
+
+    @property
+    def short_timeout(self) -> float:
+        # Timeout for commands that respond straight away (adapts to the link quality)
+        return self._link_quality.short_timeout
+
+    def link_stats(self) -> dict:
+        # Link quality and queue statistics
+        stats = self._link_quality.stats
+        stats.update(self._ble_central.queue_stats)
+        return stats
+
+    @property
+    def low_latency(self) -> bool:
+        return self._ble_central.low_latency
+
+    @low_latency.setter
+    def low_latency(self, low_latency: bool):
+        # Request low latency connection parameters (for streaming commands) or relaxed
+        # parameters (to save power when idle) - takes effect from the next connection
+        self._ble_central.low_latency = low_latency
+
+    # Pipelined commands ---------------------------------------------------------------------------------------------
+
+    def submit(self, name: str, *args) -> asyncio.Future:
+        # Queue a command without waiting for its response (this must be called from the
+        # event loop).  Commands are sent in the order they are submitted and the returned
+        # future is set to the command's result when its response arrives
+        if name not in SUBMITTABLE_COMMANDS:
+            raise ValueError(f"AsyncCommandsTx::submit - {name} is not a command that can be submitted")
+        future = asyncio.get_running_loop().create_future()
+        self.__queue_submission(name, args, future)
+        return future
+
+    def barrier(self) -> asyncio.Future:
+        # Commands submitted after a barrier are not sent until everything submitted before
+        # it has completed.  The returned future is set to False if any of them failed
+        future = asyncio.get_running_loop().create_future()
+        self.__queue_submission(None, None, future)
+        return future
+
+    async def flush(self) -> bool:
+        # Wait until every submitted command has completed.  Returns False if any of them
+        # failed (the commands submitted after it are cancelled) and clears the failure so
+        # further commands can be submitted
+        if self._submissions is not None:
+            await self._submissions.join()
+        if self._outstanding:
+            await asyncio.wait(set(self._outstanding))
+
+        succeeded = not self._submit_failed
+        self._submit_failed = False
+        return succeeded
+
+    def __queue_submission(self, name: str, args: tuple, future: asyncio.Future):
+        if self._submission_task is None:
+            self._submissions = asyncio.Queue()
+            self._submission_task = asyncio.create_task(self.__run_submissions())
+        self._submissions.put_nowait((name, args, future))
+
+    async def __run_submissions(self):
+        # Start the submitted commands in order.  Each command's task runs until it has
+        # queued its packet before the next one starts, so they are sent in order too
+        while True:
+            name, args, future = await self._submissions.get()
+            try:
+                if name is None:
+                    if self._outstanding:
+                        await asyncio.wait(set(self._outstanding))
+                    if not future.done():
+                        future.set_result(not self._submit_failed)
+                    continue
+
+                while len(self._outstanding) >= self._max_outstanding:
+                    await asyncio.wait(set(self._outstanding), return_when=asyncio.FIRST_COMPLETED)
+
+                if self._submit_failed or future.done():
+                    future.cancel()
+                    continue
+
+                task = asyncio.create_task(getattr(self, name)(*args))
+                self._outstanding.add(task)
+                task.add_done_callback(lambda task, future=future: self.__submission_done(task, future))
+            finally:
+                self._submissions.task_done()
+
+    def __submission_done(self, task: asyncio.Task, future: asyncio.Future):
+        self._outstanding.discard(task)
+
+        if task.cancelled():
+            future.cancel()
+            failed = True
+        elif task.exception() is not None:
+            if not future.done():
+                future.set_exception(task.exception())
+            failed = True
+        else:
+            result = task.result()
+            if not future.done():
+                future.set_result(result)
+            # Commands return success (or a tuple starting with it)
+            failed = not (result[0] if isinstance(result, tuple) else result)
+
+        if failed and not self._submit_failed:
+            logging.error("AsyncCommandsTx::__submission_done - A submitted command failed - cancelling the commands submitted after it")
+            self._submit_failed = True
+            for outstanding in self._outstanding:
+                outstanding.cancel()
+
+    async def __cancel_submissions(self):
+        # Drop the submitted commands (when disconnecting)
+        if self._submission_task is not None:
+            self._submission_task.cancel()
+            try:
+                await self._submission_task
+            except asyncio.CancelledError:
+                pass
+            while not self._submissions.empty():
+                _, _, future = self._submissions.get_nowait()
+                future.cancel()
+
+        for task in self._outstanding:
+            task.cancel()
+        if self._outstanding:
+            await asyncio.wait(set(self._outstanding))
+
+        self._submissions = None
+        self._submission_task = None
+        self._submit_failed = False
+
+    def __next_seq(self) -> int:
+        # Sequence IDs of commands still waiting for a response are skipped
+        for _ in range(255):
+            self._command_sequence += 1
+            if self._command_sequence > 255:
+                self._command_sequence = 1
+            if not self._ble_central.is_pending(self._command_sequence):
+                return self._command_sequence
+        raise RuntimeError("AsyncCommandsTx::__next_seq - Every sequence ID is waiting for a response")
+
+    async def __wait_for_command_response(self, seq_id: int, data: bytes, timeout: float, pending: PendingResponse) -> bytes:
+        # Wait for the response to a command, raising asyncio.TimeoutError if it doesn't
+        # arrive within the timeout.  When the robot acknowledges that a motion has
+        # started the deadline is moved to the expected end of the motion (plus a
+        # margin), so a stalled robot or failed link is noticed without waiting for
+        # the full timeout.  Once acknowledged the command isn't retransmitted (it is
+        # only sent again if the link drops, see BleCentral).
+        #
+        # A command sent whilst earlier commands are still waiting for their responses
+        # (such as a pipelined command - see submit) is queued behind them on the
+        # robot, so its timeout and retransmissions only start once they have been
+        # answered.  If the robot refuses the command CommandRefusedError is raised.
+        #
+        # A command is only retransmitted once it has been sent and the retry interval
+        # has passed since then: the measured retransmission timeout for commands that
+        # respond straight away, or the motion acknowledgement timeout for motions.  The
+        # robot may work on the commands queued behind a command before its response is
+        # sent, so the retry interval is widened by their expected service time.
+        #
+        # The round trip is measured for commands that respond straight away (unless
+        # they are retransmitted or queued, as the response could be to either
+        # transmission or include the time spent waiting in the robot's queue)
+        start_time = time.monotonic()
+        deadline = start_time + timeout
+        queued = not self._ble_central.is_first_pending(seq_id)
+        motion = data is not None and data[1] in protocol.LONG_TIMEOUT_COMMANDS
+        sample_rtt = data is not None and not motion and not queued
+        self._link_quality.add_command()
+
+        retry_interval = self.__retry_interval(motion)
+        retransmit = data is not None
+        sent_time = None
+        waiting_for = {pending.response, pending.acknowledgement}
+        while True:
+            if queued and self._ble_central.is_first_pending(seq_id):
+                # The robot starts on the command now, so its timeout and retry interval start too
+                queued = False
+                deadline = time.monotonic() + timeout
+                retry_interval = self.__retry_interval(motion)
+                if sent_time is not None:
+                    sent_time = time.monotonic()
+
+            # Time retransmissions from when the command was actually sent (it is sent
+            # again by BleCentral after a reconnection)
+            if retransmit and sent_time is not None and self._ble_central.is_queued(data):
+                sent_time = None
+                sample_rtt = False
+            if retransmit and sent_time is None and not self._ble_central.is_queued(data):
+                sent_time = time.monotonic()
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 and not queued:
+                self._link_quality.add_timeout()
+                raise asyncio.TimeoutError()
+
+            if not retransmit:
+                wait_time = retry_interval if queued else remaining
+            elif sent_time is None:
+                wait_time = retry_interval if queued else min(retry_interval, remaining)
+            else:
+                wait_time = max(sent_time + retry_interval - time.monotonic(), 0.0)
+                if not queued:
+                    wait_time = min(wait_time, remaining)
+            await asyncio.wait(waiting_for, timeout=wait_time, return_when=asyncio.FIRST_COMPLETED)
+
+            if pending.response.done():
+                if sample_rtt:
+                    self._link_quality.add_rtt(time.monotonic() - start_time)
+                return pending.response.result()
+
+            if pending.acknowledgement in waiting_for and pending.acknowledgement.done():
+                # The motion has started - wait for it to finish
+                duration_ms = pending.acknowledgement.result()
+                waiting_for = {pending.response}
+                queued = False
+                retransmit = False
+                deadline = time.monotonic() + self.__motion_deadline(duration_ms / 1000)
+                logging.debug(f"AsyncCommandsTx::__wait_for_command_response - Sequence ID = {seq_id} motion started, expected duration {duration_ms} ms")
+                continue
+
+            if queued or not retransmit or sent_time is None:
+                continue
+
+            # Retransmit the command if it was sent at least the retry interval ago
+            if time.monotonic() - sent_time >= retry_interval and time.monotonic() < deadline:
+                logging.info(f"AsyncCommandsTx::__wait_for_command_response - No response for Sequence ID = {seq_id} after {retry_interval:.2f} seconds - retransmitting")
+                self._ble_central.add_to_c2p_queue(data)
+                self._link_quality.add_retransmission()
+                sample_rtt = False
+                sent_time = None
+                retry_interval = max(retry_interval, min(retry_interval * 2, self._link_quality.max_retry_interval))
+
+    def __retry_interval(self, motion: bool) -> float:
+        # Time to wait for a response before retransmitting, allowing for the commands
+        # the robot reports as queued (see LinkQuality.queued_retry_interval)
+        retry_interval = self._link_quality.queued_retry_interval(self._ble_central.peripheral_queue_depth)
+        if motion:
+            retry_interval = max(retry_interval, self._motion_ack_timeout)
+        return retry_interval
+
+    def __motion_deadline(self, duration: float) -> float:
+        # Time to wait for a motion to complete once it has started: the expected
+        # duration plus a margin for timing errors and for the response to arrive
+        return duration * self._motion_timeout_factor + self.short_timeout
+
+    async def __send_command(self, seq_id: int, data: bytes, timeout: float) -> bytes:
+        # Queue a command and wait for its response.  The response is routed to this
+        # command by its sequence ID, so other commands can be in flight at the same time
+        pending = self._ble_central.expect_response(seq_id, data)
+        try:
+            self._ble_central.add_to_c2p_queue(data)
+            return await self.__wait_for_command_response(seq_id, data, timeout, pending)
+        finally:
+            self._ble_central.forget_response(seq_id)
+
+    # Commands ------------------------------------------------------------------------------------------------------
+
+    async def motors(self, enable: bool) -> bool:
+        if not self._ble_central.connected:
+            logging.info("AsyncCommandsTx::motors - Not connected to a robot")
+            return False
+        
+        command_id = protocol.CMD_MOTORS
+
+        # Command to enable or disable the motors
+        if enable:
+            parameter = 1
+        else:
+            parameter = 0
+
+        # Generate a sequence ID and queue the command
+        seq_id = self.__next_seq()
+        data = protocol.MOTORS_REQUEST.pack(seq_id, command_id, parameter)
+        logging.info(f"AsyncCommandsTx::motors - Command ID = {command_id}, Sequence ID = {seq_id}, enable = {enable}")
+        
+        # Wait for the command to be processed with a short timeout
+        try:
+            await self.__send_command(seq_id, data, self.short_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::motors - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::motors - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False
+
+        # This command does not return any data, so we don't need to return any
+        return True
+
+    async def forward(self, distance_mm: float) -> tuple[bool, float, float, float]:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::forward - Not connected to a robot")
+            return False, 0.0, 0.0, 0.0
+        
+        command_id = protocol.CMD_FORWARD
+
+        # Command to move the robot forward
+        # Generate a sequence ID and queue the command
+        seq_id = self.__next_seq()
+        data = protocol.FORWARD_REQUEST.pack(seq_id, command_id, distance_mm)
+        logging.info(f"AsyncCommandsTx::forward - Command ID = {command_id}, Sequence ID = {seq_id}, distance = {distance_mm}")
+
+        # Wait for the command to be processed with a long timeout
+        try:
+            response = await self.__send_command(seq_id, data, self._long_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::forward - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False, 0.0, 0.0, 0.0
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::forward - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False, 0.0, 0.0, 0.0
+
+        # Extract the position and heading from the response
+        try:
+            seq_id, x, y, heading = protocol.FORWARD_RESPONSE.unpack_from(response)
+        except ValueError as e:
+            logging.error(f"AsyncCommandsTx::forward - Error unpacking response: {e}")
+            return False, 0.0, 0.0, 0.0
+        
+        x = round(x, 2)
+        y = round(y, 2)
+        heading = round(heading, 2)
+        logging.info(f"AsyncCommandsTx::forward - X = {x}, Y = {y}, heading = {heading}")
+        return True, x, y, heading
+    
+    async def backward(self, distance_mm: float) -> tuple[bool, float, float, float]:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::backward - Not connected to a robot")
+            return False, 0.0, 0.0, 0.0
+        
+        command_id = protocol.CMD_BACKWARD
+
+        # Command to move the robot backward
+        # Generate a sequence ID and queue the command
+        seq_id = self.__next_seq()
+        data = protocol.BACKWARD_REQUEST.pack(seq_id, command_id, distance_mm)
+        logging.info(f"AsyncCommandsTx::backward - Command ID = {command_id}, Sequence ID = {seq_id}, distance = {distance_mm}")
+        
+        # Wait for the command to be processed with a long timeout
+        try:
+            response = await self.__send_command(seq_id, data, self._long_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::backward - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False, 0.0, 0.0, 0.0
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::backward - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False, 0.0, 0.0, 0.0
+
+        # Extract the position and heading from the response
+        try:
+            seq_id, x, y, heading = protocol.BACKWARD_RESPONSE.unpack_from(response)
+        except ValueError as e:
+            logging.error(f"AsyncCommandsTx::backward - Error unpacking response: {e}")
+            return False, 0.0, 0.0, 0.0
+        
+        x = round(x, 2)
+        y = round(y, 2)
+        heading = round(heading, 2)
+        logging.info(f"AsyncCommandsTx::backward - X = {x}, Y = {y}, heading = {heading}")
+        return True, x, y, heading
+    
+    async def left(self, angle_degrees: float) -> tuple[bool, float, float, float]:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::left - Not connected to a robot")
+            return False, 0.0, 0.0, 0.0
+        
+        command_id = protocol.CMD_LEFT
+
+        # Command to turn the robot left
+        # Generate a sequence ID and queue the command
+        seq_id = self.__next_seq()
+        data = protocol.LEFT_REQUEST.pack(seq_id, command_id, angle_degrees)
+        logging.info(f"AsyncCommandsTx::left - Command ID = {command_id}, Sequence ID = {seq_id}, angle = {angle_degrees}")
+        
+        # Wait for the command to be processed with a long timeout
+        try:
+            response = await self.__send_command(seq_id, data, self._long_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::left - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False, 0.0, 0.0, 0.0
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::left - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False, 0.0, 0.0, 0.0
+
+        # Extract the position and heading from the response
+        try:
+            seq_id, x, y, heading = protocol.LEFT_RESPONSE.unpack_from(response)
+        except ValueError as e:
+            logging.error(f"AsyncCommandsTx::left - Error unpacking response: {e}")
+            return False, 0.0, 0.0, 0.0
+        
+        x = round(x, 2)
+        y = round(y, 2)
+        heading = round(heading, 2)
+        logging.info(f"AsyncCommandsTx::left - X = {x}, Y = {y}, heading = {heading}")
+        return True, x, y, heading
+    
+    async def right(self, angle_degrees: float) -> tuple[bool, float, float, float]:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::right - Not connected to a robot")
+            return False, 0.0, 0.0, 0.0
+        
+        command_id = protocol.CMD_RIGHT
+
+        # Command to turn the robot right
+        # Generate a sequence ID and queue the command
+        seq_id = self.__next_seq()
+        data = protocol.RIGHT_REQUEST.pack(seq_id, command_id, angle_degrees)
+        logging.info(f"AsyncCommandsTx::right - Command ID = {command_id}, Sequence ID = {seq_id}, angle = {angle_degrees}")
+        
+        # Wait for the command to be processed with a long timeout
+        try:
+            response = await self.__send_command(seq_id, data, self._long_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::right - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False, 0.0, 0.0, 0.0
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::right - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False, 0.0, 0.0, 0.0
+
+        # Extract the position and heading from the response
+        try:
+            seq_id, x, y, heading = protocol.RIGHT_RESPONSE.unpack_from(response)
+        except ValueError as e:
+            logging.error(f"AsyncCommandsTx::right - Error unpacking response: {e}")
+            return False, 0.0, 0.0, 0.0
+        
+        x = round(x, 2)
+        y = round(y, 2)
+        heading = round(heading, 2)
+        logging.info(f"AsyncCommandsTx::right - X = {x}, Y = {y}, heading = {heading}")
+        return True, x, y, heading
+    
+    async def circle(self, radius_mm: float, extent_degrees: float) -> tuple[bool, float, float, float]:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::circle - Not connected to a robot")
+            return False, 0.0, 0.0, 0.0
+        
+        command_id = protocol.CMD_CIRCLE
+
+        # Command to turn the robot left on an arc
+        # Generate a sequence ID and queue the command
+        seq_id = self.__next_seq()
+        data = protocol.CIRCLE_REQUEST.pack(seq_id, command_id, radius_mm, extent_degrees)
+        logging.info(f"AsyncCommandsTx::circle - Command ID = {command_id}, Sequence ID = {seq_id}, radius = {radius_mm}, extent = {extent_degrees}")
+        
+        # Wait for the command to be processed with a long timeout
+        try:
+            response = await self.__send_command(seq_id, data, self._long_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::circle - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False, 0.0, 0.0, 0.0
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::circle - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False, 0.0, 0.0, 0.0
+
+        # Extract the position and heading from the response
+        try:
+            seq_id, x, y, heading = protocol.CIRCLE_RESPONSE.unpack_from(response)
+        except ValueError as e:
+            logging.error(f"AsyncCommandsTx::circle - Error unpacking response: {e}")
+            return False, 0.0, 0.0, 0.0
+        
+        x = round(x, 2)
+        y = round(y, 2)
+        heading = round(heading, 2)
+        logging.info(f"AsyncCommandsTx::circle - X = {x}, Y = {y}, heading = {heading}")
+        return True, x, y, heading
+
+    async def setheading(self, angle_degrees: float) -> bool:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::setheading - Not connected to a robot")
+            return False
+        
+        command_id = protocol.CMD_SETHEADING
+
+        # Command to set the robot heading
+        # Generate a sequence ID and queue the command
+        seq_id = self.__next_seq()
+        data = protocol.SETHEADING_REQUEST.pack(seq_id, command_id, angle_degrees)
+        logging.info(f"AsyncCommandsTx::setheading - Command ID = {command_id}, Sequence ID = {seq_id}, angle = {angle_degrees}")
+        
+        # Wait for the command to be processed with a long timeout
+        try:
+            await self.__send_command(seq_id, data, self._long_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::setheading - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::setheading - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False
+
+        # This command does not return any data, so we don't need to return any
+        return True
+    
+    async def setx(self, x_mm: float) -> tuple[bool, float, float, float]:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::setx - Not connected to a robot")
+            return False, 0.0, 0.0, 0.0
+        
+        command_id = protocol.CMD_SETX
+
+        # Command to set the robot X position
+        # Generate a sequence ID and queue the command
+        seq_id = self.__next_seq()
+        data = protocol.SETX_REQUEST.pack(seq_id, command_id, x_mm)
+        logging.info(f"AsyncCommandsTx::setx - Command ID = {command_id}, Sequence ID = {seq_id}, x = {x_mm}")
+        
+        # Wait for the command to be processed with a long timeout
+        try:
+            response = await self.__send_command(seq_id, data, self._long_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::setx - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False, 0.0, 0.0, 0.0
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::setx - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False, 0.0, 0.0, 0.0
+
+        # Extract the position and heading from the response
+        try:
+            seq_id, x, y, heading = protocol.SETX_RESPONSE.unpack_from(response)
+        except ValueError as e:
+            logging.error(f"AsyncCommandsTx::setx - Error unpacking response: {e}")
+            return False, 0.0, 0.0, 0.0
+        
+        x = round(x, 2)
+        y = round(y, 2)
+        heading = round(heading, 2)
+        logging.info(f"AsyncCommandsTx::setx - X = {x}, Y = {y}, heading = {heading}")
+        return True, x, y, heading
+    
+    async def sety(self, y_mm: float) -> tuple[bool, float, float, float]:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::sety - Not connected to a robot")
+            return False, 0.0, 0.0, 0.0
+        
+        command_id = protocol.CMD_SETY
+
+        # Command to set the robot Y position
+        # Generate a sequence ID and queue the command
+        seq_id = self.__next_seq()
+        data = protocol.SETY_REQUEST.pack(seq_id, command_id, y_mm)
+        logging.info(f"AsyncCommandsTx::sety - Command ID = {command_id}, Sequence ID = {seq_id}, y = {y_mm}")
+        
+        # Wait for the command to be processed with a long timeout
+        try:
+            response = await self.__send_command(seq_id, data, self._long_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::sety - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False, 0.0, 0.0, 0.0
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::sety - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False, 0.0, 0.0, 0.0
+
+        # Extract the position and heading from the response
+        try:
+            seq_id, x, y, heading = protocol.SETY_RESPONSE.unpack_from(response)
+        except ValueError as e:
+            logging.error(f"AsyncCommandsTx::sety - Error unpacking response: {e}")
+            return False, 0.0, 0.0, 0.0
+        
+        x = round(x, 2)
+        y = round(y, 2)
+        heading = round(heading, 2)
+        logging.info(f"AsyncCommandsTx::sety - X = {x}, Y = {y}, heading = {heading}")
+        return True, x, y, heading
+    
+    async def setposition(self, x_mm: float, y_mm: float) -> tuple[bool, float, float, float]:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::setposition - Not connected to a robot")
+            return False, 0.0, 0.0, 0.0
+        
+        command_id = protocol.CMD_SETPOSITION
+
+        # Command to set the robot position
+        # Generate a sequence ID and queue the command
+        seq_id = self.__next_seq()
+        data = protocol.SETPOSITION_REQUEST.pack(seq_id, command_id, x_mm, y_mm)
+        logging.info(f"AsyncCommandsTx::setposition - Command ID = {command_id}, Sequence ID = {seq_id}, x = {x_mm}, y = {y_mm}")
+        
+        # Wait for the command to be processed with a long timeout
+        try:
+            response = await self.__send_command(seq_id, data, self._long_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::setposition - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False, 0.0, 0.0, 0.0
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::setposition - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False, 0.0, 0.0, 0.0
+
+        # Extract the position and heading from the response
+        try:
+            seq_id, x, y, heading = protocol.SETPOSITION_RESPONSE.unpack_from(response)
+        except ValueError as e:
+            logging.error(f"AsyncCommandsTx::setposition - Error unpacking response: {e}")
+            return False, 0.0, 0.0, 0.0
+        
+        x = round(x, 2)
+        y = round(y, 2)
+        heading = round(heading, 2)
+        logging.info(f"AsyncCommandsTx::setposition - X = {x}, Y = {y}, heading = {heading}")
+        return True, x, y, heading
+    
+    async def towards(self, x_mm: float, y_mm: float) -> tuple[bool, float, float, float]:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::towards - Not connected to a robot")
+            return False, 0.0, 0.0, 0.0
+        
+        command_id = protocol.CMD_TOWARDS
+
+        # Command to move the robot towards a point
+        # Generate a sequence ID and queue the command
+        seq_id = self.__next_seq()
+        data = protocol.TOWARDS_REQUEST.pack(seq_id, command_id, x_mm, y_mm)
+        logging.info(f"AsyncCommandsTx::towards - Command ID = {command_id}, Sequence ID = {seq_id}, x = {x_mm}, y = {y_mm}")
+        
+        # Wait for the command to be processed with a long timeout
+        try:
+            response = await self.__send_command(seq_id, data, self._long_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::towards - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False, 0.0, 0.0, 0.0
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::towards - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False, 0.0, 0.0, 0.0
+
+        # Extract the position and heading from the response
+        try:
+            seq_id, x, y, heading = protocol.TOWARDS_RESPONSE.unpack_from(response)
+        except ValueError as e:
+            logging.error(f"AsyncCommandsTx::towards - Error unpacking response: {e}")
+            return False, 0.0, 0.0, 0.0
+        
+        x = round(x, 2)
+        y = round(y, 2)
+        heading = round(heading, 2)
+        logging.info(f"AsyncCommandsTx::towards - X = {x}, Y = {y}, heading = {heading}")
+        return True, x, y, heading
+    
+    async def reset_origin(self) -> bool:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::reset_origin - Not connected to a robot")
+            return False
+        
+        command_id = protocol.CMD_RESET_ORIGIN
+
+        # Command to reset the x,y origin and heading
+        # Generate a sequence ID and queue the command
+        seq_id = self.__next_seq()
+        data = protocol.RESET_ORIGIN_REQUEST.pack(seq_id, command_id)
+        logging.info(f"AsyncCommandsTx::reset_origin - Command ID = {command_id}, Sequence ID = {seq_id}")
+        
+        # Wait for the command to be processed with a short timeout
+        try:
+            await self.__send_command(seq_id, data, self.short_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::reset_origin - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::reset_origin - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False
+
+        # This command does not return any data, so we don't need to return any
+        return True
+    
+    async def heading(self) -> tuple[bool, float]:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::heading - Not connected to a robot")
+            return False, 0.0
+        
+        command_id = protocol.CMD_HEADING
+
+        # Command to get the robot heading
+        # Generate a sequence ID and queue the command
+        seq_id = self.__next_seq()
+        data = protocol.HEADING_REQUEST.pack(seq_id, command_id)
+        logging.info(f"AsyncCommandsTx::heading - Command ID = {command_id}, Sequence ID = {seq_id}")
+        
+        # Wait for the command to be processed with a long timeout
+        try:
+            response = await self.__send_command(seq_id, data, self.short_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::heading - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False, 0.0
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::heading - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False, 0.0
+
+        # Extract the heading from the response
+        try:
+            seq_id, heading = protocol.HEADING_RESPONSE.unpack_from(response)
+        except ValueError as e:
+            logging.error(f"AsyncCommandsTx::heading - Error unpacking response: {e}")
+            return False, 0.0
+        
+        heading = round(heading, 2)
+        logging.info(f"AsyncCommandsTx::heading - Heading = {heading}")
+        return True, heading
+    
+    async def position(self) -> tuple[bool, float, float]:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::position - Not connected to a robot")
+            return False, 0.0, 0.0
+        
+        command_id = protocol.CMD_POSITION
+
+        # Command to get the robot position
+        # Generate a sequence ID and queue the command
+        seq_id = self.__next_seq()
+        data = protocol.POSITION_REQUEST.pack(seq_id, command_id)
+        logging.info(f"AsyncCommandsTx::position - Command ID = {command_id}, Sequence ID = {seq_id}")
+        
+        # Wait for the command to be processed with a long timeout
+        try:
+            response = await self.__send_command(seq_id, data, self._long_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::position - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False, 0.0, 0.0
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::position - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False, 0.0, 0.0
+
+        # Extract the position from the response
+        try:
+            seq_id, x, y = protocol.POSITION_RESPONSE.unpack_from(response)
+        except ValueError as e:
+            logging.error(f"AsyncCommandsTx::position - Error unpacking response: {e}")
+            return False, 0.0, 0.0
+        
+        x = round(x, 2)
+        y = round(y, 2)
+        logging.info(f"AsyncCommandsTx::position - X = {x}, Y = {y}")
+        return True, x, y
+    
+    async def penup(self) -> bool:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::penup - Not connected to a robot")
+            return False
+        
+        command_id = protocol.CMD_PENUP
+
+        # Command to raise the pen
+        # Generate a sequence ID and queue the command
+        seq_id = self.__next_seq()
+        data = protocol.PENUP_REQUEST.pack(seq_id, command_id)
+        logging.info(f"AsyncCommandsTx::penup - Command ID = {command_id}, Sequence ID = {seq_id}")
+        
+        # Wait for the command to be processed with a short timeout
+        try:
+            await self.__send_command(seq_id, data, self.short_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::penup - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::penup - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False
+
+        # This command does not return any data, so we don't need to return any
+        return True
+    
+    async def pendown(self) -> bool:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::pendown - Not connected to a robot")
+            return False
+        
+        command_id = protocol.CMD_PENDOWN
+
+        # Command to raise the pen
+        # Generate a sequence ID and queue the command
+        seq_id = self.__next_seq()
+        data = protocol.PENDOWN_REQUEST.pack(seq_id, command_id)
+        logging.info(f"AsyncCommandsTx::pendown - Command ID = {command_id}, Sequence ID = {seq_id}")
+        
+        # Wait for the command to be processed with a short timeout
+        try:
+            await self.__send_command(seq_id, data, self.short_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::pendown - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::pendown - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False
+
+        # This command does not return any data, so we don't need to return any
+        return True
+    
+    async def eyes(self, eye_id, red, green, blue) -> bool:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::eyes - Not connected to a robot")
+            return False
+        
+        command_id = protocol.CMD_EYES
+
+        # Command to set the eye colour
+        # Generate a sequence ID and queue the command
+        seq_id = self.__next_seq()
+        data = protocol.EYES_REQUEST.pack(seq_id, command_id, eye_id, red, green, blue)
+        logging.info(f"AsyncCommandsTx::eyes - Command ID = {command_id}, Sequence ID = {seq_id}, eye_id = {eye_id}, red = {red}, green = {green}, blue = {blue}")
+        
+        # Wait for the command to be processed with a short timeout
+        try:
+            await self.__send_command(seq_id, data, self.short_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::eyes - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::eyes - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False
+
+        # This command does not return any data, so we don't need to return any
+        return True
+    
+    async def power(self) -> tuple[bool, int, int, int]:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::power - Not connected to a robot")
+            return False, 0, 0, 0
+        
+        command_id = protocol.CMD_POWER
+
+        # Command to get the robot power
+        # Generate a sequence ID and queue the command
+        seq_id = self.__next_seq()
+        data = protocol.POWER_REQUEST.pack(seq_id, command_id)
+        logging.info(f"AsyncCommandsTx::power - Command ID = {command_id}, Sequence ID = {seq_id}")
+        
+        # Wait for the command to be processed with a short timeout
+        try:
+            response = await self.__send_command(seq_id, data, self.short_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::power - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False, 0, 0, 0
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::power - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False, 0, 0, 0
+
+        # Extract the power from the response
+        try:
+            seq_id, mv, ma, mw = protocol.POWER_RESPONSE.unpack_from(response)
+        except ValueError as e:
+            logging.error(f"AsyncCommandsTx::power - Error unpacking response: {e}")
+            return False, 0, 0, 0
+        logging.info(f"AsyncCommandsTx::power - mV = {mv}, mA = {ma}, mW = {mw}")
+        return True, mv, ma, mw 
+    
+    async def isdown(self) -> tuple[bool, bool]:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::isdown - Not connected to a robot")
+            return False, False
+        
+        command_id = protocol.CMD_ISDOWN
+
+        # Command to get the pen status (True = down, False = up)
+        # Generate a sequence ID and queue the command
+        seq_id = self.__next_seq()
+        data = protocol.ISDOWN_REQUEST.pack(seq_id, command_id)
+        logging.info(f"AsyncCommandsTx::isdown - Command ID = {command_id}, Sequence ID = {seq_id}")
+        
+        # Wait for the command to be processed with a short timeout
+        try:
+            response = await self.__send_command(seq_id, data, self.short_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::isdown - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False, False
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::isdown - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False, False
+
+        # Extract the pen status from the response
+        try:
+            seq_id, pen_down = protocol.ISDOWN_RESPONSE.unpack_from(response)
+        except ValueError as e:
+            logging.error(f"AsyncCommandsTx::isdown - Error unpacking response: {e}")
+            return False, False
+        logging.info(f"AsyncCommandsTx::isdown - Pen down = {pen_down}")
+        return True, pen_down
+    
+    async def set_linear_velocity(self, target_speed: int, acceleration: int) -> bool:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::set_linear_velocity - Not connected to a robot")
+            return False
+        
+        command_id = protocol.CMD_SET_LINEAR_VELOCITY
+
+        # Command to set the linear velocity
+        # Generate a sequence ID and queue the command
+        seq_id = self.__next_seq()
+        data = protocol.SET_LINEAR_VELOCITY_REQUEST.pack(seq_id, command_id, target_speed, acceleration)
+        logging.info(f"AsyncCommandsTx::set_linear_velocity - Command ID = {command_id}, Sequence ID = {seq_id}, target_speed = {target_speed}, acceleration = {acceleration}")
+        
+        # Wait for the command to be processed with a short timeout
+        try:
+            await self.__send_command(seq_id, data, self.short_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::set_linear_velocity - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::set_linear_velocity - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False
+
+        # This command does not return any data, so we don't need to return any
+        return True
+    
+    async def set_rotational_velocity(self, target_speed: int, acceleration: int) -> bool:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::set_rotational_velocity - Not connected to a robot")
+            return False
+        
+        command_id = protocol.CMD_SET_ROTATIONAL_VELOCITY
+
+        # Command to set the rotational velocity
+        # Generate a sequence ID and queue the command
+        seq_id = self.__next_seq()
+        data = protocol.SET_ROTATIONAL_VELOCITY_REQUEST.pack(seq_id, command_id, target_speed, acceleration)
+        logging.info(f"AsyncCommandsTx::set_rotational_velocity - Command ID = {command_id}, Sequence ID = {seq_id}, target_speed = {target_speed}, acceleration = {acceleration}")
+        
+        # Wait for the command to be processed with a short timeout
+        try:
+            await self.__send_command(seq_id, data, self.short_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::set_rotational_velocity - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::set_rotational_velocity - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False
+
+        # This command does not return any data, so we don't need to return any
+        return True
+    
+    async def get_linear_velocity(self) -> tuple[bool, int, int]:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::get_linear_velocity - Not connected to a robot")
+            return False, 0, 0
+        
+        command_id = protocol.CMD_GET_LINEAR_VELOCITY
+
+        # Command to get the linear velocity
+        # Generate a sequence ID and queue the command
+        seq_id = self.__next_seq()
+        data = protocol.GET_LINEAR_VELOCITY_REQUEST.pack(seq_id, command_id)
+        logging.info(f"AsyncCommandsTx::get_linear_velocity - Command ID = {command_id}, Sequence ID = {seq_id}")
+        
+        # Wait for the command to be processed with a short timeout
+        try:
+            response = await self.__send_command(seq_id, data, self.short_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::get_linear_velocity - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False, 0, 0
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::get_linear_velocity - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False, 0, 0
+
+        # Extract the linear velocity from the response
+        try:
+            seq_id, target_speed, acceleration = protocol.GET_LINEAR_VELOCITY_RESPONSE.unpack_from(response)
+        except ValueError as e:
+            logging.error(f"AsyncCommandsTx::get_linear_velocity - Error unpacking response: {e}")
+            return False, 0, 0
+        logging.info(f"AsyncCommandsTx::get_linear_velocity - Target speed = {target_speed}, Acceleration = {acceleration}")
+        return True, target_speed, acceleration
+    
+    async def get_rotational_velocity(self) -> tuple[bool, int, int]:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::get_rotational_velocity - Not connected to a robot")
+            return False, 0, 0
+        
+        command_id = protocol.CMD_GET_ROTATIONAL_VELOCITY
+
+        # Command to get the rotational velocity
+        # Generate a sequence ID and queue the command
+        seq_id = self.__next_seq()
+        data = protocol.GET_ROTATIONAL_VELOCITY_REQUEST.pack(seq_id, command_id)
+        logging.info(f"AsyncCommandsTx::get_rotational_velocity - Command ID = {command_id}, Sequence ID = {seq_id}")
+        
+        # Wait for the command to be processed with a short timeout
+        try:
+            response = await self.__send_command(seq_id, data, self.short_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::get_rotational_velocity - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False, 0, 0
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::get_rotational_velocity - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False, 0, 0
+
+        # Extract the rotational velocity from the response
+        try:
+            seq_id, target_speed, acceleration = protocol.GET_ROTATIONAL_VELOCITY_RESPONSE.unpack_from(response)
+        except ValueError as e:
+            logging.error(f"AsyncCommandsTx::get_rotational_velocity - Error unpacking response: {e}")
+            return False, 0, 0
+        logging.info(f"AsyncCommandsTx::get_rotational_velocity - Target speed = {target_speed}, Acceleration = {acceleration}")
+        return True, target_speed, acceleration
+
+    async def set_wheel_diameter_calibration(self, wheel_diameter: int) -> bool:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::set_wheel_diameter_calibration - Not connected to a robot")
+            return False
+        
+        command_id = protocol.CMD_SET_WHEEL_DIAMETER_CALIBRATION
+
+        # Command to set the wheel diameter calibration
+        seq_id = self.__next_seq()
+        data = protocol.SET_WHEEL_DIAMETER_CALIBRATION_REQUEST.pack(seq_id, command_id, wheel_diameter)
+        logging.info(f"AsyncCommandsTx::set_wheel_diameter_calibration - Command ID = {command_id}, Sequence ID = {seq_id}, wheel_diameter = {wheel_diameter}")
+        
+        try:
+            await self.__send_command(seq_id, data, self.short_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::set_wheel_diameter_calibration - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::set_wheel_diameter_calibration - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False
+
+        return True
+
+    async def set_axel_distance_calibration(self, axel_distance: int) -> bool:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::set_axel_distance_calibration - Not connected to a robot")
+            return False
+        
+        command_id = protocol.CMD_SET_AXEL_DISTANCE_CALIBRATION
+
+        # Command to set the axel distance calibration
+        seq_id = self.__next_seq()
+        data = protocol.SET_AXEL_DISTANCE_CALIBRATION_REQUEST.pack(seq_id, command_id, axel_distance)
+        logging.info(f"AsyncCommandsTx::set_axel_distance_calibration - Command ID = {command_id}, Sequence ID = {seq_id}, axel_distance = {axel_distance}")
+        
+        try:
+            await self.__send_command(seq_id, data, self.short_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::set_axel_distance_calibration - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::set_axel_distance_calibration - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False
+
+        return True
+
+    async def get_wheel_diameter_calibration(self) -> tuple[bool, int]:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::get_wheel_diameter_calibration - Not connected to a robot")
+            return False, 0
+        
+        command_id = protocol.CMD_GET_WHEEL_DIAMETER_CALIBRATION
+
+        # Command to get the wheel diameter calibration
+        seq_id = self.__next_seq()
+        data = protocol.GET_WHEEL_DIAMETER_CALIBRATION_REQUEST.pack(seq_id, command_id)
+        logging.info(f"AsyncCommandsTx::get_wheel_diameter_calibration - Command ID = {command_id}, Sequence ID = {seq_id}")
+        
+        try:
+            response = await self.__send_command(seq_id, data, self.short_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::get_wheel_diameter_calibration - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False, 0
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::get_wheel_diameter_calibration - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False, 0
+
+        try:
+            seq_id, cali_wheel = protocol.GET_WHEEL_DIAMETER_CALIBRATION_RESPONSE.unpack_from(response)
+        except ValueError as e:
+            logging.error(f"AsyncCommandsTx::get_wheel_diameter_calibration - Error unpacking response: {e}")
+            return False, 0
+        logging.info(f"AsyncCommandsTx::get_wheel_diameter_calibration - Calibration wheel diameter = {cali_wheel}")
+        return True, cali_wheel
+
+    async def get_axel_distance_calibration(self) -> tuple[bool, int]:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::get_axel_distance_calibration - Not connected to a robot")
+            return False, 0
+        
+        command_id = protocol.CMD_GET_AXEL_DISTANCE_CALIBRATION
+
+        # Command to get the axel distance calibration
+        seq_id = self.__next_seq()
+        data = protocol.GET_AXEL_DISTANCE_CALIBRATION_REQUEST.pack(seq_id, command_id)
+        logging.info(f"AsyncCommandsTx::get_axel_distance_calibration - Command ID = {command_id}, Sequence ID = {seq_id}")
+        
+        try:
+            response = await self.__send_command(seq_id, data, self.short_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::get_axel_distance_calibration - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False, 0
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::get_axel_distance_calibration - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False, 0
+
+        try:
+            seq_id, cali_axel = protocol.GET_AXEL_DISTANCE_CALIBRATION_RESPONSE.unpack_from(response)
+        except ValueError as e:
+            logging.error(f"AsyncCommandsTx::get_axel_distance_calibration - Error unpacking response: {e}")
+            return False, 0
+        logging.info(f"AsyncCommandsTx::get_axel_distance_calibration - Calibration axel distance = {cali_axel}")
+        return True, cali_axel
+
+    async def set_turtle_id(self, turtle_id: int) -> bool:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::set_turtle_id - Not connected to a robot")
+            return False
+        
+        command_id = protocol.CMD_SET_TURTLE_ID
+
+        # Command to set the turtle ID
+        seq_id = self.__next_seq()
+        data = protocol.SET_TURTLE_ID_REQUEST.pack(seq_id, command_id, turtle_id)
+        logging.info(f"AsyncCommandsTx::set_turtle_id - Command ID = {command_id}, Sequence ID = {seq_id}, turtle_id = {turtle_id}")
+        
+        try:
+            await self.__send_command(seq_id, data, self.short_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::set_turtle_id - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::set_turtle_id - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False
+
+        # The robot's address is cached under its old turtle ID
+        self._ble_central.forget_cached_address()
+        return True
+
+    async def get_turtle_id(self) -> tuple[bool, int]:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::get_turtle_id - Not connected to a robot")
+            return False, 0
+        
+        command_id = protocol.CMD_GET_TURTLE_ID
+
+        # Command to get the turtle ID
+        seq_id = self.__next_seq()
+        data = protocol.GET_TURTLE_ID_REQUEST.pack(seq_id, command_id)
+        logging.info(f"AsyncCommandsTx::get_turtle_id - Command ID = {command_id}, Sequence ID = {seq_id}")
+        
+        try:
+            response = await self.__send_command(seq_id, data, self.short_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::get_turtle_id - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False, 0
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::get_turtle_id - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False, 0
+
+        try:
+            seq_id, turtle_id = protocol.GET_TURTLE_ID_RESPONSE.unpack_from(response)
+        except ValueError as e:
+            logging.error(f"AsyncCommandsTx::get_turtle_id - Error unpacking response: {e}")
+            return False, 0
+        logging.info(f"AsyncCommandsTx::get_turtle_id - Turtle ID = {turtle_id}")
+        return True, turtle_id
+
+    async def load_config(self) -> bool:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::load_config - Not connected to a robot")
+            return False
+        
+        command_id = protocol.CMD_LOAD_CONFIG
+
+        # Command to load the configuration
+        seq_id = self.__next_seq()
+        data = protocol.LOAD_CONFIG_REQUEST.pack(seq_id, command_id)
+        logging.info(f"AsyncCommandsTx::load_config - Command ID = {command_id}, Sequence ID = {seq_id}")
+        
+        try:
+            await self.__send_command(seq_id, data, self.short_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::load_config - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::load_config - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False
+
+        return True
+
+    async def save_config(self) -> bool:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::save_config - Not connected to a robot")
+            return False
+        
+        command_id = protocol.CMD_SAVE_CONFIG
+
+        # Command to save the configuration
+        seq_id = self.__next_seq()
+        data = protocol.SAVE_CONFIG_REQUEST.pack(seq_id, command_id)
+        logging.info(f"AsyncCommandsTx::save_config - Command ID = {command_id}, Sequence ID = {seq_id}")
+        
+        try:
+            await self.__send_command(seq_id, data, self.short_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::save_config - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::save_config - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False
+
+        return True
+
+    async def reset_config(self) -> bool:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::reset_config - Not connected to a robot")
+            return False
+        
+        command_id = protocol.CMD_RESET_CONFIG
+
+        # Command to reset the configuration
+        seq_id = self.__next_seq()
+        data = protocol.RESET_CONFIG_REQUEST.pack(seq_id, command_id)
+        logging.info(f"AsyncCommandsTx::reset_config - Command ID = {command_id}, Sequence ID = {seq_id}")
+        
+        try:
+            await self.__send_command(seq_id, data, self.short_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::reset_config - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::reset_config - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False
+
+        return True
+
+    async def _program_begin(self, length: int) -> bool:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::_program_begin - Not connected to a robot")
+            return False
+
+        command_id = protocol.CMD_PROGRAM_BEGIN
+
+        # Command to start a program upload
+        seq_id = self.__next_seq()
+        data = protocol.PROGRAM_BEGIN_REQUEST.pack(seq_id, command_id, length)
+        logging.info(f"AsyncCommandsTx::_program_begin - Command ID = {command_id}, Sequence ID = {seq_id}, length = {length}")
+
+        try:
+            response = await self.__send_command(seq_id, data, self.short_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::_program_begin - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::_program_begin - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False
+
+        try:
+            seq_id, result = protocol.PROGRAM_BEGIN_RESPONSE.unpack_from(response)
+        except ValueError as e:
+            logging.error(f"AsyncCommandsTx::_program_begin - Error unpacking response: {e}")
+            return False
+        return result != 0
+
+    async def _program_write(self, offset: int, chunk: bytes) -> bool:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::_program_write - Not connected to a robot")
+            return False
+
+        command_id = protocol.CMD_PROGRAM_WRITE
+
+        # Command to write a chunk (up to 15 bytes) of the program
+        seq_id = self.__next_seq()
+        data = protocol.PROGRAM_WRITE_REQUEST.pack(seq_id, command_id, offset, len(chunk), chunk)
+        logging.debug(f"AsyncCommandsTx::_program_write - Command ID = {command_id}, Sequence ID = {seq_id}, offset = {offset}, length = {len(chunk)}")
+
+        try:
+            response = await self.__send_command(seq_id, data, self.short_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::_program_write - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::_program_write - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False
+
+        try:
+            seq_id, result, received = protocol.PROGRAM_WRITE_RESPONSE.unpack_from(response)
+        except ValueError as e:
+            logging.error(f"AsyncCommandsTx::_program_write - Error unpacking response: {e}")
+            return False
+
+        if result == 0 or received != offset + len(chunk):
+            logging.error(f"AsyncCommandsTx::_program_write - Robot rejected chunk at offset {offset} (robot has {received} bytes)")
+            return False
+        return True
+
+    async def _program_end(self, crc32: int) -> tuple[bool, int]:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::_program_end - Not connected to a robot")
+            return False, 0
+
+        command_id = protocol.CMD_PROGRAM_END
+
+        # Command to finish a program upload
+        seq_id = self.__next_seq()
+        data = protocol.PROGRAM_END_REQUEST.pack(seq_id, command_id, crc32)
+        logging.info(f"AsyncCommandsTx::_program_end - Command ID = {command_id}, Sequence ID = {seq_id}, CRC32 = {crc32:08x}")
+
+        try:
+            response = await self.__send_command(seq_id, data, self.short_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::_program_end - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False, 0
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::_program_end - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False, 0
+
+        try:
+            seq_id, result, record_count = protocol.PROGRAM_END_RESPONSE.unpack_from(response)
+        except ValueError as e:
+            logging.error(f"AsyncCommandsTx::_program_end - Error unpacking response: {e}")
+            return False, 0
+        return result != 0, record_count
+
+    async def upload_program(self, image: bytes) -> bool:
+        # Upload a compiled program image to the robot's flash.  The L2CAP bulk transfer
+        # channel is used if it is available, otherwise (or if the channel fails part way
+        # through) the image is sent in 15 byte chunks
+        logging.info(f"AsyncCommandsTx::upload_program - Uploading program of {len(image)} bytes")
+        result = await self._bulk_transfer.upload_program(self._ble_central.address, image)
+        if result is not None:
+            success, record_count = result
+            if not success:
+                logging.error("AsyncCommandsTx::upload_program - Robot failed to store the program")
+                return False
+
+            logging.info(f"AsyncCommandsTx::upload_program - Program stored with {record_count} records (bulk transfer)")
+            return True
+
+        if not await self._program_begin(len(image)):
+            logging.error("AsyncCommandsTx::upload_program - Robot refused the program upload")
+            return False
+
+        for offset in range(0, len(image), 15):
+            if not await self._program_write(offset, image[offset:offset + 15]):
+                return False
+
+        success, record_count = await self._program_end(zlib.crc32(image))
+        if not success:
+            logging.error("AsyncCommandsTx::upload_program - Robot failed to verify the program")
+            return False
+
+        logging.info(f"AsyncCommandsTx::upload_program - Program stored with {record_count} records")
+        return True
+
+    async def download_program(self) -> bytes:
+        # Read back the stored program image (only possible over the bulk transfer channel)
+        image = await self._bulk_transfer.download_program(self._ble_central.address)
+        if image is None:
+            logging.error("AsyncCommandsTx::download_program - The bulk transfer channel is unavailable")
+            return b""
+
+        logging.info(f"AsyncCommandsTx::download_program - Downloaded program of {len(image)} bytes")
+        return image
+
+    async def run_program(self) -> tuple[bool, int]:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::run_program - Not connected to a robot")
+            return False, 0
+
+        command_id = protocol.CMD_RUN_PROGRAM
+
+        # Command to play the stored program
+        seq_id = self.__next_seq()
+        data = protocol.RUN_PROGRAM_REQUEST.pack(seq_id, command_id)
+        logging.info(f"AsyncCommandsTx::run_program - Command ID = {command_id}, Sequence ID = {seq_id}")
+
+        try:
+            response = await self.__send_command(seq_id, data, self.short_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::run_program - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False, 0
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::run_program - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False, 0
+
+        try:
+            seq_id, result, record_count = protocol.RUN_PROGRAM_RESPONSE.unpack_from(response)
+        except ValueError as e:
+            logging.error(f"AsyncCommandsTx::run_program - Error unpacking response: {e}")
+            return False, 0
+        return result != 0, record_count
+
+    async def program_status(self) -> tuple[bool, int, int, int]:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::program_status - Not connected to a robot")
+            return False, 0, 0, 0
+
+        command_id = protocol.CMD_PROGRAM_STATUS
+
+        # Command to get the program playback state and progress
+        seq_id = self.__next_seq()
+        data = protocol.PROGRAM_STATUS_REQUEST.pack(seq_id, command_id)
+        logging.info(f"AsyncCommandsTx::program_status - Command ID = {command_id}, Sequence ID = {seq_id}")
+
+        try:
+            response = await self.__send_command(seq_id, data, self.short_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::program_status - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False, 0, 0, 0
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::program_status - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False, 0, 0, 0
+
+        try:
+            seq_id, state, position, record_count = protocol.PROGRAM_STATUS_RESPONSE.unpack_from(response)
+        except ValueError as e:
+            logging.error(f"AsyncCommandsTx::program_status - Error unpacking response: {e}")
+            return False, 0, 0, 0
+        logging.info(f"AsyncCommandsTx::program_status - State = {state}, position = {position} of {record_count}")
+        return True, state, position, record_count
+
+    async def stop_program(self) -> bool:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::stop_program - Not connected to a robot")
+            return False
+
+        command_id = protocol.CMD_STOP_PROGRAM
+
+        # Command to stop program playback
+        seq_id = self.__next_seq()
+        data = protocol.STOP_PROGRAM_REQUEST.pack(seq_id, command_id)
+        logging.info(f"AsyncCommandsTx::stop_program - Command ID = {command_id}, Sequence ID = {seq_id}")
+
+        try:
+            await self.__send_command(seq_id, data, self.short_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::stop_program - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::stop_program - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False
+
+        return True
+
+    async def link_parameters(self) -> tuple[bool, float, int, int]:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::link_parameters - Not connected to a robot")
+            return False, 0.0, 0, 0
+
+        command_id = protocol.CMD_LINK_PARAMETERS
+
+        # Command to get the connection parameters the robot is using
+        seq_id = self.__next_seq()
+        data = protocol.LINK_PARAMETERS_REQUEST.pack(seq_id, command_id)
+        logging.info(f"AsyncCommandsTx::link_parameters - Command ID = {command_id}, Sequence ID = {seq_id}")
+
+        try:
+            response = await self.__send_command(seq_id, data, self.short_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::link_parameters - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False, 0.0, 0, 0
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::link_parameters - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False, 0.0, 0, 0
+
+        try:
+            seq_id, interval, latency, supervision_timeout = protocol.LINK_PARAMETERS_RESPONSE.unpack_from(response)
+        except ValueError as e:
+            logging.error(f"AsyncCommandsTx::link_parameters - Error unpacking response: {e}")
+            return False, 0.0, 0, 0
+
+        # Return the interval in ms, the latency in connection events and the timeout in ms
+        return True, interval * 1.25, latency, supervision_timeout * 10
+
+    async def link_role(self) -> tuple[bool, int]:
+        if not self._ble_central.connected:
+            logging.error("AsyncCommandsTx::link_role - Not connected to a robot")
+            return False, 0
+
+        command_id = protocol.CMD_LINK_ROLE
+
+        # Command to get our role (the robot has one controller and can have several
+        # monitors which can only use the read-only commands)
+        seq_id = self.__next_seq()
+        data = protocol.LINK_ROLE_REQUEST.pack(seq_id, command_id)
+        logging.info(f"AsyncCommandsTx::link_role - Command ID = {command_id}, Sequence ID = {seq_id}")
+
+        try:
+            response = await self.__send_command(seq_id, data, self.short_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"AsyncCommandsTx::link_role - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
+            self._ble_central.disconnect()
+            return False, 0
+        except CommandRefusedError as e:
+            logging.error(f"AsyncCommandsTx::link_role - Command ID = {command_id}, Sequence ID = {seq_id} refused: {e}")
+            return False, 0
+
+        try:
+            seq_id, role = protocol.LINK_ROLE_RESPONSE.unpack_from(response)
+        except ValueError as e:
+            logging.error(f"AsyncCommandsTx::link_role - Error unpacking response: {e}")
+            return False, 0
+        return True, role
@@ -27,15 +27,59 @@
 
 import asyncio
 import logging
+import os
+import time
 
 from bleak import BleakScanner, BleakClient
+from bleak.exc import BleakError
 from bleak.uuids import normalize_uuid_16
 from bleak.backends.characteristic import BleakGATTCharacteristic
 
+import protocol
+from ring_buffer import RingBuffer
+from link_quality import LinkQuality
+from device_cache import DeviceCache
+
+class CommandRefusedError(Exception):
+    """The robot refused a command (the reason is one of the protocol.REFUSED_* values)"""
+    def __init__(self, reason: int):
+        super().__init__(f"Command refused by the robot (reason {reason})")
+        self.reason = reason
+
+class PendingResponse:
+    """
+    A command waiting for its response.  The notification handler resolves the
+    response future with the response packet, and the acknowledgement future with
+    the expected duration (in ms) if the robot acknowledges that a motion has started.
+    The request is kept so the command can be sent again after a reconnection.
+    """
+    def __init__(self, request: bytes):
+        self.request = bytes(request)
+        loop = asyncio.get_running_loop()
+        self.response = loop.create_future()
+        self.acknowledgement = loop.create_future()
+
+    def _resolve(self, data: bytes):
+        if not self.response.done():
+            self.response.set_result(data)
+
+    def _acknowledge(self, duration_ms: int):
+        if not self.acknowledgement.done():
+            self.acknowledgement.set_result(duration_ms)
+
+    def _refuse(self, reason: int):
+        if not self.response.done():
+            self.response.set_exception(CommandRefusedError(reason))
+
 class BleCentral:
     __ADVERTISING_NAME = "vt2-robot"
     __ADVERTISING_UUID = 0xF910
 
+    # Connection parameter profiles (minimum interval, maximum interval in 1.25 ms units,
+    # peripheral latency in connection events and supervision timeout in 10 ms units)
+    __LOW_LATENCY_PARAMETERS = (6, 12, 0, 200)
+    __RELAXED_PARAMETERS = (40, 80, 4, 400)
+
     def __init__(self):
         # Remote device advertising definitions
         self._peripheral_advertising_uuid = BleCentral.__ADVERTISING_UUID
@@ -47,32 +91,178 @@ class BleCentral:
 
         # Flag to show connected status
         self._connected = False
+        self._device = None
+
+        # If set, only the robot advertising this turtle ID is connected to
+        self._turtle_id = None
+
+        # The last robot connected to (kept after the link drops so it can be reconnected
+        # to without scanning) and the connection timeouts for a reconnection and after a scan
+        self._last_device = None
+        self._reconnect_timeout = 2.0
+        self._connect_timeout = 10.0
+
+        # The address of each robot is cached between runs, so the first connection
+        # can be made straight to the robot's address rather than after a scan.  If it
+        # fails the entry is forgotten and central scans for the robot as usual
+        self._device_cache = DeviceCache()
+        self._device_cache_tried = False
+        self._advertised_turtle_id = None
 
         # Maximum number of elements to store in the queues (note: maximum is 128 since command sequence is 8 bits)
         # Note: Queue elements are 20 bytes long
         self._max_queue_elements = 50
 
-        # Transmission queue for sending service data from central
-        self._c2p_queue = []
+        # Transmission queue for sending service data from central.  This is a preallocated
+        # ring buffer of 20 byte slots; a popped packet is a view of its slot (valid until
+        # the next pop)
+        self._c2p_queue = RingBuffer(self._max_queue_elements)
+        self._c2p_queue_event = None
 
-        # Reception queue for receiving service data to central
-        self._p2c_queue = []
-        self._p2c_queue_event = None
+        # Commands waiting for a response, keyed by sequence ID.  Responses are routed
+        # to them as they arrive (in any order), so many commands can be in flight.
+        # Responses that nobody is waiting for (such as the duplicate response to a
+        # retransmitted command) are counted and dropped
+        self._pending_responses = {}
+        self._unmatched_responses = 0
 
-        # Notification event for when data is received from the peripheral
-        self._p2c_notification_event = None
+        # Commands are written (with response, so the peripheral acknowledges them)
+        # as soon as they are queued.  If nothing has been written for the keepalive
+        # interval a NOP is sent so the peripheral knows the link is still up.  The NOP
+        # is flagged rather than queued, so it is never held up behind commands
+        self._keepalive_interval = 1.0
+        self._keepalive_pending = False
+        self._keepalive_packet = bytes(20)
+        self._write_attempts = 3
+
+        # Session ID written to the peripheral when connecting (before any commands).  It
+        # is chosen at random when central starts, so the robot keeps its record of
+        # completed commands when central reconnects but not for a new host process
+        self._session_id = int.from_bytes(os.urandom(4), "little")
+        self._session_packet = protocol.SESSION.pack(0, protocol.SESSION_MARKER, self._session_id).ljust(protocol.PACKET_LENGTH, b"\0")
+        self._last_c2p_time = 0.0
+
+        # Requested connection parameters.  BLEak has no way to change the parameters of a
+        # connection so, on Linux, BlueZ's defaults for new connections are set through
+        # debugfs (which needs root).  The robot reports the values actually in use
+        self._adapter = "hci0"
+        self._low_latency = True
+        self._connection_parameters_warned = False
+
+        # Link quality statistics (round trip times, retransmissions and RSSI).  BlueZ
+        # doesn't report the RSSI of a connection, but the robot keeps advertising
+        # whilst it has a free link, so the RSSI is sampled from its advertisements
+        self._link_quality = LinkQuality()
+        self._advertised_rssi = None
+        self._rssi_interval = 10.0
+
+        # Flow control.  The peripheral reports a credit limit in every packet it
+        # sends; commands are only written whilst the number sent is below the limit
+        # so the peripheral's queue cannot overflow.  Until the first report arrives
+        # a small initial window is used (the peripheral's queue is empty on connection)
+        self._initial_credit_limit = 4
+        self._c2p_credit_limit = self._initial_credit_limit
+        self._c2p_sent = 0
+        self._peripheral_queue_depth = 0
+
+        # Time of the last response and the queue depth the peripheral reported with it
+        # (used to measure the peripheral's service time, see LinkQuality)
+        self._last_response_time = None
+        self._last_response_queue_depth = 0
 
     @property
     def connected(self):
         return self._connected
+
+    @property
+    def address(self):
+        # Address of the connected peripheral (or None)
+        if not self._connected or self._device is None:
+            return None
+        return BleCentral.__device_address(self._device)
     
     @property
     def p2c_queue(self):
         return self._c2p_queue
+
+    @property
+    def credits(self) -> int:
+        # Number of commands that can be sent before the peripheral's queue is full
+        credits = (self._c2p_credit_limit - self._c2p_sent) & 0xFF
+        return credits if credits < 128 else 0
+
+    @property
+    def peripheral_queue_depth(self) -> int:
+        # Number of commands waiting in the peripheral's queue (as last reported)
+        return self._peripheral_queue_depth
     
+    @property
+    def turtle_id(self):
+        return self._turtle_id
+
+    @turtle_id.setter
+    def turtle_id(self, turtle_id):
+        # Connect only to the robot with this turtle ID (or any robot if None)
+        self._turtle_id = turtle_id
+        self._last_device = None
+        self._device_cache_tried = False
+
+    def forget_cached_address(self):
+        # The connected robot's cached address is out of date (its turtle ID has changed).
+        # It is cached again when the robot is next found by a scan
+        self._device_cache.forget(self._advertised_turtle_id)
+
+    @property
+    def low_latency(self) -> bool:
+        return self._low_latency
+
+    @low_latency.setter
+    def low_latency(self, low_latency: bool):
+        # Takes effect from the next connection
+        if low_latency != self._low_latency and self._connected:
+            logging.warning(f"{'Low latency' if low_latency else 'Relaxed'} connection parameters will be requested when the robot next connects (BlueZ can't change the parameters of the current connection)")
+        self._low_latency = low_latency
+
+    @property
+    def link_quality(self) -> LinkQuality:
+        return self._link_quality
+
+    @property
+    def queue_stats(self) -> dict:
+        # Queue high water marks and dropped packet counts (used to tune the queue sizes)
+        return {
+            "c2p_high_water_mark": self._c2p_queue.high_water_mark,
+            "c2p_dropped": self._c2p_queue.dropped,
+            "pending_responses": len(self._pending_responses),
+            "unmatched_responses": self._unmatched_responses,
+        }
+
+    def expect_response(self, seq_id: int, data) -> PendingResponse:
+        # Register a command that is about to be sent, so its response is routed to it
+        pending = PendingResponse(data)
+        self._pending_responses[seq_id] = pending
+        return pending
+
+    def forget_response(self, seq_id: int):
+        self._pending_responses.pop(seq_id, None)
+
+    def is_pending(self, seq_id: int) -> bool:
+        return seq_id in self._pending_responses
+
+    def is_first_pending(self, seq_id: int) -> bool:
+        # The robot executes commands in the order they are sent, so a command can't be
+        # answered until every command sent before it has been (the dict keeps the
+        # commands in the order they were registered)
+        return next(iter(self._pending_responses), None) == seq_id
+
+    def is_queued(self, data) -> bool:
+        # True if the packet is still waiting to be sent to the peripheral
+        return data in self._c2p_queue
+
     def add_to_c2p_queue(self, data):
-        if len(self._c2p_queue) < self._max_queue_elements:
-            self._c2p_queue.append(data)
+        if self._c2p_queue.push(data):
+            if self._c2p_queue_event is not None:
+                self._c2p_queue_event.set()
         else:
             logging.info("C2P queue is full - data not added")
 
@@ -83,12 +273,13 @@ class BleCentral:
     async def run(self):
         logging.info("Running BLE central async tasks") 
 
-        self._p2c_queue_event = asyncio.Event()
-        self._p2c_notification_event = asyncio.Event()
+        self._c2p_queue_event = asyncio.Event()
 
         tasks = [
             asyncio.create_task(self.__maintain_connection()),
-            asyncio.create_task(self.__handle_commands()),
+            asyncio.create_task(self.__transmit_c2p()),
+            asyncio.create_task(self.__keepalive()),
+            asyncio.create_task(self.__sample_rssi()),
         ]
         await asyncio.gather(*tasks)
 
@@ -99,32 +290,49 @@ class BleCentral:
             if not self._connected:
                 # Clear the queues
                 self._c2p_queue.clear()
-                self._p2c_queue.clear()
+                self._keepalive_pending = False
+
+                # Request the connection parameters before connecting
+                self.__set_connection_parameters()
+
+                # After a dropout, connect straight to the last robot without scanning (it
+                # advertises rapidly for a short time after losing the connection)
+                if self._last_device is not None:
+                    logging.info(f"Reconnecting to BLE peripheral with address {BleCentral.__device_address(self._last_device)}...")
+                    self._device = self._last_device
+                    self._last_device = None
+                    if await self.__connect(self._reconnect_timeout, resume=True):
+                        continue
+
+                # On the first attempt connect straight to the robot's cached address (BLEak
+                # accepts an address in place of a scanned device)
+                if not self._device_cache_tried:
+                    self._device_cache_tried = True
+                    address = self._device_cache.address(self._turtle_id)
+                    if address is not None:
+                        logging.info(f"Connecting to cached BLE peripheral address {address}...")
+                        self._device = address
+                        self._advertised_rssi = None
+                        self._advertised_turtle_id = self._turtle_id
+                        if await self.__connect(self._reconnect_timeout):
+                            continue
+                        logging.info(f"Unable to connect to cached address {address} - scanning")
+                        self._device_cache.forget(self._turtle_id)
 
-                # Scan for the peripheral
-                logging.info("Scanning for BLE peripheral...")
-                scanner = BleakScanner()
-                self._device = await scanner.find_device_by_name(self._peripheral_advertising_name, timeout=5, return_adv=True)
+                # Scan for the peripheral (the turtle ID is picked from the advertising data, so
+                # there is no need to connect to each robot in turn to find the right one)
+                if self._turtle_id is None:
+                    logging.info("Scanning for BLE peripheral...")
+                else:
+                    logging.info(f"Scanning for BLE peripheral with turtle ID {self._turtle_id}...")
+                self._device = await BleakScanner.find_device_by_filter(self.__advertisement_filter, timeout=5)
                 if self._device:
                     logging.info(f"BLE peripheral found with address {self._device.address}")
 
                     # Attempt to connect to the peripheral
-                    try:
-                        async with BleakClient(self._device.address) as self._client:
-                            if self._client.is_connected:
-                                # We should probably pair here... but bleak doesn't support programmatic pairing
-
-                                # Subscribe to notifications on the tx_p2c_characteristic
-                                await self._client.start_notify(self._tx_p2c_characteristic_uuid, self.__p2c_notification_handler)
-                                logging.info("Subscribed to P2C notifications")
-                                self._connected = True
-
-                                # Wait for disconnection
-                                while self._client.is_connected and self._connected:
-                                    await asyncio.sleep(0.25)
-                    except BleakError as e:
-                        logging.error(f"Failed to connect or discover services: {e}")
-                        await asyncio.sleep(1)  # Wait before retrying
+                    if await self.__connect(self._connect_timeout):
+                        continue
+                    await asyncio.sleep(1)  # Wait before retrying
                 else:
                     logging.info("BLE peripheral not found")
                     self._connected = False
@@ -132,46 +340,267 @@ class BleCentral:
             # Wait for 1 second before checking again
             await asyncio.sleep(1)
 
-    async def __handle_commands(self):
-        logging.info("Running handle commands task")
+    # Connect to self._device and stay connected until the link drops.  Returns
+    # True if a connection was made (so the peripheral can be reconnected to quickly)
+    async def __connect(self, timeout: float, resume: bool = False) -> bool:
+        was_connected = False
+        try:
+            async with BleakClient(self._device, timeout=timeout) as self._client:
+                if self._client.is_connected:
+                    # We should probably pair here... but bleak doesn't support programmatic pairing
+
+                    # Subscribe to notifications on the tx_p2c_characteristic
+                    await self._client.start_notify(self._tx_p2c_characteristic_uuid, self.__p2c_notification_handler)
+                    logging.info("Subscribed to P2C notifications")
+
+                    # Tell the peripheral which session this is before any commands are sent
+                    if not await self.__write(self._session_packet):
+                        logging.error(f"Peripheral did not acknowledge the session ID after {self._write_attempts} writes")
+                        return False
+                    logging.info(f"Session ID {self._session_id:08x} sent to peripheral")
+                    self._last_c2p_time = time.monotonic()
+                    self.__reset_credits()
+                    self._link_quality.reset()
+                    self._link_quality.add_rssi(self._advertised_rssi)
+                    if resume:
+                        self.__resend_pending()
+                    self._connected = True
+                    was_connected = True
+                    self._device_cache.store(BleCentral.__device_address(self._device), self._advertised_turtle_id)
+                    self._c2p_queue_event.set()
+
+                    # Wait for disconnection
+                    while self._client.is_connected and self._connected:
+                        await asyncio.sleep(0.25)
+        except (BleakError, asyncio.TimeoutError) as e:
+            logging.error(f"Failed to connect or discover services: {e}")
+
+        if was_connected:
+            logging.info("Connection to BLE peripheral lost")
+            logging.info(f"Link quality at disconnection: {self._link_quality.stats}")
+            self._last_device = self._device
+            self._connected = False
+        return was_connected
+
+    def __resend_pending(self):
+        # Commands still waiting for their responses when the link dropped (including
+        # motions that had started) are sent again, in the order they were first sent.
+        # The robot answers any it has already completed from its record of completed
+        # commands, so a response lost with the link isn't waited for in vain
+        resent = 0
+        for pending in self._pending_responses.values():
+            if not pending.response.done():
+                self._c2p_queue.push(pending.request)
+                resent += 1
+        if resent > 0:
+            logging.info(f"Resending {resent} commands that were waiting for a response when the link dropped")
+
+    async def scan(self, timeout: float = 5.0) -> list[dict]:
+        """Scan for robots and return the status each one is advertising (without connecting)"""
+        robots = []
+        devices = await BleakScanner.discover(timeout=timeout, return_adv=True)
+        for device, advertisement_data in devices.values():
+            if (advertisement_data.local_name or device.name) != self._peripheral_advertising_name:
+                continue
+
+            status = BleCentral.__advertised_status(advertisement_data)
+            if status is None:
+                continue
+
+            turtle_id, voltage_mv, flags = status
+            robots.append({
+                "address": device.address,
+                "turtle_id": turtle_id,
+                "voltage_mv": voltage_mv,
+                "connected": flags & protocol.ADVERTISING_FLAG_CONNECTED != 0,
+                "busy": flags & protocol.ADVERTISING_FLAG_BUSY != 0,
+                "power_low": flags & protocol.ADVERTISING_FLAG_POWER_LOW != 0,
+                "rssi": advertisement_data.rssi,
+            })
+        return sorted(robots, key=lambda robot: robot["turtle_id"])
+
+    def __advertisement_filter(self, device, advertisement_data) -> bool:
+        if (advertisement_data.local_name or device.name) != self._peripheral_advertising_name:
+            return False
+        status = BleCentral.__advertised_status(advertisement_data)
+        if self._turtle_id is not None:
+            if status is None or status[0] != self._turtle_id:
+                return False
+
+        self._advertised_rssi = advertisement_data.rssi
+        self._advertised_turtle_id = None if status is None else status[0]
+        return True
+
+    @staticmethod
+    def __device_address(device) -> str:
+        # A device is either a scanned BLEDevice or an address from the device cache
+        return device if isinstance(device, str) else device.address
+
+    @staticmethod
+    def __advertised_status(advertisement_data):
+        # Returns (turtle ID, voltage in mV, status flags) or None if the robot isn't advertising its status
+        data = advertisement_data.manufacturer_data.get(protocol.ADVERTISING_COMPANY_ID)
+        if data is None or len(data) < protocol.ADVERTISING_STATUS.size:
+            return None
+        return protocol.ADVERTISING_STATUS.unpack_from(data)
+
+    def __set_connection_parameters(self):
+        if self._low_latency:
+            parameters = BleCentral.__LOW_LATENCY_PARAMETERS
+        else:
+            parameters = BleCentral.__RELAXED_PARAMETERS
+
+        debugfs_path = os.path.join("/sys/kernel/debug/bluetooth", self._adapter)
+        names = ("conn_min_interval", "conn_max_interval", "conn_latency", "supervision_timeout")
+        try:
+            # The new minimum can't be above the current maximum (and vice versa), so
+            # write the maximum first when the interval is increasing
+            with open(os.path.join(debugfs_path, "conn_max_interval")) as f:
+                current_max_interval = int(f.read())
+            if parameters[0] > current_max_interval:
+                names = ("conn_max_interval", "conn_min_interval", "conn_latency", "supervision_timeout")
+                parameters = (parameters[1], parameters[0], parameters[2], parameters[3])
+
+            for name, value in zip(names, parameters):
+                with open(os.path.join(debugfs_path, name), "w") as f:
+                    f.write(str(value))
+            logging.info(f"Requested {'low latency' if self._low_latency else 'relaxed'} connection parameters")
+        except (OSError, ValueError) as e:
+            # Usually because debugfs isn't mounted or this isn't running as root.  Warn
+            # once (the request is repeated before every connection attempt)
+            message = f"Unable to request {'low latency' if self._low_latency else 'relaxed'} connection parameters through {debugfs_path} - the connection will use the BlueZ defaults ({e})"
+            if self._connection_parameters_warned:
+                logging.debug(message)
+            else:
+                logging.warning(message)
+                self._connection_parameters_warned = True
+            return
+        self._connection_parameters_warned = False
+
+    async def __transmit_c2p(self):
+        logging.info("Running transmit task")
         while True:
+            await self._c2p_queue_event.wait()
+            self._c2p_queue_event.clear()
+
+            # Send all waiting data (that there is credit for)
             while self._connected:
-                # Wait for a notification to be received
-                #logging.info("Waiting for P2C notification event")
-                await self._p2c_notification_event.wait()
-                #logging.info("P2C notification event received")
-    
-                # Send any data in the c2p queue to the peripheral
-                if len(self._c2p_queue) > 0:
-                    # Send all waiting data
-                    while len(self._c2p_queue) > 0:
-                        data_packet = self._c2p_queue.pop(0)
-                        #logging.info(f"Sending data to peripheral: {data_packet}")
-                        await self._client.write_gatt_char(self._rx_c2p_characteristic_uuid, data_packet, response=False)
-                else:
-                    # If the queue is empty, send a nop
-                    data_packet = bytearray(20)
-                    await self._client.write_gatt_char(self._rx_c2p_characteristic_uuid, data_packet, response=False)
+                data_packet = self.__next_c2p_packet()
+                if data_packet is None:
+                    break
+                if not await self.__write(data_packet):
+                    logging.error(f"Peripheral did not acknowledge {self._write_attempts} writes - disconnecting")
+                    self._connected = False
 
-                # Clear the notification event
-                self._p2c_notification_event.clear()
-            else:
-                # If we are not connected, wait for 250ms
-                await asyncio.sleep(0.25)
+    def __next_c2p_packet(self):
+        # Keepalives (sequence 0) don't use credit, so they are never held up behind commands
+        if self._keepalive_pending:
+            self._keepalive_pending = False
+            return self._keepalive_packet
+
+        if len(self._c2p_queue) > 0 and self.credits > 0:
+            self._c2p_sent = (self._c2p_sent + 1) & 0xFF
+            return self._c2p_queue.pop()
+        return None
+
+    def __reset_credits(self):
+        self._c2p_credit_limit = self._initial_credit_limit
+        self._c2p_sent = 0
+        self._peripheral_queue_depth = 0
+        self._last_response_time = None
+
+    def __update_credits(self, service_data):
+        self._peripheral_queue_depth = service_data[protocol.QUEUE_DEPTH_OFFSET]
+        credit_limit = service_data[protocol.CREDIT_LIMIT_OFFSET]
+        if credit_limit != self._c2p_credit_limit:
+            self._c2p_credit_limit = credit_limit
+            # Wake the transmit task in case it is waiting for credit
+            if len(self._c2p_queue) > 0:
+                self._c2p_queue_event.set()
+
+    def __sample_service_time(self, service_data):
+        # Whilst the peripheral has commands queued it works through them one after
+        # another, so the time between its responses is the time taken per command
+        now = time.monotonic()
+        if self._last_response_time is not None and self._last_response_queue_depth > 0:
+            self._link_quality.add_service_time(now - self._last_response_time)
+        self._last_response_time = now
+        self._last_response_queue_depth = service_data[protocol.QUEUE_DEPTH_OFFSET]
+
+    async def __write(self, data_packet) -> bool:
+        # Write with response so the peripheral acknowledges the packet at the
+        # link level, retrying if it doesn't
+        for attempt in range(1, self._write_attempts + 1):
+            try:
+                start_time = time.monotonic()
+                await self._client.write_gatt_char(self._rx_c2p_characteristic_uuid, data_packet, response=True)
+                self._last_c2p_time = time.monotonic()
+                self._link_quality.add_write(self._last_c2p_time - start_time)
+                return True
+            except BleakError as e:
+                logging.info(f"Write to peripheral failed after attempt {attempt}: {e}")
+                self._link_quality.add_write_failure()
+        return False
+
+    async def __keepalive(self):
+        logging.info("Running keepalive task")
+        while True:
+            await asyncio.sleep(self._keepalive_interval / 2)
+            if self._connected and time.monotonic() - self._last_c2p_time >= self._keepalive_interval:
+                # Nothing sent recently - send a NOP
+                self._keepalive_pending = True
+                self._c2p_queue_event.set()
+
+    async def __sample_rssi(self):
+        logging.info("Running RSSI sampling task")
+        while True:
+            await asyncio.sleep(self._rssi_interval)
+            if not self._connected or self._device is None:
+                continue
+
+            # Listen briefly for the connected robot's advertisements
+            address = BleCentral.__device_address(self._device)
+            def rssi_filter(device, advertisement_data) -> bool:
+                if device.address != address:
+                    return False
+                self._link_quality.add_rssi(advertisement_data.rssi)
+                return True
+            try:
+                await BleakScanner.find_device_by_filter(rssi_filter, timeout=2.0)
+            except BleakError as e:
+                logging.debug(f"Unable to sample the RSSI: {e}")
+
+            # Link quality telemetry
+            logging.info(f"Link quality: {self._link_quality.stats}")
 
     def __p2c_notification_handler(self, characteristic: BleakGATTCharacteristic, service_data: bytearray):
-        """Handle notifications from the peripheral."""
+        """Handle notifications (and indications) from the peripheral."""
         if len(service_data) == 20:
+            # Every packet (including NOPs) carries the peripheral's credit limit
+            self.__update_credits(service_data)
+
             # Check the first byte to see if it is a valid commmand response
-            # If the first byte is 0x00, then it is a NOP response
+            # If the first byte is 0x00, then it is a NOP response (unless it is
+            # a motion acknowledgement or a refusal)
             if service_data[0] != 0x00:
-                # Queue the data packet for processing
-                if len(self._p2c_queue) < self._max_queue_elements:
-                    self._p2c_queue.append(service_data)
-                    #logging.info(f"Received data from peripheral: {service_data}, appended to queue ({len(self._p2c_queue)} elements)")
-                    self._p2c_queue_event.set()
+                self.__sample_service_time(service_data)
+
+                # Route the response to the command waiting for it
+                pending = self._pending_responses.get(service_data[0])
+                if pending is not None:
+                    pending._resolve(bytes(service_data))
+                else:
+                    self._unmatched_responses += 1
+                    logging.debug(f"Received response for sequence ID {service_data[0]} but no command is waiting for it")
+            elif service_data[1] == protocol.MOTION_ACK_MARKER:
+                _, _, seq_id, duration_ms = protocol.MOTION_ACK.unpack_from(service_data)
+                pending = self._pending_responses.get(seq_id)
+                if pending is not None:
+                    pending._acknowledge(duration_ms)
+            elif service_data[1] == protocol.REFUSED_MARKER:
+                _, _, seq_id, reason = protocol.REFUSED.unpack_from(service_data)
+                pending = self._pending_responses.get(seq_id)
+                if pending is not None:
+                    pending._refuse(reason)
         else:
             logging.info(f"Received data from peripheral: {service_data} - invalid length")
-
-        # Notify the main async task that data has been received
-        self._p2c_notification_event.set()
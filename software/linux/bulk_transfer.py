@@ -0,0 +1,136 @@
+#************************************************************************
+#
+#   bulk_transfer.py
+#
+#   L2CAP bulk transfer channel
+#   Valiant Turtle 2 - Communicator Linux Firmware
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+import asyncio
+import logging
+import socket
+import zlib
+
+import protocol
+
+class BulkTransfer:
+    """
+    Streams large blobs (such as program images) to and from the robot over an
+    L2CAP connection oriented channel, which is much faster than writing 20 byte
+    packets to the command characteristic.
+
+    BLEak doesn't support L2CAP channels so a BlueZ L2CAP socket is used.  This
+    needs a Python socket module that can connect to LE addresses; if it can't,
+    or the channel can't be opened or fails part way through a transfer, the
+    methods return None and the caller should fall back to the command
+    characteristic.
+    """
+    def __init__(self):
+        self._timeout = 10.0
+
+    @property
+    def is_supported(self) -> bool:
+        return hasattr(socket, "AF_BLUETOOTH") and hasattr(socket, "BDADDR_LE_PUBLIC")
+
+    async def upload_program(self, address: str, image: bytes):
+        """Upload a program image. Returns (success, record_count) from the robot's result, or None if the channel is unavailable or fails"""
+        sock = await self.__open(address)
+        if sock is None:
+            return None
+
+        try:
+            header = protocol.BULK_HEADER.pack(protocol.BULK_MAGIC, protocol.BULK_PROGRAM_UPLOAD, 0, len(image), zlib.crc32(image))
+            await asyncio.wait_for(self.__send(sock, header + image), self._timeout)
+            _, result, record_count, _, _ = await asyncio.wait_for(self.__receive_header(sock), self._timeout)
+        except (OSError, ValueError, asyncio.TimeoutError) as e:
+            logging.error(f"BulkTransfer::upload_program - Transfer failed: {e}")
+            return None
+        finally:
+            sock.close()
+
+        return result != 0, record_count
+
+    async def download_program(self, address: str):
+        """Download the stored program image. Returns the image (b"" if there isn't one) or None if the channel is unavailable"""
+        sock = await self.__open(address)
+        if sock is None:
+            return None
+
+        try:
+            header = protocol.BULK_HEADER.pack(protocol.BULK_MAGIC, protocol.BULK_PROGRAM_DOWNLOAD, 0, 0, 0)
+            await asyncio.wait_for(self.__send(sock, header), self._timeout)
+            _, result, _, length, crc32 = await asyncio.wait_for(self.__receive_header(sock), self._timeout)
+            image = b""
+            if result != 0:
+                image = await asyncio.wait_for(self.__receive(sock, length), self._timeout)
+        except (OSError, ValueError, asyncio.TimeoutError) as e:
+            logging.error(f"BulkTransfer::download_program - Transfer failed: {e}")
+            return None
+        finally:
+            sock.close()
+
+        if result != 0 and zlib.crc32(image) != crc32:
+            logging.error("BulkTransfer::download_program - CRC mismatch on the downloaded program")
+            return None
+        return image
+
+    async def __open(self, address: str):
+        if not self.is_supported or address is None:
+            return None
+
+        # The robot may use a public or a random address
+        loop = asyncio.get_running_loop()
+        for address_type in (socket.BDADDR_LE_PUBLIC, socket.BDADDR_LE_RANDOM):
+            sock = socket.socket(socket.AF_BLUETOOTH, socket.SOCK_SEQPACKET, socket.BTPROTO_L2CAP)
+            sock.setblocking(False)
+            try:
+                await asyncio.wait_for(loop.sock_connect(sock, (address, protocol.L2CAP_PSM, 0, address_type)), self._timeout)
+                logging.info(f"BulkTransfer::__open - Opened bulk transfer channel to {address}")
+                return sock
+            except (OSError, asyncio.TimeoutError) as e:
+                logging.debug(f"BulkTransfer::__open - Unable to open channel (address type {address_type}): {e}")
+                sock.close()
+
+        logging.info("BulkTransfer::__open - Bulk transfer channel is unavailable")
+        return None
+
+    async def __send(self, sock, data: bytes):
+        # Each send is a single L2CAP SDU, which can't be larger than the MTU
+        loop = asyncio.get_running_loop()
+        for offset in range(0, len(data), protocol.L2CAP_MTU):
+            await loop.sock_sendall(sock, data[offset:offset + protocol.L2CAP_MTU])
+
+    async def __receive(self, sock, length: int) -> bytes:
+        loop = asyncio.get_running_loop()
+        data = bytearray()
+        while len(data) < length:
+            sdu = await loop.sock_recv(sock, protocol.L2CAP_MTU)
+            if not sdu:
+                raise OSError("Channel closed by the robot")
+            data += sdu
+        return bytes(data)
+
+    async def __receive_header(self, sock) -> tuple[int, int, int, int, int]:
+        header = protocol.BULK_HEADER.unpack(await self.__receive(sock, protocol.BULK_HEADER.size))
+        if header[0] != protocol.BULK_MAGIC:
+            raise ValueError(f"Invalid transfer header magic {header[0]}")
+        return header
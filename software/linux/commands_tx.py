@@ -26,45 +26,56 @@
 #************************************************************************
 
 import asyncio
+import concurrent.futures
 import logging
-import struct
 import threading
-from ble_central import BleCentral
-
-# Note: The commands are defined in the BLE peripheral firmware
-# and the ControlRx class must match the ControlTx class otherwise
-# bad things will happen :)
+from async_commands_tx import AsyncCommandsTx, SUBMITTABLE_COMMANDS
 
 class CommandsTx:
+    """
+    Synchronous facade over AsyncCommandsTx for scripts that don't use asyncio.
+    The commands run on an event loop in a background thread and each method
+    blocks until the command's response arrives.
+
+    Commands can also be submitted without waiting for their responses, so the
+    robot's queue is kept topped up; flush() then waits for them all:
+
+        commands_tx.submit("forward", 100)
+        commands_tx.submit("left", 90)
+        if not commands_tx.flush():
+            print("A submitted command failed")
+    """
     def __init__(self):
-        self._ble_central = BleCentral()
-        self._command_sequence = 1
+        self._commands = AsyncCommandsTx()
+        self._loop = None
+        self._thread = None
+        self._connect = False
 
-        self._short_timeout = 5.0
-        self._long_timeout = 60.0
+    @property
+    def commands(self) -> AsyncCommandsTx:
+        # The asynchronous API (its coroutines must be run on the background event loop)
+        return self._commands
 
-        self._connect = False
-        
-    def connect(self):
+    def connect(self, turtle_id: int = None):
         if not self._connect:
             logging.info("CommandsTx::connect - Staring the BLE central role")
-            # Start the BleCentral event loop in the background
+            # Start the event loop in the background and the BLE central on it
             self._loop = asyncio.new_event_loop()
             self._thread = threading.Thread(target=self._start_event_loop, args=(self._loop,))
             self._thread.start()
-            self._loop.call_soon_threadsafe(self._loop.create_task, self._ble_central.run())
+            asyncio.run_coroutine_threadsafe(self._commands.connect(turtle_id), self._loop).result()
             self._connect = True
 
     def disconnect(self):
         if self._connect:
             # Disconnect the BLE
             logging.info("CommandsTx::disconnect - Disconnecting BLE")
-            self._ble_central.disconnect()
-            
+            asyncio.run_coroutine_threadsafe(self._commands.disconnect(), self._loop).result()
+
             # Stop the event loop
             logging.info("CommandsTx::disconnect - Stopping event loop")
             self._loop.call_soon_threadsafe(self._loop.stop)
-            
+
             # Wait for the thread to finish
             logging.info("CommandsTx::disconnect - Waiting for thread to finish")
             self._thread.join()
@@ -74,1127 +85,184 @@ class CommandsTx:
             self._thread = None
             self._connect = False
 
+    def scan(self, timeout: float = 5.0) -> list[dict]:
+        # Find the robots in range and their advertised status (without connecting)
+        if self._connect:
+            return asyncio.run_coroutine_threadsafe(self._commands.scan(timeout), self._loop).result()
+        return asyncio.run(self._commands.scan(timeout))
+
     def _start_event_loop(self, loop):
         asyncio.set_event_loop(loop)
         loop.run_forever()
 
-    def __next_seq(self) -> int:
-        self._command_sequence += 1
-        if self._command_sequence > 255:
-            self._command_sequence = 1
-        return self._command_sequence
-    
-    async def __wait_for_command_response(self, seq_id: int) -> bytes:
-        while True:
-            await self._ble_central._p2c_queue_event.wait()
-            try:
-                data = self._ble_central._p2c_queue.pop(0)
-            except IndexError:
-                logging.error("CommandsTx::__wait_for_command_response - Got P2C queue event but the queue was empty?")
-                seq_id_rx = 0
-                return None
+    # Run a command on the background event loop and wait for its result
+    def __call(self, name: str, *args):
+        if not self._commands.connected:
+            raise RuntimeError(f"CommandsTx::{name} - The connect method must be called before sending commands")
+        return asyncio.run_coroutine_threadsafe(getattr(self._commands, name)(*args), self._loop).result()
 
-            self._ble_central._p2c_queue_event.clear()
-            seq_id_rx = data[0]
+    @property
+    def connected(self):
+        return self._commands.connected
+
+    def submit(self, name: str, *args) -> concurrent.futures.Future:
+        # Queue a command (by method name) without waiting for its response.  Returns a
+        # future for the command's result
+        if not self._commands.connected:
+            raise RuntimeError("CommandsTx::submit - The connect method must be called before sending commands")
+        if name not in SUBMITTABLE_COMMANDS:
+            raise ValueError(f"CommandsTx::submit - {name} is not a command that can be submitted")
+        return asyncio.run_coroutine_threadsafe(self.__wait_for(self._commands.submit, name, *args), self._loop)
+
+    def barrier(self) -> bool:
+        # Wait until every command submitted so far has completed (commands submitted by
+        # other threads in the meantime are held until then).  Returns False if any failed
+        if not self._connect:
+            return True
+        return asyncio.run_coroutine_threadsafe(self.__wait_for(self._commands.barrier), self._loop).result()
 
-            # Check if the sequence ID matches
-            if seq_id_rx == seq_id:
-                #logging.info(f"CommandsTx::__wait_for_command_response - Sequence ID = {seq_id_rx} matched")
-                return data
-            else:
-                logging.info(f"CommandsTx::__wait_for_command_response - Sequence ID = {seq_id_rx} did not match received sequence ID = {seq_id}")
+    def flush(self) -> bool:
+        # Wait until every submitted command has completed.  Returns False if any failed
+        # (the commands submitted after it are cancelled) and clears the failure
+        if not self._connect:
+            return True
+        return asyncio.run_coroutine_threadsafe(self._commands.flush(), self._loop).result()
+
+    # The submission methods must be called on the event loop and return an asyncio future
+    @staticmethod
+    async def __wait_for(method, *args):
+        return await method(*args)
 
     @property
-    def connected(self):
-        return self._ble_central.connected
+    def short_timeout(self) -> float:
+        return self._commands.short_timeout
+
+    def link_stats(self) -> dict:
+        return self._commands.link_stats()
+
+    @property
+    def low_latency(self) -> bool:
+        return self._commands.low_latency
+
+    @low_latency.setter
+    def low_latency(self, low_latency: bool):
+        self._commands.low_latency = low_latency
 
     # Synchronous methods to call the asynchronous methods ------------------------------------------------------------
 
     def motors(self, enable: bool) -> bool:
-        if not self._ble_central.connected:
-            raise RuntimeError("CommandsTx::motors - The connect method must be called before sending commands")
-        return asyncio.run_coroutine_threadsafe(self._motors(enable), self._loop).result()
+        return self.__call("motors", enable)
 
     def forward(self, distance_mm: float) -> tuple[bool, float, float, float]:
-        if not self._ble_central.connected:
-            raise RuntimeError("CommandsTx::forward - The connect method must be called before sending commands")
-        return asyncio.run_coroutine_threadsafe(self._forward(distance_mm), self._loop).result()
+        return self.__call("forward", distance_mm)
 
     def backward(self, distance_mm: float) -> tuple[bool, float, float, float]:
-        if not self._ble_central.connected:
-            raise RuntimeError("CommandsTx::backward - The connect method must be called before sending commands")
-        return asyncio.run_coroutine_threadsafe(self._backward(distance_mm), self._loop).result()
+        return self.__call("backward", distance_mm)
 
     def left(self, angle_degrees: float) -> tuple[bool, float, float, float]:
-        if not self._ble_central.connected:
-            raise RuntimeError("CommandsTx::left - The connect method must be called before sending commands")
-        return asyncio.run_coroutine_threadsafe(self._left(angle_degrees), self._loop).result()
+        return self.__call("left", angle_degrees)
 
     def right(self, angle_degrees: float) -> tuple[bool, float, float, float]:
-        if not self._ble_central.connected:
-            raise RuntimeError("CommandsTx::right - The connect method must be called before sending commands")
-        return asyncio.run_coroutine_threadsafe(self._right(angle_degrees), self._loop).result()
-    
+        return self.__call("right", angle_degrees)
+
     def circle(self, radius_mm: float, extent_degrees: float) -> tuple[bool, float, float, float]:
-        if not self._ble_central.connected:
-            raise RuntimeError("CommandsTx::circle - The connect method must be called before sending commands")
-        return asyncio.run_coroutine_threadsafe(self._circle(radius_mm, extent_degrees), self._loop).result()
+        return self.__call("circle", radius_mm, extent_degrees)
 
     def setheading(self, angle_degrees: float) -> bool:
-        if not self._ble_central.connected:
-            raise RuntimeError("CommandsTx::setheading - The connect method must be called before sending commands")
-        return asyncio.run_coroutine_threadsafe(self._setheading(angle_degrees), self._loop).result()
+        return self.__call("setheading", angle_degrees)
 
     def setx(self, x_mm: float) -> bool:
-        if not self._ble_central.connected:
-            raise RuntimeError("CommandsTx::setx - The connect method must be called before sending commands")
-        return asyncio.run_coroutine_threadsafe(self._setx(x_mm), self._loop).result()
+        return self.__call("setx", x_mm)
 
     def sety(self, y_mm: float) -> bool:
-        if not self._ble_central.connected:
-            raise RuntimeError("CommandsTx::sety - The connect method must be called before sending commands")
-        return asyncio.run_coroutine_threadsafe(self._sety(y_mm), self._loop).result()
+        return self.__call("sety", y_mm)
 
     def setposition(self, x_mm: float, y_mm: float) -> bool:
-        if not self._ble_central.connected:
-            raise RuntimeError("CommandsTx::setposition - The connect method must be called before sending commands")
-        return asyncio.run_coroutine_threadsafe(self._goto(x_mm, y_mm), self._loop).result()
+        return self.__call("setposition", x_mm, y_mm)
 
     def towards(self, x_mm: float, y_mm: float) -> bool:
-        if not self._ble_central.connected:
-            raise RuntimeError("CommandsTx::towards - The connect method must be called before sending commands")
-        return asyncio.run_coroutine_threadsafe(self._towards(x_mm, y_mm), self._loop).result()
+        return self.__call("towards", x_mm, y_mm)
 
     def reset_origin(self) -> bool:
-        if not self._ble_central.connected:
-            raise RuntimeError("CommandsTx::reset_origin - The connect method must be called before sending commands")
-        return asyncio.run_coroutine_threadsafe(self._reset_origin(), self._loop).result()
+        return self.__call("reset_origin")
 
     def heading(self) -> tuple[bool, float]:
-        if not self._ble_central.connected:
-            raise RuntimeError("CommandsTx::heading - The connect method must be called before sending commands")
-        return asyncio.run_coroutine_threadsafe(self._heading(), self._loop).result()
+        return self.__call("heading")
 
     def position(self) -> tuple[bool, float, float]:
-        if not self._ble_central.connected:
-            raise RuntimeError("CommandsTx::position - The connect method must be called before sending commands")
-        return asyncio.run_coroutine_threadsafe(self._position(), self._loop).result()
+        return self.__call("position")
 
     def penup(self) -> bool:
-        if not self._ble_central.connected:
-            raise RuntimeError("CommandsTx::penup - The connect method must be called before sending commands")
-        return asyncio.run_coroutine_threadsafe(self._penup(), self._loop).result()
-    
+        return self.__call("penup")
+
     def pendown(self) -> bool:
-        if not self._ble_central.connected:
-            raise RuntimeError("CommandsTx::pendown - The connect method must be called before sending commands")
-        return asyncio.run_coroutine_threadsafe(self._pendown(), self._loop).result()
+        return self.__call("pendown")
 
     def eyes(self, eye_id, red, green, blue) -> bool:
-        if not self._ble_central.connected:
-            raise RuntimeError("CommandsTx::eyes - The connect method must be called before sending commands")
-        return asyncio.run_coroutine_threadsafe(self._eyes(eye_id, red, green, blue), self._loop).result()
+        return self.__call("eyes", eye_id, red, green, blue)
 
     def power(self) -> tuple[bool, int, int, int]:
-        if not self._ble_central.connected:
-            raise RuntimeError("CommandsTx::power - The connect method must be called before sending commands")
-        return asyncio.run_coroutine_threadsafe(self._power(), self._loop).result()
+        return self.__call("power")
 
     def isdown(self) -> tuple[bool, bool]:
-        if not self._ble_central.connected:
-            raise RuntimeError("CommandsTx::isdown - The connect method must be called before sending commands")
-        return asyncio.run_coroutine_threadsafe(self._isdown(), self._loop).result()
+        return self.__call("isdown")
 
     def set_linear_velocity(self, target_speed: int, acceleration: int) -> bool:
-        if not self._ble_central.connected:
-            raise RuntimeError("CommandsTx::set_linear_velocity - The connect method must be called before sending commands")
-        return asyncio.run_coroutine_threadsafe(self._set_linear_velocity(target_speed, acceleration), self._loop).result()
+        return self.__call("set_linear_velocity", target_speed, acceleration)
 
     def set_rotational_velocity(self, target_speed: int, acceleration: int) -> bool:
-        if not self._ble_central.connected:
-            raise RuntimeError("CommandsTx::set_rotational_velocity - The connect method must be called before sending commands")
-        return asyncio.run_coroutine_threadsafe(self._set_rotational_velocity(target_speed, acceleration), self._loop).result()
+        return self.__call("set_rotational_velocity", target_speed, acceleration)
 
     def get_linear_velocity(self) -> tuple[bool, int, int]:
-        if not self._ble_central.connected:
-            raise RuntimeError("CommandsTx::get_linear_velocity - The connect method must be called before sending commands")
-        return asyncio.run_coroutine_threadsafe(self._get_linear_velocity(), self._loop).result()
+        return self.__call("get_linear_velocity")
 
     def get_rotational_velocity(self) -> tuple[bool, int, int]:
-        if not self._ble_central.connected:
-            raise RuntimeError("CommandsTx::get_rotational_velocity - The connect method must be called before sending commands")
-        return asyncio.run_coroutine_threadsafe(self._get_rotational_velocity(), self._loop).result()
+        return self.__call("get_rotational_velocity")
 
     def set_wheel_diameter_calibration(self, wheel_diameter: int) -> bool:
-        if not self._ble_central.connected:
-            raise RuntimeError("CommandsTx::set_wheel_diameter_calibration - The connect method must be called before sending commands")
-        return asyncio.run_coroutine_threadsafe(self._set_wheel_diameter_calibration(wheel_diameter), self._loop).result()
+        return self.__call("set_wheel_diameter_calibration", wheel_diameter)
 
     def set_axel_distance_calibration(self, axel_distance: int) -> bool:
-        if not self._ble_central.connected:
-            raise RuntimeError("CommandsTx::set_axel_distance_calibration - The connect method must be called before sending commands")
-        return asyncio.run_coroutine_threadsafe(self._set_axel_distance_calibration(axel_distance), self._loop).result()
+        return self.__call("set_axel_distance_calibration", axel_distance)
 
     def get_wheel_diameter_calibration(self) -> tuple[bool, int]:
-        if not self._ble_central.connected:
-            raise RuntimeError("CommandsTx::get_wheel_diameter_calibration - The connect method must be called before sending commands")
-        return asyncio.run_coroutine_threadsafe(self._get_wheel_diameter_calibration(), self._loop).result()
+        return self.__call("get_wheel_diameter_calibration")
 
     def get_axel_distance_calibration(self) -> tuple[bool, int]:
-        if not self._ble_central.connected:
-            raise RuntimeError("CommandsTx::get_axel_distance_calibration - The connect method must be called before sending commands")
-        return asyncio.run_coroutine_threadsafe(self._get_axel_distance_calibration(), self._loop).result()
+        return self.__call("get_axel_distance_calibration")
 
     def set_turtle_id(self, turtle_id: int) -> bool:
-        if not self._ble_central.connected:
-            raise RuntimeError("CommandsTx::set_turtle_id - The connect method must be called before sending commands")
-        return asyncio.run_coroutine_threadsafe(self._set_turtle_id(turtle_id), self._loop).result()
+        return self.__call("set_turtle_id", turtle_id)
 
     def get_turtle_id(self) -> tuple[bool, int]:
-        if not self._ble_central.connected:
-            raise RuntimeError("CommandsTx::get_turtle_id - The connect method must be called before sending commands")
-        return asyncio.run_coroutine_threadsafe(self._get_turtle_id(), self._loop).result()
+        return self.__call("get_turtle_id")
 
     def load_config(self) -> bool:
-        if not self._ble_central.connected:
-            raise RuntimeError("CommandsTx::load_config - The connect method must be called before sending commands")
-        return asyncio.run_coroutine_threadsafe(self._load_config(), self._loop).result()
+        return self.__call("load_config")
 
     def save_config(self) -> bool:
-        if not self._ble_central.connected:
-            raise RuntimeError("CommandsTx::save_config - The connect method must be called before sending commands")
-        return asyncio.run_coroutine_threadsafe(self._save_config(), self._loop).result()
+        return self.__call("save_config")
 
     def reset_config(self) -> bool:
-        if not self._ble_central.connected:
-            raise RuntimeError("CommandsTx::reset_config - The connect method must be called before sending commands")
-        return asyncio.run_coroutine_threadsafe(self._reset_config(), self._loop).result()
-    
-    # Asynchronous methods to send commands to the BLE peripheral -----------------------------------------------------
-
-    async def _motors(self, enable: bool) -> bool:
-        if not self._ble_central.connected:
-            logging.info("CommandsTx::motors - Not connected to a robot")
-            return False
-        
-        command_id = 1
-
-        # Command to enable or disable the motors
-        if enable:
-            parameter = 1
-        else:
-            parameter = 0
-
-        # Generate a sequence ID and queue the command
-        seq_id = self.__next_seq()
-        data = struct.pack("<BBB", seq_id, command_id, parameter)
-        self._ble_central.add_to_c2p_queue(data)
-        logging.info(f"CommandsTx::motors - Command ID = {command_id}, Sequence ID = {seq_id}, enable = {enable}")
-        
-        # Wait for the command to be processed with a short timeout
-        try:
-            await asyncio.wait_for(self.__wait_for_command_response(seq_id), timeout=self._short_timeout)
-        except asyncio.TimeoutError:
-            logging.error(f"CommandsTx::motors - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
-            self._ble_central.disconnect()
-            return False
-
-        # This command does not return any data, so we don't need to return any
-        return True
-
-    async def _forward(self, distance_mm: float) -> tuple[bool, float, float, float]:
-        if not self._ble_central.connected:
-            logging.error("CommandsTx::_forward - Not connected to a robot")
-            return False, 0.0, 0.0, 0.0
-        
-        command_id = 2
-
-        # Command to move the robot forward
-        # Generate a sequence ID and queue the command
-        seq_id = self.__next_seq()
-        data = struct.pack("<BBf", seq_id, command_id, distance_mm)
-        self._ble_central.add_to_c2p_queue(data)
-        logging.info(f"CommandsTx::_forward - Command ID = {command_id}, Sequence ID = {seq_id}, distance = {distance_mm}")
-
-        # Wait for the command to be processed with a long timeout
-        try:
-            response = await asyncio.wait_for(self.__wait_for_command_response(seq_id), timeout=self._long_timeout)
-        except asyncio.TimeoutError:
-            logging.error(f"CommandsTx::_forward - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
-            self._ble_central.disconnect()
-            return False, 0.0, 0.0, 0.0
-
-        # Extract the position and heading from the response
-        try:
-            seq_id, x, y, heading = struct.unpack("<Bfff", response[:13])
-        except ValueError as e:
-            logging.error(f"CommandsTx::_forward - Error unpacking response: {e}")
-            return False, 0.0, 0.0, 0.0
-        
-        x = round(x, 2)
-        y = round(y, 2)
-        heading = round(heading, 2)
-        logging.info(f"CommandsTx::_forward - X = {x}, Y = {y}, heading = {heading}")
-        return True, x, y, heading
-    
-    async def _backward(self, distance_mm: float) -> tuple[bool, float, float, float]:
-        if not self._ble_central.connected:
-            logging.error("CommandsTx::_backward - Not connected to a robot")
-            return False, 0.0, 0.0, 0.0
-        
-        command_id = 3
-
-        # Command to move the robot backward
-        # Generate a sequence ID and queue the command
-        seq_id = self.__next_seq()
-        data = struct.pack("<BBf", seq_id, command_id, distance_mm)
-        self._ble_central.add_to_c2p_queue(data)
-        logging.info(f"CommandsTx::_backward - Command ID = {command_id}, Sequence ID = {seq_id}, distance = {distance_mm}")
-        
-        # Wait for the command to be processed with a long timeout
-        try:
-            response = await asyncio.wait_for(self.__wait_for_command_response(seq_id), timeout=self._long_timeout)
-        except asyncio.TimeoutError:
-            logging.error(f"CommandsTx::_backward - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
-            self._ble_central.disconnect()
-            return False, 0.0, 0.0, 0.0
-
-        # Extract the position and heading from the response
-        try:
-            seq_id, x, y, heading = struct.unpack("<Bfff", response[:13])
-        except ValueError as e:
-            logging.error(f"CommandsTx::_backward - Error unpacking response: {e}")
-            return False, 0.0, 0.0, 0.0
-        
-        x = round(x, 2)
-        y = round(y, 2)
-        heading = round(heading, 2)
-        logging.info(f"CommandsTx::_backward - X = {x}, Y = {y}, heading = {heading}")
-        return True, x, y, heading
-    
-    async def _left(self, angle_degrees: float) -> tuple[bool, float, float, float]:
-        if not self._ble_central.connected:
-            logging.error("CommandsTx::_left - Not connected to a robot")
-            return False, 0.0, 0.0, 0.0
-        
-        command_id = 4
-
-        # Command to turn the robot left
-        # Generate a sequence ID and queue the command
-        seq_id = self.__next_seq()
-        data = struct.pack("<BBf", seq_id, command_id, angle_degrees)
-        self._ble_central.add_to_c2p_queue(data)
-        logging.info(f"CommandsTx::_left - Command ID = {command_id}, Sequence ID = {seq_id}, angle = {angle_degrees}")
-        
-        # Wait for the command to be processed with a long timeout
-        try:
-            response = await asyncio.wait_for(self.__wait_for_command_response(seq_id), timeout=self._long_timeout)
-        except asyncio.TimeoutError:
-            logging.error(f"CommandsTx::_left - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
-            self._ble_central.disconnect()
-            return False, 0.0, 0.0, 0.0
-
-        # Extract the position and heading from the response
-        try:
-            seq_id, x, y, heading = struct.unpack("<Bfff", response[:13])
-        except ValueError as e:
-            logging.error(f"CommandsTx::_left - Error unpacking response: {e}")
-            return False, 0.0, 0.0, 0.0
-        
-        x = round(x, 2)
-        y = round(y, 2)
-        heading = round(heading, 2)
-        logging.info(f"CommandsTx::_left - X = {x}, Y = {y}, heading = {heading}")
-        return True, x, y, heading
-    
-    async def _right(self, angle_degrees: float) -> tuple[bool, float, float, float]:
-        if not self._ble_central.connected:
-            logging.error("CommandsTx::_right - Not connected to a robot")
-            return False, 0.0, 0.0, 0.0
-        
-        command_id = 5
-
-        # Command to turn the robot right
-        # Generate a sequence ID and queue the command
-        seq_id = self.__next_seq()
-        data = struct.pack("<BBf", seq_id, command_id, angle_degrees)
-        self._ble_central.add_to_c2p_queue(data)
-        logging.info(f"CommandsTx::_right - Command ID = {command_id}, Sequence ID = {seq_id}, angle = {angle_degrees}")
-        
-        # Wait for the command to be processed with a long timeout
-        try:
-            response = await asyncio.wait_for(self.__wait_for_command_response(seq_id), timeout=self._long_timeout)
-        except asyncio.TimeoutError:
-            logging.error(f"CommandsTx::_right - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
-            self._ble_central.disconnect()
-            return False, 0.0, 0.0, 0.0
-
-        # Extract the position and heading from the response
-        try:
-            seq_id, x, y, heading = struct.unpack("<Bfff", response[:13])
-        except ValueError as e:
-            logging.error(f"CommandsTx::_right - Error unpacking response: {e}")
-            return False, 0.0, 0.0, 0.0
-        
-        x = round(x, 2)
-        y = round(y, 2)
-        heading = round(heading, 2)
-        logging.info(f"CommandsTx::_right - X = {x}, Y = {y}, heading = {heading}")
-        return True, x, y, heading
-    
-    async def _circle(self, radius_mm: float, extent_degrees: float) -> tuple[bool, float, float, float]:
-        if not self._ble_central.connected:
-            logging.error("CommandsTx::_circle - Not connected to a robot")
-            return False, 0.0, 0.0, 0.0
-        
-        command_id = 6
-
-        # Command to turn the robot left on an arc
-        # Generate a sequence ID and queue the command
-        seq_id = self.__next_seq()
-        data = struct.pack("<BBff", seq_id, command_id, radius_mm, extent_degrees)
-        self._ble_central.add_to_c2p_queue(data)
-        logging.info(f"CommandsTx::_circle - Command ID = {command_id}, Sequence ID = {seq_id}, radius = {radius_mm}, extent = {extent_degrees}")
-        
-        # Wait for the command to be processed with a long timeout
-        try:
-            response = await asyncio.wait_for(self.__wait_for_command_response(seq_id), timeout=self._long_timeout)
-        except asyncio.TimeoutError:
-            logging.error(f"CommandsTx::_circle - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
-            self._ble_central.disconnect()
-            return False, 0.0, 0.0, 0.0
-
-        # Extract the position and heading from the response
-        try:
-            seq_id, x, y, heading = struct.unpack("<Bfff", response[:13])
-        except ValueError as e:
-            logging.error(f"CommandsTx::_circle - Error unpacking response: {e}")
-            return False, 0.0, 0.0, 0.0
-        
-        x = round(x, 2)
-        y = round(y, 2)
-        heading = round(heading, 2)
-        logging.info(f"CommandsTx::_circle - X = {x}, Y = {y}, heading = {heading}")
-        return True, x, y, heading
-
-    async def _setheading(self, angle_degrees: float) -> bool:
-        if not self._ble_central.connected:
-            logging.error("CommandsTx::_setheading - Not connected to a robot")
-            return False
-        
-        command_id = 7
-
-        # Command to set the robot heading
-        # Generate a sequence ID and queue the command
-        seq_id = self.__next_seq()
-        data = struct.pack("<BBf", seq_id, command_id, angle_degrees)
-        self._ble_central.add_to_c2p_queue(data)
-        logging.info(f"CommandsTx::_setheading - Command ID = {command_id}, Sequence ID = {seq_id}, angle = {angle_degrees}")
-        
-        # Wait for the command to be processed with a long timeout
-        try:
-            await asyncio.wait_for(self.__wait_for_command_response(seq_id), timeout=self._long_timeout)
-        except asyncio.TimeoutError:
-            logging.error(f"CommandsTx::_setheading - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
-            self._ble_central.disconnect()
-            return False
-
-        # This command does not return any data, so we don't need to return any
-        return True
-    
-    async def _setx(self, x_mm: float) -> tuple[bool, float, float, float]:
-        if not self._ble_central.connected:
-            logging.error("CommandsTx::_setx - Not connected to a robot")
-            return False, 0.0, 0.0, 0.0
-        
-        command_id = 8
-
-        # Command to set the robot X position
-        # Generate a sequence ID and queue the command
-        seq_id = self.__next_seq()
-        data = struct.pack("<BBf", seq_id, command_id, x_mm)
-        self._ble_central.add_to_c2p_queue(data)
-        logging.info(f"CommandsTx::_setx - Command ID = {command_id}, Sequence ID = {seq_id}, x = {x_mm}")
-        
-        # Wait for the command to be processed with a long timeout
-        try:
-            response = await asyncio.wait_for(self.__wait_for_command_response(seq_id), timeout=self._long_timeout)
-        except asyncio.TimeoutError:
-            logging.error(f"CommandsTx::_setx - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
-            self._ble_central.disconnect()
-            return False, 0.0, 0.0, 0.0
-
-        # Extract the position and heading from the response
-        try:
-            seq_id, x, y, heading = struct.unpack("<Bfff", response[:13])
-        except ValueError as e:
-            logging.error(f"CommandsTx::_setx - Error unpacking response: {e}")
-            return False, 0.0, 0.0, 0.0
-        
-        x = round(x, 2)
-        y = round(y, 2)
-        heading = round(heading, 2)
-        logging.info(f"CommandsTx::_setx - X = {x}, Y = {y}, heading = {heading}")
-        return True, x, y, heading
-    
-    async def _sety(self, y_mm: float) -> tuple[bool, float, float, float]:
-        if not self._ble_central.connected:
-            logging.error("CommandsTx::_sety - Not connected to a robot")
-            return False, 0.0, 0.0, 0.0
-        
-        command_id = 9
-
-        # Command to set the robot Y position
-        # Generate a sequence ID and queue the command
-        seq_id = self.__next_seq()
-        data = struct.pack("<BBf", seq_id, command_id, y_mm)
-        self._ble_central.add_to_c2p_queue(data)
-        logging.info(f"CommandsTx::_sety - Command ID = {command_id}, Sequence ID = {seq_id}, y = {y_mm}")
-        
-        # Wait for the command to be processed with a long timeout
-        try:
-            response = await asyncio.wait_for(self.__wait_for_command_response(seq_id), timeout=self._long_timeout)
-        except asyncio.TimeoutError:
-            logging.error(f"CommandsTx::_sety - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
-            self._ble_central.disconnect()
-            return False, 0.0, 0.0, 0.0
-
-        # Extract the position and heading from the response
-        try:
-            seq_id, x, y, heading = struct.unpack("<Bfff", response[:13])
-        except ValueError as e:
-            logging.error(f"CommandsTx::_sety - Error unpacking response: {e}")
-            return False, 0.0, 0.0, 0.0
-        
-        x = round(x, 2)
-        y = round(y, 2)
-        heading = round(heading, 2)
-        logging.info(f"CommandsTx::_sety - X = {x}, Y = {y}, heading = {heading}")
-        return True, x, y, heading
-    
-    async def _goto(self, x_mm: float, y_mm: float) -> tuple[bool, float, float, float]:
-        if not self._ble_central.connected:
-            logging.error("CommandsTx::_setposition - Not connected to a robot")
-            return False, 0.0, 0.0, 0.0
-        
-        command_id = 10
-
-        # Command to set the robot position
-        # Generate a sequence ID and queue the command
-        seq_id = self.__next_seq()
-        data = struct.pack("<BBff", seq_id, command_id, x_mm, y_mm)
-        self._ble_central.add_to_c2p_queue(data)
-        logging.info(f"CommandsTx::_setposition - Command ID = {command_id}, Sequence ID = {seq_id}, x = {x_mm}, y = {y_mm}")
-        
-        # Wait for the command to be processed with a long timeout
-        try:
-            response = await asyncio.wait_for(self.__wait_for_command_response(seq_id), timeout=self._long_timeout)
-        except asyncio.TimeoutError:
-            logging.error(f"CommandsTx::_setposition - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
-            self._ble_central.disconnect()
-            return False, 0.0, 0.0, 0.0
-
-        # Extract the position and heading from the response
-        try:
-            seq_id, x, y, heading = struct.unpack("<Bfff", response[:13])
-        except ValueError as e:
-            logging.error(f"CommandsTx::_setposition - Error unpacking response: {e}")
-            return False, 0.0, 0.0, 0.0
-        
-        x = round(x, 2)
-        y = round(y, 2)
-        heading = round(heading, 2)
-        logging.info(f"CommandsTx::_setposition - X = {x}, Y = {y}, heading = {heading}")
-        return True, x, y, heading
-    
-    async def _towards(self, x_mm: float, y_mm: float) -> tuple[bool, float, float, float]:
-        if not self._ble_central.connected:
-            logging.error("CommandsTx::_towards - Not connected to a robot")
-            return False, 0.0, 0.0, 0.0
-        
-        command_id = 11
-
-        # Command to move the robot towards a point
-        # Generate a sequence ID and queue the command
-        seq_id = self.__next_seq()
-        data = struct.pack("<BBff", seq_id, command_id, x_mm, y_mm)
-        self._ble_central.add_to_c2p_queue(data)
-        logging.info(f"CommandsTx::_towards - Command ID = {command_id}, Sequence ID = {seq_id}, x = {x_mm}, y = {y_mm}")
-        
-        # Wait for the command to be processed with a long timeout
-        try:
-            response = await asyncio.wait_for(self.__wait_for_command_response(seq_id), timeout=self._long_timeout)
-        except asyncio.TimeoutError:
-            logging.error(f"CommandsTx::_towards - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
-            self._ble_central.disconnect()
-            return False, 0.0, 0.0, 0.0
-
-        # Extract the position and heading from the response
-        try:
-            seq_id, x, y, heading = struct.unpack("<Bfff", response[:13])
-        except ValueError as e:
-            logging.error(f"CommandsTx::_towards - Error unpacking response: {e}")
-            return False, 0.0, 0.0, 0.0
-        
-        x = round(x, 2)
-        y = round(y, 2)
-        heading = round(heading, 2)
-        logging.info(f"CommandsTx::_towards - X = {x}, Y = {y}, heading = {heading}")
-        return True, x, y, heading
-    
-    async def _reset_origin(self) -> bool:
-        if not self._ble_central.connected:
-            logging.error("CommandsTx::_reset_origin - Not connected to a robot")
-            return False
-        
-        command_id = 12
-
-        # Command to reset the x,y origin and heading
-        # Generate a sequence ID and queue the command
-        seq_id = self.__next_seq()
-        data = struct.pack("<BB", seq_id, command_id)
-        self._ble_central.add_to_c2p_queue(data)
-        logging.info(f"CommandsTx::_reset_origin - Command ID = {command_id}, Sequence ID = {seq_id}")
-        
-        # Wait for the command to be processed with a short timeout
-        try:
-            await asyncio.wait_for(self.__wait_for_command_response(seq_id), timeout=self._short_timeout)
-        except asyncio.TimeoutError:
-            logging.error(f"CommandsTx::_reset_origin - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
-            self._ble_central.disconnect()
-            return False
-
-        # This command does not return any data, so we don't need to return any
-        return True
-    
-    async def _heading(self) -> tuple[bool, float]:
-        if not self._ble_central.connected:
-            logging.error("CommandsTx::_heading - Not connected to a robot")
-            return False, 0.0
-        
-        command_id = 13
-
-        # Command to get the robot heading
-        # Generate a sequence ID and queue the command
-        seq_id = self.__next_seq()
-        data = struct.pack("<BB", seq_id, command_id)
-        self._ble_central.add_to_c2p_queue(data)
-        logging.info(f"CommandsTx::_heading - Command ID = {command_id}, Sequence ID = {seq_id}")
-        
-        # Wait for the command to be processed with a long timeout
-        try:
-            response = await asyncio.wait_for(self.__wait_for_command_response(seq_id), timeout=self._short_timeout)
-        except asyncio.TimeoutError:
-            logging.error(f"CommandsTx::_heading - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
-            self._ble_central.disconnect()
-            return False, 0.0
-
-        # Extract the heading from the response
-        try:
-            seq_id, heading = struct.unpack("<Bf", response[:5])
-        except ValueError as e:
-            logging.error(f"CommandsTx::_heading - Error unpacking response: {e}")
-            return False, 0.0
-        
-        heading = round(heading, 2)
-        logging.info(f"CommandsTx::_heading - Heading = {heading}")
-        return True, heading
-    
-    async def _position(self) -> tuple[bool, float, float]:
-        if not self._ble_central.connected:
-            logging.error("CommandsTx::_position - Not connected to a robot")
-            return False, 0.0, 0.0
-        
-        command_id = 14
-
-        # Command to get the robot position
-        # Generate a sequence ID and queue the command
-        seq_id = self.__next_seq()
-        data = struct.pack("<BB", seq_id, command_id)
-        self._ble_central.add_to_c2p_queue(data)
-        logging.info(f"CommandsTx::_position - Command ID = {command_id}, Sequence ID = {seq_id}")
-        
-        # Wait for the command to be processed with a long timeout
-        try:
-            response = await asyncio.wait_for(self.__wait_for_command_response(seq_id), timeout=self._long_timeout)
-        except asyncio.TimeoutError:
-            logging.error(f"CommandsTx::_position - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
-            self._ble_central.disconnect()
-            return False, 0.0, 0.0
-
-        # Extract the position from the response
-        try:
-            seq_id, x, y = struct.unpack("<Bff", response[:9])
-        except ValueError as e:
-            logging.error(f"CommandsTx::_position - Error unpacking response: {e}")
-            return False, 0.0, 0.0
-        
-        x = round(x, 2)
-        y = round(y, 2)
-        logging.info(f"CommandsTx::_position - X = {x}, Y = {y}")
-        return True, x, y
-    
-    async def _penup(self) -> bool:
-        if not self._ble_central.connected:
-            logging.error("CommandsTx::_penup - Not connected to a robot")
-            return False
-        
-        command_id = 15
-
-        # Command to raise the pen
-        # Generate a sequence ID and queue the command
-        seq_id = self.__next_seq()
-        data = struct.pack("<BB", seq_id, command_id)
-        self._ble_central.add_to_c2p_queue(data)
-        logging.info(f"CommandsTx::_penup - Command ID = {command_id}, Sequence ID = {seq_id}")
-        
-        # Wait for the command to be processed with a short timeout
-        try:
-            await asyncio.wait_for(self.__wait_for_command_response(seq_id), timeout=self._short_timeout)
-        except asyncio.TimeoutError:
-            logging.error(f"CommandsTx::_penup - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
-            self._ble_central.disconnect()
-            return False
-
-        # This command does not return any data, so we don't need to return any
-        return True
-    
-    async def _pendown(self) -> bool:
-        if not self._ble_central.connected:
-            logging.error("CommandsTx::_pendown - Not connected to a robot")
-            return False
-        
-        command_id = 16
-
-        # Command to raise the pen
-        # Generate a sequence ID and queue the command
-        seq_id = self.__next_seq()
-        data = struct.pack("<BB", seq_id, command_id)
-        self._ble_central.add_to_c2p_queue(data)
-        logging.info(f"CommandsTx::_pendown - Command ID = {command_id}, Sequence ID = {seq_id}")
-        
-        # Wait for the command to be processed with a short timeout
-        try:
-            await asyncio.wait_for(self.__wait_for_command_response(seq_id), timeout=self._short_timeout)
-        except asyncio.TimeoutError:
-            logging.error(f"CommandsTx::_pendown - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
-            self._ble_central.disconnect()
-            return False
-
-        # This command does not return any data, so we don't need to return any
-        return True
-    
-    async def _eyes(self, eye_id, red, green, blue) -> bool:
-        if not self._ble_central.connected:
-            logging.error("CommandsTx::_eyes - Not connected to a robot")
-            return False
-        
-        command_id = 17
-
-        # Command to set the eye colour
-        # Generate a sequence ID and queue the command
-        seq_id = self.__next_seq()
-        data = struct.pack("<BBBBBB", seq_id, command_id, eye_id, red, green, blue)
-        self._ble_central.add_to_c2p_queue(data)
-        logging.info(f"CommandsTx::_eyes - Command ID = {command_id}, Sequence ID = {seq_id}, eye_id = {eye_id}, red = {red}, green = {green}, blue = {blue}")
-        
-        # Wait for the command to be processed with a short timeout
-        try:
-            await asyncio.wait_for(self.__wait_for_command_response(seq_id), timeout=self._short_timeout)
-        except asyncio.TimeoutError:
-            logging.error(f"CommandsTx::_eyes - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
-            self._ble_central.disconnect()
-            return False
-
-        # This command does not return any data, so we don't need to return any
-        return True
-    
-    async def _power(self) -> tuple[bool, int, int, int]:
-        if not self._ble_central.connected:
-            logging.error("CommandsTx::_power - Not connected to a robot")
-            return False, 0, 0, 0
-        
-        command_id = 18
-
-        # Command to get the robot power
-        # Generate a sequence ID and queue the command
-        seq_id = self.__next_seq()
-        data = struct.pack("<BB", seq_id, command_id)
-        self._ble_central.add_to_c2p_queue(data)
-        logging.info(f"CommandsTx::_power - Command ID = {command_id}, Sequence ID = {seq_id}")
-        
-        # Wait for the command to be processed with a short timeout
-        try:
-            response = await asyncio.wait_for(self.__wait_for_command_response(seq_id), timeout=self._short_timeout)
-        except asyncio.TimeoutError:
-            logging.error(f"CommandsTx::_power - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
-            self._ble_central.disconnect()
-            return False, 0, 0, 0
-
-        # Extract the power from the response
-        try:
-            seq_id, mv, ma, mw = struct.unpack("<Blll", response[:13])
-        except ValueError as e:
-            logging.error(f"CommandsTx::_power - Error unpacking response: {e}")
-            return False, 0, 0, 0
-        logging.info(f"CommandsTx::_power - mV = {mv}, mA = {ma}, mW = {mw}")
-        return True, mv, ma, mw 
-    
-    async def _isdown(self) -> tuple[bool, bool]:
-        if not self._ble_central.connected:
-            logging.error("CommandsTx::_isdown - Not connected to a robot")
-            return False, False
-        
-        command_id = 19
-
-        # Command to get the pen status (True = down, False = up)
-        # Generate a sequence ID and queue the command
-        seq_id = self.__next_seq()
-        data = struct.pack("<BB", seq_id, command_id)
-        self._ble_central.add_to_c2p_queue(data)
-        logging.info(f"CommandsTx::_isdown - Command ID = {command_id}, Sequence ID = {seq_id}")
-        
-        # Wait for the command to be processed with a short timeout
-        try:
-            response = await asyncio.wait_for(self.__wait_for_command_response(seq_id), timeout=self._short_timeout)
-        except asyncio.TimeoutError:
-            logging.error(f"CommandsTx::_isdown - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
-            self._ble_central.disconnect()
-            return False, False
-
-        # Extract the pen status from the response
-        try:
-            seq_id, pen_down = struct.unpack("<BB", response[:2])
-        except ValueError as e:
-            logging.error(f"CommandsTx::_isdown - Error unpacking response: {e}")
-            return False, False
-        logging.info(f"CommandsTx::_isdown - Pen down = {pen_down}")
-        return True, pen_down
-    
-    async def _set_linear_velocity(self, target_speed: int, acceleration: int) -> bool:
-        if not self._ble_central.connected:
-            logging.error("CommandsTx::_set_linear_velocity - Not connected to a robot")
-            return False
-        
-        command_id = 20
-
-        # Command to set the linear velocity
-        # Generate a sequence ID and queue the command
-        seq_id = self.__next_seq()
-        data = struct.pack("<BBll", seq_id, command_id, target_speed, acceleration)
-        self._ble_central.add_to_c2p_queue(data)
-        logging.info(f"CommandsTx::set_linear_velocity - Command ID = {command_id}, Sequence ID = {seq_id}, target_speed = {target_speed}, acceleration = {acceleration}")
-        
-        # Wait for the command to be processed with a short timeout
-        try:
-            await asyncio.wait_for(self.__wait_for_command_response(seq_id), timeout=self._short_timeout)
-        except asyncio.TimeoutError:
-            logging.error(f"CommandsTx::set_linear_velocity - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
-            self._ble_central.disconnect()
-            return False
-
-        # This command does not return any data, so we don't need to return any
-        return True
-    
-    async def _set_rotational_velocity(self, target_speed: int, acceleration: int) -> bool:
-        if not self._ble_central.connected:
-            logging.error("CommandsTx::_set_rotational_velocity - Not connected to a robot")
-            return False
-        
-        command_id = 21
-
-        # Command to set the rotational velocity
-        # Generate a sequence ID and queue the command
-        seq_id = self.__next_seq()
-        data = struct.pack("<BBll", seq_id, command_id, target_speed, acceleration)
-        self._ble_central.add_to_c2p_queue(data)
-        logging.info(f"CommandsTx::_set_rotational_velocity - Command ID = {command_id}, Sequence ID = {seq_id}, target_speed = {target_speed}, acceleration = {acceleration}")
-        
-        # Wait for the command to be processed with a short timeout
-        try:
-            await asyncio.wait_for(self.__wait_for_command_response(seq_id), timeout=self._short_timeout)
-        except asyncio.TimeoutError:
-            logging.error(f"CommandsTx::_set_rotational_velocity - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
-            self._ble_central.disconnect()
-            return False
-
-        # This command does not return any data, so we don't need to return any
-        return True
-    
-    async def _get_linear_velocity(self) -> tuple[bool, int, int]:
-        if not self._ble_central.connected:
-            logging.error("CommandsTx::_get_linear_velocity - Not connected to a robot")
-            return False, 0, 0
-        
-        command_id = 22
-
-        # Command to get the linear velocity
-        # Generate a sequence ID and queue the command
-        seq_id = self.__next_seq()
-        data = struct.pack("<BB", seq_id, command_id)
-        self._ble_central.add_to_c2p_queue(data)
-        logging.info(f"CommandsTx::_get_linear_velocity - Command ID = {command_id}, Sequence ID = {seq_id}")
-        
-        # Wait for the command to be processed with a short timeout
-        try:
-            response = await asyncio.wait_for(self.__wait_for_command_response(seq_id), timeout=self._short_timeout)
-        except asyncio.TimeoutError:
-            logging.error(f"CommandsTx::_get_linear_velocity - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
-            self._ble_central.disconnect()
-            return False, 0, 0
-
-        # Extract the linear velocity from the response
-        try:
-            seq_id, target_speed, acceleration = struct.unpack("<Bll", response[:9])
-        except ValueError as e:
-            logging.error(f"CommandsTx::_get_linear_velocity - Error unpacking response: {e}")
-            return False, 0, 0
-        logging.info(f"CommandsTx::_get_linear_velocity - Target speed = {target_speed}, Acceleration = {acceleration}")
-        return True, target_speed, acceleration
-    
-    async def _get_rotational_velocity(self) -> tuple[bool, int, int]:
-        if not self._ble_central.connected:
-            logging.error("CommandsTx::_get_rotational_velocity - Not connected to a robot")
-            return False, 0, 0
-        
-        command_id = 23
-
-        # Command to get the rotational velocity
-        # Generate a sequence ID and queue the command
-        seq_id = self.__next_seq()
-        data = struct.pack("<BB", seq_id, command_id)
-        self._ble_central.add_to_c2p_queue(data)
-        logging.info(f"CommandsTx::_get_rotational_velocity - Command ID = {command_id}, Sequence ID = {seq_id}")
-        
-        # Wait for the command to be processed with a short timeout
-        try:
-            response = await asyncio.wait_for(self.__wait_for_command_response(seq_id), timeout=self._short_timeout)
-        except asyncio.TimeoutError:
-            logging.error(f"CommandsTx::_get_rotational_velocity - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
-            self._ble_central.disconnect()
-            return False, 0, 0
-
-        # Extract the rotational velocity from the response
-        try:
-            seq_id, target_speed, acceleration = struct.unpack("<Bll", response[:9])
-        except ValueError as e:
-            logging.error(f"CommandsTx::_get_rotational_velocity - Error unpacking response: {e}")
-            return False, 0, 0
-        logging.info(f"CommandsTx::_get_rotational_velocity - Target speed = {target_speed}, Acceleration = {acceleration}")
-        return True, target_speed, acceleration
-
-    async def _set_wheel_diameter_calibration(self, wheel_diameter: int) -> bool:
-        if not self._ble_central.connected:
-            logging.error("CommandsTx::_set_wheel_diameter_calibration - Not connected to a robot")
-            return False
-        
-        command_id = 24
-
-        # Command to set the wheel diameter calibration
-        seq_id = self.__next_seq()
-        data = struct.pack("<BBi", seq_id, command_id, wheel_diameter)
-        self._ble_central.add_to_c2p_queue(data)
-        logging.info(f"CommandsTx::_set_wheel_diameter_calibration - Command ID = {command_id}, Sequence ID = {seq_id}, wheel_diameter = {wheel_diameter}")
-        
-        try:
-            await asyncio.wait_for(self.__wait_for_command_response(seq_id), timeout=self._short_timeout)
-        except asyncio.TimeoutError:
-            logging.error(f"CommandsTx::_set_wheel_diameter_calibration - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
-            self._ble_central.disconnect()
-            return False
-
-        return True
-
-    async def _set_axel_distance_calibration(self, axel_distance: int) -> bool:
-        if not self._ble_central.connected:
-            logging.error("CommandsTx::_set_axel_distance_calibration - Not connected to a robot")
-            return False
-        
-        command_id = 25
-
-        # Command to set the axel distance calibration
-        seq_id = self.__next_seq()
-        data = struct.pack("<BBi", seq_id, command_id, axel_distance)
-        self._ble_central.add_to_c2p_queue(data)
-        logging.info(f"CommandsTx::_set_axel_distance_calibration - Command ID = {command_id}, Sequence ID = {seq_id}, axel_distance = {axel_distance}")
-        
-        try:
-            await asyncio.wait_for(self.__wait_for_command_response(seq_id), timeout=self._short_timeout)
-        except asyncio.TimeoutError:
-            logging.error(f"CommandsTx::_set_axel_distance_calibration - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
-            self._ble_central.disconnect()
-            return False
-
-        return True
-
-    async def _get_wheel_diameter_calibration(self) -> tuple[bool, int]:
-        if not self._ble_central.connected:
-            logging.error("CommandsTx::_get_wheel_diameter_calibration - Not connected to a robot")
-            return False, 0
-        
-        command_id = 26
-
-        # Command to get the wheel diameter calibration
-        seq_id = self.__next_seq()
-        data = struct.pack("<BB", seq_id, command_id)
-        self._ble_central.add_to_c2p_queue(data)
-        logging.info(f"CommandsTx::_get_wheel_diameter_calibration - Command ID = {command_id}, Sequence ID = {seq_id}")
-        
-        try:
-            response = await asyncio.wait_for(self.__wait_for_command_response(seq_id), timeout=self._short_timeout)
-        except asyncio.TimeoutError:
-            logging.error(f"CommandsTx::_get_wheel_diameter_calibration - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
-            self._ble_central.disconnect()
-            return False, 0
-
-        try:
-            seq_id, cali_wheel = struct.unpack("<Bi", response[:5])
-        except ValueError as e:
-            logging.error(f"CommandsTx::_get_wheel_diameter_calibration - Error unpacking response: {e}")
-            return False, 0
-        logging.info(f"CommandsTx::_get_wheel_diameter_calibration - Calibration wheel diameter = {cali_wheel}")
-        return True, cali_wheel
-
-    async def _get_axel_distance_calibration(self) -> tuple[bool, int]:
-        if not self._ble_central.connected:
-            logging.error("CommandsTx::_get_axel_distance_calibration - Not connected to a robot")
-            return False, 0
-        
-        command_id = 27
-
-        # Command to get the axel distance calibration
-        seq_id = self.__next_seq()
-        data = struct.pack("<BB", seq_id, command_id)
-        self._ble_central.add_to_c2p_queue(data)
-        logging.info(f"CommandsTx::_get_axel_distance_calibration - Command ID = {command_id}, Sequence ID = {seq_id}")
-        
-        try:
-            response = await asyncio.wait_for(self.__wait_for_command_response(seq_id), timeout=self._short_timeout)
-        except asyncio.TimeoutError:
-            logging.error(f"CommandsTx::_get_axel_distance_calibration - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
-            self._ble_central.disconnect()
-            return False, 0
-
-        try:
-            seq_id, cali_axel = struct.unpack("<Bi", response[:5])
-        except ValueError as e:
-            logging.error(f"CommandsTx::_get_axel_distance_calibration - Error unpacking response: {e}")
-            return False, 0
-        logging.info(f"CommandsTx::_get_axel_distance_calibration - Calibration axel distance = {cali_axel}")
-        return True, cali_axel
-
-    async def _set_turtle_id(self, turtle_id: int) -> bool:
-        if not self._ble_central.connected:
-            logging.error("CommandsTx::_set_turtle_id - Not connected to a robot")
-            return False
-        
-        command_id = 28
-
-        # Command to set the turtle ID
-        seq_id = self.__next_seq()
-        data = struct.pack("<BBB", seq_id, command_id, turtle_id)
-        self._ble_central.add_to_c2p_queue(data)
-        logging.info(f"CommandsTx::_set_turtle_id - Command ID = {command_id}, Sequence ID = {seq_id}, turtle_id = {turtle_id}")
-        
-        try:
-            await asyncio.wait_for(self.__wait_for_command_response(seq_id), timeout=self._short_timeout)
-        except asyncio.TimeoutError:
-            logging.error(f"CommandsTx::_set_turtle_id - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
-            self._ble_central.disconnect()
-            return False
-
-        return True
-
-    async def _get_turtle_id(self) -> tuple[bool, int]:
-        if not self._ble_central.connected:
-            logging.error("CommandsTx::_get_turtle_id - Not connected to a robot")
-            return False, 0
-        
-        command_id = 29
-
-        # Command to get the turtle ID
-        seq_id = self.__next_seq()
-        data = struct.pack("<BB", seq_id, command_id)
-        self._ble_central.add_to_c2p_queue(data)
-        logging.info(f"CommandsTx::_get_turtle_id - Command ID = {command_id}, Sequence ID = {seq_id}")
-        
-        try:
-            response = await asyncio.wait_for(self.__wait_for_command_response(seq_id), timeout=self._short_timeout)
-        except asyncio.TimeoutError:
-            logging.error(f"CommandsTx::_get_turtle_id - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
-            self._ble_central.disconnect()
-            return False, 0
-
-        try:
-            seq_id, turtle_id = struct.unpack("<BB", response[:2])
-        except ValueError as e:
-            logging.error(f"CommandsTx::_get_turtle_id - Error unpacking response: {e}")
-            return False, 0
-        logging.info(f"CommandsTx::_get_turtle_id - Turtle ID = {turtle_id}")
-        return True, turtle_id
-
-    async def _load_config(self) -> bool:
-        if not self._ble_central.connected:
-            logging.error("CommandsTx::_load_config - Not connected to a robot")
-            return False
-        
-        command_id = 30
-
-        # Command to load the configuration
-        seq_id = self.__next_seq()
-        data = struct.pack("<BB", seq_id, command_id)
-        self._ble_central.add_to_c2p_queue(data)
-        logging.info(f"CommandsTx::_load_config - Command ID = {command_id}, Sequence ID = {seq_id}")
-        
-        try:
-            await asyncio.wait_for(self.__wait_for_command_response(seq_id), timeout=self._short_timeout)
-        except asyncio.TimeoutError:
-            logging.error(f"CommandsTx::_load_config - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
-            self._ble_central.disconnect()
-            return False
+        return self.__call("reset_config")
 
-        return True
+    def upload_program(self, image: bytes) -> bool:
+        return self.__call("upload_program", image)
 
-    async def _save_config(self) -> bool:
-        if not self._ble_central.connected:
-            logging.error("CommandsTx::_save_config - Not connected to a robot")
-            return False
-        
-        command_id = 31
+    def download_program(self) -> bytes:
+        return self.__call("download_program")
 
-        # Command to save the configuration
-        seq_id = self.__next_seq()
-        data = struct.pack("<BB", seq_id, command_id)
-        self._ble_central.add_to_c2p_queue(data)
-        logging.info(f"CommandsTx::_save_config - Command ID = {command_id}, Sequence ID = {seq_id}")
-        
-        try:
-            await asyncio.wait_for(self.__wait_for_command_response(seq_id), timeout=self._short_timeout)
-        except asyncio.TimeoutError:
-            logging.error(f"CommandsTx::_save_config - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
-            self._ble_central.disconnect()
-            return False
+    def run_program(self) -> tuple[bool, int]:
+        return self.__call("run_program")
 
-        return True
+    def program_status(self) -> tuple[bool, int, int, int]:
+        return self.__call("program_status")
 
-    async def _reset_config(self) -> bool:
-        if not self._ble_central.connected:
-            logging.error("CommandsTx::_reset_config - Not connected to a robot")
-            return False
-        
-        command_id = 32
+    def stop_program(self) -> bool:
+        return self.__call("stop_program")
 
-        # Command to reset the configuration
-        seq_id = self.__next_seq()
-        data = struct.pack("<BB", seq_id, command_id)
-        self._ble_central.add_to_c2p_queue(data)
-        logging.info(f"CommandsTx::_reset_config - Command ID = {command_id}, Sequence ID = {seq_id}")
-        
-        try:
-            await asyncio.wait_for(self.__wait_for_command_response(seq_id), timeout=self._short_timeout)
-        except asyncio.TimeoutError:
-            logging.error(f"CommandsTx::_reset_config - Command ID = {command_id}, Sequence ID = {seq_id} timed out")
-            self._ble_central.disconnect()
-            return False
+    def link_parameters(self) -> tuple[bool, float, int, int]:
+        return self.__call("link_parameters")
 
-        return True
\ No newline at end of file
+    def link_role(self) -> tuple[bool, int]:
+        return self.__call("link_role")
@@ -0,0 +1,106 @@
+#************************************************************************
+#
+#   device_cache.py
+#
+#   Cache of robot BLE addresses
+#   Valiant Turtle 2 - Communicator Linux Firmware
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+import json
+import logging
+import os
+
+class DeviceCache:
+    """
+    Remembers the BLE address of each robot (by turtle ID) between runs, so central
+    can connect straight to the robot rather than scanning for it first.  The last
+    robot connected to is also remembered, for when no turtle ID is given.
+
+    The cache is a small JSON file in ~/.cache/vt2 (or $XDG_CACHE_HOME/vt2).  It is
+    only a hint: if it can't be read or written, or an address in it no longer
+    connects, central scans as usual.  The file is read again before every change,
+    so several centrals (see Fleet) can share it.
+    """
+    __ANY = "any"
+
+    def __init__(self, path: str = None):
+        if path is None:
+            cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+            path = os.path.join(cache_home, "vt2", "devices.json")
+        self._path = path
+        self._addresses = {}
+
+    def address(self, turtle_id: int = None) -> str:
+        """Return the cached address of the robot (or of the last robot if turtle_id is None)"""
+        return self.__load().get(DeviceCache.__key(turtle_id))
+
+    def store(self, address: str, turtle_id: int = None):
+        """Remember the address of a robot that has been connected to"""
+        addresses = self.__load()
+        changed = False
+        for key in {DeviceCache.__key(turtle_id), DeviceCache.__ANY}:
+            if addresses.get(key) != address:
+                addresses[key] = address
+                changed = True
+        if changed:
+            self.__save()
+
+    def forget(self, turtle_id: int = None):
+        """Forget the address of a robot (when it no longer connects)"""
+        addresses = self.__load()
+        key = DeviceCache.__key(turtle_id)
+        address = addresses.pop(key, None)
+        if address is None:
+            return
+
+        # Forget every entry for the address, as they all refer to the same robot
+        for other_key in [other_key for other_key, other_address in addresses.items() if other_address == address]:
+            del addresses[other_key]
+        self.__save()
+
+    @staticmethod
+    def __key(turtle_id: int) -> str:
+        return DeviceCache.__ANY if turtle_id is None else str(turtle_id)
+
+    def __load(self) -> dict:
+        self._addresses = {}
+        try:
+            with open(self._path, "r") as cache_file:
+                addresses = json.load(cache_file)
+            if isinstance(addresses, dict):
+                self._addresses = {str(key): str(value) for key, value in addresses.items()}
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logging.warning(f"DeviceCache::__load - Unable to read {self._path}: {e}")
+        return self._addresses
+
+    def __save(self):
+        # Write to a temporary file and rename it, so a reader never sees a partial file
+        temporary_path = self._path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self._path), exist_ok=True)
+            with open(temporary_path, "w") as cache_file:
+                json.dump(self._addresses, cache_file, indent=4, sort_keys=True)
+            os.replace(temporary_path, self._path)
+        except OSError as e:
+            logging.warning(f"DeviceCache::__save - Unable to write {self._path}: {e}")
@@ -0,0 +1,353 @@
+#************************************************************************
+#
+#   display_list.py
+#
+#   Display lists of pen-down strokes and their optimisation
+#   Valiant Turtle 2 - Communicator Linux Firmware
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+import math
+from abstract_turtle import TurtleInterface
+
+# Lengths (in mm) and angles (in degrees) below these are treated as zero
+DEFAULT_TOLERANCE = 0.05
+ANGLE_TOLERANCE = 0.01
+
+# How far apart (in strokes) the ends of a 2-opt reversal can be
+DEFAULT_WINDOW = 100
+
+def arc_end(x: float, y: float, heading: float, radius: float, extent: float) -> tuple[float, float, float]:
+    """
+    Return the position and heading at the end of an arc (following the turtle.circle()
+    convention: the centre is radius mm to the left, so a negative radius curves to the
+    right, and a negative extent is driven backwards)
+    """
+    heading_radians = math.radians(heading)
+    centre_x = x - radius * math.sin(heading_radians)
+    centre_y = y + radius * math.cos(heading_radians)
+    end_heading = heading + math.copysign(extent, radius)
+    end_radians = math.radians(end_heading)
+    return centre_x + radius * math.sin(end_radians), centre_y - radius * math.cos(end_radians), end_heading
+
+def _normalise_angle(degrees: float) -> float:
+    # Normalise an angle to the range [-180, 180)
+    return (degrees + 180) % 360 - 180
+
+class Stroke:
+    """
+    A continuous pen-down path: a start point followed by line and arc segments.
+
+    A line is ("line", x, y) and is drawn straight to (x, y).  An arc is ("arc", heading,
+    radius, extent, x, y): the turtle faces heading and calls circle(radius, extent),
+    finishing at (x, y).  The commands are (name, arguments...) tuples (eye colours,
+    speed changes and so on) that are sent before the stroke is drawn.
+    """
+    def __init__(self, x: float, y: float, commands: list = None):
+        self.start = (x, y)
+        self.segments = []
+        self.commands = [] if commands is None else commands
+
+    @property
+    def end(self) -> tuple[float, float]:
+        if not self.segments:
+            return self.start
+        return self.segments[-1][-2:]
+
+    @property
+    def length(self) -> float:
+        length = 0.0
+        x, y = self.start
+        for segment in self.segments:
+            if segment[0] == "line":
+                length += math.hypot(segment[1] - x, segment[2] - y)
+            else:
+                length += abs(segment[2]) * math.radians(abs(segment[3]))
+            x, y = segment[-2:]
+        return length
+
+    def line_to(self, x: float, y: float):
+        self.segments.append(("line", x, y))
+
+    def arc(self, heading: float, radius: float, extent: float):
+        x, y, _ = arc_end(*self.end, heading, radius, extent)
+        self.segments.append(("arc", heading, radius, extent, x, y))
+
+    def reversed(self) -> "Stroke":
+        """Return the same path drawn from the other end"""
+        stroke = Stroke(*self.end, self.commands)
+        points = [self.start] + [segment[-2:] for segment in self.segments]
+        for index in range(len(self.segments) - 1, -1, -1):
+            segment = self.segments[index]
+            x, y = points[index]
+            if segment[0] == "line":
+                stroke.segments.append(("line", x, y))
+            else:
+                # Drive round the same circle the other way (the centre swaps sides)
+                _, heading, radius, extent, _, _ = segment
+                end_heading = heading + math.copysign(extent, radius)
+                stroke.segments.append(("arc", (end_heading + 180) % 360, -radius, extent, x, y))
+        return stroke
+
+class DisplayList:
+    """
+    A drawing held as a list of pen-down strokes rather than as the turtle calls
+    that made it (see RecordingTurtle).  Coordinates are in mm from where the turtle
+    started the drawing, facing heading 0.
+
+    The prologue and epilogue are commands sent before and after the strokes (motors,
+    speed, eyes...).  If the drawing finishes by moving the turtle with the pen up
+    (out of the way of the drawing, say) that final (x, y, heading) is kept as park.
+
+    optimised() returns a copy that draws the same lines with less pen-up travel,
+    and replay() draws a display list with any TurtleInterface (reading the strokes
+    once, so they can be a generator - see Artwork):
+
+        recorder = RecordingTurtle()
+        Cat(recorder, speed).render()
+        recorder.display_list().optimised().replay(FloorTurtle(commands_tx))
+    """
+    def __init__(self):
+        self.prologue = []
+        self.strokes = []
+        self.epilogue = []
+        self.park = None
+
+    def stats(self) -> dict:
+        """Return the number of strokes, segments and arcs and the drawn and pen-up travel distances (in mm)"""
+        travel = 0.0
+        x, y = 0.0, 0.0
+        for stroke in self.strokes:
+            travel += math.hypot(stroke.start[0] - x, stroke.start[1] - y)
+            x, y = stroke.end
+        if self.park is not None:
+            travel += math.hypot(self.park[0] - x, self.park[1] - y)
+
+        return {
+            "strokes": len(self.strokes),
+            "segments": sum(len(stroke.segments) for stroke in self.strokes),
+            "arcs": sum(1 for stroke in self.strokes for segment in stroke.segments if segment[0] == "arc"),
+            "drawn_mm": round(sum(stroke.length for stroke in self.strokes), 1),
+            "travel_mm": round(travel, 1),
+        }
+
+    def optimised(self, tolerance: float = DEFAULT_TOLERANCE, window: int = DEFAULT_WINDOW) -> "DisplayList":
+        """
+        Return a display list that draws the same lines (to within tolerance mm) faster:
+        zero-length segments are dropped, collinear lines are merged, the strokes are
+        reordered and reversed to shorten the pen-up travel between them (nearest
+        neighbour followed by 2-opt, with reversals up to window strokes long) and
+        strokes that then meet end to end are joined.
+        """
+        optimised = DisplayList()
+        optimised.prologue = list(self.prologue)
+        optimised.epilogue = list(self.epilogue)
+        optimised.park = self.park
+
+        # Simplify each stroke, passing the commands of any that vanish on to the next
+        strokes = []
+        commands = []
+        for stroke in self.strokes:
+            stroke = DisplayList.__simplify(stroke, tolerance)
+            if not stroke.segments:
+                commands += stroke.commands
+                continue
+            if commands:
+                stroke.commands = commands + stroke.commands
+                commands = []
+            strokes.append(stroke)
+        optimised.epilogue = commands + optimised.epilogue
+
+        park = None if self.park is None else self.park[:2]
+        route = DisplayList.__nearest_neighbour(strokes)
+        DisplayList.__two_opt(route, park, tolerance, window)
+        optimised.strokes = DisplayList.__join(route, tolerance)
+        return optimised
+
+    def replay(self, t: TurtleInterface, tolerance: float = DEFAULT_TOLERANCE):
+        """
+        Draw the display list with a turtle.  Only relative moves are sent; each line
+        turns by the smaller angle and then drives forwards or backwards, so headings
+        are never set or turned towards unless an arc needs them.
+        """
+        t.connect()
+        for name, *args in self.prologue:
+            getattr(t, name)(*args)
+
+        pose = [0.0, 0.0, 0.0]
+        t.penup()
+        for stroke in self.strokes:
+            for name, *args in stroke.commands:
+                getattr(t, name)(*args)
+            DisplayList.__move_to(t, pose, *stroke.start, tolerance)
+
+            t.pendown()
+            for segment in stroke.segments:
+                if segment[0] == "line":
+                    DisplayList.__move_to(t, pose, segment[1], segment[2], tolerance)
+                else:
+                    _, heading, radius, extent, _, _ = segment
+                    DisplayList.__turn_to(t, pose, heading)
+                    t.circle(radius, extent)
+                    pose[:] = arc_end(*pose, radius, extent)
+            t.penup()
+
+        if self.park is not None:
+            x, y, heading = self.park
+            DisplayList.__move_to(t, pose, x, y, tolerance)
+            DisplayList.__turn_to(t, pose, heading)
+
+        for name, *args in self.epilogue:
+            getattr(t, name)(*args)
+        t.disconnect()
+
+    @staticmethod
+    def __turn_to(t: TurtleInterface, pose: list, heading: float):
+        # Turn by the smaller angle to face heading (pose is [x, y, heading] and is updated)
+        turn = round(_normalise_angle(heading - pose[2]), 2)
+        if turn >= ANGLE_TOLERANCE:
+            t.left(turn)
+        elif turn <= -ANGLE_TOLERANCE:
+            t.right(-turn)
+        else:
+            return
+        pose[2] += turn
+
+    @staticmethod
+    def __move_to(t: TurtleInterface, pose: list, x: float, y: float, tolerance: float):
+        # Drive in a straight line to (x, y), backwards if that needs less turning
+        distance = math.hypot(x - pose[0], y - pose[1])
+        if distance < tolerance:
+            return
+
+        bearing = math.degrees(math.atan2(y - pose[1], x - pose[0]))
+        backwards = abs(_normalise_angle(bearing - pose[2])) > 90
+        DisplayList.__turn_to(t, pose, bearing + 180 if backwards else bearing)
+
+        distance = round(distance, 2)
+        if backwards:
+            t.backward(distance)
+            distance = -distance
+        else:
+            t.forward(distance)
+        pose[0] += distance * math.cos(math.radians(pose[2]))
+        pose[1] += distance * math.sin(math.radians(pose[2]))
+
+    @staticmethod
+    def __simplify(stroke: Stroke, tolerance: float) -> Stroke:
+        # Drop zero-length segments and merge runs of collinear lines
+        simplified = Stroke(*stroke.start, list(stroke.commands))
+        run = []  # Points merged into the last line (which must stay within tolerance of it)
+        for segment in stroke.segments:
+            x0, y0 = simplified.end
+            if segment[0] == "arc":
+                if abs(segment[2]) * math.radians(abs(segment[3])) >= tolerance:
+                    simplified.arc(*segment[1:4])
+                    run = []
+                continue
+
+            x, y = segment[1:]
+            if math.hypot(x - x0, y - y0) < tolerance:
+                continue
+
+            if simplified.segments and simplified.segments[-1][0] == "line":
+                line_start = simplified.segments[-2][-2:] if len(simplified.segments) > 1 else simplified.start
+                if DisplayList.__collinear(line_start, run + [(x0, y0)], (x, y), tolerance):
+                    run.append((x0, y0))
+                    simplified.segments[-1] = ("line", x, y)
+                    continue
+
+            simplified.line_to(x, y)
+            run = []
+        return simplified
+
+    @staticmethod
+    def __collinear(start: tuple, points: list, end: tuple, tolerance: float) -> bool:
+        # True if the points lie (in order) within tolerance of the line from start to end
+        dx, dy = end[0] - start[0], end[1] - start[1]
+        length = math.hypot(dx, dy)
+        if length < tolerance:
+            return False
+
+        position = 0.0
+        for x, y in points:
+            along = ((x - start[0]) * dx + (y - start[1]) * dy) / length
+            across = ((x - start[0]) * dy - (y - start[1]) * dx) / length
+            if abs(across) >= tolerance or along < position or along > length:
+                return False
+            position = along
+        return True
+
+    @staticmethod
+    def __nearest_neighbour(strokes: list) -> list:
+        # Order the strokes by repeatedly drawing the nearest one next (from whichever end is nearer)
+        route = []
+        remaining = list(strokes)
+        x, y = 0.0, 0.0
+        while remaining:
+            best_index, best_distance, best_reversed = 0, math.inf, False
+            for index, stroke in enumerate(remaining):
+                distance = math.hypot(stroke.start[0] - x, stroke.start[1] - y)
+                if distance < best_distance:
+                    best_index, best_distance, best_reversed = index, distance, False
+                distance = math.hypot(stroke.end[0] - x, stroke.end[1] - y)
+                if distance < best_distance:
+                    best_index, best_distance, best_reversed = index, distance, True
+
+            stroke = remaining.pop(best_index)
+            if best_reversed:
+                stroke = stroke.reversed()
+            route.append(stroke)
+            x, y = stroke.end
+        return route
+
+    @staticmethod
+    def __two_opt(route: list, park: tuple, tolerance: float, window: int):
+        # Reverse runs of strokes (in order and direction) while doing so shortens the travel.
+        # A run of one stroke is simply that stroke drawn the other way round
+        def distance(a: tuple, b: tuple) -> float:
+            return 0.0 if b is None else math.hypot(b[0] - a[0], b[1] - a[1])
+
+        improved = True
+        while improved:
+            improved = False
+            for i in range(len(route)):
+                before = (0.0, 0.0) if i == 0 else route[i - 1].end
+                for j in range(i, min(len(route), i + window)):
+                    after = route[j + 1].start if j + 1 < len(route) else park
+                    current = distance(before, route[i].start) + distance(route[j].end, after)
+                    reversed_run = distance(before, route[j].end) + distance(route[i].start, after)
+                    if reversed_run < current - tolerance:
+                        route[i:j + 1] = [stroke.reversed() for stroke in reversed(route[i:j + 1])]
+                        improved = True
+
+    @staticmethod
+    def __join(route: list, tolerance: float) -> list:
+        # Join strokes that meet end to end (unless the second has commands to send first)
+        joined = []
+        for stroke in route:
+            if joined and not stroke.commands and math.hypot(stroke.start[0] - joined[-1].end[0], stroke.start[1] - joined[-1].end[1]) < tolerance:
+                previous = joined[-1]
+                previous.segments = previous.segments + stroke.segments
+                joined[-1] = DisplayList.__simplify(previous, tolerance)
+            else:
+                joined.append(stroke)
+        return joined
@@ -0,0 +1,173 @@
+#************************************************************************
+#
+#   fleet.py
+#
+#   Control of several robots from one event loop
+#   Valiant Turtle 2 - Communicator Linux Firmware
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+import asyncio
+import logging
+import time
+from async_commands_tx import AsyncCommandsTx, SUBMITTABLE_COMMANDS
+
+class Fleet:
+    """
+    Drives several robots at once from one asyncio event loop.  Each robot has its
+    own AsyncCommandsTx (and BLE central), addressed by its turtle ID:
+
+        fleet = Fleet()
+        await fleet.connect([1, 2, 3])
+        await fleet.broadcast("motors", True)
+        await fleet[2].forward(100)
+
+    A choreography gives each robot a program (a list of (command name, arguments...)
+    tuples).  The programs are streamed to the robots together; Fleet.SYNC entries are
+    sync points where each robot waits until every robot has reached them:
+
+        await fleet.choreograph({
+            1: [("forward", 100), Fleet.SYNC, ("left", 90)],
+            2: [("backward", 100), Fleet.SYNC, ("right", 90)],
+        })
+
+    Each robot must have a different turtle ID (see set_turtle_id).
+    """
+    SYNC = "sync"
+
+    def __init__(self):
+        self._robots = {}
+        self._start_time = None
+
+    def __getitem__(self, turtle_id: int) -> AsyncCommandsTx:
+        return self._robots[turtle_id]
+
+    def __len__(self) -> int:
+        return len(self._robots)
+
+    @property
+    def turtle_ids(self) -> list[int]:
+        # Turtle IDs of the connected robots
+        return sorted(self._robots)
+
+    async def discover(self, timeout: float = 5.0) -> list[int]:
+        # Find the turtle IDs of the robots in range (without connecting)
+        turtle_ids = []
+        for robot in await AsyncCommandsTx().scan(timeout):
+            if robot["turtle_id"] in turtle_ids:
+                logging.warning(f"Fleet::discover - More than one robot has turtle ID {robot['turtle_id']}")
+                continue
+            turtle_ids.append(robot["turtle_id"])
+        return turtle_ids
+
+    async def connect(self, turtle_ids: list[int] = None, timeout: float = 30.0) -> list[int]:
+        # Connect to the robots (or to every robot in range if turtle_ids is None).  BlueZ
+        # makes one connection at a time, so the robots are connected to in turn.  Returns
+        # the turtle IDs of the connected robots
+        if turtle_ids is None:
+            turtle_ids = await self.discover()
+
+        for turtle_id in turtle_ids:
+            if turtle_id in self._robots:
+                continue
+
+            logging.info(f"Fleet::connect - Connecting to turtle ID {turtle_id}")
+            commands = AsyncCommandsTx()
+            await commands.connect(turtle_id)
+            if await commands.wait_for_connection(timeout):
+                self._robots[turtle_id] = commands
+            else:
+                logging.error(f"Fleet::connect - Unable to connect to turtle ID {turtle_id}")
+                await commands.disconnect()
+
+        self._start_time = time.monotonic()
+        return self.turtle_ids
+
+    async def disconnect(self):
+        await asyncio.gather(*(commands.disconnect() for commands in self._robots.values()))
+        self._robots.clear()
+        self._start_time = None
+
+    async def broadcast(self, name: str, *args) -> dict:
+        # Send a command to every robot at once.  Returns the result from each robot (by turtle ID)
+        if name not in SUBMITTABLE_COMMANDS:
+            raise ValueError(f"Fleet::broadcast - {name} is not a command that can be broadcast")
+        turtle_ids = self.turtle_ids
+        results = await asyncio.gather(*(getattr(self._robots[turtle_id], name)(*args) for turtle_id in turtle_ids))
+        return dict(zip(turtle_ids, results))
+
+    async def choreograph(self, programs: dict) -> dict:
+        # Run a program on each robot (by turtle ID).  Returns whether each robot's program
+        # succeeded; a robot whose program fails stops, but the others carry on
+        unknown = [turtle_id for turtle_id in programs if turtle_id not in self._robots]
+        if unknown:
+            raise ValueError(f"Fleet::choreograph - Not connected to turtle IDs {unknown}")
+
+        phases = {turtle_id: Fleet.__split(program) for turtle_id, program in programs.items()}
+        phase_counts = {len(robot_phases) for robot_phases in phases.values()}
+        if len(phase_counts) > 1:
+            raise ValueError("Fleet::choreograph - Every program must have the same number of sync points")
+
+        results = {turtle_id: True for turtle_id in programs}
+        for phase in range(phase_counts.pop() if phase_counts else 0):
+            turtle_ids = [turtle_id for turtle_id in programs if results[turtle_id]]
+            outcomes = await asyncio.gather(*(self.__run_phase(turtle_id, phases[turtle_id][phase]) for turtle_id in turtle_ids))
+            for turtle_id, succeeded in zip(turtle_ids, outcomes):
+                if not succeeded:
+                    logging.error(f"Fleet::choreograph - The program for turtle ID {turtle_id} failed in phase {phase}")
+                    results[turtle_id] = False
+        return results
+
+    def stats(self) -> dict:
+        # Aggregate throughput (commands per second across the fleet since connecting)
+        # and each robot's link statistics
+        elapsed = 0.0 if self._start_time is None else time.monotonic() - self._start_time
+        robots = {turtle_id: self._robots[turtle_id].link_stats() for turtle_id in self.turtle_ids}
+        commands = sum(robot["commands"] for robot in robots.values())
+        return {
+            "robots": len(robots),
+            "elapsed_s": round(elapsed, 1),
+            "commands": commands,
+            "commands_per_s": round(commands / elapsed, 2) if elapsed > 0 else 0.0,
+            "retransmissions": sum(robot["retransmissions"] for robot in robots.values()),
+            "timeouts": sum(robot["timeouts"] for robot in robots.values()),
+            "per_robot": robots,
+        }
+
+    async def __run_phase(self, turtle_id: int, steps: list) -> bool:
+        # Stream the steps to the robot (so its queue stays full) and wait for them to finish
+        commands = self._robots[turtle_id]
+        for name, *args in steps:
+            commands.submit(name, *args)
+        return await commands.flush()
+
+    @staticmethod
+    def __split(program: list) -> list:
+        # Split a program into the phases between its sync points
+        phases = [[]]
+        for step in program:
+            if step == Fleet.SYNC:
+                phases.append([])
+            elif step[0] not in SUBMITTABLE_COMMANDS:
+                raise ValueError(f"Fleet::choreograph - {step[0]} is not a command that can be used in a program")
+            else:
+                phases[-1].append(step)
+        return phases
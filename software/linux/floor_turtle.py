@@ -31,8 +31,13 @@ import time
 import math
 
 class FloorTurtle(TurtleInterface):
-    def __init__(self, commands_tx: CommandsTx):
+    def __init__(self, commands_tx: CommandsTx, pipelined: bool = False):
+        # In pipelined mode the commands are submitted without waiting for their
+        # responses, which keeps the robot's queue topped up so consecutive segments
+        # of a drawing don't each pay a round trip.  Queries wait for the submitted
+        # commands to complete first
         self._commands_tx = commands_tx
+        self._pipelined = pipelined
 
     def connect(self):
         """Establish a BLE connection to the turtle."""
@@ -44,38 +49,51 @@ class FloorTurtle(TurtleInterface):
     def disconnect(self):
         """Terminate the BLE connection to the turtle."""
         print("disconnect()")
+        self.flush()
         self._commands_tx.disconnect()
 
+    def flush(self):
+        """Wait for the submitted commands to complete (in pipelined mode)."""
+        if self._pipelined and not self._commands_tx.flush():
+            print("flush() - a submitted command failed")
+
+    def __send(self, name: str, *args):
+        # Send a command that doesn't return a value (submitting it in pipelined mode)
+        if self._pipelined:
+            self._commands_tx.submit(name, *args)
+        else:
+            getattr(self._commands_tx, name)(*args)
+
     def motors(self, state: bool):
         """Control the state of the motors."""
         print(f"motors(state={state})")
-        self._commands_tx.motors(state)
+        self.__send("motors", state)
 
     def forward(self, distance: float):
         """Move the turtle forward by a specified distance."""
         print(f"forward(distance={distance})")
-        self._commands_tx.forward(distance)
+        self.__send("forward", distance)
 
     def backward(self, distance: float):
         """Move the turtle backward by a specified distance."""
         print(f"backward(distance={distance})")
-        self._commands_tx.backward(distance)
+        self.__send("backward", distance)
 
     def left(self, angle: float):
         """Turn the turtle left by a specified angle."""
         print(f"left(angle={angle})")
-        self._commands_tx.left(angle)
+        self.__send("left", angle)
 
     def right(self, angle: float):
         """Turn the turtle right by a specified angle."""
         print(f"right(angle={angle})")
-        self._commands_tx.right(angle)
+        self.__send("right", angle)
 
     def circle(self, radius: float, extent: float=360, steps: int=None):
         """Move the turtle in a circle with a specified radius and extent."""
         if steps is None or extent != 360:
             print(f"circle(radius={radius}, extent={extent})")
-            self._commands_tx.circle(radius, extent)
+            self.__send("circle", radius, extent)
         else:
             # This implementation attempts to match the behaviour of turtle.circle()
             # by using a series of straight lines to approximate the circle
@@ -93,30 +111,30 @@ class FloorTurtle(TurtleInterface):
             step_length = 2 * abs(radius) * math.sin(math.pi / steps)
             
             # Rotate to match turtle.circle() starting orientation
-            self._commands_tx.left(start_angle * turn_direction)
+            self.__send("left", start_angle * turn_direction)
 
             for _ in range(steps):
-                self._commands_tx.forward(step_length)
-                self._commands_tx.left(turn_direction * step_angle)
+                self.__send("forward", step_length)
+                self.__send("left", turn_direction * step_angle)
             
             # Reset the initial rotation to match turtle.circle() final state
-            self._commands_tx.right(start_angle * turn_direction)
+            self.__send("right", start_angle * turn_direction)
 
     def setheading(self, angle: float):
         """Set the turtle's heading to a specified angle."""
         print(f"setheading(angle={angle})")
         self._angle = angle % 360
-        self._commands_tx.setheading(self._angle)
+        self.__send("setheading", self._angle)
 
     def setx(self, x: float):
         """Set the turtle's x-coordinate."""
         print(f"setx(x={x})")
-        self._commands_tx.setx(x)
+        self.__send("setx", x)
 
     def sety(self, y: float):
         """Set the turtle's y-coordinate."""
         print(f"sety(y={y})")
-        self._commands_tx.sety(y)
+        self.__send("sety", y)
 
     def setposition(self, x: float = None, y: float = None):
         """Set the turtle's position to specified x and y coordinates."""
@@ -130,26 +148,28 @@ class FloorTurtle(TurtleInterface):
             raise ValueError("Provide either two floats or a single tuple containing two floats.")
 
         print(f"setposition(x={_x}, y={_y})")
-        self._commands_tx.setposition(_x, _y)
+        self.__send("setposition", _x, _y)
 
     def towards(self, x: float, y: float):
         """Calculate the angle towards a specified position."""
         print(f"towards(x={x}, y={y})")
-        self._commands_tx.towards(x, y)
+        self.__send("towards", x, y)
 
     def reset_origin(self):
         """Reset the turtle's origin."""
         print("reset_origin()")
-        self._commands_tx.reset_origin()
+        self.__send("reset_origin")
 
     def heading(self) -> float:
         """Get the turtle's current heading."""
         print("heading()")
+        self.flush()
         _, self._angle = self._commands_tx.heading()
         return self._angle
 
     def position(self) -> tuple[float, float]:
         """Get the turtle's current position."""
+        self.flush()
         _, self._x, self._y = self._commands_tx.position()
         print(f"position() = {self._x}, {self._y}")
         return self._x, self._y
@@ -157,12 +177,12 @@ class FloorTurtle(TurtleInterface):
     def penup(self):
         """Lift the pen up."""
         print("penup()")
-        self._commands_tx.penup()
+        self.__send("penup")
 
     def pendown(self):
         """Put the pen down."""
         print("pendown()")
-        self._commands_tx.pendown()
+        self.__send("pendown")
 
     def eyes(self, eye: int, red: int, green: int, blue: int):
         """Set the color of the turtle's eyes."""
@@ -172,16 +192,18 @@ class FloorTurtle(TurtleInterface):
         red = max(0, min(255, red))
         green = max(0, min(255, green))
         blue = max(0, min(255, blue))
-        self._commands_tx.eyes(eye, red, green, blue)
+        self.__send("eyes", eye, red, green, blue)
 
     def power(self) -> tuple[int, int, int]:
         """Returns the power state of the turtle."""
+        self.flush()
         _, mv, ma, mw = self._commands_tx.power()
         print(f"power() = {mv}mV, {ma}mA, {mw}mW")
         return mv, ma, mw
 
     def isdown(self) -> bool:
         """Check if the pen is down."""
+        self.flush()
         is_down = self._commands_tx.isdown()
         print(f"isdown() = {'down' if is_down else 'up'}")
         return is_down
@@ -189,21 +211,23 @@ class FloorTurtle(TurtleInterface):
     def set_linear_velocity(self, target_speed: int, acceleration: int):
         """Set the turtle's linear velocity."""
         print(f"set_linear_velocity(target_speed={target_speed}, acceleration={acceleration})")
-        self._commands_tx.set_linear_velocity(target_speed, acceleration)
+        self.__send("set_linear_velocity", target_speed, acceleration)
 
     def set_rotational_velocity(self, target_speed: int, acceleration: int):
         """Set the turtle's rotational velocity."""
         print(f"set_rotational_velocity(target_speed={target_speed}, acceleration={acceleration})")
-        self._commands_tx.set_rotational_velocity(target_speed, acceleration)
+        self.__send("set_rotational_velocity", target_speed, acceleration)
 
     def get_linear_velocity(self) -> tuple[int, int]:
         """Get the turtle's current linear velocity."""
+        self.flush()
         _, target_speed, acceleration = self._commands_tx.get_linear_velocity()
         print(f"get_linear_velocity() = {target_speed}, {acceleration}")
         return target_speed, acceleration
 
     def get_rotational_velocity(self) -> tuple[int, int]:
         """Get the turtle's current rotational velocity."""
+        self.flush()
         _, target_speed, acceleration = self._commands_tx.get_rotational_velocity()
         print(f"get_rotational_velocity() = {target_speed}, {acceleration}")
         return target_speed, acceleration
@@ -211,21 +235,23 @@ class FloorTurtle(TurtleInterface):
     def set_wheel_diameter_calibration(self, diameter: int):
         """Set the calibration for the wheel diameter."""
         print(f"set_wheel_diameter_calibration(diameter={diameter})")
-        self._commands_tx.set_wheel_diameter_calibration(diameter)
+        self.__send("set_wheel_diameter_calibration", diameter)
 
     def set_axel_distance_calibration(self, distance: int):
         """Set the calibration for the axel distance."""
         print(f"set_axel_distance_calibration(distance={distance})")
-        self._commands_tx.set_axel_distance_calibration(distance)
+        self.__send("set_axel_distance_calibration", distance)
 
     def get_wheel_diameter_calibration(self) -> int:
         """Get the current wheel diameter calibration."""
+        self.flush()
         _, wheel_diameter = self._commands_tx.get_wheel_diameter_calibration()
         print(f"get_wheel_diameter_calibration() = {wheel_diameter}")
         return wheel_diameter
 
     def get_axel_distance_calibration(self) -> int:
         """Get the current axel distance calibration."""
+        self.flush()
         _, axel_distance = self._commands_tx.get_axel_distance_calibration()
         print(f"get_axel_distance_calibration() = {axel_distance}")
         return axel_distance
@@ -233,10 +259,11 @@ class FloorTurtle(TurtleInterface):
     def set_turtle_id(self, turtle_id: int):
         """Set the turtle's ID."""
         print(f"set_turtle_id(turtle_id={turtle_id})")
-        self._commands_tx.set_turtle_id(turtle_id)
+        self.__send("set_turtle_id", turtle_id)
 
     def get_turtle_id(self) -> int:
         """Get the turtle's ID."""
+        self.flush()
         _, turtle_id = self._commands_tx.get_turtle_id()
         print(f"get_turtle_id() = {turtle_id}")
         return turtle_id
@@ -244,17 +271,17 @@ class FloorTurtle(TurtleInterface):
     def load_config(self):
         """Load the turtle's configuration."""
         print("load_config()")
-        self._commands_tx.load_config()
+        self.__send("load_config")
 
     def save_config(self):
         """Save the turtle's configuration."""
         print("save_config()")
-        self._commands_tx.save_config()
+        self.__send("save_config")
 
     def reset_config(self):
         """Reset the turtle's configuration to default."""
         print("reset_config()")
-        self._commands_tx.reset_config()
+        self.__send("reset_config")
 
     def speed(self, speed: int):
         """Set the turtle's speed."""
@@ -281,14 +308,14 @@ class FloorTurtle(TurtleInterface):
             speed = 10
 
         if speed <= 3:
-            self._commands_tx.set_linear_velocity(100, 2)
-            self._commands_tx.set_rotational_velocity(50, 2)
+            self.__send("set_linear_velocity", 100, 2)
+            self.__send("set_rotational_velocity", 50, 2)
         elif speed <= 6:
-            self._commands_tx.set_linear_velocity(200, 4)
-            self._commands_tx.set_rotational_velocity(100, 4)
+            self.__send("set_linear_velocity", 200, 4)
+            self.__send("set_rotational_velocity", 100, 4)
         elif speed <= 8:
-            self._commands_tx.set_linear_velocity(400, 8)
-            self._commands_tx.set_rotational_velocity(200, 4)
+            self.__send("set_linear_velocity", 400, 8)
+            self.__send("set_rotational_velocity", 200, 4)
         else:
-            self._commands_tx.set_linear_velocity(600, 12)
-            self._commands_tx.set_rotational_velocity(300, 6)
+            self.__send("set_linear_velocity", 600, 12)
+            self.__send("set_rotational_velocity", 300, 6)
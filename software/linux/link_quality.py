@@ -0,0 +1,199 @@
+#************************************************************************
+#
+#   link_quality.py
+#
+#   BLE link quality statistics and retry policy
+#   Valiant Turtle 2 - Communicator Linux Firmware
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+import time
+
+class LinkQuality:
+    """
+    Measures the quality of the BLE link to the robot and sets the retry interval
+    and command timeout from it.
+
+    Two round trip times are measured: the time taken for the peripheral to
+    acknowledge each write (the link level round trip) and the time from queuing a
+    command to receiving its response (only for commands that respond straight
+    away).  The smoothed RTT and its variation are kept as in TCP (RFC 6298), so
+    the retry interval is a little above the normal round trip on a clean link
+    and widens as the round trip becomes erratic.  Each retransmission doubles the
+    retry interval (and lengthens the timeout) until a command gets through first
+    time again.  Command RTTs are not sampled for retransmitted commands, since
+    the response can't be matched to a particular transmission.
+
+    The robot's service time (the time between its responses whilst it has
+    further commands queued) is also measured.  A response can be held up whilst
+    the robot works on the commands queued behind it, so the retry interval is
+    widened by the service time of each command the robot reports as queued.
+    """
+    def __init__(self):
+        # Limits of the retry interval and the timeout for commands that respond straight away
+        self._min_retry_interval = 0.25
+        self._max_retry_interval = 4.0
+        self._min_short_timeout = 1.0
+        self._max_short_timeout = 5.0
+
+        # Weighting of new samples (RFC 6298 alpha and beta) and of new RSSI samples
+        self._alpha = 0.125
+        self._beta = 0.25
+        self._rssi_alpha = 0.25
+
+        self.reset()
+
+    def reset(self):
+        # Command round trip (smoothed RTT and RTT variation, None until the first sample)
+        self._srtt = None
+        self._rttvar = None
+        self._last_rtt = None
+        self._rtt_samples = 0
+
+        # Robot's service time per queued command (smoothed, None until the first sample)
+        self._service_time = None
+
+        # Write acknowledgement round trip
+        self._write_srtt = None
+        self._writes = 0
+        self._write_failures = 0
+
+        self._commands = 0
+        self._retransmissions = 0
+        self._timeouts = 0
+        self._backoff = 1
+
+        # Received signal strength (smoothed, dBm)
+        self._rssi = None
+        self._rssi_time = None
+
+        self._start_time = time.monotonic()
+
+    @property
+    def srtt(self):
+        return self._srtt
+
+    @property
+    def rssi(self):
+        return self._rssi
+
+    @property
+    def retry_interval(self) -> float:
+        # Time to wait for a response before retransmitting a command
+        if self._srtt is None:
+            retry_interval = 0.5
+        else:
+            retry_interval = self._srtt + 4 * self._rttvar
+        return min(max(retry_interval * self._backoff, self._min_retry_interval), self._max_retry_interval)
+
+    def queued_retry_interval(self, queue_depth: int) -> float:
+        # Time to wait for a response before retransmitting a command whilst the robot
+        # reports queue_depth commands queued (which it may work on before the response
+        # is sent)
+        retry_interval = self.retry_interval
+        if queue_depth <= 0 or self._service_time is None:
+            return retry_interval
+        return min(retry_interval + queue_depth * self._service_time, self._max_retry_interval)
+
+    @property
+    def max_retry_interval(self) -> float:
+        return self._max_retry_interval
+
+    @property
+    def short_timeout(self) -> float:
+        # Time to wait for a command that responds straight away (enough for several
+        # retransmissions) before the link is treated as failed
+        if self._srtt is None:
+            return self._max_short_timeout
+        return min(max(8 * self.retry_interval, self._min_short_timeout), self._max_short_timeout)
+
+    def add_command(self):
+        self._commands += 1
+
+    def add_rtt(self, rtt: float):
+        self._last_rtt = rtt
+        self._rtt_samples += 1
+        if self._srtt is None:
+            self._srtt = rtt
+            self._rttvar = rtt / 2
+        else:
+            self._rttvar = (1 - self._beta) * self._rttvar + self._beta * abs(self._srtt - rtt)
+            self._srtt = (1 - self._alpha) * self._srtt + self._alpha * rtt
+
+        # A command got through first time, so stop backing off
+        self._backoff = 1
+
+    def add_service_time(self, service_time: float):
+        if self._service_time is None:
+            self._service_time = service_time
+        else:
+            self._service_time = (1 - self._alpha) * self._service_time + self._alpha * service_time
+
+    def add_write(self, rtt: float):
+        self._writes += 1
+        if self._write_srtt is None:
+            self._write_srtt = rtt
+        else:
+            self._write_srtt = (1 - self._alpha) * self._write_srtt + self._alpha * rtt
+
+    def add_write_failure(self):
+        self._write_failures += 1
+
+    def add_retransmission(self):
+        self._retransmissions += 1
+        self._backoff = min(self._backoff * 2, 16)
+
+    def add_timeout(self):
+        self._timeouts += 1
+
+    def add_rssi(self, rssi: int):
+        if rssi is None:
+            return
+        if self._rssi is None:
+            self._rssi = float(rssi)
+        else:
+            self._rssi = (1 - self._rssi_alpha) * self._rssi + self._rssi_alpha * rssi
+        self._rssi_time = time.monotonic()
+
+    @property
+    def stats(self) -> dict:
+        """The link statistics (times in ms, None if there are no samples yet)"""
+        def ms(seconds):
+            return None if seconds is None else round(seconds * 1000, 1)
+
+        return {
+            "uptime_s": round(time.monotonic() - self._start_time, 1),
+            "rssi_dbm": None if self._rssi is None else round(self._rssi),
+            "rssi_age_s": None if self._rssi_time is None else round(time.monotonic() - self._rssi_time, 1),
+            "commands": self._commands,
+            "retransmissions": self._retransmissions,
+            "timeouts": self._timeouts,
+            "rtt_samples": self._rtt_samples,
+            "last_rtt_ms": ms(self._last_rtt),
+            "srtt_ms": ms(self._srtt),
+            "rttvar_ms": ms(self._rttvar),
+            "service_time_ms": ms(self._service_time),
+            "writes": self._writes,
+            "write_failures": self._write_failures,
+            "write_srtt_ms": ms(self._write_srtt),
+            "retry_interval_ms": ms(self.retry_interval),
+            "short_timeout_ms": ms(self.short_timeout),
+        }
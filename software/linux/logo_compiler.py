@@ -0,0 +1,481 @@
+#************************************************************************
+#
+#   logo_compiler.py
+#
+#   Compile Logo programs into bytecode for the robot's turtle VM
+#   Valiant Turtle 2 - Communicator Linux Firmware
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+import logging
+import re
+import struct
+
+# Program image format (must match ProgramStore in the robot firmware)
+FORMAT_BYTECODE = 0x02
+
+# Opcodes (must match turtle_vm.py in the robot firmware)
+OP_HALT = 0x00
+OP_PUSH8 = 0x01
+OP_PUSH16 = 0x02
+OP_PUSH32 = 0x03
+OP_LOAD = 0x04
+OP_STORE = 0x05
+OP_LOADL = 0x06
+OP_STOREL = 0x07
+OP_DUP = 0x08
+OP_DROP = 0x09
+OP_ADD = 0x10
+OP_SUB = 0x11
+OP_MUL = 0x12
+OP_DIV = 0x13
+OP_FMUL = 0x14
+OP_FDIV = 0x15
+OP_NEG = 0x16
+OP_MOD = 0x17
+OP_EQUAL = 0x18
+OP_LESS = 0x19
+OP_GREATER = 0x1A
+OP_NOT = 0x1B
+OP_ITOF = 0x1C
+OP_FTOI = 0x1D
+OP_JMP = 0x20
+OP_JZ = 0x21
+OP_REPEAT = 0x22
+OP_ENDREP = 0x23
+OP_REPCOUNT = 0x24
+OP_CALL = 0x25
+OP_RET = 0x26
+OP_RETV = 0x27
+OP_FD = 0x30
+OP_BK = 0x31
+OP_LT = 0x32
+OP_RT = 0x33
+OP_CIRCLE = 0x34
+OP_SETH = 0x35
+OP_SETX = 0x36
+OP_SETY = 0x37
+OP_SETPOS = 0x38
+OP_TOWARDS = 0x39
+OP_HOME = 0x3A      # Drive back to the origin and set the heading to 0
+OP_PU = 0x3B
+OP_PD = 0x3C
+OP_EYES = 0x3D
+OP_MOTORS = 0x3E
+OP_SETLV = 0x3F
+OP_SETRV = 0x40
+OP_HEADING = 0x41
+OP_XCOR = 0x42
+OP_YCOR = 0x43
+OP_WAIT = 0x44
+
+class LogoError(Exception):
+    pass
+
+class BytecodeAssembler:
+    """
+    Builds a bytecode image for the robot's turtle VM.  Jump and call targets
+    are labels which are resolved when the image is generated.
+    """
+    def __init__(self):
+        self._code = bytearray()
+        self._labels = {}
+        self._fixups = []  # (code offset, label)
+        self._global_count = 0
+
+    @property
+    def address(self) -> int:
+        return len(self._code)
+
+    def set_global_count(self, global_count: int):
+        if global_count > 64:
+            raise LogoError("Too many global variables (maximum is 64)")
+        self._global_count = global_count
+
+    def emit(self, opcode: int, *operands: int):
+        self._code.append(opcode)
+        self._code.extend(operands)
+
+    def push_int(self, value: int):
+        if -128 <= value <= 127:
+            self._code.extend(struct.pack("<Bb", OP_PUSH8, value))
+        elif -32768 <= value <= 32767:
+            self._code.extend(struct.pack("<Bh", OP_PUSH16, value))
+        else:
+            self._code.extend(struct.pack("<Bi", OP_PUSH32, value))
+
+    def push_fixed(self, value: float):
+        # Whole numbers are pushed as integers and converted as it is shorter
+        if value == int(value) and -32768 <= value <= 32767:
+            self.push_int(int(value))
+            self.emit(OP_ITOF)
+        else:
+            self.push_int(int(round(value * 65536)))
+
+    def patch(self, offset: int, value: int):
+        self._code[offset] = value
+
+    def new_label(self) -> int:
+        label = len(self._labels)
+        self._labels[label] = None
+        return label
+
+    def bind(self, label: int):
+        self._labels[label] = self.address
+
+    def jump(self, opcode: int, label: int):
+        self.emit(opcode)
+        self._fixups.append((self.address, label))
+        self._code.extend(bytes(2))
+
+    def call(self, label: int, parameter_count: int, local_count: int):
+        self.jump(OP_CALL, label)
+        self.emit(parameter_count, local_count)
+
+    def image(self) -> bytes:
+        code = bytearray(self._code)
+        for offset, label in self._fixups:
+            address = self._labels[label]
+            if address is None:
+                raise LogoError(f"Label {label} is not bound")
+            struct.pack_into("<H", code, offset, address)
+        if len(code) > 65535:
+            raise LogoError("Program is too large")
+        return bytes([FORMAT_BYTECODE, self._global_count]) + bytes(code)
+
+class _Procedure:
+    def __init__(self, name: str, parameters: list[str], outputs: bool):
+        self.name = name
+        self.parameters = parameters
+        self.outputs = outputs
+        self.locals = list(parameters)
+        self.label = None
+
+class LogoCompiler:
+    """
+    Compiles a subset of Logo into bytecode for the robot's turtle VM, for example
+    the Calitest1 drawing is:
+
+        MOTORS 1
+        REPEAT 6 [PD REPEAT 3 [FD 100 LT 90] FD 100 RT 60 - 90]
+        PU FD 225 MOTORS 0
+
+    Supported commands are FD, BK, LT, RT, PU, PD, SETH, SETX, SETY, SETXY,
+    TOWARDS, HOME, CIRCLE, EYES, MOTORS, SETLINEAR, SETROTATIONAL, WAIT, REPEAT,
+    IF, MAKE, LOCAL, STOP, OUTPUT and TO ... END procedures (with parameters).
+    Expressions can use numbers, :variables, + - * / = < >, brackets, REPCOUNT,
+    HEADING, XCOR, YCOR and procedures that OUTPUT a value.  All values are
+    16.16 fixed-point numbers.
+    """
+    # Primitive commands: name -> (opcode, number of inputs, inputs are integers)
+    _COMMANDS = {
+        "FD": (OP_FD, 1, False), "FORWARD": (OP_FD, 1, False),
+        "BK": (OP_BK, 1, False), "BACK": (OP_BK, 1, False),
+        "LT": (OP_LT, 1, False), "LEFT": (OP_LT, 1, False),
+        "RT": (OP_RT, 1, False), "RIGHT": (OP_RT, 1, False),
+        "PU": (OP_PU, 0, False), "PENUP": (OP_PU, 0, False),
+        "PD": (OP_PD, 0, False), "PENDOWN": (OP_PD, 0, False),
+        "SETH": (OP_SETH, 1, False), "SETHEADING": (OP_SETH, 1, False),
+        "SETX": (OP_SETX, 1, False),
+        "SETY": (OP_SETY, 1, False),
+        "SETXY": (OP_SETPOS, 2, False),
+        "TOWARDS": (OP_TOWARDS, 2, False),
+        "HOME": (OP_HOME, 0, False),
+        "CIRCLE": (OP_CIRCLE, 2, False),
+        "EYES": (OP_EYES, 4, True),
+        "MOTORS": (OP_MOTORS, 1, True),
+        "SETLINEAR": (OP_SETLV, 2, True),
+        "SETROTATIONAL": (OP_SETRV, 2, True),
+        "WAIT": (OP_WAIT, 1, True),
+    }
+
+    # Primitive operations that output a value
+    _REPORTERS = {
+        "HEADING": OP_HEADING,
+        "XCOR": OP_XCOR,
+        "YCOR": OP_YCOR,
+    }
+
+    _TOKEN_RE = re.compile(r"\[|\]|\(|\)|[+\-*/=<>]|[^\s\[\]()+\-*/=<>]+")
+
+    def __init__(self):
+        self._asm = None
+        self._tokens = []
+        self._position = 0
+        self._globals = {}
+        self._procedures = {}
+        self._procedure = None
+        self._call_sites = []
+
+    def compile(self, source: str) -> bytes:
+        """Compile Logo source code and return the program image"""
+        self._asm = BytecodeAssembler()
+        self._tokens = self.__tokenise(source)
+        self._position = 0
+        self._globals = {}
+        self._procedures = {}
+        self._procedure = None
+        self._call_sites = []
+
+        # First pass - find the procedures so calls can be made before definitions
+        self.__find_procedures()
+        for procedure in self._procedures.values():
+            procedure.label = self._asm.new_label()
+
+        # Main program (everything outside of TO ... END)
+        bodies = []
+        while not self.__at_end():
+            if self.__peek() == "TO":
+                bodies.append(self._position)
+                self.__skip_procedure()
+            else:
+                self.__statement()
+        self._asm.emit(OP_HALT)
+
+        # Procedures
+        for start in bodies:
+            self._position = start
+            self.__definition()
+
+        for offset, procedure in self._call_sites:
+            self._asm.patch(offset, len(procedure.locals) - len(procedure.parameters))
+
+        self._asm.set_global_count(len(self._globals))
+        image = self._asm.image()
+        logging.info(f"LogoCompiler::compile - Compiled {len(self._procedures)} procedures into {len(image)} bytes")
+        return image
+
+    def __tokenise(self, source: str) -> list[str]:
+        tokens = []
+        for line in source.splitlines():
+            # Both ; and \ (Acornsoft) start a comment
+            line = re.split(r"[;\\]", line, maxsplit=1)[0]
+            tokens.extend(token.upper() for token in self._TOKEN_RE.findall(line))
+        return tokens
+
+    def __at_end(self) -> bool:
+        return self._position >= len(self._tokens)
+
+    def __peek(self) -> str:
+        if self.__at_end():
+            return ""
+        return self._tokens[self._position]
+
+    def __next(self) -> str:
+        if self.__at_end():
+            raise LogoError("Unexpected end of program")
+        token = self._tokens[self._position]
+        self._position += 1
+        return token
+
+    def __expect(self, expected: str):
+        token = self.__next()
+        if token != expected:
+            raise LogoError(f"Expected {expected} but found {token}")
+
+    def __find_procedures(self):
+        while not self.__at_end():
+            if self.__next() != "TO":
+                continue
+            name = self.__next()
+            parameters = []
+            while self.__peek().startswith(":"):
+                parameters.append(self.__next()[1:])
+            outputs = False
+            while self.__peek() != "END":
+                if self.__next() in ("OUTPUT", "OP"):
+                    outputs = True
+            self.__expect("END")
+            if name in self._procedures or name in self._COMMANDS or name in self._REPORTERS:
+                raise LogoError(f"{name} is already defined")
+            self._procedures[name] = _Procedure(name, parameters, outputs)
+        self._position = 0
+
+    def __skip_procedure(self):
+        while self.__next() != "END":
+            pass
+
+    def __definition(self):
+        self.__expect("TO")
+        procedure = self._procedures[self.__next()]
+        while self.__peek().startswith(":"):
+            self.__next()
+
+        self._procedure = procedure
+        self._asm.bind(procedure.label)
+        while self.__peek() != "END":
+            self.__statement()
+        self.__expect("END")
+
+        if procedure.outputs:
+            # Procedures that output a value must always return one
+            self._asm.push_int(0)
+            self._asm.emit(OP_RETV)
+        else:
+            self._asm.emit(OP_RET)
+        self._procedure = None
+
+    def __block(self):
+        self.__expect("[")
+        while self.__peek() != "]":
+            if self.__at_end():
+                raise LogoError("Missing ]")
+            self.__statement()
+        self.__expect("]")
+
+    def __word(self) -> str:
+        token = self.__next()
+        if not token.startswith('"'):
+            raise LogoError(f"Expected a quoted name but found {token}")
+        return token[1:]
+
+    def __variable(self, name: str) -> tuple[int, int, int]:
+        # Returns the load opcode, store opcode and slot number of a variable
+        if self._procedure is not None and name in self._procedure.locals:
+            return OP_LOADL, OP_STOREL, self._procedure.locals.index(name)
+        if name not in self._globals:
+            self._globals[name] = len(self._globals)
+        return OP_LOAD, OP_STORE, self._globals[name]
+
+    def __statement(self):
+        token = self.__next()
+
+        if token in self._COMMANDS:
+            opcode, input_count, integers = self._COMMANDS[token]
+            for _ in range(input_count):
+                self.__expression()
+                if integers:
+                    self._asm.emit(OP_FTOI)
+            self._asm.emit(opcode)
+        elif token == "REPEAT":
+            self.__expression()
+            self._asm.emit(OP_FTOI)
+            self._asm.emit(OP_REPEAT)
+            self.__block()
+            self._asm.emit(OP_ENDREP)
+        elif token == "IF":
+            self.__expression()
+            else_label = self._asm.new_label()
+            self._asm.jump(OP_JZ, else_label)
+            self.__block()
+            if self.__peek() == "[":
+                end_label = self._asm.new_label()
+                self._asm.jump(OP_JMP, end_label)
+                self._asm.bind(else_label)
+                self.__block()
+                self._asm.bind(end_label)
+            else:
+                self._asm.bind(else_label)
+        elif token == "MAKE":
+            name = self.__word()
+            self.__expression()
+            _, store, slot = self.__variable(name)
+            self._asm.emit(store, slot)
+        elif token == "LOCAL":
+            if self._procedure is None:
+                raise LogoError("LOCAL can only be used in a procedure")
+            name = self.__word()
+            if name not in self._procedure.locals:
+                self._procedure.locals.append(name)
+            _, store, slot = self.__variable(name)
+            # Acornsoft Logo allows an initial value (locals are otherwise zero)
+            if self.__peek() and (self.__peek()[0].isdigit() or self.__peek()[0] in ":(-"):
+                self.__expression()
+                self._asm.emit(store, slot)
+        elif token == "STOP":
+            if self._procedure is None:
+                self._asm.emit(OP_HALT)
+            else:
+                self._asm.emit(OP_RET)
+        elif token in ("OUTPUT", "OP"):
+            if self._procedure is None:
+                raise LogoError("OUTPUT can only be used in a procedure")
+            self.__expression()
+            self._asm.emit(OP_RETV)
+        elif token in self._procedures:
+            self.__call(self._procedures[token])
+            if self._procedures[token].outputs:
+                self._asm.emit(OP_DROP)
+        else:
+            raise LogoError(f"I don't know how to {token}")
+
+    def __call(self, procedure: _Procedure):
+        for _ in procedure.parameters:
+            self.__expression()
+        # The number of locals is only known once the procedure has been compiled
+        # so the call site is patched when the image is generated
+        self._asm.call(procedure.label, len(procedure.parameters), 0)
+        self._call_sites.append((self._asm.address - 1, procedure))
+
+    # Expressions (lowest to highest precedence)
+    def __expression(self):
+        self.__additive()
+        while self.__peek() in ("=", "<", ">"):
+            operator = self.__next()
+            self.__additive()
+            self._asm.emit({"=": OP_EQUAL, "<": OP_LESS, ">": OP_GREATER}[operator])
+
+    def __additive(self):
+        self.__multiplicative()
+        while self.__peek() in ("+", "-"):
+            operator = self.__next()
+            self.__multiplicative()
+            self._asm.emit(OP_ADD if operator == "+" else OP_SUB)
+
+    def __multiplicative(self):
+        self.__unary()
+        while self.__peek() in ("*", "/"):
+            operator = self.__next()
+            self.__unary()
+            self._asm.emit(OP_FMUL if operator == "*" else OP_FDIV)
+
+    def __unary(self):
+        if self.__peek() == "-":
+            self.__next()
+            self.__unary()
+            self._asm.emit(OP_NEG)
+        else:
+            self.__primary()
+
+    def __primary(self):
+        token = self.__next()
+
+        if token == "(":
+            self.__expression()
+            self.__expect(")")
+        elif token.startswith(":"):
+            load, _, slot = self.__variable(token[1:])
+            self._asm.emit(load, slot)
+        elif token == "REPCOUNT":
+            self._asm.emit(OP_REPCOUNT)
+            self._asm.emit(OP_ITOF)
+        elif token in self._REPORTERS:
+            self._asm.emit(self._REPORTERS[token])
+        elif token in self._procedures:
+            if not self._procedures[token].outputs:
+                raise LogoError(f"{token} didn't output to an expression")
+            self.__call(self._procedures[token])
+        else:
+            try:
+                value = float(token)
+            except ValueError:
+                raise LogoError(f"I don't know how to {token}")
+            self._asm.push_fixed(value)
@@ -0,0 +1,212 @@
+#************************************************************************
+#
+#   program_compiler.py
+#
+#   Compile turtle commands into a program image for on-robot playback
+#   Valiant Turtle 2 - Communicator Linux Firmware
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+import logging
+import protocol
+
+# Program image formats (must match ProgramStore in the robot firmware)
+FORMAT_COMMANDS = 0x01
+
+class ProgramCompiler:
+    """
+    A stand-in for CommandsTx that, rather than sending commands to the robot,
+    records them as a program image that can be uploaded with
+    CommandsTx.upload_program() and played back on the robot with run_program().
+
+    Since it has the same methods as CommandsTx it can be passed to FloorTurtle
+    so that any drawing can be compiled, for example:
+
+        compiler = ProgramCompiler()
+        Cat(FloorTurtle(compiler), speed).render()
+        commands_tx.upload_program(compiler.image())
+
+    Commands that query the robot (heading, position, power, etc.) cannot be
+    compiled; they return default values and log a warning.
+    """
+    def __init__(self):
+        self._records = []
+
+    @property
+    def connected(self) -> bool:
+        # Always "connected" so FloorTurtle.connect() returns immediately
+        return True
+
+    @property
+    def record_count(self) -> int:
+        return len(self._records)
+
+    def image(self) -> bytes:
+        """Return the compiled program image"""
+        image = bytearray([FORMAT_COMMANDS])
+        for record in self._records:
+            image.append(len(record))
+            image.extend(record)
+        return bytes(image)
+
+    def clear(self):
+        self._records.clear()
+
+    def __add(self, request, command_id: int, *parameters):
+        # A record is the command's request packet without the sequence number
+        self._records.append(request.pack(0, command_id, *parameters)[1:])
+
+    def __not_compilable(self, name: str):
+        logging.warning(f"ProgramCompiler::{name} - Queries cannot be compiled into a program, returning defaults")
+
+    def connect(self):
+        pass
+
+    def disconnect(self):
+        pass
+
+    def motors(self, enable: bool) -> bool:
+        self.__add(protocol.MOTORS_REQUEST, protocol.CMD_MOTORS, 1 if enable else 0)
+        return True
+
+    def forward(self, distance_mm: float) -> tuple[bool, float, float, float]:
+        self.__add(protocol.FORWARD_REQUEST, protocol.CMD_FORWARD, distance_mm)
+        return True, 0.0, 0.0, 0.0
+
+    def backward(self, distance_mm: float) -> tuple[bool, float, float, float]:
+        self.__add(protocol.BACKWARD_REQUEST, protocol.CMD_BACKWARD, distance_mm)
+        return True, 0.0, 0.0, 0.0
+
+    def left(self, angle_degrees: float) -> tuple[bool, float, float, float]:
+        self.__add(protocol.LEFT_REQUEST, protocol.CMD_LEFT, angle_degrees)
+        return True, 0.0, 0.0, 0.0
+
+    def right(self, angle_degrees: float) -> tuple[bool, float, float, float]:
+        self.__add(protocol.RIGHT_REQUEST, protocol.CMD_RIGHT, angle_degrees)
+        return True, 0.0, 0.0, 0.0
+
+    def circle(self, radius_mm: float, extent_degrees: float) -> tuple[bool, float, float, float]:
+        self.__add(protocol.CIRCLE_REQUEST, protocol.CMD_CIRCLE, radius_mm, extent_degrees)
+        return True, 0.0, 0.0, 0.0
+
+    def setheading(self, angle_degrees: float) -> bool:
+        self.__add(protocol.SETHEADING_REQUEST, protocol.CMD_SETHEADING, angle_degrees)
+        return True
+
+    def setx(self, x_mm: float) -> tuple[bool, float, float, float]:
+        self.__add(protocol.SETX_REQUEST, protocol.CMD_SETX, x_mm)
+        return True, 0.0, 0.0, 0.0
+
+    def sety(self, y_mm: float) -> tuple[bool, float, float, float]:
+        self.__add(protocol.SETY_REQUEST, protocol.CMD_SETY, y_mm)
+        return True, 0.0, 0.0, 0.0
+
+    def setposition(self, x_mm: float, y_mm: float) -> tuple[bool, float, float, float]:
+        self.__add(protocol.SETPOSITION_REQUEST, protocol.CMD_SETPOSITION, x_mm, y_mm)
+        return True, 0.0, 0.0, 0.0
+
+    def towards(self, x_mm: float, y_mm: float) -> tuple[bool, float, float, float]:
+        self.__add(protocol.TOWARDS_REQUEST, protocol.CMD_TOWARDS, x_mm, y_mm)
+        return True, 0.0, 0.0, 0.0
+
+    def reset_origin(self) -> bool:
+        self.__add(protocol.RESET_ORIGIN_REQUEST, protocol.CMD_RESET_ORIGIN)
+        return True
+
+    def heading(self) -> tuple[bool, float]:
+        self.__not_compilable("heading")
+        return True, 0.0
+
+    def position(self) -> tuple[bool, float, float]:
+        self.__not_compilable("position")
+        return True, 0.0, 0.0
+
+    def penup(self) -> bool:
+        self.__add(protocol.PENUP_REQUEST, protocol.CMD_PENUP)
+        return True
+
+    def pendown(self) -> bool:
+        self.__add(protocol.PENDOWN_REQUEST, protocol.CMD_PENDOWN)
+        return True
+
+    def eyes(self, eye_id, red, green, blue) -> bool:
+        self.__add(protocol.EYES_REQUEST, protocol.CMD_EYES, eye_id, red, green, blue)
+        return True
+
+    def power(self) -> tuple[bool, int, int, int]:
+        self.__not_compilable("power")
+        return True, 0, 0, 0
+
+    def isdown(self) -> tuple[bool, bool]:
+        self.__not_compilable("isdown")
+        return True, False
+
+    def set_linear_velocity(self, target_speed: int, acceleration: int) -> bool:
+        self.__add(protocol.SET_LINEAR_VELOCITY_REQUEST, protocol.CMD_SET_LINEAR_VELOCITY, target_speed, acceleration)
+        return True
+
+    def set_rotational_velocity(self, target_speed: int, acceleration: int) -> bool:
+        self.__add(protocol.SET_ROTATIONAL_VELOCITY_REQUEST, protocol.CMD_SET_ROTATIONAL_VELOCITY, target_speed, acceleration)
+        return True
+
+    def get_linear_velocity(self) -> tuple[bool, int, int]:
+        self.__not_compilable("get_linear_velocity")
+        return True, 0, 0
+
+    def get_rotational_velocity(self) -> tuple[bool, int, int]:
+        self.__not_compilable("get_rotational_velocity")
+        return True, 0, 0
+
+    def set_wheel_diameter_calibration(self, wheel_diameter: int) -> bool:
+        self.__add(protocol.SET_WHEEL_DIAMETER_CALIBRATION_REQUEST, protocol.CMD_SET_WHEEL_DIAMETER_CALIBRATION, wheel_diameter)
+        return True
+
+    def set_axel_distance_calibration(self, axel_distance: int) -> bool:
+        self.__add(protocol.SET_AXEL_DISTANCE_CALIBRATION_REQUEST, protocol.CMD_SET_AXEL_DISTANCE_CALIBRATION, axel_distance)
+        return True
+
+    def get_wheel_diameter_calibration(self) -> tuple[bool, int]:
+        self.__not_compilable("get_wheel_diameter_calibration")
+        return True, 0
+
+    def get_axel_distance_calibration(self) -> tuple[bool, int]:
+        self.__not_compilable("get_axel_distance_calibration")
+        return True, 0
+
+    def set_turtle_id(self, turtle_id: int) -> bool:
+        self.__add(protocol.SET_TURTLE_ID_REQUEST, protocol.CMD_SET_TURTLE_ID, turtle_id)
+        return True
+
+    def get_turtle_id(self) -> tuple[bool, int]:
+        self.__not_compilable("get_turtle_id")
+        return True, 0
+
+    def load_config(self) -> bool:
+        self.__add(protocol.LOAD_CONFIG_REQUEST, protocol.CMD_LOAD_CONFIG)
+        return True
+
+    def save_config(self) -> bool:
+        self.__add(protocol.SAVE_CONFIG_REQUEST, protocol.CMD_SAVE_CONFIG)
+        return True
+
+    def reset_config(self) -> bool:
+        self.__add(protocol.RESET_CONFIG_REQUEST, protocol.CMD_RESET_CONFIG)
+        return True
@@ -0,0 +1,251 @@
+#************************************************************************
+#
+#   protocol.py
+#
+#   Command protocol definitions (Linux host)
+#   Valiant Turtle 2 - Communicator Linux Firmware
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+# Note: This file is generated from protocol/schema.py by protocol/generate.py
+# - do not edit it by hand.
+
+import struct
+
+PACKET_LENGTH = 20
+
+# Flow control bytes in packets sent by the robot
+QUEUE_DEPTH_OFFSET = 18
+CREDIT_LIMIT_OFFSET = 19
+
+# Bulk transfer channel
+L2CAP_PSM = 128
+L2CAP_MTU = 512
+BULK_MAGIC = 86
+BULK_HEADER = struct.Struct("<BBHII")
+BULK_PROGRAM_UPLOAD = 1
+BULK_PROGRAM_DOWNLOAD = 2
+
+# Motion acknowledgement (sent before the response when a motion starts)
+MOTION_ACK_MARKER = 1
+MOTION_ACK = struct.Struct("<BBBI")
+
+# Refusal (sent in place of the response when a command can't be processed)
+REFUSED_MARKER = 2
+REFUSED = struct.Struct("<BBBB")
+REFUSED_PROGRAM_RUNNING = 1
+REFUSED_NOT_CONTROLLER = 2
+
+# Session (written by central when it connects, before any commands)
+SESSION_MARKER = 1
+SESSION = struct.Struct("<BBI")
+
+# Status carried in the advertising manufacturer data
+ADVERTISING_COMPANY_ID = 65505
+ADVERTISING_STATUS = struct.Struct("<BHB")
+ADVERTISING_FLAG_CONNECTED = 1
+ADVERTISING_FLAG_BUSY = 2
+ADVERTISING_FLAG_POWER_LOW = 4
+
+# Command IDs
+CMD_NOP = 0 # No operation (used for polling)
+CMD_MOTORS = 1 # Enable (1) or disable (0) the motors
+CMD_FORWARD = 2 # Move forward
+CMD_BACKWARD = 3 # Move backward
+CMD_LEFT = 4 # Turn left
+CMD_RIGHT = 5 # Turn right
+CMD_CIRCLE = 6 # Move in a circle
+CMD_SETHEADING = 7 # Turn to a heading
+CMD_SETX = 8 # Move to an x position
+CMD_SETY = 9 # Move to a y position
+CMD_SETPOSITION = 10 # Move to a position
+CMD_TOWARDS = 11 # Turn towards a position
+CMD_RESET_ORIGIN = 12 # Make the current position the origin
+CMD_HEADING = 13 # Get the heading
+CMD_POSITION = 14 # Get the position
+CMD_PENUP = 15 # Lift the pen
+CMD_PENDOWN = 16 # Lower the pen
+CMD_EYES = 17 # Set the eye colour (0 = both, 1 = left, 2 = right)
+CMD_POWER = 18 # Get the power status
+CMD_ISDOWN = 19 # Get the pen position
+CMD_SET_LINEAR_VELOCITY = 20 # Set the linear velocity
+CMD_SET_ROTATIONAL_VELOCITY = 21 # Set the rotational velocity
+CMD_GET_LINEAR_VELOCITY = 22 # Get the linear velocity
+CMD_GET_ROTATIONAL_VELOCITY = 23 # Get the rotational velocity
+CMD_SET_WHEEL_DIAMETER_CALIBRATION = 24 # Set the wheel diameter calibration (um)
+CMD_SET_AXEL_DISTANCE_CALIBRATION = 25 # Set the axel distance calibration (um)
+CMD_GET_WHEEL_DIAMETER_CALIBRATION = 26 # Get the wheel diameter calibration (um)
+CMD_GET_AXEL_DISTANCE_CALIBRATION = 27 # Get the axel distance calibration (um)
+CMD_SET_TURTLE_ID = 28 # Set the turtle ID (0-7)
+CMD_GET_TURTLE_ID = 29 # Get the turtle ID
+CMD_LOAD_CONFIG = 30 # Load the configuration from EEPROM
+CMD_SAVE_CONFIG = 31 # Save the configuration to EEPROM
+CMD_RESET_CONFIG = 32 # Reset the configuration to the defaults
+CMD_PROGRAM_BEGIN = 33 # Start a program upload
+CMD_PROGRAM_WRITE = 34 # Write up to 15 bytes of the program
+CMD_PROGRAM_END = 35 # Finish and verify a program upload
+CMD_RUN_PROGRAM = 36 # Play the stored program
+CMD_PROGRAM_STATUS = 37 # Get the program playback status
+CMD_STOP_PROGRAM = 38 # Stop program playback
+CMD_LINK_PARAMETERS = 39 # Get the BLE connection parameters (1.25 ms units, events, 10 ms units)
+CMD_LINK_ROLE = 40 # Get the central's role (0 = controller, 1 = monitor)
+
+# Precompiled packet formats (requests include the sequence number and command ID,
+# responses include the sequence number)
+MOTORS_REQUEST = struct.Struct("<BBB")
+MOTORS_RESPONSE = struct.Struct("<B")
+FORWARD_REQUEST = struct.Struct("<BBf")
+FORWARD_RESPONSE = struct.Struct("<Bfff")
+BACKWARD_REQUEST = struct.Struct("<BBf")
+BACKWARD_RESPONSE = struct.Struct("<Bfff")
+LEFT_REQUEST = struct.Struct("<BBf")
+LEFT_RESPONSE = struct.Struct("<Bfff")
+RIGHT_REQUEST = struct.Struct("<BBf")
+RIGHT_RESPONSE = struct.Struct("<Bfff")
+CIRCLE_REQUEST = struct.Struct("<BBff")
+CIRCLE_RESPONSE = struct.Struct("<Bfff")
+SETHEADING_REQUEST = struct.Struct("<BBf")
+SETHEADING_RESPONSE = struct.Struct("<B")
+SETX_REQUEST = struct.Struct("<BBf")
+SETX_RESPONSE = struct.Struct("<Bfff")
+SETY_REQUEST = struct.Struct("<BBf")
+SETY_RESPONSE = struct.Struct("<Bfff")
+SETPOSITION_REQUEST = struct.Struct("<BBff")
+SETPOSITION_RESPONSE = struct.Struct("<Bfff")
+TOWARDS_REQUEST = struct.Struct("<BBff")
+TOWARDS_RESPONSE = struct.Struct("<Bfff")
+RESET_ORIGIN_REQUEST = struct.Struct("<BB")
+RESET_ORIGIN_RESPONSE = struct.Struct("<B")
+HEADING_REQUEST = struct.Struct("<BB")
+HEADING_RESPONSE = struct.Struct("<Bf")
+POSITION_REQUEST = struct.Struct("<BB")
+POSITION_RESPONSE = struct.Struct("<Bff")
+PENUP_REQUEST = struct.Struct("<BB")
+PENUP_RESPONSE = struct.Struct("<B")
+PENDOWN_REQUEST = struct.Struct("<BB")
+PENDOWN_RESPONSE = struct.Struct("<B")
+EYES_REQUEST = struct.Struct("<BBBBBB")
+EYES_RESPONSE = struct.Struct("<B")
+POWER_REQUEST = struct.Struct("<BB")
+POWER_RESPONSE = struct.Struct("<Blll")
+ISDOWN_REQUEST = struct.Struct("<BB")
+ISDOWN_RESPONSE = struct.Struct("<BB")
+SET_LINEAR_VELOCITY_REQUEST = struct.Struct("<BBll")
+SET_LINEAR_VELOCITY_RESPONSE = struct.Struct("<B")
+SET_ROTATIONAL_VELOCITY_REQUEST = struct.Struct("<BBll")
+SET_ROTATIONAL_VELOCITY_RESPONSE = struct.Struct("<B")
+GET_LINEAR_VELOCITY_REQUEST = struct.Struct("<BB")
+GET_LINEAR_VELOCITY_RESPONSE = struct.Struct("<Bll")
+GET_ROTATIONAL_VELOCITY_REQUEST = struct.Struct("<BB")
+GET_ROTATIONAL_VELOCITY_RESPONSE = struct.Struct("<Bll")
+SET_WHEEL_DIAMETER_CALIBRATION_REQUEST = struct.Struct("<BBi")
+SET_WHEEL_DIAMETER_CALIBRATION_RESPONSE = struct.Struct("<B")
+SET_AXEL_DISTANCE_CALIBRATION_REQUEST = struct.Struct("<BBi")
+SET_AXEL_DISTANCE_CALIBRATION_RESPONSE = struct.Struct("<B")
+GET_WHEEL_DIAMETER_CALIBRATION_REQUEST = struct.Struct("<BB")
+GET_WHEEL_DIAMETER_CALIBRATION_RESPONSE = struct.Struct("<Bi")
+GET_AXEL_DISTANCE_CALIBRATION_REQUEST = struct.Struct("<BB")
+GET_AXEL_DISTANCE_CALIBRATION_RESPONSE = struct.Struct("<Bi")
+SET_TURTLE_ID_REQUEST = struct.Struct("<BBB")
+SET_TURTLE_ID_RESPONSE = struct.Struct("<B")
+GET_TURTLE_ID_REQUEST = struct.Struct("<BB")
+GET_TURTLE_ID_RESPONSE = struct.Struct("<BB")
+LOAD_CONFIG_REQUEST = struct.Struct("<BB")
+LOAD_CONFIG_RESPONSE = struct.Struct("<B")
+SAVE_CONFIG_REQUEST = struct.Struct("<BB")
+SAVE_CONFIG_RESPONSE = struct.Struct("<B")
+RESET_CONFIG_REQUEST = struct.Struct("<BB")
+RESET_CONFIG_RESPONSE = struct.Struct("<B")
+PROGRAM_BEGIN_REQUEST = struct.Struct("<BBI")
+PROGRAM_BEGIN_RESPONSE = struct.Struct("<BB")
+PROGRAM_WRITE_REQUEST = struct.Struct("<BBHB15s")
+PROGRAM_WRITE_RESPONSE = struct.Struct("<BBH")
+PROGRAM_END_REQUEST = struct.Struct("<BBI")
+PROGRAM_END_RESPONSE = struct.Struct("<BBH")
+RUN_PROGRAM_REQUEST = struct.Struct("<BB")
+RUN_PROGRAM_RESPONSE = struct.Struct("<BBH")
+PROGRAM_STATUS_REQUEST = struct.Struct("<BB")
+PROGRAM_STATUS_RESPONSE = struct.Struct("<BBHH")
+STOP_PROGRAM_REQUEST = struct.Struct("<BB")
+STOP_PROGRAM_RESPONSE = struct.Struct("<B")
+LINK_PARAMETERS_REQUEST = struct.Struct("<BB")
+LINK_PARAMETERS_RESPONSE = struct.Struct("<BHHH")
+LINK_ROLE_REQUEST = struct.Struct("<BB")
+LINK_ROLE_RESPONSE = struct.Struct("<BB")
+
+# Commands that need the long response timeout
+LONG_TIMEOUT_COMMANDS = frozenset((
+    CMD_FORWARD,
+    CMD_BACKWARD,
+    CMD_LEFT,
+    CMD_RIGHT,
+    CMD_CIRCLE,
+    CMD_SETHEADING,
+    CMD_SETX,
+    CMD_SETY,
+    CMD_SETPOSITION,
+    CMD_TOWARDS,
+    CMD_POSITION,
+))
+
+COMMAND_NAMES = {
+    CMD_NOP: "nop",
+    CMD_MOTORS: "motors",
+    CMD_FORWARD: "forward",
+    CMD_BACKWARD: "backward",
+    CMD_LEFT: "left",
+    CMD_RIGHT: "right",
+    CMD_CIRCLE: "circle",
+    CMD_SETHEADING: "setheading",
+    CMD_SETX: "setx",
+    CMD_SETY: "sety",
+    CMD_SETPOSITION: "setposition",
+    CMD_TOWARDS: "towards",
+    CMD_RESET_ORIGIN: "reset_origin",
+    CMD_HEADING: "heading",
+    CMD_POSITION: "position",
+    CMD_PENUP: "penup",
+    CMD_PENDOWN: "pendown",
+    CMD_EYES: "eyes",
+    CMD_POWER: "power",
+    CMD_ISDOWN: "isdown",
+    CMD_SET_LINEAR_VELOCITY: "set_linear_velocity",
+    CMD_SET_ROTATIONAL_VELOCITY: "set_rotational_velocity",
+    CMD_GET_LINEAR_VELOCITY: "get_linear_velocity",
+    CMD_GET_ROTATIONAL_VELOCITY: "get_rotational_velocity",
+    CMD_SET_WHEEL_DIAMETER_CALIBRATION: "set_wheel_diameter_calibration",
+    CMD_SET_AXEL_DISTANCE_CALIBRATION: "set_axel_distance_calibration",
+    CMD_GET_WHEEL_DIAMETER_CALIBRATION: "get_wheel_diameter_calibration",
+    CMD_GET_AXEL_DISTANCE_CALIBRATION: "get_axel_distance_calibration",
+    CMD_SET_TURTLE_ID: "set_turtle_id",
+    CMD_GET_TURTLE_ID: "get_turtle_id",
+    CMD_LOAD_CONFIG: "load_config",
+    CMD_SAVE_CONFIG: "save_config",
+    CMD_RESET_CONFIG: "reset_config",
+    CMD_PROGRAM_BEGIN: "program_begin",
+    CMD_PROGRAM_WRITE: "program_write",
+    CMD_PROGRAM_END: "program_end",
+    CMD_RUN_PROGRAM: "run_program",
+    CMD_PROGRAM_STATUS: "program_status",
+    CMD_STOP_PROGRAM: "stop_program",
+    CMD_LINK_PARAMETERS: "link_parameters",
+    CMD_LINK_ROLE: "link_role",
+}
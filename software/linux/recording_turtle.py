@@ -0,0 +1,293 @@
+#************************************************************************
+#
+#   recording_turtle.py
+#
+#   Turtle that records a drawing as a display list
+#   Valiant Turtle 2 - Communicator Linux Firmware
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+import logging
+import math
+from abstract_turtle import TurtleInterface
+from display_list import DisplayList, Stroke, arc_end
+
+class RecordingTurtle(TurtleInterface):
+    """
+    A turtle that records a drawing as a display list of pen-down strokes rather
+    than drawing it.  The turtle's position and heading are tracked (as the robot
+    does), so any drawing can be recorded and then optimised and replayed:
+
+        recorder = RecordingTurtle()
+        Logotype(recorder, speed).render()
+        display_list = recorder.display_list().optimised()
+        display_list.replay(FloorTurtle(commands_tx, pipelined=True))
+
+    Pen-up moves, setheading() and towards() only move the tracked turtle; the
+    display list keeps just what is drawn.  Other commands (motors, eyes, speed...)
+    are kept with the stroke that follows them.  Queries that need the robot
+    (power, calibration...) return default values and log a warning.
+    """
+    def __init__(self):
+        self._x = 0.0
+        self._y = 0.0
+        self._heading = 0.0
+        self._origin = (0.0, 0.0, 0.0)  # Set by reset_origin()
+        self._down = False
+        self._display_list = DisplayList()
+        self._stroke = None
+        self._commands = []  # Commands waiting for the next stroke
+        self._moved_since_stroke = False
+
+    def display_list(self) -> DisplayList:
+        """Return the display list recorded so far"""
+        display_list = DisplayList()
+        display_list.prologue = list(self._display_list.prologue)
+        display_list.strokes = list(self._display_list.strokes)
+        if display_list.strokes:
+            display_list.epilogue = list(self._commands)
+        else:
+            display_list.prologue += self._commands
+
+        # A drawing that ends with the pen up somewhere else (out of the way, say) ends there
+        if self._moved_since_stroke:
+            display_list.park = (self._x, self._y, self._heading % 360)
+        return display_list
+
+    def __record(self, name: str, *args):
+        # Record a command for the next stroke (ending the current one)
+        self._stroke = None
+        self._commands.append((name, *args))
+
+    def __not_recordable(self, name: str):
+        logging.warning(f"RecordingTurtle::{name} - Queries cannot be recorded, returning defaults")
+
+    def __to_world(self, x: float, y: float) -> tuple[float, float]:
+        # Convert coordinates relative to the origin into coordinates relative to the start of the drawing
+        origin_x, origin_y, origin_heading = self._origin
+        radians = math.radians(origin_heading)
+        return (origin_x + x * math.cos(radians) - y * math.sin(radians),
+                origin_y + x * math.sin(radians) + y * math.cos(radians))
+
+    def __from_world(self, x: float, y: float) -> tuple[float, float]:
+        origin_x, origin_y, origin_heading = self._origin
+        radians = math.radians(origin_heading)
+        x, y = x - origin_x, y - origin_y
+        return x * math.cos(radians) + y * math.sin(radians), -x * math.sin(radians) + y * math.cos(radians)
+
+    def __stroke(self) -> Stroke:
+        # The stroke being drawn (starting one if the pen has just gone down)
+        if self._stroke is None:
+            if self._display_list.strokes:
+                self._stroke = Stroke(self._x, self._y, self._commands)
+            else:
+                self._display_list.prologue += self._commands
+                self._stroke = Stroke(self._x, self._y)
+            self._commands = []
+            self._display_list.strokes.append(self._stroke)
+        return self._stroke
+
+    def __line_to(self, x: float, y: float):
+        if self._down:
+            self.__stroke().line_to(x, y)
+            self._moved_since_stroke = False
+        elif (x, y) != (self._x, self._y):
+            self._moved_since_stroke = True
+        self._x, self._y = x, y
+
+    def connect(self):
+        pass
+
+    def disconnect(self):
+        pass
+
+    def motors(self, state: bool):
+        """Control the state of the motors."""
+        self.__record("motors", state)
+
+    def forward(self, distance: float):
+        """Move the turtle forward by a specified distance."""
+        radians = math.radians(self._heading)
+        self.__line_to(self._x + distance * math.cos(radians), self._y + distance * math.sin(radians))
+
+    def backward(self, distance: float):
+        """Move the turtle backward by a specified distance."""
+        self.forward(-distance)
+
+    def left(self, angle: float):
+        """Turn the turtle left by a specified angle."""
+        self._heading += angle
+
+    def right(self, angle: float):
+        """Turn the turtle right by a specified angle."""
+        self._heading -= angle
+
+    def circle(self, radius: float, extent: float=360, steps: int=None):
+        """Move the turtle in a circle with a specified radius and extent."""
+        if steps is None or extent != 360:
+            # A native circle command (as FloorTurtle sends)
+            if self._down:
+                self.__stroke().arc(self._heading, radius, extent)
+                self._moved_since_stroke = False
+            else:
+                self._moved_since_stroke = True
+            self._x, self._y, self._heading = arc_end(self._x, self._y, self._heading, radius, extent)
+        else:
+            # A polygon (as FloorTurtle draws it)
+            step_angle = 360 / steps
+            turn_direction = -1 if radius < 0 else 1
+            step_length = 2 * abs(radius) * math.sin(math.pi / steps)
+
+            self.left(step_angle / 2 * turn_direction)
+            for _ in range(steps):
+                self.forward(step_length)
+                self.left(turn_direction * step_angle)
+            self.right(step_angle / 2 * turn_direction)
+
+    def setheading(self, angle: float):
+        """Set the turtle's heading to a specified angle."""
+        self._heading = self._origin[2] + angle % 360
+
+    def setx(self, x: float):
+        """Set the turtle's x-coordinate."""
+        self.setposition(x, self.position()[1])
+
+    def sety(self, y: float):
+        """Set the turtle's y-coordinate."""
+        self.setposition(self.position()[0], y)
+
+    def setposition(self, x: float = None, y: float = None):
+        """Set the turtle's position to specified x and y coordinates."""
+        if isinstance(x, tuple) and len(x) == 2 and y is None:
+            # Handle the case where a single tuple (x, y) is passed
+            _x, _y = x  # Unpack the tuple
+        elif isinstance(x, (int, float)) and isinstance(y, (int, float)):
+            # Handle the case where x and y are passed as separate floats
+            _x, _y = x, y
+        else:
+            raise ValueError("Provide either two floats or a single tuple containing two floats.")
+
+        # The robot keeps its heading when moving to a position
+        self.__line_to(*self.__to_world(_x, _y))
+
+    def towards(self, x: float, y: float):
+        """Calculate the angle towards a specified position."""
+        world_x, world_y = self.__to_world(x, y)
+        if (world_x, world_y) != (self._x, self._y):
+            self._heading = math.degrees(math.atan2(world_y - self._y, world_x - self._x))
+
+    def reset_origin(self):
+        """Reset the turtle's origin."""
+        self._origin = (self._x, self._y, self._heading)
+
+    def heading(self) -> float:
+        """Get the turtle's current heading."""
+        return round((self._heading - self._origin[2]) % 360, 2)
+
+    def position(self) -> tuple[float, float]:
+        """Get the turtle's current position."""
+        x, y = self.__from_world(self._x, self._y)
+        return round(x, 2), round(y, 2)
+
+    def penup(self):
+        """Lift the pen up."""
+        self._down = False
+        self._stroke = None
+
+    def pendown(self):
+        """Put the pen down."""
+        self._down = True
+
+    def eyes(self, eye: int, red: int, green: int, blue: int):
+        """Set the color of the turtle's eyes."""
+        if eye < 0 or eye > 2:
+            raise ValueError("Eye value must be between 0 and 2")
+        self.__record("eyes", eye, red, green, blue)
+
+    def power(self) -> tuple[int, int, int]:
+        """Returns the power state of the turtle."""
+        self.__not_recordable("power")
+        return 0, 0, 0
+
+    def isdown(self) -> bool:
+        """Check if the pen is down."""
+        return self._down
+
+    def set_linear_velocity(self, target_speed: int, acceleration: int):
+        """Set the turtle's linear velocity."""
+        self.__record("set_linear_velocity", target_speed, acceleration)
+
+    def set_rotational_velocity(self, target_speed: int, acceleration: int):
+        """Set the turtle's rotational velocity."""
+        self.__record("set_rotational_velocity", target_speed, acceleration)
+
+    def get_linear_velocity(self) -> tuple[int, int]:
+        """Get the turtle's current linear velocity."""
+        self.__not_recordable("get_linear_velocity")
+        return 0, 0
+
+    def get_rotational_velocity(self) -> tuple[int, int]:
+        """Get the turtle's current rotational velocity."""
+        self.__not_recordable("get_rotational_velocity")
+        return 0, 0
+
+    def set_wheel_diameter_calibration(self, diameter: int):
+        """Set the calibration for the wheel diameter."""
+        self.__record("set_wheel_diameter_calibration", diameter)
+
+    def set_axel_distance_calibration(self, distance: int):
+        """Set the calibration for the axel distance."""
+        self.__record("set_axel_distance_calibration", distance)
+
+    def get_wheel_diameter_calibration(self) -> int:
+        """Get the current wheel diameter calibration."""
+        self.__not_recordable("get_wheel_diameter_calibration")
+        return 0
+
+    def get_axel_distance_calibration(self) -> int:
+        """Get the current axel distance calibration."""
+        self.__not_recordable("get_axel_distance_calibration")
+        return 0
+
+    def set_turtle_id(self, turtle_id: int):
+        """Set the turtle's ID."""
+        self.__record("set_turtle_id", turtle_id)
+
+    def get_turtle_id(self) -> int:
+        """Get the turtle's ID."""
+        self.__not_recordable("get_turtle_id")
+        return 0
+
+    def load_config(self):
+        """Load the turtle's configuration."""
+        self.__record("load_config")
+
+    def save_config(self):
+        """Save the turtle's configuration."""
+        self.__record("save_config")
+
+    def reset_config(self):
+        """Reset the turtle's configuration to default."""
+        self.__record("reset_config")
+
+    def speed(self, speed):
+        """Set the turtle's speed."""
+        self.__record("speed", speed)
@@ -0,0 +1,133 @@
+#************************************************************************
+#
+#   ring_buffer.py
+#
+#   Preallocated ring buffer queue
+#   Valiant Turtle 2 - Library class
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+class RingBuffer:
+    """
+    A fixed capacity FIFO queue of fixed size slots (such as 20 byte BLE packets)
+    held in a single preallocated bytearray.  push() copies a packet into the next
+    free slot and pop() returns a memoryview of the oldest slot, so no memory is
+    allocated once the queue has been created.
+
+    There is one more slot than the capacity, so the slot returned by pop() is not
+    overwritten until pop() is called again (even if the queue is filled up in
+    the meantime).  The high water mark and the number of dropped packets are
+    kept so queue sizes can be tuned.
+    """
+    def __init__(self, capacity: int, slot_size: int = 20):
+        self._capacity = capacity
+        self._slot_size = slot_size
+        self._slot_count = capacity + 1
+        self._buffer = bytearray(self._slot_count * slot_size)
+        buffer_view = memoryview(self._buffer)
+        self._slots = [buffer_view[i * slot_size:(i + 1) * slot_size] for i in range(self._slot_count)]
+
+        # Zeros used to pad packets shorter than a slot
+        self._padding = memoryview(bytes(slot_size))
+        self._head = 0
+        self._length = 0
+
+        # Statistics
+        self._high_water_mark = 0
+        self._dropped = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __contains__(self, data) -> bool:
+        # True if a queued packet matches data
+        for i in range(self._length):
+            slot = self._slots[(self._head + i) % self._slot_count]
+            if self.__matches(slot, data):
+                return True
+        return False
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def is_full(self) -> bool:
+        return self._length == self._capacity
+
+    @property
+    def high_water_mark(self) -> int:
+        return self._high_water_mark
+
+    @property
+    def dropped(self) -> int:
+        return self._dropped
+
+    def reset_stats(self):
+        self._high_water_mark = self._length
+        self._dropped = 0
+
+    def clear(self):
+        self._head = 0
+        self._length = 0
+
+    def push(self, data) -> bool:
+        """Copy data into the next free slot (zero padded). Returns False (and drops the data) if the queue is full"""
+        if self._length == self._capacity:
+            self._dropped += 1
+            return False
+
+        slot = self._slots[(self._head + self._length) % self._slot_count]
+        length = len(data)
+        if length >= self._slot_size:
+            slot[:] = data if length == self._slot_size else data[:self._slot_size]
+        else:
+            slot[:length] = data
+            slot[length:] = self._padding[length:]
+
+        self._length += 1
+        if self._length > self._high_water_mark:
+            self._high_water_mark = self._length
+        return True
+
+    def peek(self):
+        """Return a memoryview of the oldest slot without removing it (or None if the queue is empty)"""
+        if self._length == 0:
+            return None
+        return self._slots[self._head]
+
+    def pop(self):
+        """Remove the oldest slot and return a memoryview of it (or None if the queue is empty)"""
+        if self._length == 0:
+            return None
+
+        slot = self._slots[self._head]
+        self._head = (self._head + 1) % self._slot_count
+        self._length -= 1
+        return slot
+
+    def __matches(self, slot, data) -> bool:
+        if len(data) > self._slot_size:
+            return False
+        for i in range(self._slot_size):
+            if slot[i] != (data[i] if i < len(data) else 0):
+                return False
+        return True
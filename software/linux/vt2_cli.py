@@ -27,6 +27,7 @@
 
 import logging
 from commands_tx import CommandsTx
+from logo_compiler import LogoCompiler, LogoError
 import sys
 import time
 import cmd
@@ -44,9 +45,16 @@ class ValiantTurtleCLI(cmd.Cmd):
         pass
 
     def do_connect(self, arg):
-        'Connect to the BLE device: connect'
+        'Connect to the BLE device (optionally the robot with a turtle ID): connect [turtle_id]'
         if not self._connected:
-            self._commands_tx.connect()
+            turtle_id = None
+            if arg:
+                try:
+                    turtle_id = int(arg)
+                except ValueError:
+                    print("Invalid argument. Please enter a turtle ID.")
+                    return
+            self._commands_tx.connect(turtle_id)
             logging.info("Waiting for BLE connection...")
             while not self._commands_tx.connected:
                 time.sleep(1)
@@ -56,6 +64,17 @@ class ValiantTurtleCLI(cmd.Cmd):
         else:
             print("Cannot connect as BLE is already connected.")
 
+    def do_scan(self, arg):
+        'Scan for robots and show their advertised status: scan'
+        robots = self._commands_tx.scan()
+        if not robots:
+            print("No robots found.")
+        for robot in robots:
+            status = "connected" if robot["connected"] else "busy" if robot["busy"] else "idle"
+            power = " (power low)" if robot["power_low"] else ""
+            print(f"Turtle {robot['turtle_id']}: {robot['address']}, {robot['voltage_mv']}mV{power}, {status}, RSSI {robot['rssi']}dBm")
+        logging.info("CLI: Scan")
+
     def do_disconnect(self, arg):
         'Disconnect from the BLE device: disconnect'
         if self._connected:
@@ -499,6 +518,84 @@ class ValiantTurtleCLI(cmd.Cmd):
         else:
             print("Not connected to BLE device.")
 
+    def do_logo(self, arg):
+        'Compile a Logo program, upload it and run it on the robot: logo [filename]'
+        if self._connected:
+            try:
+                with open(arg) as f:
+                    image = LogoCompiler().compile(f.read())
+            except OSError as e:
+                print(f"Unable to read {arg} - {e}")
+                return
+            except LogoError as e:
+                print(f"Logo error - {e}")
+                return
+
+            print(f"Uploading program ({len(image)} bytes)...")
+            if not self._commands_tx.upload_program(image):
+                print("Program upload failed.")
+                return
+
+            success, code_size = self._commands_tx.run_program()
+            if not success:
+                print("Robot could not run the program.")
+                return
+
+            # Wait for the program to finish (states as reported by the robot)
+            states = {0: "idle", 1: "running", 2: "complete", 3: "stopped", 4: "failed"}
+            state = 1
+            while state == 1:
+                time.sleep(1)
+                success, state, position, code_size = self._commands_tx.program_status()
+                if not success:
+                    print("Lost contact with the robot (the program continues to run).")
+                    break
+            print(f"Program {states.get(state, 'unknown')} at address {position} of {code_size}")
+            logging.info("CLI: Logo")
+        else:
+            print("Not connected to BLE device.")
+
+    def do_stop_program(self, arg):
+        'Stop the program running on the robot: stop_program'
+        if self._connected:
+            self._commands_tx.stop_program()
+            logging.info("CLI: Stop Program")
+        else:
+            print("Not connected to BLE device.")
+
+    def do_link(self, arg):
+        'Get the BLE connection parameters, or choose the parameters for the next connection: link [low_latency|relaxed]'
+        if arg:
+            if arg not in ("low_latency", "relaxed"):
+                print("Invalid argument. Please enter low_latency or relaxed.")
+                return
+            self._commands_tx.low_latency = arg == "low_latency"
+            print(f"The {arg} connection parameters will be requested on the next connection.")
+        elif self._connected:
+            success, interval_ms, latency, supervision_timeout_ms = self._commands_tx.link_parameters()
+            if success:
+                if interval_ms == 0:
+                    print("The connection parameters have not been reported by the robot yet.")
+                else:
+                    print(f"Connection interval: {interval_ms}ms, latency: {latency}, supervision timeout: {supervision_timeout_ms}ms")
+                success, role = self._commands_tx.link_role()
+                if success:
+                    print(f"Role: {'monitor (read-only)' if role == 1 else 'controller'}")
+            else:
+                print("Failed to get the connection parameters.")
+            logging.info("CLI: Link")
+        else:
+            print("Not connected to BLE device.")
+
+    def do_stats(self, arg):
+        'Show the BLE link quality statistics (RSSI, round trip times, retries and queue usage): stats'
+        if self._connected:
+            for name, value in self._commands_tx.link_stats().items():
+                print(f"{name}: {'-' if value is None else value}")
+            logging.info("CLI: Stats")
+        else:
+            print("Not connected to BLE device.")
+
 def main():
     # Configure the logging module
     log_format = "[%(asctime)s %(filename)s::%(funcName)s():%(lineno)s]%(levelname)s: %(message)s"
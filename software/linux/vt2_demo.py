@@ -27,6 +27,7 @@
 
 import logging
 import argparse
+import time
 from abstract_turtle import TurtleInterface
 from floor_turtle import FloorTurtle
 from screen_turtle import ScreenTurtle
@@ -34,6 +35,43 @@ from commands_tx import CommandsTx
 from cat import Cat
 from logotype import Logotype
 from calitest import Calitest1, Calitest2
+from program_compiler import ProgramCompiler
+from recording_turtle import RecordingTurtle
+from arc_fitter import ArcFitter
+from artwork_import import Artwork, ArtworkError
+
+def play_program(compiler: ProgramCompiler):
+    """Upload a compiled drawing to the robot and play it back locally, reporting progress"""
+    commands_tx = CommandsTx()
+    commands_tx.connect()
+    while not commands_tx.connected:
+        time.sleep(1)
+
+    image = compiler.image()
+    print(f"Uploading program ({compiler.record_count} commands, {len(image)} bytes)...")
+    if not commands_tx.upload_program(image):
+        print("Program upload failed.")
+        commands_tx.disconnect()
+        return
+
+    success, record_count = commands_tx.run_program()
+    if not success:
+        print("Robot could not run the program.")
+        commands_tx.disconnect()
+        return
+
+    # Program states (as reported by the robot)
+    states = {0: "idle", 1: "running", 2: "complete", 3: "stopped", 4: "failed"}
+    state = 1
+    while state == 1:
+        time.sleep(1)
+        success, state, position, record_count = commands_tx.program_status()
+        if not success:
+            print("Lost contact with the robot (the program continues to run).")
+            break
+        print(f"Program {states.get(state, 'unknown')}: {position} of {record_count} commands")
+
+    commands_tx.disconnect()
 
 def main():
      # Configure the logging module
@@ -44,9 +82,9 @@ def main():
     parser = argparse.ArgumentParser(description="Choose turtle mode and shape.")
     parser.add_argument(
         "-m", "--mode",
-        choices=["screen", "floor"],
+        choices=["screen", "floor", "program"],
         default="screen",
-        help="Choose between 'screen' for the on-screen turtle or 'floor' for the physical robot. Default is 'screen'."
+        help="Choose between 'screen' for the on-screen turtle, 'floor' for the physical robot or 'program' to upload the drawing and play it back on the robot. Default is 'screen'."
     )
     parser.add_argument(
         "-d", "--drawing",
@@ -61,6 +99,25 @@ def main():
         default=6,
         help="Choose the speed of the turtle (0-9). Default is 6."
     )
+    parser.add_argument(
+        "-p", "--pipelined",
+        action="store_true",
+        help="In 'floor' mode, send the drawing's commands without waiting for each one to finish (keeps the robot's queue topped up)."
+    )
+    parser.add_argument(
+        "-o", "--optimise",
+        action="store_true",
+        help="Record the drawing first and reorder its strokes to cut down the pen-up travel before drawing it."
+    )
+    parser.add_argument(
+        "-a", "--arcs",
+        action="store_true",
+        help="Record the drawing first and replace runs of short lines with native circle commands before drawing it."
+    )
+    parser.add_argument(
+        "-f", "--file",
+        help="Draw an SVG or G-code file (scaled to fit A1 paper) instead of one of the built-in drawings."
+    )
     args = parser.parse_args()
     mode = args.mode
     drawing = args.drawing
@@ -75,12 +132,30 @@ def main():
         turtle_object = ScreenTurtle()
     elif mode == "floor":
         commands_tx = CommandsTx()
-        turtle_object = FloorTurtle(commands_tx)
+        turtle_object = FloorTurtle(commands_tx, args.pipelined)
+    elif mode == "program":
+        compiler = ProgramCompiler()
+        turtle_object = FloorTurtle(compiler)
     else:
-        print("Unsupported mode. Please choose 'screen' or 'floor'.")
+        print("Unsupported mode. Please choose 'screen', 'floor' or 'program'.")
         return
 
-    if drawing == "cat":
+    # When optimising or fitting arcs, the drawing is recorded and then replayed to the turtle
+    recording = args.optimise or args.arcs
+    if recording:
+        recorder = RecordingTurtle()
+        output_turtle = turtle_object
+        turtle_object = recorder
+
+    if args.file is not None:
+        # Draw the artwork from the file
+        artwork = Artwork(turtle_object, speed, args.file)
+        try:
+            artwork.render()
+        except (ArtworkError, OSError) as e:
+            print(f"Unable to draw {args.file}: {e}")
+            return
+    elif drawing == "cat":
         # Draw the cat
         cat = Cat(turtle_object, speed)
         cat.render()
@@ -100,9 +175,28 @@ def main():
         print("Unsupported drawing. Please choose 'cat' or 'logotype'.")
         return
 
+    if recording:
+        display_list = recorder.display_list()
+        if args.arcs:
+            fitted = ArcFitter().fit(display_list)
+            before, after = display_list.stats(), fitted.stats()
+            print(f"Fitted {after['arcs'] - before['arcs']} arcs, {before['segments']} segments -> {after['segments']}")
+            display_list = fitted
+        if args.optimise:
+            optimised = display_list.optimised()
+            before, after = display_list.stats(), optimised.stats()
+            print(f"Optimised {before['strokes']} strokes into {after['strokes']}, pen-up travel {before['travel_mm']} mm -> {after['travel_mm']} mm")
+            display_list = optimised
+        turtle_object = output_turtle
+        display_list.replay(turtle_object)
+
     # If we are in screen mode, run the main loop to keep the window open
     if mode == "screen":
         turtle_object.screen.mainloop()
 
+    # If we are in program mode, the drawing has been compiled - send it to the robot
+    if mode == "program":
+        play_program(compiler)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
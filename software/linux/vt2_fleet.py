@@ -0,0 +1,97 @@
+#************************************************************************
+#
+#   vt2_fleet.py
+#
+#   Fleet demonstration (several robots drawing together)
+#   Valiant Turtle 2 - Communicator Linux Firmware
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+import argparse
+import asyncio
+import logging
+from fleet import Fleet
+
+# Eye colours given to the robots (in turtle ID order)
+COLOURS = [(255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 0), (0, 255, 255), (255, 0, 255), (255, 255, 255), (255, 128, 0)]
+
+async def draw_squares(fleet: Fleet, size: float):
+    """
+    Each robot draws a square, turning in the opposite direction to its neighbour.
+    The robots wait for each other at the end of every side.
+    """
+    programs = {}
+    for index, turtle_id in enumerate(fleet.turtle_ids):
+        turn = "left" if index % 2 == 0 else "right"
+        red, green, blue = COLOURS[index % len(COLOURS)]
+        program = [("eyes", 0, red, green, blue), ("pendown",)]
+        for _ in range(4):
+            program += [("forward", size), (turn, 90), Fleet.SYNC]
+        program += [("penup",), ("eyes", 0, 0, 0, 0)]
+        programs[turtle_id] = program
+
+    results = await fleet.choreograph(programs)
+    for turtle_id, succeeded in results.items():
+        print(f"Turtle {turtle_id}: {'complete' if succeeded else 'failed'}")
+
+async def run(turtle_ids: list[int], size: float):
+    fleet = Fleet()
+    print("Connecting...")
+    connected = await fleet.connect(turtle_ids)
+    if not connected:
+        print("No robots connected.")
+        return
+    print(f"Connected to turtle IDs {connected}")
+
+    try:
+        await fleet.broadcast("motors", True)
+        await draw_squares(fleet, size)
+        await fleet.broadcast("motors", False)
+
+        stats = fleet.stats()
+        print(f"{stats['commands']} commands to {stats['robots']} robots in {stats['elapsed_s']} s ({stats['commands_per_s']} commands/s, {stats['retransmissions']} retransmissions, {stats['timeouts']} timeouts)")
+    finally:
+        await fleet.disconnect()
+
+def main():
+    # Configure the logging module
+    log_format = "[%(asctime)s %(filename)s::%(funcName)s():%(lineno)s]%(levelname)s: %(message)s"
+    logging.basicConfig(level=logging.INFO, format=log_format, filename="vt2_fleet.log")
+
+    parser = argparse.ArgumentParser(description="Drive several Valiant Turtle 2 robots at once.")
+    parser.add_argument(
+        "-t", "--turtles",
+        type=int,
+        nargs="+",
+        help="Turtle IDs of the robots to use. Default is every robot in range."
+    )
+    parser.add_argument(
+        "-s", "--size",
+        type=float,
+        default=200,
+        help="Length of the sides of the squares in mm. Default is 200."
+    )
+    args = parser.parse_args()
+
+    asyncio.run(run(args.turtles, args.size))
+
+if __name__ == "__main__":
+    main()
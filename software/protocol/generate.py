@@ -0,0 +1,328 @@
+#************************************************************************
+#
+#   generate.py
+#
+#   Generate the protocol modules from the protocol schema
+#   Valiant Turtle 2 - Protocol
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+# Usage: python3 generate.py
+#
+# Writes protocol.py into the robot, communicator and linux directories.  The
+# robot and communicator run MicroPython (which has no struct.Struct) so they
+# get format strings; the Linux host gets precompiled struct.Struct objects.
+
+import os
+import struct
+import sys
+
+from schema import COMMANDS, SERIAL_COMMANDS, PACKET_LENGTH, QUEUE_DEPTH_OFFSET, CREDIT_LIMIT_OFFSET, LONG
+from schema import COMMANDS_RX, CONTROL, LINK
+from schema import L2CAP_PSM, L2CAP_MTU, BULK_MAGIC, BULK_HEADER, BULK_PROGRAM_UPLOAD, BULK_PROGRAM_DOWNLOAD
+from schema import MOTION_ACK_MARKER, MOTION_ACK
+from schema import REFUSED_MARKER, REFUSED, REFUSED_PROGRAM_RUNNING, REFUSED_NOT_CONTROLLER
+from schema import SESSION_MARKER, SESSION
+from schema import ADVERTISING_COMPANY_ID, ADVERTISING_STATUS, ADVERTISING_FLAG_CONNECTED, ADVERTISING_FLAG_BUSY, ADVERTISING_FLAG_POWER_LOW
+
+_HEADER = """#************************************************************************
+#
+#   protocol.py
+#
+#   Command protocol definitions ({target})
+#   Valiant Turtle 2 - {project}
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+# Note: This file is generated from protocol/schema.py by protocol/generate.py
+# - do not edit it by hand.
+"""
+
+def _format(fields: list) -> str:
+    return "".join(field_format for _, field_format in fields)
+
+def _request_format(command) -> str:
+    return "<BB" + _format(command.request)
+
+def _response_format(command) -> str:
+    return "<B" + _format(command.response)
+
+def _check_schema():
+    command_ids = set()
+    names = set()
+    for command in COMMANDS:
+        if command.command_id in command_ids or command.name in names:
+            sys.exit(f"Duplicate command {command.command_id} {command.name}")
+        command_ids.add(command.command_id)
+        names.add(command.name)
+
+        if command.handler not in (COMMANDS_RX, CONTROL, LINK):
+            sys.exit(f"Command {command.name} has an unknown handler {command.handler}")
+
+        if struct.calcsize(_request_format(command)) > PACKET_LENGTH:
+            sys.exit(f"Command {command.name} request {_request_format(command)} is longer than {PACKET_LENGTH} bytes")
+
+        # Responses must leave room for the flow control bytes
+        if struct.calcsize(_response_format(command)) > QUEUE_DEPTH_OFFSET:
+            sys.exit(f"Command {command.name} response {_response_format(command)} is longer than {QUEUE_DEPTH_OFFSET} bytes")
+
+    if struct.calcsize(MOTION_ACK) > QUEUE_DEPTH_OFFSET:
+        sys.exit(f"Motion acknowledgement {MOTION_ACK} is longer than {QUEUE_DEPTH_OFFSET} bytes")
+
+    if struct.calcsize(REFUSED) > QUEUE_DEPTH_OFFSET:
+        sys.exit(f"Refusal {REFUSED} is longer than {QUEUE_DEPTH_OFFSET} bytes")
+
+    if struct.calcsize(SESSION) > PACKET_LENGTH:
+        sys.exit(f"Session {SESSION} is longer than {PACKET_LENGTH} bytes")
+
+    serial_ids = set()
+    for serial_command in SERIAL_COMMANDS:
+        if serial_command.serial_id in serial_ids:
+            sys.exit(f"Duplicate serial command {serial_command.serial_id}")
+        serial_ids.add(serial_command.serial_id)
+
+        command = _command(serial_command.command)
+        if len(command.request) > 4:
+            sys.exit(f"Serial command {serial_command.name} has more than 4 parameters")
+        if serial_command.response_field is not None and serial_command.response_field not in [name for name, _ in command.response]:
+            sys.exit(f"Serial command {serial_command.name} response field {serial_command.response_field} is not in {command.name}")
+
+def _command(name: str):
+    for command in COMMANDS:
+        if command.name == name:
+            return command
+    sys.exit(f"Unknown command {name}")
+
+def _constant(prefix: str, name: str) -> str:
+    return prefix + name.upper()
+
+def _micropython_module(target: str, project: str, serial: bool, dispatch: bool) -> str:
+    lines = [_HEADER.format(target=target, project=project)]
+    lines.append("from micropython import const")
+    lines.append("")
+    lines.append(f"PACKET_LENGTH = const({PACKET_LENGTH})")
+    lines.append("")
+    lines.append("# Flow control bytes in packets sent by the robot")
+    lines.append(f"QUEUE_DEPTH_OFFSET = const({QUEUE_DEPTH_OFFSET})")
+    lines.append(f"CREDIT_LIMIT_OFFSET = const({CREDIT_LIMIT_OFFSET})")
+    lines.append("")
+    lines.append("# Bulk transfer channel")
+    lines.append(f"L2CAP_PSM = const({L2CAP_PSM})")
+    lines.append(f"L2CAP_MTU = const({L2CAP_MTU})")
+    lines.append(f"BULK_MAGIC = const({BULK_MAGIC})")
+    lines.append(f"BULK_HEADER = \"{BULK_HEADER}\"")
+    lines.append(f"BULK_PROGRAM_UPLOAD = const({BULK_PROGRAM_UPLOAD})")
+    lines.append(f"BULK_PROGRAM_DOWNLOAD = const({BULK_PROGRAM_DOWNLOAD})")
+    lines.append("")
+    lines.append("# Motion acknowledgement (sent before the response when a motion starts)")
+    lines.append(f"MOTION_ACK_MARKER = const({MOTION_ACK_MARKER})")
+    lines.append(f"MOTION_ACK = \"{MOTION_ACK}\"")
+    lines.append("")
+    lines.append("# Refusal (sent in place of the response when a command can't be processed)")
+    lines.append(f"REFUSED_MARKER = const({REFUSED_MARKER})")
+    lines.append(f"REFUSED = \"{REFUSED}\"")
+    lines.append(f"REFUSED_PROGRAM_RUNNING = const({REFUSED_PROGRAM_RUNNING})")
+    lines.append(f"REFUSED_NOT_CONTROLLER = const({REFUSED_NOT_CONTROLLER})")
+    lines.append("")
+    lines.append("# Session (written by central when it connects, before any commands)")
+    lines.append(f"SESSION_MARKER = const({SESSION_MARKER})")
+    lines.append(f"SESSION = \"{SESSION}\"")
+    lines.append("")
+    lines.append("# Status carried in the advertising manufacturer data")
+    lines.append(f"ADVERTISING_COMPANY_ID = const({ADVERTISING_COMPANY_ID})")
+    lines.append(f"ADVERTISING_STATUS = \"{ADVERTISING_STATUS}\"")
+    lines.append(f"ADVERTISING_FLAG_CONNECTED = const({ADVERTISING_FLAG_CONNECTED})")
+    lines.append(f"ADVERTISING_FLAG_BUSY = const({ADVERTISING_FLAG_BUSY})")
+    lines.append(f"ADVERTISING_FLAG_POWER_LOW = const({ADVERTISING_FLAG_POWER_LOW})")
+    lines.append("")
+
+    lines.append("# Command IDs")
+    for command in COMMANDS:
+        lines.append(f"{_constant('CMD_', command.name)} = const({command.command_id}) # {command.description}")
+    lines.append("")
+
+    lines.append("# Packet formats (requests include the sequence number and command ID,")
+    lines.append("# responses include the sequence number)")
+    for command in COMMANDS[1:]:
+        lines.append(f"{command.name.upper()}_REQUEST = \"{_request_format(command)}\"")
+        lines.append(f"{command.name.upper()}_RESPONSE = \"{_response_format(command)}\"")
+    lines.append("")
+
+    lines.append("# Request parameter formats (unpacked from offset 2 of a command packet)")
+    lines.append("REQUEST_PARAMETERS = {")
+    for command in COMMANDS[1:]:
+        lines.append(f"    {_constant('CMD_', command.name)}: \"<{_format(command.request)}\",")
+    lines.append("}")
+    lines.append("")
+
+    lines.append("# Response formats and the number of padding bytes needed to fill a packet")
+    lines.append("RESPONSE_FORMATS = {")
+    for command in COMMANDS[1:]:
+        lines.append(f"    {_constant('CMD_', command.name)}: {command.name.upper()}_RESPONSE,")
+    lines.append("}")
+    lines.append("RESPONSE_PADDING = {")
+    for command in COMMANDS[1:]:
+        lines.append(f"    {_constant('CMD_', command.name)}: {PACKET_LENGTH - struct.calcsize(_response_format(command))},")
+    lines.append("}")
+    lines.append("")
+
+    if dispatch:
+        lines.append("# Command handler owners (see HANDLERS)")
+        lines.append("HANDLER_COMMANDS_RX = const(0)")
+        lines.append("HANDLER_CONTROL = const(1)")
+        lines.append("HANDLER_LINK = const(2)")
+        lines.append("")
+        lines.append("# Command ID -> (handler owner, handler name).  Handlers are called with the")
+        lines.append("# request parameters (link handlers are passed the link first)")
+        lines.append("HANDLERS = {")
+        for command in COMMANDS[1:]:
+            if command.handler == COMMANDS_RX:
+                owner, name = "HANDLER_COMMANDS_RX", command.name
+            elif command.handler == CONTROL:
+                owner, name = "HANDLER_CONTROL", "_" + command.name
+            else:
+                owner, name = "HANDLER_LINK", "_" + command.name
+            lines.append(f"    {_constant('CMD_', command.name)}: ({owner}, \"{name}\"),")
+        lines.append("}")
+        lines.append("")
+
+    if serial:
+        lines.append("# Serial command IDs (from the BBC Micro)")
+        for serial_command in SERIAL_COMMANDS:
+            lines.append(f"{_constant('SERIAL_', serial_command.name)} = const({serial_command.serial_id})")
+        lines.append("")
+        lines.append("# Serial command ID -> (command name, parameter count, response field index (or -1), inverted)")
+        lines.append("SERIAL_COMMANDS = {")
+        for serial_command in SERIAL_COMMANDS:
+            command = _command(serial_command.command)
+            field_index = -1
+            if serial_command.response_field is not None:
+                field_index = [name for name, _ in command.response].index(serial_command.response_field)
+            lines.append(f"    {_constant('SERIAL_', serial_command.name)}: (\"{command.name}\", {len(command.request)}, {field_index}, {serial_command.inverted}),")
+        lines.append("}")
+        lines.append("")
+
+    return "\n".join(lines)
+
+def _python_module(target: str, project: str) -> str:
+    lines = [_HEADER.format(target=target, project=project)]
+    lines.append("import struct")
+    lines.append("")
+    lines.append(f"PACKET_LENGTH = {PACKET_LENGTH}")
+    lines.append("")
+    lines.append("# Flow control bytes in packets sent by the robot")
+    lines.append(f"QUEUE_DEPTH_OFFSET = {QUEUE_DEPTH_OFFSET}")
+    lines.append(f"CREDIT_LIMIT_OFFSET = {CREDIT_LIMIT_OFFSET}")
+    lines.append("")
+    lines.append("# Bulk transfer channel")
+    lines.append(f"L2CAP_PSM = {L2CAP_PSM}")
+    lines.append(f"L2CAP_MTU = {L2CAP_MTU}")
+    lines.append(f"BULK_MAGIC = {BULK_MAGIC}")
+    lines.append(f"BULK_HEADER = struct.Struct(\"{BULK_HEADER}\")")
+    lines.append(f"BULK_PROGRAM_UPLOAD = {BULK_PROGRAM_UPLOAD}")
+    lines.append(f"BULK_PROGRAM_DOWNLOAD = {BULK_PROGRAM_DOWNLOAD}")
+    lines.append("")
+    lines.append("# Motion acknowledgement (sent before the response when a motion starts)")
+    lines.append(f"MOTION_ACK_MARKER = {MOTION_ACK_MARKER}")
+    lines.append(f"MOTION_ACK = struct.Struct(\"{MOTION_ACK}\")")
+    lines.append("")
+    lines.append("# Refusal (sent in place of the response when a command can't be processed)")
+    lines.append(f"REFUSED_MARKER = {REFUSED_MARKER}")
+    lines.append(f"REFUSED = struct.Struct(\"{REFUSED}\")")
+    lines.append(f"REFUSED_PROGRAM_RUNNING = {REFUSED_PROGRAM_RUNNING}")
+    lines.append(f"REFUSED_NOT_CONTROLLER = {REFUSED_NOT_CONTROLLER}")
+    lines.append("")
+    lines.append("# Session (written by central when it connects, before any commands)")
+    lines.append(f"SESSION_MARKER = {SESSION_MARKER}")
+    lines.append(f"SESSION = struct.Struct(\"{SESSION}\")")
+    lines.append("")
+    lines.append("# Status carried in the advertising manufacturer data")
+    lines.append(f"ADVERTISING_COMPANY_ID = {ADVERTISING_COMPANY_ID}")
+    lines.append(f"ADVERTISING_STATUS = struct.Struct(\"{ADVERTISING_STATUS}\")")
+    lines.append(f"ADVERTISING_FLAG_CONNECTED = {ADVERTISING_FLAG_CONNECTED}")
+    lines.append(f"ADVERTISING_FLAG_BUSY = {ADVERTISING_FLAG_BUSY}")
+    lines.append(f"ADVERTISING_FLAG_POWER_LOW = {ADVERTISING_FLAG_POWER_LOW}")
+    lines.append("")
+
+    lines.append("# Command IDs")
+    for command in COMMANDS:
+        lines.append(f"{_constant('CMD_', command.name)} = {command.command_id} # {command.description}")
+    lines.append("")
+
+    lines.append("# Precompiled packet formats (requests include the sequence number and command ID,")
+    lines.append("# responses include the sequence number)")
+    for command in COMMANDS[1:]:
+        lines.append(f"{command.name.upper()}_REQUEST = struct.Struct(\"{_request_format(command)}\")")
+        lines.append(f"{command.name.upper()}_RESPONSE = struct.Struct(\"{_response_format(command)}\")")
+    lines.append("")
+
+    lines.append("# Commands that need the long response timeout")
+    lines.append("LONG_TIMEOUT_COMMANDS = frozenset((")
+    for command in COMMANDS:
+        if command.timeout == LONG:
+            lines.append(f"    {_constant('CMD_', command.name)},")
+    lines.append("))")
+    lines.append("")
+
+    lines.append("COMMAND_NAMES = {")
+    for command in COMMANDS:
+        lines.append(f"    {_constant('CMD_', command.name)}: \"{command.name}\",")
+    lines.append("}")
+    lines.append("")
+
+    return "\n".join(lines)
+
+def main():
+    _check_schema()
+
+    software_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    modules = {
+        "robot": _micropython_module("robot", "Robot firmware", False, True),
+        "communicator": _micropython_module("communicator", "Communicator firmware", True, False),
+        "linux": _python_module("Linux host", "Communicator Linux Firmware"),
+    }
+
+    for directory, source in modules.items():
+        filename = os.path.join(software_dir, directory, "protocol.py")
+        with open(filename, "w") as f:
+            f.write(source)
+        print(f"Generated {filename}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+#************************************************************************
+#
+#   schema.py
+#
+#   Valiant Turtle 2 command protocol definition
+#   Valiant Turtle 2 - Protocol
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+# This is the single definition of the commands understood by the robot.  After
+# changing it run generate.py to regenerate protocol.py for the robot, the
+# communicator and the Linux host software.  The robot's dispatch table is
+# generated too, but a new command still needs its robot handler and a method in
+# the host's AsyncCommandsTx (these check their arguments and convert the
+# results, so they are written by hand).
+#
+# Every BLE packet is 20 bytes.  A command packet is the sequence number, the
+# command ID and then the request fields; a response packet is the sequence
+# number followed by the response fields.  Field types are struct format
+# characters and all values are little-endian.
+
+# Maximum packet length (BLE characteristic length)
+PACKET_LENGTH = 20
+
+# The last two bytes of every packet sent by the robot are used for flow control:
+# the number of commands waiting in the robot's queue and the credit limit.  The
+# credit limit is the (modulo 256) count of commands the central may have sent
+# in total; central can send another command whilst its own count is below it
+QUEUE_DEPTH_OFFSET = 18
+CREDIT_LIMIT_OFFSET = 19
+
+# Bulk transfers (such as program images) are streamed over an L2CAP connection
+# oriented channel which central opens alongside the command service.  A
+# transfer starts with a header (magic, transfer type, record count, length and
+# CRC32 of the data) followed by the data.  The robot replies with a header
+# where the type is replaced by the result (1 = success, 0 = failure) and, for
+# downloads, follows it with the data
+L2CAP_PSM = 0x0080
+L2CAP_MTU = 512
+BULK_MAGIC = 0x56
+BULK_HEADER = "<BBHII"
+BULK_PROGRAM_UPLOAD = 1
+BULK_PROGRAM_DOWNLOAD = 2
+
+# The robot's advertising manufacturer data carries its status, so central can
+# pick a robot without connecting to it: turtle ID, battery voltage (mV) and
+# status flags
+ADVERTISING_COMPANY_ID = 0xFFE1
+ADVERTISING_STATUS = "<BHB"
+ADVERTISING_FLAG_CONNECTED = 0x01
+ADVERTISING_FLAG_BUSY = 0x02
+ADVERTISING_FLAG_POWER_LOW = 0x04
+
+# When a motion starts the robot sends an acknowledgement before the response:
+# sequence 0 (so centrals that don't understand it ignore it as a NOP), the
+# acknowledgement marker, the sequence number of the command and the expected
+# duration of the motion in ms (from the stepper acceleration plan).  Central can
+# then wait for the response with a deadline based on the expected duration
+MOTION_ACK_MARKER = 0x01
+MOTION_ACK = "<BBBI"
+
+# When the robot can't process a command it sends a refusal in place of the
+# response: sequence 0, the refusal marker, the sequence number of the command
+# and the reason.  Central fails the command straight away rather than waiting
+# for a response that will never arrive
+REFUSED_MARKER = 0x02
+REFUSED = "<BBBB"
+REFUSED_PROGRAM_RUNNING = 1
+REFUSED_NOT_CONTROLLER = 2
+
+# When central connects it writes its session ID before any commands: sequence 0
+# (so peripherals that don't understand it ignore it as a NOP), the session marker
+# and a random ID chosen when central starts.  The robot only keeps the command
+# sequence space (and so the responses it remembers for retransmitted commands)
+# whilst the session ID is unchanged, so a new host process that reuses the
+# adapter is never sent responses meant for the previous one
+SESSION_MARKER = 0x01
+SESSION = "<BBI"
+
+# Timeout classes used by the central when waiting for a response
+SHORT = "short"
+LONG = "long"
+
+# Where the robot's handler for a command is: the CommandsRx method with the
+# command's name, the Control method with the command's name (with a leading
+# underscore), or a Control method that is also passed the link the command
+# arrived on.  The robot's dispatch table is generated from these
+COMMANDS_RX = "commands_rx"
+CONTROL = "control"
+LINK = "link"
+
+class Command:
+    def __init__(self, command_id: int, name: str, request: list = [], response: list = [], timeout: str = SHORT, description: str = "", handler: str = COMMANDS_RX):
+        self.command_id = command_id
+        self.name = name
+        self.request = request      # List of (field name, struct format) tuples
+        self.response = response    # List of (field name, struct format) tuples
+        self.timeout = timeout
+        self.description = description
+        self.handler = handler
+
+# The robot's pose after a motion command
+_POSE = [("x_mm", "f"), ("y_mm", "f"), ("heading_degrees", "f")]
+
+COMMANDS = [
+    Command(0, "nop", description="No operation (used for polling)"),
+    Command(1, "motors", [("enable", "B")], description="Enable (1) or disable (0) the motors"),
+    Command(2, "forward", [("distance_mm", "f")], _POSE, LONG, "Move forward", CONTROL),
+    Command(3, "backward", [("distance_mm", "f")], _POSE, LONG, "Move backward", CONTROL),
+    Command(4, "left", [("angle_degrees", "f")], _POSE, LONG, "Turn left", CONTROL),
+    Command(5, "right", [("angle_degrees", "f")], _POSE, LONG, "Turn right", CONTROL),
+    Command(6, "circle", [("radius_mm", "f"), ("extent_degrees", "f")], _POSE, LONG, "Move in a circle"),
+    Command(7, "setheading", [("heading_degrees", "f")], [], LONG, "Turn to a heading"),
+    Command(8, "setx", [("x_mm", "f")], _POSE, LONG, "Move to an x position"),
+    Command(9, "sety", [("y_mm", "f")], _POSE, LONG, "Move to a y position"),
+    Command(10, "setposition", [("x_mm", "f"), ("y_mm", "f")], _POSE, LONG, "Move to a position"),
+    Command(11, "towards", [("x_mm", "f"), ("y_mm", "f")], _POSE, LONG, "Turn towards a position"),
+    Command(12, "reset_origin", description="Make the current position the origin"),
+    Command(13, "heading", [], [("heading_degrees", "f")], description="Get the heading"),
+    Command(14, "position", [], [("x_mm", "f"), ("y_mm", "f")], LONG, "Get the position"),
+    Command(15, "penup", description="Lift the pen"),
+    Command(16, "pendown", description="Lower the pen"),
+    Command(17, "eyes", [("eye_id", "B"), ("red", "B"), ("green", "B"), ("blue", "B")], description="Set the eye colour (0 = both, 1 = left, 2 = right)"),
+    Command(18, "power", [], [("mv", "l"), ("ma", "l"), ("mw", "l")], description="Get the power status"),
+    Command(19, "isdown", [], [("pen_down", "B")], description="Get the pen position"),
+    Command(20, "set_linear_velocity", [("target_speed", "l"), ("acceleration", "l")], description="Set the linear velocity"),
+    Command(21, "set_rotational_velocity", [("target_speed", "l"), ("acceleration", "l")], description="Set the rotational velocity"),
+    Command(22, "get_linear_velocity", [], [("target_speed", "l"), ("acceleration", "l")], description="Get the linear velocity"),
+    Command(23, "get_rotational_velocity", [], [("target_speed", "l"), ("acceleration", "l")], description="Get the rotational velocity"),
+    Command(24, "set_wheel_diameter_calibration", [("wheel_diameter", "i")], description="Set the wheel diameter calibration (um)"),
+    Command(25, "set_axel_distance_calibration", [("axel_distance", "i")], description="Set the axel distance calibration (um)"),
+    Command(26, "get_wheel_diameter_calibration", [], [("wheel_diameter", "i")], description="Get the wheel diameter calibration (um)"),
+    Command(27, "get_axel_distance_calibration", [], [("axel_distance", "i")], description="Get the axel distance calibration (um)"),
+    Command(28, "set_turtle_id", [("turtle_id", "B")], description="Set the turtle ID (0-7)"),
+    Command(29, "get_turtle_id", [], [("turtle_id", "B")], description="Get the turtle ID"),
+    Command(30, "load_config", description="Load the configuration from EEPROM"),
+    Command(31, "save_config", description="Save the configuration to EEPROM"),
+    Command(32, "reset_config", description="Reset the configuration to the defaults"),
+    Command(33, "program_begin", [("length", "I")], [("result", "B")], description="Start a program upload", handler=CONTROL),
+    Command(34, "program_write", [("offset", "H"), ("length", "B"), ("data", "15s")], [("result", "B"), ("bytes_received", "H")], description="Write up to 15 bytes of the program", handler=CONTROL),
+    Command(35, "program_end", [("crc32", "I")], [("result", "B"), ("record_count", "H")], description="Finish and verify a program upload", handler=CONTROL),
+    Command(36, "run_program", [], [("result", "B"), ("record_count", "H")], description="Play the stored program", handler=CONTROL),
+    Command(37, "program_status", [], [("state", "B"), ("position", "H"), ("record_count", "H")], description="Get the program playback status", handler=CONTROL),
+    Command(38, "stop_program", description="Stop program playback", handler=CONTROL),
+    Command(39, "link_parameters", [], [("interval", "H"), ("latency", "H"), ("supervision_timeout", "H")], description="Get the BLE connection parameters (1.25 ms units, events, 10 ms units)", handler=LINK),
+    Command(40, "link_role", [], [("role", "B")], description="Get the central's role (0 = controller, 1 = monitor)", handler=LINK),
+]
+
+# Serial commands understood by the communicator (from the BBC Micro).  Serial
+# command IDs start from 32 to avoid clashing with ASCII control characters.
+# Each serial command has up to 4 int16 parameters (passed to the BLE command in
+# order) and returns a single int16 response value, which is the named response
+# field of the BLE command (or 0).  Inverted responses return 1 - value.
+class SerialCommand:
+    def __init__(self, serial_id: int, name: str, command: str, response_field: str = None, inverted: bool = False):
+        self.serial_id = serial_id
+        self.name = name
+        self.command = command
+        self.response_field = response_field
+        self.inverted = inverted
+
+SERIAL_COMMANDS = [
+    SerialCommand(32, "motors", "motors"),
+    SerialCommand(33, "forward", "forward"),
+    SerialCommand(34, "backward", "backward"),
+    SerialCommand(35, "left", "left"),
+    SerialCommand(36, "right", "right"),
+    SerialCommand(37, "penup", "penup"),
+    SerialCommand(38, "pendown", "pendown"),
+    SerialCommand(39, "eyes", "eyes"),
+    SerialCommand(40, "ispenup", "isdown", "pen_down", inverted=True),
+    SerialCommand(41, "power_mv", "power", "mv"),
+    SerialCommand(42, "power_ma", "power", "ma"),
+    SerialCommand(43, "power_mw", "power", "mw"),
+    SerialCommand(44, "circle", "circle"),
+    SerialCommand(45, "setheading", "setheading"),
+    SerialCommand(46, "setposition", "setposition"),
+    SerialCommand(47, "reset_origin", "reset_origin"),
+    SerialCommand(48, "heading", "heading", "heading_degrees"),
+    SerialCommand(49, "set_turtle_id", "set_turtle_id"),
+    SerialCommand(50, "get_turtle_id", "get_turtle_id", "turtle_id"),
+]
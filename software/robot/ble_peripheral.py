@@ -31,26 +31,170 @@ import aioble
 import bluetooth
 import asyncio
 import struct
+import time
+import protocol
 
+from ring_buffer import RingBuffer
 from machine import unique_id
 from micropython import const
 
+# If nothing (not even a keepalive) is received from central for this long the link is dropped
+_KEEPALIVE_TIMEOUT_MS = const(5000)
+
+# Number of attempts to deliver a response before the link is dropped
+_INDICATE_ATTEMPTS = const(3)
+
+# How often to check if central needs a credit update (when no responses are being sent)
+_CREDIT_UPDATE_INTERVAL = 0.25
+
+# BLE IRQ event raised when central changes the connection parameters
+_IRQ_CONNECTION_UPDATE = const(27)
+
+# Advertising is restarted this often so the status in the manufacturer data is kept up to date
+_ADVERTISING_REFRESH_MS = const(5000)
+
+# Advertising intervals.  For a short time after the link drops the robot advertises
+# rapidly so central (which reconnects without scanning) finds it again quickly
+_ADVERTISING_INTERVAL_US = const(250000)
+_FAST_ADVERTISING_INTERVAL_US = const(20000)
+_FAST_ADVERTISING_MS = const(3000)
+
+# Maximum number of centrals connected at the same time (one controller and the rest monitors)
+_MAX_CENTRALS = const(3)
+
+# Central roles.  The controller drives the robot; monitors can only use the
+# read-only commands (see Control)
+ROLE_CONTROLLER = const(0)
+ROLE_MONITOR = const(1)
+
+# aioble keeps the last 10 writes captured by a characteristic (shared by every central)
+# and drops the oldest when more arrive.  Writes are only moved into a link's c2p queue
+# when the receive task runs, which can be held up whilst a motion is being planned, so
+# the credit granted to the centrals is limited to what the capture queue can hold: a
+# small window for each monitor, room for keepalives (which don't use credit) and the
+# rest for the controller
+_WRITE_CAPTURE_DEPTH = const(10)
+_KEEPALIVE_RESERVE = const(2)
+_MONITOR_CREDIT = const(1)
+_CONTROLLER_CREDIT = const(_WRITE_CAPTURE_DEPTH - _KEEPALIVE_RESERVE - _MONITOR_CREDIT * (_MAX_CENTRALS - 1))
+
+# Length of the session packet central writes when it connects
+_SESSION_LENGTH = struct.calcsize(protocol.SESSION)
+
+class CentralLink:
+    """
+    The link to one connected central.  Each central has its own queues, flow
+    control credit and command sequence space.
+    """
+    def __init__(self, max_queue_elements: int):
+        # Maximum number of elements to store in the queues (note: maximum is 128 since command sequence is 8 bits)
+        # Note: Queue elements are 20 bytes long
+        self._max_queue_elements = max_queue_elements
+
+        # BLE connection object (None if the link isn't in use)
+        self._connection = None
+        self._role = ROLE_MONITOR
+        self._connection_id = 0
+
+        # Connection parameters chosen by central (interval in 1.25 ms units, peripheral
+        # latency in connection events and supervision timeout in 10 ms units).  These
+        # are only known once central has updated them (zero until then)
+        self._connection_parameters = (0, 0, 0)
+
+        # Reception and transmission queues.  These are preallocated ring buffers of
+        # 20 byte slots so no memory is allocated per packet.  A popped c2p packet is a
+        # view of its slot and remains valid whilst Control processes it
+        self._c2p_queue = RingBuffer(self._max_queue_elements)
+        self._p2c_queue = RingBuffer(self._max_queue_elements)
+        self._p2c_queue_event = None
+
+        # Time of the last packet received from central (used by the keepalive watchdog)
+        self._last_c2p_ms = time.ticks_ms()
+
+        # Flow control.  Every packet sent to central carries the c2p queue depth and
+        # a credit limit (the number of commands received so far plus the free space
+        # in the c2p queue, modulo 256).  Central only sends a command whilst the number
+        # of commands it has sent is below the limit, so the c2p queue can never overflow.
+        # The free space is capped at the link's share of the write capture queue, so
+        # writes that haven't been received yet can't overflow that either
+        self._c2p_received = 0
+        self._advertised_credit_limit = -1
+
+    @property
+    def is_connected(self) -> bool:
+        return self._connection is not None
+
+    @property
+    def role(self) -> int:
+        return self._role
+
+    @property
+    def connection_id(self) -> int:
+        return self._connection_id
+
+    @property
+    def connection_parameters(self) -> tuple[int, int, int]:
+        return self._connection_parameters
+
+    @property
+    def c2p_queue(self):
+        return self._c2p_queue
+
+    @property
+    def credit_limit(self) -> int:
+        window = _CONTROLLER_CREDIT if self._role == ROLE_CONTROLLER else _MONITOR_CREDIT
+        return (self._c2p_received + min(window, self._max_queue_elements - len(self._c2p_queue))) & 0xFF
+
+    @property
+    def p2c_queue(self):
+        return self._p2c_queue
+
+    def add_to_p2c_queue(self, data):
+        if self._p2c_queue.push(data):
+            self._p2c_queue_event.set()
+        else:
+            picolog.debug("CentralLink::add_to_p2c_queue - P2C queue is full - data not added")
+
+    def _open(self, connection, role: int, connection_id: int, p2c_queue_event: asyncio.Event):
+        self._connection = connection
+        self._role = role
+        self._connection_id = connection_id
+        self._connection_parameters = (0, 0, 0)
+        self._p2c_queue_event = p2c_queue_event
+        self._c2p_queue.clear()
+        self._p2c_queue.clear()
+        self._c2p_queue.reset_stats()
+        self._p2c_queue.reset_stats()
+        self._last_c2p_ms = time.ticks_ms()
+        self._c2p_received = 0
+        self._advertised_credit_limit = -1
+
+    def _close(self):
+        picolog.debug(f"CentralLink::_close - Queue high water marks c2p = {self._c2p_queue.high_water_mark}, p2c = {self._p2c_queue.high_water_mark} (p2c dropped = {self._p2c_queue.dropped})")
+        self._connection = None
+        self._c2p_queue.clear()
+        self._p2c_queue.clear()
+
 class BlePeripheral:
-    __MANUFACTURER_DATA = (0xFFE1, b"www.waitingforfriday.com")
     __ADVERTISING_NAME = "vt2-robot"
 
     def __init__(self):
         # Get the local device's Unique ID (used as the serial number)
         self._uid = "{:02x}{:02x}{:02x}{:02x}{:02x}{:02x}{:02x}{:02x}".format(*unique_id())
 
-        # Advertising flag
-        self._is_advertising = True
-
-        # Flag to show connected status
-        self._connected = False
+        # Incremented every time a controller connects, unless it is the same central
+        # reconnecting during fast advertising after a dropout (so its retransmitted
+        # commands are still recognised).  It is also incremented if the controller's
+        # session ID shows it is a new host process using the same adapter
+        self._connection_id = 0
+        self._last_controller_addr = None
+        self._controller_session_id = None
+        self._fast_advertising_until_ms = time.ticks_ms()
 
-        # BLE connection object
-        self._ble_connection = None
+        # Robot status advertised in the manufacturer data (see set_status)
+        self._turtle_id = 0
+        self._voltage_mv = 0
+        self._status_flags = 0
 
         # Advertising definitions
         self.__ble_advertising_definitions()
@@ -60,31 +204,76 @@ class BlePeripheral:
 
         # Register services with aioBLE library
         aioble.register_services(self.command_service)
+        aioble.core.register_irq_handler(self.__ble_irq, None)
 
-        # Maximum number of elements to store in the queues (note: maximum is 128 since command sequence is 8 bits)
-        # Note: Queue elements are 20 bytes long
-        self._max_queue_elements = 50
+        # One link per connected central.  The first central to connect (when there is
+        # no controller) becomes the controller and any others are monitors
+        self._links = [CentralLink(50) for _ in range(_MAX_CENTRALS)]
 
-        # Reception queue for received service data from central
-        self._c2p_queue = []
+        # Events set when commands are received from the controller and from monitors
         self._c2p_queue_event = asyncio.Event()
+        self._monitor_queue_event = asyncio.Event()
+
+        # Event set when any link has data to send
+        self._p2c_queue_event = asyncio.Event()
+
+        # Event set to restart advertising (at the fast interval) when the controller drops out
+        self._restart_advertising_event = asyncio.Event()
 
-        # Transmission queue for sending service data to central
-        self._p2c_queue = []
+        # Buffer used to add the flow control bytes to transmitted packets
+        self._p2c_buffer = bytearray(20)
 
     @property
     def is_connected(self):
-        return self._connected
-    
+        # True if a controller is connected
+        return self.controller is not None
+
     @property
-    def c2p_queue(self):
-        return self._c2p_queue
-    
-    def add_to_p2c_queue(self, data):
-        if len(self._p2c_queue) < self._max_queue_elements:
-            self._p2c_queue.append(data)
-        else:
-            picolog.debug("BlePeripheral::add_to_p2c_queue - P2C queue is full - data not added")
+    def links(self):
+        return self._links
+
+    @property
+    def controller(self) -> CentralLink:
+        for link in self._links:
+            if link.is_connected and link.role == ROLE_CONTROLLER:
+                return link
+        return None
+
+    @property
+    def awaiting_reconnection(self) -> bool:
+        # True whilst the controller that dropped out can still reconnect and carry on
+        # (advertising quickly, with its connection ID kept)
+        return self.controller is None and time.ticks_diff(self._fast_advertising_until_ms, time.ticks_ms()) > 0
+
+    @property
+    def connection(self):
+        # The controller's BLE connection (or None)
+        controller = self.controller
+        return controller._connection if controller is not None else None
+
+    @property
+    def c2p_queue_event(self):
+        return self._c2p_queue_event
+
+    @property
+    def monitor_queue_event(self):
+        return self._monitor_queue_event
+
+    def set_status(self, turtle_id: int, voltage_mv: int, busy: bool, power_low: bool):
+        """Set the robot status shown in the advertising data (picked up when advertising is next refreshed)"""
+        self._turtle_id = turtle_id & 0xFF
+        self._voltage_mv = min(max(int(voltage_mv), 0), 0xFFFF)
+        self._status_flags = 0
+        if busy:
+            self._status_flags |= protocol.ADVERTISING_FLAG_BUSY
+        if power_low:
+            self._status_flags |= protocol.ADVERTISING_FLAG_POWER_LOW
+
+    def __manufacturer_data(self):
+        flags = self._status_flags
+        if self.is_connected:
+            flags |= protocol.ADVERTISING_FLAG_CONNECTED
+        return (protocol.ADVERTISING_COMPANY_ID, struct.pack(protocol.ADVERTISING_STATUS, self._turtle_id, self._voltage_mv, flags))
 
     def __ble_advertising_definitions(self):
         # Definitions used for advertising via BLE
@@ -94,7 +283,6 @@ class BlePeripheral:
 
         # Set our appearance to "Remote Control"
         self.peripheral_appearance_generic_remote_control = const(0x0180)
-        self.peripheral_manufacturer = BlePeripheral.__MANUFACTURER_DATA
         self.peripheral_advertising_name = BlePeripheral.__ADVERTISING_NAME
 
     def __ble_service_definitions(self):
@@ -106,7 +294,8 @@ class BlePeripheral:
         self.command_service = aioble.Service(service_uuid)
 
         # TX: Peripheral -> Central (maximum supported length by BLE is 20 bytes)
-        self.tx_p2c_characteristic = aioble.BufferedCharacteristic(self.command_service, tx_p2c_characteristic_uuid, notify=True, max_len=20)
+        # Responses are sent as indications so that central acknowledges them
+        self.tx_p2c_characteristic = aioble.BufferedCharacteristic(self.command_service, tx_p2c_characteristic_uuid, notify=True, indicate=True, max_len=20)
         # RX: Central -> Peripheral
         self.rx_c2p_characteristic = aioble.Characteristic(self.command_service, rx_c2p_characteristic_uuid, write=True, write_no_response=True, capture=True)
 
@@ -114,122 +303,233 @@ class BlePeripheral:
         picolog.debug("BlePeripheral::run - Running")
 
         tasks = [
-            asyncio.create_task(self.__maintain_connection()),
-            asyncio.create_task(self.__handle_commands()),
+            asyncio.create_task(self.__maintain_connections()),
+            asyncio.create_task(self.__receive_c2p()),
+            asyncio.create_task(self.__transmit_p2c()),
+            asyncio.create_task(self.__watch_links()),
         ]
         await asyncio.gather(*tasks)
 
-    async def __maintain_connection(self):
-        picolog.debug("BlePeripheral::__maintain_connection - running")
+    # Advertise whenever there is a free link so further centrals can connect
+    async def __maintain_connections(self):
+        picolog.debug("BlePeripheral::__maintain_connections - running")
         while True:
-            # If we are not connected, clear the queues then advertise and wait for connection
-            if self._is_advertising:
-                # Clear the queues
-                self._c2p_queue.clear()
-                self._p2c_queue.clear()
-
-                # BLE Advertising frequency
-                ble_advertising_frequency_us = const(250000)
-
-                # Wait for something to connect
-                picolog.debug("BlePeripheral::__maintain_connection - Advertising and waiting for connection from central...")
-                self._ble_connection = await aioble.advertise(
-                    ble_advertising_frequency_us,
-                    name=self.peripheral_advertising_name,
-                    services=[self.peripheral_advertising_uuid],
-                    appearance=self.peripheral_appearance_generic_remote_control,
-                    manufacturer=self.peripheral_manufacturer,
-                )
-                picolog.info(f"BlePeripheral::__maintain_connection - Central with address {self._ble_connection.device.addr_hex()} has connected - advertising stopped")
-                self._is_advertising = False
-                self._connected = True
-            else:
-                # If we are connected, wait for disconnection
+            link = self.__free_link()
+            if link is None:
                 await asyncio.sleep(0.25)
+                continue
 
-    async def send_data_p2c(self, p2c_data_packet: bytearray):
-        try:
-            if p2c_data_packet is not None:
-                self.tx_p2c_characteristic.notify(self._ble_connection, p2c_data_packet)
+            # BLE Advertising frequency (fast for a short time after the controller drops out)
+            fast_advertising_ms = time.ticks_diff(self._fast_advertising_until_ms, time.ticks_ms())
+            if fast_advertising_ms > 0:
+                ble_advertising_frequency_us = _FAST_ADVERTISING_INTERVAL_US
+                advertising_timeout_ms = fast_advertising_ms
+            else:
+                ble_advertising_frequency_us = _ADVERTISING_INTERVAL_US
+                advertising_timeout_ms = _ADVERTISING_REFRESH_MS
+
+            # Wait for something to connect.  Advertising times out periodically so
+            # it can be restarted with the current status, and is restarted straight
+            # away (at the fast interval) if the controller drops out in the meantime
+            picolog.debug("BlePeripheral::__maintain_connections - Advertising and waiting for connection from central...")
+            self._restart_advertising_event.clear()
+            advertise_task = asyncio.create_task(aioble.advertise(
+                ble_advertising_frequency_us,
+                name=self.peripheral_advertising_name,
+                services=[self.peripheral_advertising_uuid],
+                appearance=self.peripheral_appearance_generic_remote_control,
+                manufacturer=self.__manufacturer_data(),
+                timeout_ms=advertising_timeout_ms,
+            ))
+            restart_task = asyncio.create_task(self.__restart_advertising(advertise_task))
+            try:
+                connection = await advertise_task
+            except asyncio.TimeoutError:
+                continue
+            except asyncio.CancelledError:
+                if not self._restart_advertising_event.is_set():
+                    raise
+                picolog.debug("BlePeripheral::__maintain_connections - Controller dropped out - restarting advertising")
+                continue
+            finally:
+                restart_task.cancel()
+
+            # The central becomes the controller if there isn't one (whilst fast advertising
+            # the controller role is kept for the controller that dropped out).  This is
+            # decided when the central connects, as advertising may have started before
+            # the controller dropped out
+            central_addr = connection.device.addr_hex()
+            reconnect_window = time.ticks_diff(self._fast_advertising_until_ms, time.ticks_ms()) > 0
+            if self.controller is not None or (reconnect_window and central_addr != self._last_controller_addr):
+                picolog.info(f"BlePeripheral::__maintain_connections - Central with address {central_addr} has connected as a monitor")
+                link._open(connection, ROLE_MONITOR, 0, self._p2c_queue_event)
+                continue
+
+            if reconnect_window:
+                picolog.info(f"BlePeripheral::__maintain_connections - Controller with address {central_addr} has reconnected")
             else:
-                TypeError("BlePeripheral::send_data_p2c - p2c_data_packet is None")
+                picolog.info(f"BlePeripheral::__maintain_connections - Central with address {central_addr} has connected as the controller")
+                self._connection_id += 1
+            self._fast_advertising_until_ms = time.ticks_ms()
+            self._last_controller_addr = central_addr
+            link._open(connection, ROLE_CONTROLLER, self._connection_id, self._p2c_queue_event)
+
+    # Cancel advertising when it needs to be restarted
+    async def __restart_advertising(self, advertise_task):
+        await self._restart_advertising_event.wait()
+        advertise_task.cancel()
+
+    def __free_link(self) -> CentralLink:
+        for link in self._links:
+            if not link.is_connected:
+                return link
+        return None
+
+    def __link(self, connection) -> CentralLink:
+        for link in self._links:
+            if link.is_connected and link._connection is connection:
+                return link
+        return None
+
+    async def __flag_disconnected(self, link: CentralLink, reason: str):
+        if not link.is_connected:
+            return
+
+        connection = link._connection
+        link._close()
+        if link.role == ROLE_CONTROLLER:
+            self._fast_advertising_until_ms = time.ticks_add(time.ticks_ms(), _FAST_ADVERTISING_MS)
+            self._restart_advertising_event.set()
+        try:
+            await connection.disconnect()
         except Exception as e:
-            picolog.error(f"BlePeripheral::send_data_p2c - Exception {e}")
-            RuntimeError(f"BlePeripheral::send_data_p2c - Exception {e}")
+            picolog.debug(f"BlePeripheral::__flag_disconnected - Exception {e}")
+        picolog.info(f"BlePeripheral::__flag_disconnected - {reason}... Flagged as disconnected")
 
-    async def get_data_c2p(self, characteristic, timeout_ms=2000):
-        try:
-            _, c2p_data_packet = await characteristic.written(timeout_ms=timeout_ms)
-            return c2p_data_packet
-        except asyncio.TimeoutError:
-            picolog.debug(f"BlePeripheral::get_data_c2p - Timed-out")
-            return None
-
-    # Note: We use an atomic exchange of data with the central to ensure that the data is received and processed
-    # as, after the initial connection, the central can sometimes miss data packets
-    async def exchange_data(self, p2c_data_packet) -> tuple[bytearray, bool]:
-        for attempt in range(1, 4):
-            await self.send_data_p2c(p2c_data_packet)
-            c2p_data_packet = await self.get_data_c2p(self.rx_c2p_characteristic)
-            if c2p_data_packet is not None:
-                return c2p_data_packet, True
-            picolog.debug(f"BlePeripheral::exchange_data - No response from central after attempt {attempt}")
-
-        picolog.error("BlePeripheral::exchange_data - All 3 attempts failed")
-        return bytearray(20), False
-
-    async def __poll_central(self):
-        # If a response is available, send it to central, otherwise send a NOP
-        p2c_data_packet = bytearray(20)
-        if len(self._p2c_queue) > 0:
-            p2c_data_packet = self._p2c_queue.pop(0)
-
-            # Just temporarily log the sequence number for testing
-            p2c_sequence = struct.unpack("<B", p2c_data_packet[0:1])[0]
-            picolog.debug(f"BlePeripheral::__poll_central - Sending data to central with sequence = {p2c_sequence}")
-
-        # Exchange data with central
-        success = False
-        c2p_data_packet, success = await self.exchange_data(p2c_data_packet)
-
-        if success:
-            # If we have received data from central, add it to the queue
-            if c2p_data_packet is not None:
-                # Only add data to the queue if the first byte is not 0 (NOP)
-                if c2p_data_packet[0] != 0:
-                    if len(self._c2p_queue) < self._max_queue_elements:
-                        self._c2p_queue.append(c2p_data_packet)
+    # Receive commands from the centrals as soon as they are written.  Central writes
+    # with response, so the BLE stack acknowledges each one at the link level
+    async def __receive_c2p(self):
+        picolog.debug("BlePeripheral::__receive_c2p - running")
+        while True:
+            if not any(link.is_connected for link in self._links):
+                # Nothing is connected
+                await asyncio.sleep(0.25)
+                continue
+
+            try:
+                connection, c2p_data_packet = await self.rx_c2p_characteristic.written(timeout_ms=1000)
+            except asyncio.TimeoutError:
+                # Nothing received - the link watchdog checks the links
+                continue
+
+            link = self.__link(connection)
+            if link is None:
+                continue
+            link._last_c2p_ms = time.ticks_ms()
+
+            # Only add data to the queue if the first byte is not 0 (NOP/keepalive)
+            if c2p_data_packet is not None and len(c2p_data_packet) > 0 and c2p_data_packet[0] != 0:
+                # Every command uses one of central's credits (even if it is dropped)
+                link._c2p_received = (link._c2p_received + 1) & 0xFF
+                if link.c2p_queue.push(c2p_data_packet):
+                    if link.role == ROLE_CONTROLLER:
                         self._c2p_queue_event.set()
                     else:
-                        picolog.debug("BlePeripheral::__poll_central - c2p queue is full - data not added")
-            else:
-                self._connected = False
-                self._is_advertising = True
-                if self._ble_connection:
-                    await self._ble_connection.disconnect()
-                self._ble_connection = None
-                picolog.info("BlePeripheral::__poll_central - Empty response from central... Flagged as disconnected")
-        else:
-            self._connected = False
-            self._is_advertising = True
-            if self._ble_connection:
-                await self._ble_connection.disconnect()
-            self._ble_connection = None
-            picolog.info("BlePeripheral::__poll_central - No response from central... Flagged as disconnected")
-
-    async def __handle_commands(self):
-        picolog.debug("BlePeripheral::__handle_commands - running")
+                        self._monitor_queue_event.set()
+                else:
+                    picolog.info("BlePeripheral::__receive_c2p - c2p queue is full (central exceeded its credit limit) - data not added")
+            elif c2p_data_packet is not None and len(c2p_data_packet) >= _SESSION_LENGTH and c2p_data_packet[1] == protocol.SESSION_MARKER:
+                # Session ID (sequence 0, so it doesn't use credit)
+                self.__start_session(link, c2p_data_packet)
+
+    # Central writes its session ID when it connects, before any commands.  If the
+    # controller's session isn't the one the robot was serving it is a new host
+    # process (even if it has the same address), so it gets a new connection ID
+    # and its sequence IDs aren't mistaken for those of the previous session
+    def __start_session(self, link: CentralLink, packet):
+        if link.role != ROLE_CONTROLLER:
+            return
+
+        session_id = struct.unpack_from(protocol.SESSION, packet)[2]
+        if session_id == self._controller_session_id:
+            picolog.debug(f"BlePeripheral::__start_session - Controller has resumed session {session_id:08x}")
+            return
+
+        picolog.info(f"BlePeripheral::__start_session - Controller has started session {session_id:08x}")
+        self._controller_session_id = session_id
+        self._connection_id += 1
+        link._connection_id = self._connection_id
+
+    # Send responses to the centrals as soon as they are ready.  Indications are
+    # acknowledged by central; if an indication is not acknowledged it is sent
+    # again and, after repeated failures, the link is dropped
+    async def __transmit_p2c(self):
+        picolog.debug("BlePeripheral::__transmit_p2c - running")
         while True:
-            # If we are connected, poll central for data
-            if self._connected:
-                await self.__poll_central()
-
-                # Limit polling to a maximum of 5 times per second
-                await asyncio.sleep(0.2)
-            else:
-                # Disconnected - Wait before checking again
-                await asyncio.sleep(0.5)
+            try:
+                await asyncio.wait_for(self._p2c_queue_event.wait(), _CREDIT_UPDATE_INTERVAL)
+            except asyncio.TimeoutError:
+                # No responses to send - if Control has freed space in a c2p queue
+                # since the last packet, send a credit update (sequence 0) so central
+                # is not left waiting for credit
+                for link in self._links:
+                    if link.is_connected and link.credit_limit != link._advertised_credit_limit:
+                        await self.__indicate(link, None)
+                continue
+            self._p2c_queue_event.clear()
+
+            for link in self._links:
+                while link.is_connected and len(link.p2c_queue) > 0:
+                    p2c_data_packet = link.p2c_queue.pop()
+                    picolog.debug(f"BlePeripheral::__transmit_p2c - Sending data to central with sequence = {p2c_data_packet[0]}")
+                    await self.__indicate(link, p2c_data_packet)
+
+    # Send a packet (or a credit update if the packet is None) with the flow control bytes added
+    async def __indicate(self, link: CentralLink, p2c_data_packet):
+        buffer = self._p2c_buffer
+        for i in range(protocol.QUEUE_DEPTH_OFFSET):
+            buffer[i] = p2c_data_packet[i] if p2c_data_packet is not None else 0
+        credit_limit = link.credit_limit
+        buffer[protocol.QUEUE_DEPTH_OFFSET] = len(link.c2p_queue)
+        buffer[protocol.CREDIT_LIMIT_OFFSET] = credit_limit
+
+        for attempt in range(1, _INDICATE_ATTEMPTS + 1):
+            try:
+                await self.tx_p2c_characteristic.indicate(link._connection, buffer, timeout_ms=1000)
+                link._advertised_credit_limit = credit_limit
+                return
+            except Exception as e:
+                picolog.debug(f"BlePeripheral::__indicate - Indication not acknowledged after attempt {attempt} - {e}")
+            if not link.is_connected:
+                return
+
+        await self.__flag_disconnected(link, f"Central did not acknowledge {_INDICATE_ATTEMPTS} indications")
+
+    # Drop links that have disconnected or gone quiet.  Central sends keepalives on
+    # its own (slower) timer whenever it has no commands to send, so if nothing
+    # arrives for the timeout period the link has failed
+    async def __watch_links(self):
+        picolog.debug("BlePeripheral::__watch_links - running")
+        while True:
+            await asyncio.sleep(0.25)
+            for link in self._links:
+                if not link.is_connected:
+                    continue
+                if not link._connection.is_connected():
+                    await self.__flag_disconnected(link, "Central has disconnected")
+                elif time.ticks_diff(time.ticks_ms(), link._last_c2p_ms) > _KEEPALIVE_TIMEOUT_MS:
+                    await self.__flag_disconnected(link, "No data or keepalive received from central")
+
+    # Called (by aioble) for every BLE IRQ event - only connection updates are of interest
+    def __ble_irq(self, event, data):
+        if event == _IRQ_CONNECTION_UPDATE:
+            conn_handle, interval, latency, supervision_timeout, status = data
+            for link in self._links:
+                if status == 0 and link.is_connected and link._connection._conn_handle == conn_handle:
+                    link._connection_parameters = (interval, latency, supervision_timeout)
+                    picolog.info(f"BlePeripheral::__ble_irq - Connection parameters updated: interval = {interval * 1.25} ms, latency = {latency}, supervision timeout = {supervision_timeout * 10} ms")
+        return None
 
 if __name__ == "__main__":
     from main import main
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,148 @@
+#************************************************************************
+#
+#   bulk_transfer.py
+#
+#   L2CAP bulk transfer channel
+#   Valiant Turtle 2 - Robot firmware
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+import picolog
+import asyncio
+import binascii
+import struct
+import protocol
+
+from ble_peripheral import BlePeripheral
+from program_store import ProgramStore
+from control import Control
+from micropython import const
+
+# Time to wait for the next part of a transfer before the channel is dropped
+_RECEIVE_TIMEOUT_MS = const(5000)
+_SEND_TIMEOUT_MS = const(5000)
+
+class BulkTransfer:
+    """
+    Streams large blobs between central and the robot over an L2CAP connection
+    oriented channel, which is much faster than 20 byte writes to the command
+    characteristic.  Central opens the channel alongside the command service and
+    sends transfers framed by protocol.BULK_HEADER.  Uploaded programs are written
+    straight into the ProgramStore as they arrive (so the whole image is never
+    held in memory) and verified against the CRC32 in the header.
+    """
+    def __init__(self, ble_peripheral :BlePeripheral, program_store :ProgramStore, control :Control):
+        self._ble_peripheral = ble_peripheral
+        self._program_store = program_store
+        self._control = control
+
+        # Preallocated transfer buffers
+        self._header = bytearray(struct.calcsize(protocol.BULK_HEADER))
+        self._buffer = bytearray(protocol.L2CAP_MTU)
+        self._buffer_view = memoryview(self._buffer)
+
+    async def run(self):
+        picolog.debug("BulkTransfer::run - Running")
+        while True:
+            connection = self._ble_peripheral.connection
+            if connection is None or not self._ble_peripheral.is_connected:
+                await asyncio.sleep(0.25)
+                continue
+
+            try:
+                channel = await connection.l2cap_accept(protocol.L2CAP_PSM, protocol.L2CAP_MTU)
+                picolog.info("BulkTransfer::run - Central has opened the bulk transfer channel")
+                while True:
+                    await self.__transfer(channel)
+            except Exception as e:
+                # The channel (or the connection) has closed, or the transfer failed
+                picolog.info(f"BulkTransfer::run - Bulk transfer channel closed - {e}")
+
+            await asyncio.sleep(0.25)
+
+    async def __transfer(self, channel):
+        await self.__receive(channel, self._header)
+        magic, transfer_type, _, length, crc32 = struct.unpack_from(protocol.BULK_HEADER, self._header)
+        if magic != protocol.BULK_MAGIC:
+            # The stream is out of step and can't be recovered, so close the channel
+            await channel.disconnect()
+            raise ValueError(f"Invalid transfer header magic {magic}")
+
+        if transfer_type == protocol.BULK_PROGRAM_UPLOAD:
+            await self.__receive_program(channel, length, crc32)
+        elif transfer_type == protocol.BULK_PROGRAM_DOWNLOAD:
+            await self.__send_program(channel)
+        else:
+            picolog.error(f"BulkTransfer::__transfer - Unknown transfer type {transfer_type}")
+            await self.__send_header(channel, False, 0, 0, 0)
+
+    async def __receive_program(self, channel, length: int, crc32: int):
+        # Program uploads are refused whilst a program is playing, but the data is still
+        # read so the next transfer header is found
+        accepted = not self._control.program_running and self._program_store.begin(length)
+        if not accepted:
+            picolog.error("BulkTransfer::__receive_program - Program upload refused")
+
+        offset = 0
+        while offset < length:
+            chunk = self._buffer_view[:min(length - offset, len(self._buffer))]
+            await self.__receive(channel, chunk)
+            if accepted:
+                accepted = self._program_store.write(offset, chunk)
+            offset += len(chunk)
+
+        if accepted:
+            accepted = self._program_store.end(crc32)
+
+        picolog.info(f"BulkTransfer::__receive_program - Received {length} bytes (result = {accepted})")
+        await self.__send_header(channel, accepted, self._program_store.record_count, self._program_store.bytes_received, crc32)
+
+    async def __send_program(self, channel):
+        if not self._program_store.is_valid:
+            await self.__send_header(channel, False, 0, 0, 0)
+            return
+
+        # The CRC32 is sent before the data, so the stored image is read twice
+        crc32 = 0
+        for length in self._program_store.chunks(self._buffer):
+            crc32 = binascii.crc32(self._buffer_view[:length], crc32)
+
+        await self.__send_header(channel, True, self._program_store.record_count, self._program_store.size, crc32)
+        for length in self._program_store.chunks(self._buffer):
+            await channel.send(self._buffer_view[:length], _SEND_TIMEOUT_MS)
+        await channel.flush()
+        picolog.info(f"BulkTransfer::__send_program - Sent {self._program_store.size} bytes")
+
+    async def __send_header(self, channel, result: bool, record_count: int, length: int, crc32: int):
+        struct.pack_into(protocol.BULK_HEADER, self._header, 0, protocol.BULK_MAGIC, 1 if result else 0, record_count, length, crc32 & 0xFFFFFFFF)
+        await channel.send(self._header, _SEND_TIMEOUT_MS)
+        await channel.flush()
+
+    # Fill the buffer from the channel (a transfer can be split over many L2CAP SDUs)
+    async def __receive(self, channel, buffer):
+        view = memoryview(buffer)
+        received = 0
+        while received < len(view):
+            received += await channel.recvinto(view[received:], _RECEIVE_TIMEOUT_MS)
+
+if __name__ == "__main__":
+    from main import main
+    main()
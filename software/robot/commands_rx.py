@@ -51,10 +51,24 @@ class CommandsRx:
         self._diff_drive = diff_drive
         self._configuration = configuration
 
+        # Called with the expected duration (in ms) when a motion starts
+        self._motion_callback = None
+
     @property
     def motors_enabled(self) -> bool:
         return self._diff_drive.is_enabled
     
+    def set_motion_callback(self, callback):
+        """Set a function to call with the expected duration (in ms) when a motion starts"""
+        self._motion_callback = callback
+
+    # Report the expected duration of the motion and wait for it to complete
+    async def __wait_for_motion(self):
+        if self._motion_callback is not None and self._diff_drive.is_moving:
+            self._motion_callback(self._diff_drive.remaining_ms)
+        while self._diff_drive.is_moving:
+            await asyncio.sleep(0.25)
+
     # Convert between mm and um
     def __mm_to_um(self, mm: float) -> int:
         return int(mm * 1000)
@@ -75,8 +89,7 @@ class CommandsRx:
     async def forward(self, distance_mm: float) -> tuple[float, float, float]:
         picolog.info(f"CommandsRx::forward - Moving forward {distance_mm} mm")
         self._diff_drive.drive_forward(self.__mm_to_um(distance_mm))
-        while self._diff_drive.is_moving:
-            await asyncio.sleep(0.25)
+        await self.__wait_for_motion()
 
         # Return the new position and heading
         x_pos_um, y_pos_um = self._diff_drive.get_cartesian_position()
@@ -86,8 +99,7 @@ class CommandsRx:
     async def backward(self, distance_mm: float) -> tuple[float, float, float]:
         picolog.info(f"CommandsRx::backward - Moving backward {distance_mm} mm")
         self._diff_drive.drive_backward(self.__mm_to_um(distance_mm))
-        while self._diff_drive.is_moving:
-            await asyncio.sleep(0.25)
+        await self.__wait_for_motion()
         
         # Return the new position and heading
         x_pos_um, y_pos_um = self._diff_drive.get_cartesian_position()
@@ -97,8 +109,7 @@ class CommandsRx:
     async def left(self, angle_degrees: float) -> tuple[float, float, float]:
         picolog.info(f"CommandsRx::left - Turning left {angle_degrees} degrees")
         self._diff_drive.turn_left(angle_degrees)
-        while self._diff_drive.is_moving:
-            await asyncio.sleep(0.25)
+        await self.__wait_for_motion()
 
         # Return the new position and heading
         x_pos_um, y_pos_um = self._diff_drive.get_cartesian_position()
@@ -108,8 +119,7 @@ class CommandsRx:
     async def right(self, angle_degrees: float) -> tuple[float, float, float]:
         picolog.info(f"CommandsRx::right - Turning right {angle_degrees} degrees")
         self._diff_drive.turn_right(angle_degrees)
-        while self._diff_drive.is_moving:
-            await asyncio.sleep(0.25)
+        await self.__wait_for_motion()
 
         # Return the new position and heading
         x_pos_um, y_pos_um = self._diff_drive.get_cartesian_position()
@@ -119,8 +129,7 @@ class CommandsRx:
     async def circle(self, radius_mm: float, extent_degrees: float) -> tuple[float, float, float]:
         picolog.info(f"CommandsRx::circle - Circle with radius {radius_mm} mm and extent of {extent_degrees} degrees")
         self._diff_drive.circle(self.__mm_to_um(radius_mm), extent_degrees)
-        while self._diff_drive.is_moving:
-            await asyncio.sleep(0.25)
+        await self.__wait_for_motion()
 
         # Return the new position and heading
         x_pos_um, y_pos_um = self._diff_drive.get_cartesian_position()
@@ -130,14 +139,12 @@ class CommandsRx:
     async def setheading(self, heading_degrees: float):
         picolog.info(f"CommandsRx::setheading - Setting heading to {heading_degrees} degrees")
         self._diff_drive.set_heading(heading_degrees)
-        while self._diff_drive.is_moving:
-            await asyncio.sleep(0.25)
+        await self.__wait_for_motion()
 
     async def setx(self, x_mm: float) -> tuple[float, float, float]:
         picolog.info(f"CommandsRx::setx - Setting X position to {x_mm} mm")
         self._diff_drive.set_cartesian_x_position(self.__mm_to_um(x_mm))
-        while self._diff_drive.is_moving:
-            await asyncio.sleep(0.25)
+        await self.__wait_for_motion()
 
         # Return the new position and heading
         x_pos_um, y_pos_um = self._diff_drive.get_cartesian_position()
@@ -147,8 +154,7 @@ class CommandsRx:
     async def sety(self, y_mm: float) -> tuple[float, float, float]:
         picolog.info(f"CommandsRx::sety - Setting Y position to {y_mm} mm")
         self._diff_drive.set_cartesian_y_position(self.__mm_to_um(y_mm))
-        while self._diff_drive.is_moving:
-            await asyncio.sleep(0.25)
+        await self.__wait_for_motion()
 
         # Return the new position and heading
         x_pos_um, y_pos_um = self._diff_drive.get_cartesian_position()
@@ -158,8 +164,7 @@ class CommandsRx:
     async def setposition(self, x_mm: float, y_mm: float) -> tuple[float, float, float]:
         picolog.info(f"CommandsRx::setposition - Setting position to ({x_mm}, {y_mm}) mm")
         self._diff_drive.set_cartesian_position(self.__mm_to_um(x_mm), self.__mm_to_um(y_mm))
-        while self._diff_drive.is_moving:
-            await asyncio.sleep(0.25)
+        await self.__wait_for_motion()
 
         # Return the new position and heading
         x_pos_um, y_pos_um = self._diff_drive.get_cartesian_position()
@@ -169,8 +174,7 @@ class CommandsRx:
     async def towards(self, x_mm: float, y_mm: float) -> tuple[float, float, float]:
         picolog.info(f"CommandsRx::towards - Turning towards ({x_mm}, {y_mm}) mm")
         self._diff_drive.turn_towards_cartesian_point(self.__mm_to_um(x_mm), self.__mm_to_um(y_mm))
-        while self._diff_drive.is_moving:
-            await asyncio.sleep(0.25)
+        await self.__wait_for_motion()
 
         # Return the new position and heading
         x_pos_um, y_pos_um = self._diff_drive.get_cartesian_position()
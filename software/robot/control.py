@@ -28,9 +28,34 @@
 import picolog
 import asyncio
 
-from ble_peripheral import BlePeripheral
+from ble_peripheral import BlePeripheral, CentralLink, ROLE_MONITOR
 from commands_rx import CommandsRx
+from program_store import ProgramStore, FORMAT_BYTECODE
+from turtle_vm import TurtleVm
+from micropython import const
 import struct
+import protocol
+
+# Program playback states (reported by the program_status command)
+_PROGRAM_IDLE = const(0)
+_PROGRAM_RUNNING = const(1)
+_PROGRAM_COMPLETE = const(2)
+_PROGRAM_STOPPED = const(3)
+_PROGRAM_FAILED = const(4)
+
+# Commands that can be processed whilst a program is playing
+_PROGRAM_SAFE_COMMANDS = (protocol.CMD_NOP, protocol.CMD_PROGRAM_STATUS, protocol.CMD_STOP_PROGRAM, protocol.CMD_LINK_PARAMETERS, protocol.CMD_LINK_ROLE)
+
+# Read-only commands that monitor centrals can use (everything else is reserved for the controller)
+_MONITOR_COMMANDS = (
+    protocol.CMD_HEADING, protocol.CMD_POSITION, protocol.CMD_POWER, protocol.CMD_ISDOWN,
+    protocol.CMD_GET_LINEAR_VELOCITY, protocol.CMD_GET_ROTATIONAL_VELOCITY,
+    protocol.CMD_GET_WHEEL_DIAMETER_CALIBRATION, protocol.CMD_GET_AXEL_DISTANCE_CALIBRATION,
+    protocol.CMD_GET_TURTLE_ID, protocol.CMD_PROGRAM_STATUS, protocol.CMD_LINK_PARAMETERS, protocol.CMD_LINK_ROLE,
+)
+
+# Number of recently completed command sequence IDs (and their responses) to remember
+_DEDUP_WINDOW = const(32)
 
 class Control:
     """
@@ -38,12 +63,60 @@ class Control:
     calling the appropriate command functions in the Commands class. The commands are then
     responded to with data that is sent back to the central device.
     """
-    def __init__(self, ble_peripheral :BlePeripheral, commands_rx :CommandsRx, power_low_event: asyncio.Event):
+    def __init__(self, ble_peripheral :BlePeripheral, commands_rx :CommandsRx, power_low_event: asyncio.Event, program_store :ProgramStore):
         self._ble_peripheral = ble_peripheral
         self._commands_rx = commands_rx
         self._power_low_event = power_low_event
+        self._program_store = program_store
+
+        # Program playback state
+        self._program_state = _PROGRAM_IDLE
+        self._program_position = 0
+        self._program_stop = False
+
+        # Command packet buffer used during program playback
+        self._program_packet = bytearray(20)
+
+        # Interpreter for bytecode programs
+        self._turtle_vm = TurtleVm(commands_rx)
+
+        # The controller's command that is being executed (so motions it starts can be
+        # acknowledged with their expected duration) and the acknowledgement packet buffer
+        self._executing_link = None
+        self._executing_seq = 0
+        self._motion_ack = bytearray(20)
+        commands_rx.set_motion_callback(self.__acknowledge_motion)
+
+        # Refusal packet buffer (sent in place of the response to a command that can't be processed)
+        self._refusal = bytearray(20)
+
+        # Command ID -> handler, built from the handler table generated from protocol/schema.py.
+        # Handlers are called with the request parameters and return the response fields.
+        # Link handlers (for commands about the link the command arrived on) are also
+        # passed the CentralLink
+        self._dispatch = {}
+        self._link_dispatch = {}
+        for command_id, (owner, name) in protocol.HANDLERS.items():
+            if owner == protocol.HANDLER_COMMANDS_RX:
+                self._dispatch[command_id] = getattr(commands_rx, name)
+            elif owner == protocol.HANDLER_CONTROL:
+                self._dispatch[command_id] = getattr(self, name)
+            else:
+                self._link_dispatch[command_id] = getattr(self, name)
+
+        # Sliding window of recently completed sequence IDs (with their command IDs) and
+        # their responses, used to answer retransmitted commands without executing them again
+        self._completed_seqs = bytearray(_DEDUP_WINDOW)
+        self._completed_commands = bytearray(_DEDUP_WINDOW)
+        self._completed_responses = [None] * _DEDUP_WINDOW
+        self._completed_index = 0
+        self._completed_connection_id = 0
+
+    @property
+    def program_running(self) -> bool:
+        return self._program_state == _PROGRAM_RUNNING
 
-    # Run a task where we wait for BLE c2p queue to have data
+    # Run a task where we wait for the controller's c2p queue to have data
     # then process the data as commands which then respond
     # with p2c data
     async def run(self):
@@ -52,301 +125,295 @@ class Control:
         # Ensure the stored configuration is loaded from EEPROM
         await self._commands_rx.load_config()
 
+        # Monitors are served by their own task so they are never held up by motion commands
+        asyncio.create_task(self.__serve_monitors())
+
         while True:
-            # Wait for data to arrive in the c2p queue
-            while len(self._ble_peripheral.c2p_queue) == 0 and self._power_low_event.is_set() == False:
-                await asyncio.sleep(0.25)
-                if not self._ble_peripheral.is_connected and self._commands_rx.motors_enabled:
-                    # If we are not connected, ensure the motors are off
+            # Wait for data to arrive in the controller's c2p queue
+            link = self._ble_peripheral.controller
+            while (link is None or len(link.c2p_queue) == 0) and self._power_low_event.is_set() == False:
+                # Wake as soon as a command arrives (or every 250ms to check the link and power)
+                try:
+                    await asyncio.wait_for(self._ble_peripheral.c2p_queue_event.wait(), 0.25)
+                except asyncio.TimeoutError:
+                    pass
+                self._ble_peripheral.c2p_queue_event.clear()
+                link = self._ble_peripheral.controller
+                if link is None and self._commands_rx.motors_enabled and not self.program_running and not self._ble_peripheral.awaiting_reconnection:
+                    # If no controller is connected (and we are not playing a stored program), ensure the motors are off.
+                    # They are kept on whilst the controller can still reconnect, so a drawing survives a dropout
                     await self._commands_rx.motors(False)
 
             if self._power_low_event.is_set():
                 picolog.debug("Control::run - Power low event set - waiting for power to return")
+                self._program_stop = True
+                while self.program_running:
+                    await asyncio.sleep(0.25)
                 await self._commands_rx.motors(False)
                 while self._power_low_event.is_set():
                     await asyncio.sleep(0.25)
                 picolog.debug("Control::run - Power restored - resuming")
             else:
-                # C2P queue has data - process it
-                data = self._ble_peripheral.c2p_queue.pop(0)
-
-                # The first byte is the command ID and the second
-                # byte is the sequence number. Unpack the data using struct
-                command_seq, command_id = struct.unpack('<BB', data[:2])
-
-                if command_id == 0:
-                    # NOP command
-                    pass
-                elif command_id == 1:
-                    # Command ID 1 = motors
-                    # Expect a single byte parameter (1 = enable, 0 = disable)
-                    command_seq, command_id, enable = struct.unpack('<BBB', data[:3])
-                    await self._commands_rx.motors(enable)
-
-                    response = struct.pack('<B', command_seq) + bytes(19)
-                    self._ble_peripheral.add_to_p2c_queue(response)
-                elif command_id == 2:
-                    # Command ID 2 = forward
-                    # Expect a single float parameter (distance in mm)
-                    command_seq, command_id, distance_mm = struct.unpack('<BBf', data[:6])
-                    if distance_mm > 0:
-                        x_position, y_position, heading = await self._commands_rx.forward(distance_mm)
-                    elif distance_mm < 0:
-                        x_position, y_position, heading = await self._commands_rx.backward(-distance_mm)
-
-                    response = struct.pack('<Bfff', command_seq, x_position, y_position, heading) + bytes(7)
-                    self._ble_peripheral.add_to_p2c_queue(response)
-                elif command_id == 3:
-                    # Command ID 3 = backward
-                    # Expect a single float parameter (distance in mm)
-                    command_seq, command_id, distance_mm = struct.unpack('<BBf', data[:6])
-                    if distance_mm > 0:
-                        x_position, y_position, heading = await self._commands_rx.backward(distance_mm)
-                    elif distance_mm < 0:
-                        x_position, y_position, heading = await self._commands_rx.forward(-distance_mm)
-
-                    response = struct.pack('<Bfff', command_seq, x_position, y_position, heading) + bytes(7)
-                    self._ble_peripheral.add_to_p2c_queue(response)
-                elif command_id == 4:
-                    # Command ID 4 = left
-                    # Expect a single float parameter (angle in degrees)
-                    command_seq, command_id, angle_degrees = struct.unpack('<BBf', data[:6])
-                    if angle_degrees > 0:
-                        x_position, y_position, heading = await self._commands_rx.left(angle_degrees)
-                    elif angle_degrees < 0:
-                        x_position, y_position, heading = await self._commands_rx.right(-angle_degrees)
-
-                    response = struct.pack('<Bfff', command_seq, x_position, y_position, heading) + bytes(7)
-                    self._ble_peripheral.add_to_p2c_queue(response)
-                elif command_id == 5:
-                    # Command ID 5 = right
-                    # Expect a single float parameter (angle in degrees)
-                    command_seq, command_id, angle_degrees = struct.unpack('<BBf', data[:6])
-                    if angle_degrees > 0:
-                        x_position, y_position, heading = await self._commands_rx.right(angle_degrees)
-                    elif angle_degrees < 0:
-                        x_position, y_position, heading = await self._commands_rx.left(-angle_degrees)
-
-                    response = struct.pack('<Bfff', command_seq, x_position, y_position, heading) + bytes(7)
-                    self._ble_peripheral.add_to_p2c_queue(response)
-                elif command_id == 6:
-                    # Command ID 6 = circle
-                    # Expect two float parameters (radius in mm and extent in degrees)
-                    command_seq, command_id, radius_mm, extent_degrees = struct.unpack('<BBff', data[:10])
-                    x_position, y_position, heading = await self._commands_rx.circle(radius_mm, extent_degrees)
-
-                    response = struct.pack('<Bfff', command_seq, x_position, y_position, heading) + bytes(7)
-                    self._ble_peripheral.add_to_p2c_queue(response)
-                elif command_id == 7:
-                    # Command ID 7 = setheading
-                    # Expect a single float parameter (heading in degrees)
-                    command_seq, command_id, heading_degrees = struct.unpack('<BBf', data[:6])
-                    await self._commands_rx.setheading(heading_degrees)
-
-                    response = struct.pack('<B', command_seq) + bytes(19)
-                    self._ble_peripheral.add_to_p2c_queue(response)
-                elif command_id == 8:
-                    # Command ID 8 = setx
-                    # Expect a single float parameter (x position in mm)
-                    command_seq, command_id, x_mm = struct.unpack('<BBf', data[:6])
-                    x_position, y_position, heading = await self._commands_rx.setx(x_mm)
-
-                    response = struct.pack('<Bfff', command_seq, x_position, y_position, heading) + bytes(7)
-                    self._ble_peripheral.add_to_p2c_queue(response)
-                elif command_id == 9:
-                    # Command ID 9 = sety
-                    # Expect a single float parameter (y position in mm)
-                    command_seq, command_id, y_mm = struct.unpack('<BBf', data[:6])
-                    x_position, y_position, heading = await self._commands_rx.sety(y_mm)
-
-                    response = struct.pack('<Bfff', command_seq, x_position, y_position, heading) + bytes(7)
-                    self._ble_peripheral.add_to_p2c_queue(response)
-                elif command_id == 10:
-                    # Command ID 10 = setposition
-                    # Expect two float parameters (x and y position in mm)
-                    command_seq, command_id, x_mm, y_mm = struct.unpack('<BBff', data[:10])
-                    x_position, y_position, heading = await self._commands_rx.setposition(x_mm, y_mm)
-
-                    response = struct.pack('<Bfff', command_seq, x_position, y_position, heading) + bytes(7)
-                    self._ble_peripheral.add_to_p2c_queue(response)
-                elif command_id == 11:
-                    # Command ID 11 = towards
-                    # Expect two float parameters (x and y position in mm)
-                    command_seq, command_id, x_mm, y_mm = struct.unpack('<BBff', data[:10])
-                    x_position, y_position, heading = await self._commands_rx.towards(x_mm, y_mm)
-
-                    response = struct.pack('<Bfff', command_seq, x_position, y_position, heading) + bytes(7)
-                    self._ble_peripheral.add_to_p2c_queue(response)
-                elif command_id == 12:
-                    # Command ID 12 = reset_origin
-                    # Expect no parameters
-                    command_seq, command_id = struct.unpack('<BB', data[:2])
-                    await self._commands_rx.reset_origin()
-
-                    response = struct.pack('<B', command_seq) + bytes(19)
-                    self._ble_peripheral.add_to_p2c_queue(response)
-                elif command_id == 13:
-                    # Command ID 13 = heading
-                    # Expect no parameters
-                    command_seq, command_id = struct.unpack('<BB', data[:2])
-                    heading = await self._commands_rx.heading()
-
-                    response = struct.pack('<Bf', command_seq, heading) + bytes(15)
-                    self._ble_peripheral.add_to_p2c_queue(response)
-                elif command_id == 14:
-                    # Command ID 14 = position
-                    # Expect no parameters
-                    command_seq, command_id = struct.unpack('<BB', data[:2])
-                    x_position, y_position = await self._commands_rx.position()
-
-                    response = struct.pack('<Bff', command_seq, x_position, y_position) + bytes(11)
-                    self._ble_peripheral.add_to_p2c_queue(response)
-                elif command_id == 15:
-                    # Command ID 15 = penup
-                    # Expect no parameters
-                    command_seq, command_id = struct.unpack('<BB', data[:2])
-                    await self._commands_rx.penup()
-
-                    response = struct.pack('<B', command_seq) + bytes(19)
-                    self._ble_peripheral.add_to_p2c_queue(response)
-                elif command_id == 16:
-                    # Command ID 16 = pendown
-                    # Expect no parameters
-                    command_seq, command_id = struct.unpack('<BB', data[:2])
-                    await self._commands_rx.pendown()
-
-                    response = struct.pack('<B', command_seq) + bytes(19)
-                    self._ble_peripheral.add_to_p2c_queue(response)
-                elif command_id == 17:
-                    # Command ID 17 = eyes
-                    # Expect four byte parameters (eye ID, red, green, blue)
-                    command_seq, command_id, eye_id, red, green, blue = struct.unpack('<BBBBBB', data[:6])
-                    await self._commands_rx.eyes(eye_id, red, green, blue)
-
-                    response = struct.pack('<B', command_seq) + bytes(19)
-                    self._ble_peripheral.add_to_p2c_queue(response)
-                elif command_id == 18:
-                    # Command ID 18 = power
-                    # Expect no parameters
-                    command_seq, command_id = struct.unpack('<BB', data[:2])
-                    mv, ma, mw = await self._commands_rx.power()
-
-                    response = struct.pack('<Blll', command_seq, mv, ma, mw) + bytes(7)
-                    self._ble_peripheral.add_to_p2c_queue(response)
-                elif command_id == 19:
-                    # Command ID 19 = isdown (pen)
-                    # Expect no parameters
-                    command_seq, command_id = struct.unpack('<BB', data[:2])
-                    pen_position = await self._commands_rx.isdown()
-
-                    response = struct.pack('<BB', command_seq, pen_position) + bytes(18)
-                    self._ble_peripheral.add_to_p2c_queue(response)
-                elif command_id == 20:
-                    # Command ID 20 = set_linear_velocity
-                    # Expect two float parameters (max speed and acceleration in mm/s^2)
-                    command_seq, command_id, max_speed, acceleration = struct.unpack('<BBll', data[:10])
-                    await self._commands_rx.set_linear_velocity(max_speed, acceleration)
-
-                    response = struct.pack('<B', command_seq) + bytes(19)
-                    self._ble_peripheral.add_to_p2c_queue(response)
-                elif command_id == 21:
-                    # Command ID 21 = set_rotation_velocity
-                    # Expect two float parameters (max speed and acceleration in mm/s^2)
-                    command_seq, command_id, max_speed, acceleration = struct.unpack('<BBll', data[:10])
-                    await self._commands_rx.set_rotational_velocity(max_speed, acceleration)
-
-                    response = struct.pack('<B', command_seq) + bytes(19)
-                    self._ble_peripheral.add_to_p2c_queue(response)
-                elif command_id == 22:
-                    # Command ID 22 = get_linear_velocity
-                    # Expect no parameters
-                    command_seq, command_id = struct.unpack('<BB', data[:2])
-                    linear_max_speed, linear_acceleration = await self._commands_rx.get_linear_velocity()
-
-                    response = struct.pack('<Bll', command_seq, linear_max_speed, linear_acceleration) + bytes(11)
-                    self._ble_peripheral.add_to_p2c_queue(response)
-                elif command_id == 23:
-                    # Command ID 23 = get_rotational_velocity
-                    # Expect no parameters
-                    command_seq, command_id = struct.unpack('<BB', data[:2])
-                    rotation_max_speed, rotation_acceleration = await self._commands_rx.get_rotational_velocity()
-
-                    response = struct.pack('<Bll', command_seq, rotation_max_speed, rotation_acceleration) + bytes(11)
-                    self._ble_peripheral.add_to_p2c_queue(response)
-                elif command_id == 24:
-                    # Command ID 24 = set_cali_wheel
-                    # Expect a single int32 parameter (wheel diameter adjustment in micrometers)
-                    command_seq, command_id, wheel_diameter = struct.unpack('<BBi', data[:6])
-                    await self._commands_rx.set_wheel_diameter_calibration(wheel_diameter)
-
-                    response = struct.pack('<B', command_seq) + bytes(19)
-                    self._ble_peripheral.add_to_p2c_queue(response)
-                elif command_id == 25:
-                    # Command ID 25 = set_cali_axel
-                    # Expect a single int32 parameter (axel distance adjustment in micrometers)
-                    command_seq, command_id, axel_distance = struct.unpack('<BBi', data[:6])
-                    await self._commands_rx.set_axel_distance_calibration(axel_distance)
-
-                    response = struct.pack('<B', command_seq) + bytes(19)
-                    self._ble_peripheral.add_to_p2c_queue(response)
-                elif command_id == 26:
-                    # Command ID 26 = get_wheel_diameter_calibration
-                    # Expect no parameters
-                    command_seq, command_id = struct.unpack('<BB', data[:2])
-                    cali_wheel = await self._commands_rx.get_wheel_diameter_calibration()
-
-                    response = struct.pack('<Bi', command_seq, cali_wheel) + bytes(15)
-                    self._ble_peripheral.add_to_p2c_queue(response)
-                elif command_id == 27:
-                    # Command ID 27 = get_axel_distance_calibration
-                    # Expect no parameters
-                    command_seq, command_id = struct.unpack('<BB', data[:2])
-                    cali_axel = await self._commands_rx.get_axel_distance_calibration()
-
-                    response = struct.pack('<Bi', command_seq, cali_axel) + bytes(15)
-                    self._ble_peripheral.add_to_p2c_queue(response)
-                elif command_id == 28:
-                    # Command ID 28 = set_turtle_id
-                    # Expect a single byte parameter (ID)
-                    command_seq, command_id, turtle_id = struct.unpack('<BBB', data[:3])
-                    await self._commands_rx.set_turtle_id(turtle_id)
-
-                    response = struct.pack('<B', command_seq) + bytes(19)
-                    self._ble_peripheral.add_to_p2c_queue(response)
-                elif command_id == 29:
-                    # Command ID 29 = get_turtle_id
-                    # Expect no parameters
-                    command_seq, command_id = struct.unpack('<BB', data[:2])
-                    turtle_id = await self._commands_rx.get_turtle_id()
-
-                    response = struct.pack('<BB', command_seq, turtle_id) + bytes(18)
-                    self._ble_peripheral.add_to_p2c_queue(response)
-                elif command_id == 30:
-                    # Command ID 30 = load_config
-                    # Expect no parameters
-                    command_seq, command_id = struct.unpack('<BB', data[:2])
-                    await self._commands_rx.load_config()
-
-                    response = struct.pack('<B', command_seq) + bytes(19)
-                    self._ble_peripheral.add_to_p2c_queue(response)
-                elif command_id == 31:
-                    # Command ID 31 = save_config
-                    # Expect no parameters
-                    command_seq, command_id = struct.unpack('<BB', data[:2])
-                    await self._commands_rx.save_config()
-
-                    response = struct.pack('<B', command_seq) + bytes(19)
-                    self._ble_peripheral.add_to_p2c_queue(response)
-                elif command_id == 32:
-                    # Command ID 32 = reset_config
-                    # Expect no parameters
-                    command_seq, command_id = struct.unpack('<BB', data[:2])
-                    await self._commands_rx.reset_config()
-
-                    response = struct.pack('<B', command_seq) + bytes(19)
-                    self._ble_peripheral.add_to_p2c_queue(response)
-                else:
-                    picolog.debug(f"Control::run - Unknown command ID = {command_id} received from central")
+                # C2P queue has data - process it (the packet is a view of the queue's
+                # slot, which stays valid until the next pop)
+                data = link.c2p_queue.pop()
+                if data is None:
+                    # The link was closed whilst waiting
+                    continue
+
+                # If central has retransmitted a command we have already executed (because
+                # the response was lost) send the original response again rather than
+                # repeating the command
+                cached_response = self.__completed_response(link, data[0], data[1])
+                if cached_response is not None:
+                    picolog.debug(f"Control::run - Sequence ID = {data[0]} already executed - resending response")
+                    link.add_to_p2c_queue(cached_response)
+                    continue
+
+                # Whilst a stored program is playing only the program status and
+                # stop commands are processed, anything else is refused straight away
+                # (so a stop command queued behind it is not held up)
+                if self.program_running and data[1] not in _PROGRAM_SAFE_COMMANDS:
+                    picolog.debug(f"Control::run - Command ID = {data[1]} refused - a program is playing")
+                    self.__refuse(link, data[0], protocol.REFUSED_PROGRAM_RUNNING)
+                    continue
+
+                self._executing_link = link
+                self._executing_seq = data[0]
+                response = await self.__execute(data, link)
+                self._executing_link = None
+                if response is not None:
+                    self.__complete(data[0], data[1], response)
+                    link.add_to_p2c_queue(response)
+
+                # Let the other tasks run before the next command.  A command can complete
+                # without waiting (setposition and towards block until their motion is done)
+                # and, whilst central keeps the queue full, the responses would not be sent
+                await asyncio.sleep(0)
+
+    # Process commands from the monitor centrals.  Monitors can only use read-only
+    # commands; they are not deduplicated as repeating a read does no harm
+    async def __serve_monitors(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._ble_peripheral.monitor_queue_event.wait(), 0.25)
+            except asyncio.TimeoutError:
+                pass
+            self._ble_peripheral.monitor_queue_event.clear()
+
+            for link in self._ble_peripheral.links:
+                while link.is_connected and link.role == ROLE_MONITOR and len(link.c2p_queue) > 0:
+                    data = link.c2p_queue.pop()
+                    if data[1] not in _MONITOR_COMMANDS:
+                        picolog.info(f"Control::__serve_monitors - Command ID = {data[1]} refused - only the controller can use it")
+                        self.__refuse(link, data[0], protocol.REFUSED_NOT_CONTROLLER)
+                        continue
+
+                    response = await self.__execute(data, link)
+                    if response is not None:
+                        link.add_to_p2c_queue(response)
+
+    # Called by CommandsRx when a motion starts.  Motions started by the controller's
+    # command are acknowledged straight away with the expected duration, so central
+    # can tell a long motion from a failed link (motions during program playback
+    # are not acknowledged)
+    def __acknowledge_motion(self, duration_ms: int):
+        link = self._executing_link
+        if link is None or not link.is_connected:
+            return
+        struct.pack_into(protocol.MOTION_ACK, self._motion_ack, 0, 0, protocol.MOTION_ACK_MARKER, self._executing_seq, duration_ms)
+        link.add_to_p2c_queue(self._motion_ack)
+        picolog.debug(f"Control::__acknowledge_motion - Sequence ID = {self._executing_seq} motion started, expected duration {duration_ms} ms")
+
+    # Tell central that a command won't be processed (the refusal isn't remembered as a
+    # completed command, so the command can be sent again once the reason has gone)
+    def __refuse(self, link: CentralLink, command_seq: int, reason: int):
+        struct.pack_into(protocol.REFUSED, self._refusal, 0, 0, protocol.REFUSED_MARKER, command_seq, reason)
+        link.add_to_p2c_queue(self._refusal)
+
+    # Return the cached response for a completed sequence ID (or None).  The command
+    # ID must match too, so a command that only shares the sequence ID of an old one
+    # is executed rather than answered with the old response
+    def __completed_response(self, link: CentralLink, command_seq: int, command_id: int) -> bytes:
+        # Sequence IDs restart when a new controller (or host session) connects, so
+        # forget the old ones
+        if self._completed_connection_id != link.connection_id:
+            self._completed_connection_id = link.connection_id
+            for i in range(_DEDUP_WINDOW):
+                self._completed_seqs[i] = 0
+                self._completed_commands[i] = 0
+                self._completed_responses[i] = None
+            return None
+
+        if command_seq == 0:
+            return None
+
+        for i in range(_DEDUP_WINDOW):
+            if self._completed_seqs[i] == command_seq and self._completed_commands[i] == command_id:
+                return self._completed_responses[i]
+        return None
+
+    # Remember the response to a completed command
+    def __complete(self, command_seq: int, command_id: int, response: bytes):
+        if command_seq == 0:
+            return
+
+        self._completed_seqs[self._completed_index] = command_seq
+        self._completed_commands[self._completed_index] = command_id
+        self._completed_responses[self._completed_index] = response
+        self._completed_index = (self._completed_index + 1) % _DEDUP_WINDOW
+
+    # Decode a command packet, call the handler for the command from the dispatch
+    # table and return the response packet (or None if there is no response).
+    # The packet is decoded in place (with unpack_from) as it is a buffer from the
+    # receive pool rather than a copy.  The request and response formats come from
+    # protocol.py which is generated from protocol/schema.py
+    async def __execute(self, data, link: CentralLink = None) -> bytes:
+        command_seq = data[0]
+        command_id = data[1]
+
+        if command_id == protocol.CMD_NOP:
+            return None
+
+        handler = self._dispatch.get(command_id)
+        if handler is None and link is not None:
+            handler = self._link_dispatch.get(command_id)
+        if handler is None:
+            picolog.debug(f"Control::__execute - Unknown command ID = {command_id} received from central")
+            return None
+
+        parameters = struct.unpack_from(protocol.REQUEST_PARAMETERS[command_id], data, 2)
+        if command_id in self._link_dispatch:
+            result = await handler(link, *parameters)
+        else:
+            result = await handler(*parameters)
+
+        # Handlers return None (no response fields), a single value or a tuple of values
+        if result is None:
+            result = ()
+        elif not isinstance(result, tuple):
+            result = (result,)
+
+        return struct.pack(protocol.RESPONSE_FORMATS[command_id], command_seq, *result) + bytes(protocol.RESPONSE_PADDING[command_id])
+
+    # Command handlers that need more than a direct call to CommandsRx ---------------
+    # (these are looked up by name from protocol.HANDLERS, so they have a single
+    # leading underscore)
+
+    # Negative distances and angles are performed as the opposite movement
+    async def _forward(self, distance_mm: float) -> tuple[float, float, float]:
+        if distance_mm >= 0:
+            return await self._commands_rx.forward(distance_mm)
+        return await self._commands_rx.backward(-distance_mm)
+
+    async def _backward(self, distance_mm: float) -> tuple[float, float, float]:
+        if distance_mm >= 0:
+            return await self._commands_rx.backward(distance_mm)
+        return await self._commands_rx.forward(-distance_mm)
+
+    async def _left(self, angle_degrees: float) -> tuple[float, float, float]:
+        if angle_degrees >= 0:
+            return await self._commands_rx.left(angle_degrees)
+        return await self._commands_rx.right(-angle_degrees)
+
+    async def _right(self, angle_degrees: float) -> tuple[float, float, float]:
+        if angle_degrees >= 0:
+            return await self._commands_rx.right(angle_degrees)
+        return await self._commands_rx.left(-angle_degrees)
+
+    async def _program_begin(self, length: int) -> bool:
+        return self._program_store.begin(length)
+
+    async def _program_write(self, offset: int, length: int, chunk: bytes) -> tuple[bool, int]:
+        result = self._program_store.write(offset, chunk[:min(length, 15)])
+        return result, self._program_store.bytes_received
+
+    async def _program_end(self, crc32: int) -> tuple[bool, int]:
+        result = self._program_store.end(crc32)
+        return result, self._program_store.record_count
+
+    async def _run_program(self) -> tuple[bool, int]:
+        result = False
+        if self._program_store.is_valid and not self.program_running:
+            self._program_state = _PROGRAM_RUNNING
+            self._program_position = 0
+            self._program_stop = False
+            asyncio.create_task(self.__play_program())
+            result = True
+        return result, self._program_store.record_count
+
+    async def _program_status(self) -> tuple[int, int, int]:
+        if self._program_store.format == FORMAT_BYTECODE and self.program_running:
+            # For bytecode programs the position is the interpreter's code address
+            self._program_position = self._turtle_vm.pc
+        return self._program_state, self._program_position, self._program_store.record_count
+
+    async def _stop_program(self):
+        if self.program_running:
+            self._program_stop = True
+
+    async def _link_parameters(self, link: CentralLink) -> tuple[int, int, int]:
+        return link.connection_parameters
+
+    async def _link_role(self, link: CentralLink) -> int:
+        return link.role
+
+    # Play the stored program locally through the command handler.  Each record is
+    # placed into a command packet (with a zero sequence number) and executed
+    # exactly as if it had been received from central; the responses are discarded
+    async def __play_program(self):
+        if self._program_store.format == FORMAT_BYTECODE:
+            await self.__run_bytecode()
+            return
+
+        picolog.info(f"Control::__play_program - Running stored program with {self._program_store.record_count} records")
+
+        try:
+            for record in self._program_store.records():
+                if self._program_stop or self._power_low_event.is_set():
+                    picolog.info(f"Control::__play_program - Program stopped at record {self._program_position}")
+                    self._program_state = _PROGRAM_STOPPED
+                    return
+
+                # Programs cannot contain program commands (or NOPs)
+                if len(record) == 0 or len(record) > 19 or record[0] == protocol.CMD_NOP or record[0] >= protocol.CMD_PROGRAM_BEGIN:
+                    picolog.error(f"Control::__play_program - Invalid record {self._program_position} in program")
+                    self._program_state = _PROGRAM_FAILED
+                    return
+
+                for i in range(len(self._program_packet)):
+                    self._program_packet[i] = 0
+                self._program_packet[1:1 + len(record)] = record
+                await self.__execute(self._program_packet)
+                self._program_position += 1
+        except Exception as e:
+            picolog.error(f"Control::__play_program - Exception {e}")
+            self._program_state = _PROGRAM_FAILED
+            return
+
+        picolog.info("Control::__play_program - Program complete")
+        self._program_state = _PROGRAM_COMPLETE
+
+    # Play a stored bytecode program using the turtle VM
+    async def __run_bytecode(self):
+        picolog.info(f"Control::__run_bytecode - Running stored bytecode program of {self._program_store.record_count} bytes")
+
+        try:
+            completed = await self._turtle_vm.run(self._program_store.read(),
+                lambda: self._program_stop or self._power_low_event.is_set())
+        except Exception as e:
+            picolog.error(f"Control::__run_bytecode - Exception {e} at address {self._turtle_vm.pc}")
+            self._program_position = self._turtle_vm.pc
+            self._program_state = _PROGRAM_FAILED
+            return
+
+        self._program_position = self._turtle_vm.pc
+        if completed:
+            picolog.info("Control::__run_bytecode - Program complete")
+            self._program_state = _PROGRAM_COMPLETE
+        else:
+            picolog.info(f"Control::__run_bytecode - Program stopped at address {self._program_position}")
+            self._program_state = _PROGRAM_STOPPED
 
 if __name__ == "__main__":
     from main import main
@@ -98,7 +98,12 @@ class DiffDrive:
     @property
     def is_moving(self):
         """Returns True if the motors are moving"""
-        return self._left_stepper.is_busy
+        return self._left_stepper.is_busy or self._right_stepper.is_busy
+
+    @property
+    def remaining_ms(self) -> int:
+        """Returns the expected time until the current motion completes in milliseconds"""
+        return max(self._left_stepper.remaining_ms, self._right_stepper.remaining_ms)
     
     def set_wheel_calibration(self, value: int):
         """Set the wheel calibration in micrometers"""
@@ -162,7 +167,11 @@ class DiffDrive:
         arc_center_x = self._x_pos - radius_um * math.sin(self._heading_radians)
         arc_center_y = self._y_pos + radius_um * math.cos(self._heading_radians)
 
-        new_heading_radians = self._heading_radians + math.radians(extent_degrees)
+        # A negative radius circles to the right, so the heading decreases
+        if radius_um < 0:
+            new_heading_radians = self._heading_radians - math.radians(extent_degrees)
+        else:
+            new_heading_radians = self._heading_radians + math.radians(extent_degrees)
 
         self._x_pos = arc_center_x + radius_um * math.sin(new_heading_radians)
         self._y_pos = arc_center_y - radius_um * math.cos(new_heading_radians)
@@ -36,6 +36,8 @@ from diffdrive import DiffDrive
 from machine import I2C, Pin
 from commands_rx import CommandsRx
 from control import Control
+from program_store import ProgramStore
+from bulk_transfer import BulkTransfer
 import asyncio
 
 # GPIO hardware mapping
@@ -142,6 +144,10 @@ def main():
                     picolog.warning("Power monitor: Power low event cleared")
                     power_low_event.clear()
 
+            # Update the status shown in the BLE advertising data
+            busy = control.program_running or diff_drive.is_moving
+            ble_peripheral.set_status(configuration.turtle_id, voltage, busy, power_low_event.is_set())
+
             await asyncio.sleep(5)
 
     # Async task generation and launch
@@ -149,6 +155,7 @@ def main():
         tasks = [
             asyncio.create_task(ble_peripheral.run()), # BLE peripheral tasks
             asyncio.create_task(control.run()), # Control task (BLE <-> Commands)
+            asyncio.create_task(bulk_transfer.run()), # L2CAP bulk transfer task
             asyncio.create_task(led_fx.run()), # LED effects task
             asyncio.create_task(robot_status_task()), # Robot status monitoring task
             asyncio.create_task(power_monitor_task()), # Robot power monitoring task
@@ -194,8 +201,14 @@ def main():
     # Initialise the commands handler
     commands = CommandsRx(pen, ina260, eeprom, led_fx, diff_drive, configuration)
 
+    # Initialise the on-robot program storage
+    program_store = ProgramStore()
+
     # Initialise the control handler
-    control = Control(ble_peripheral, commands, power_low_event)
+    control = Control(ble_peripheral, commands, power_low_event, program_store)
+
+    # Initialise the bulk transfer channel
+    bulk_transfer = BulkTransfer(ble_peripheral, program_store, control)
 
     # Run
     asyncio.run(aio_main())
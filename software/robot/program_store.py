@@ -0,0 +1,241 @@
+#************************************************************************
+#
+#   program_store.py
+#
+#   On-robot program storage (flash filesystem)
+#   Valiant Turtle 2 - Robot firmware
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+import picolog
+import binascii
+import os
+from micropython import const
+
+# Program image formats (the first byte of a stored program)
+FORMAT_COMMANDS = const(0x01) # Sequence of length-prefixed command records
+FORMAT_BYTECODE = const(0x02) # TurtleVm bytecode (see turtle_vm.py)
+
+class ProgramStore:
+    """
+    Stores a compiled turtle program in the robot's flash filesystem so that it
+    can be played back locally (without the BLE link).
+
+    A program image is a format byte followed by a series of records.  For the
+    command record format each record is a length byte followed by the command
+    ID and its parameters (exactly as they appear in a BLE command packet, but
+    without the sequence number).  For the bytecode format the rest of the image
+    is executed by TurtleVm and the record count is the size of the code in bytes.
+
+    Uploads are written to a temporary file which only replaces the stored
+    program once the whole image has been received and its CRC32 verified.
+    """
+    def __init__(self, filename: str = "program.bin", max_size: int = 65535):
+        self._filename = filename
+        self._temp_filename = filename + ".tmp"
+        self._max_size = max_size
+
+        # Upload state
+        self._upload_file = None
+        self._upload_length = 0
+        self._upload_received = 0
+        self._upload_crc = 0
+
+        # Stored program state
+        self._format = 0
+        self._record_count = 0
+        self._size = 0
+        self._is_valid = False
+
+        # Check if there is a valid program already in flash
+        self.__index()
+
+    @property
+    def is_valid(self) -> bool:
+        return self._is_valid
+
+    @property
+    def record_count(self) -> int:
+        return self._record_count
+
+    @property
+    def format(self) -> int:
+        return self._format
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def begin(self, length: int) -> bool:
+        """Start a new program upload of the specified length in bytes"""
+        if self._upload_file is not None:
+            self._upload_file.close()
+            self._upload_file = None
+
+        if length < 1 or length > self._max_size:
+            picolog.error(f"ProgramStore::begin - Program length of {length} bytes is out of range (1-{self._max_size})")
+            return False
+
+        try:
+            self._upload_file = open(self._temp_filename, "wb")
+        except OSError as e:
+            picolog.error(f"ProgramStore::begin - Unable to create {self._temp_filename} - {e}")
+            return False
+
+        self._upload_length = length
+        self._upload_received = 0
+        self._upload_crc = 0
+        picolog.info(f"ProgramStore::begin - Receiving program of {length} bytes")
+        return True
+
+    def write(self, offset: int, data) -> bool:
+        """Write a chunk of the program image. Chunks must arrive in order"""
+        if self._upload_file is None:
+            picolog.error("ProgramStore::write - No upload in progress")
+            return False
+
+        if offset != self._upload_received:
+            picolog.error(f"ProgramStore::write - Expected offset {self._upload_received} but got {offset}")
+            return False
+
+        if self._upload_received + len(data) > self._upload_length:
+            picolog.error("ProgramStore::write - Chunk exceeds the declared program length")
+            return False
+
+        self._upload_file.write(data)
+        self._upload_crc = binascii.crc32(data, self._upload_crc)
+        self._upload_received += len(data)
+        return True
+
+    @property
+    def bytes_received(self) -> int:
+        return self._upload_received
+
+    def end(self, crc32: int) -> bool:
+        """Finish the upload, verify it and make it the stored program"""
+        if self._upload_file is None:
+            picolog.error("ProgramStore::end - No upload in progress")
+            return False
+
+        self._upload_file.close()
+        self._upload_file = None
+
+        if self._upload_received != self._upload_length:
+            picolog.error(f"ProgramStore::end - Received {self._upload_received} of {self._upload_length} bytes")
+            self.__remove(self._temp_filename)
+            return False
+
+        if (self._upload_crc & 0xFFFFFFFF) != (crc32 & 0xFFFFFFFF):
+            picolog.error(f"ProgramStore::end - CRC mismatch (expected {crc32:08x}, calculated {self._upload_crc:08x})")
+            self.__remove(self._temp_filename)
+            return False
+
+        # Replace the stored program with the new one
+        self.__remove(self._filename)
+        os.rename(self._temp_filename, self._filename)
+        self.__index()
+
+        picolog.info(f"ProgramStore::end - Program stored with {self._record_count} records")
+        return self._is_valid
+
+    def read(self) -> bytes:
+        """Return the whole of the stored program image"""
+        if not self._is_valid:
+            return b""
+
+        with open(self._filename, "rb") as f:
+            return f.read()
+
+    def chunks(self, buffer):
+        """Generator filling the buffer with successive chunks of the stored program image (returns the length of each)"""
+        if not self._is_valid:
+            return
+
+        with open(self._filename, "rb") as f:
+            while True:
+                length = f.readinto(buffer)
+                if not length:
+                    break
+                yield length
+
+    def records(self):
+        """Generator returning each record of the stored program in order"""
+        if not self._is_valid or self._format != FORMAT_COMMANDS:
+            return
+
+        with open(self._filename, "rb") as f:
+            f.read(1) # Skip the format byte
+            while True:
+                length = f.read(1)
+                if not length:
+                    break
+                yield f.read(length[0])
+
+    def __index(self):
+        # Check the stored program and count the records
+        self._is_valid = False
+        self._record_count = 0
+        self._size = 0
+        self._format = 0
+
+        try:
+            with open(self._filename, "rb") as f:
+                header = f.read(1)
+                if not header or header[0] not in (FORMAT_COMMANDS, FORMAT_BYTECODE):
+                    picolog.info("ProgramStore::__index - No valid program stored")
+                    return
+                self._format = header[0]
+
+                count = 0
+                if self._format == FORMAT_BYTECODE:
+                    # Bytecode is checked by TurtleVm as it runs, so just measure the
+                    # code (after the format and global variable count bytes)
+                    count = os.stat(self._filename)[6] - 2
+                    if count < 1:
+                        picolog.error("ProgramStore::__index - Stored bytecode program is truncated")
+                        return
+
+                while self._format == FORMAT_COMMANDS:
+                    length = f.read(1)
+                    if not length:
+                        break
+                    if length[0] == 0 or len(f.read(length[0])) != length[0]:
+                        picolog.error("ProgramStore::__index - Stored program is truncated or corrupt")
+                        return
+                    count += 1
+        except OSError:
+            picolog.info("ProgramStore::__index - No program stored")
+            return
+
+        self._record_count = count
+        self._size = os.stat(self._filename)[6]
+        self._is_valid = True
+        picolog.info(f"ProgramStore::__index - Stored program has {self._record_count} records")
+
+    def __remove(self, filename: str):
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
+
+if __name__ == "__main__":
+    from main import main
+    main()
@@ -0,0 +1,372 @@
+#************************************************************************
+#
+#   protocol.py
+#
+#   Command protocol definitions (robot)
+#   Valiant Turtle 2 - Robot firmware
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+# Note: This file is generated from protocol/schema.py by protocol/generate.py
+# - do not edit it by hand.
+
+from micropython import const
+
+PACKET_LENGTH = const(20)
+
+# Flow control bytes in packets sent by the robot
+QUEUE_DEPTH_OFFSET = const(18)
+CREDIT_LIMIT_OFFSET = const(19)
+
+# Bulk transfer channel
+L2CAP_PSM = const(128)
+L2CAP_MTU = const(512)
+BULK_MAGIC = const(86)
+BULK_HEADER = "<BBHII"
+BULK_PROGRAM_UPLOAD = const(1)
+BULK_PROGRAM_DOWNLOAD = const(2)
+
+# Motion acknowledgement (sent before the response when a motion starts)
+MOTION_ACK_MARKER = const(1)
+MOTION_ACK = "<BBBI"
+
+# Refusal (sent in place of the response when a command can't be processed)
+REFUSED_MARKER = const(2)
+REFUSED = "<BBBB"
+REFUSED_PROGRAM_RUNNING = const(1)
+REFUSED_NOT_CONTROLLER = const(2)
+
+# Session (written by central when it connects, before any commands)
+SESSION_MARKER = const(1)
+SESSION = "<BBI"
+
+# Status carried in the advertising manufacturer data
+ADVERTISING_COMPANY_ID = const(65505)
+ADVERTISING_STATUS = "<BHB"
+ADVERTISING_FLAG_CONNECTED = const(1)
+ADVERTISING_FLAG_BUSY = const(2)
+ADVERTISING_FLAG_POWER_LOW = const(4)
+
+# Command IDs
+CMD_NOP = const(0) # No operation (used for polling)
+CMD_MOTORS = const(1) # Enable (1) or disable (0) the motors
+CMD_FORWARD = const(2) # Move forward
+CMD_BACKWARD = const(3) # Move backward
+CMD_LEFT = const(4) # Turn left
+CMD_RIGHT = const(5) # Turn right
+CMD_CIRCLE = const(6) # Move in a circle
+CMD_SETHEADING = const(7) # Turn to a heading
+CMD_SETX = const(8) # Move to an x position
+CMD_SETY = const(9) # Move to a y position
+CMD_SETPOSITION = const(10) # Move to a position
+CMD_TOWARDS = const(11) # Turn towards a position
+CMD_RESET_ORIGIN = const(12) # Make the current position the origin
+CMD_HEADING = const(13) # Get the heading
+CMD_POSITION = const(14) # Get the position
+CMD_PENUP = const(15) # Lift the pen
+CMD_PENDOWN = const(16) # Lower the pen
+CMD_EYES = const(17) # Set the eye colour (0 = both, 1 = left, 2 = right)
+CMD_POWER = const(18) # Get the power status
+CMD_ISDOWN = const(19) # Get the pen position
+CMD_SET_LINEAR_VELOCITY = const(20) # Set the linear velocity
+CMD_SET_ROTATIONAL_VELOCITY = const(21) # Set the rotational velocity
+CMD_GET_LINEAR_VELOCITY = const(22) # Get the linear velocity
+CMD_GET_ROTATIONAL_VELOCITY = const(23) # Get the rotational velocity
+CMD_SET_WHEEL_DIAMETER_CALIBRATION = const(24) # Set the wheel diameter calibration (um)
+CMD_SET_AXEL_DISTANCE_CALIBRATION = const(25) # Set the axel distance calibration (um)
+CMD_GET_WHEEL_DIAMETER_CALIBRATION = const(26) # Get the wheel diameter calibration (um)
+CMD_GET_AXEL_DISTANCE_CALIBRATION = const(27) # Get the axel distance calibration (um)
+CMD_SET_TURTLE_ID = const(28) # Set the turtle ID (0-7)
+CMD_GET_TURTLE_ID = const(29) # Get the turtle ID
+CMD_LOAD_CONFIG = const(30) # Load the configuration from EEPROM
+CMD_SAVE_CONFIG = const(31) # Save the configuration to EEPROM
+CMD_RESET_CONFIG = const(32) # Reset the configuration to the defaults
+CMD_PROGRAM_BEGIN = const(33) # Start a program upload
+CMD_PROGRAM_WRITE = const(34) # Write up to 15 bytes of the program
+CMD_PROGRAM_END = const(35) # Finish and verify a program upload
+CMD_RUN_PROGRAM = const(36) # Play the stored program
+CMD_PROGRAM_STATUS = const(37) # Get the program playback status
+CMD_STOP_PROGRAM = const(38) # Stop program playback
+CMD_LINK_PARAMETERS = const(39) # Get the BLE connection parameters (1.25 ms units, events, 10 ms units)
+CMD_LINK_ROLE = const(40) # Get the central's role (0 = controller, 1 = monitor)
+
+# Packet formats (requests include the sequence number and command ID,
+# responses include the sequence number)
+MOTORS_REQUEST = "<BBB"
+MOTORS_RESPONSE = "<B"
+FORWARD_REQUEST = "<BBf"
+FORWARD_RESPONSE = "<Bfff"
+BACKWARD_REQUEST = "<BBf"
+BACKWARD_RESPONSE = "<Bfff"
+LEFT_REQUEST = "<BBf"
+LEFT_RESPONSE = "<Bfff"
+RIGHT_REQUEST = "<BBf"
+RIGHT_RESPONSE = "<Bfff"
+CIRCLE_REQUEST = "<BBff"
+CIRCLE_RESPONSE = "<Bfff"
+SETHEADING_REQUEST = "<BBf"
+SETHEADING_RESPONSE = "<B"
+SETX_REQUEST = "<BBf"
+SETX_RESPONSE = "<Bfff"
+SETY_REQUEST = "<BBf"
+SETY_RESPONSE = "<Bfff"
+SETPOSITION_REQUEST = "<BBff"
+SETPOSITION_RESPONSE = "<Bfff"
+TOWARDS_REQUEST = "<BBff"
+TOWARDS_RESPONSE = "<Bfff"
+RESET_ORIGIN_REQUEST = "<BB"
+RESET_ORIGIN_RESPONSE = "<B"
+HEADING_REQUEST = "<BB"
+HEADING_RESPONSE = "<Bf"
+POSITION_REQUEST = "<BB"
+POSITION_RESPONSE = "<Bff"
+PENUP_REQUEST = "<BB"
+PENUP_RESPONSE = "<B"
+PENDOWN_REQUEST = "<BB"
+PENDOWN_RESPONSE = "<B"
+EYES_REQUEST = "<BBBBBB"
+EYES_RESPONSE = "<B"
+POWER_REQUEST = "<BB"
+POWER_RESPONSE = "<Blll"
+ISDOWN_REQUEST = "<BB"
+ISDOWN_RESPONSE = "<BB"
+SET_LINEAR_VELOCITY_REQUEST = "<BBll"
+SET_LINEAR_VELOCITY_RESPONSE = "<B"
+SET_ROTATIONAL_VELOCITY_REQUEST = "<BBll"
+SET_ROTATIONAL_VELOCITY_RESPONSE = "<B"
+GET_LINEAR_VELOCITY_REQUEST = "<BB"
+GET_LINEAR_VELOCITY_RESPONSE = "<Bll"
+GET_ROTATIONAL_VELOCITY_REQUEST = "<BB"
+GET_ROTATIONAL_VELOCITY_RESPONSE = "<Bll"
+SET_WHEEL_DIAMETER_CALIBRATION_REQUEST = "<BBi"
+SET_WHEEL_DIAMETER_CALIBRATION_RESPONSE = "<B"
+SET_AXEL_DISTANCE_CALIBRATION_REQUEST = "<BBi"
+SET_AXEL_DISTANCE_CALIBRATION_RESPONSE = "<B"
+GET_WHEEL_DIAMETER_CALIBRATION_REQUEST = "<BB"
+GET_WHEEL_DIAMETER_CALIBRATION_RESPONSE = "<Bi"
+GET_AXEL_DISTANCE_CALIBRATION_REQUEST = "<BB"
+GET_AXEL_DISTANCE_CALIBRATION_RESPONSE = "<Bi"
+SET_TURTLE_ID_REQUEST = "<BBB"
+SET_TURTLE_ID_RESPONSE = "<B"
+GET_TURTLE_ID_REQUEST = "<BB"
+GET_TURTLE_ID_RESPONSE = "<BB"
+LOAD_CONFIG_REQUEST = "<BB"
+LOAD_CONFIG_RESPONSE = "<B"
+SAVE_CONFIG_REQUEST = "<BB"
+SAVE_CONFIG_RESPONSE = "<B"
+RESET_CONFIG_REQUEST = "<BB"
+RESET_CONFIG_RESPONSE = "<B"
+PROGRAM_BEGIN_REQUEST = "<BBI"
+PROGRAM_BEGIN_RESPONSE = "<BB"
+PROGRAM_WRITE_REQUEST = "<BBHB15s"
+PROGRAM_WRITE_RESPONSE = "<BBH"
+PROGRAM_END_REQUEST = "<BBI"
+PROGRAM_END_RESPONSE = "<BBH"
+RUN_PROGRAM_REQUEST = "<BB"
+RUN_PROGRAM_RESPONSE = "<BBH"
+PROGRAM_STATUS_REQUEST = "<BB"
+PROGRAM_STATUS_RESPONSE = "<BBHH"
+STOP_PROGRAM_REQUEST = "<BB"
+STOP_PROGRAM_RESPONSE = "<B"
+LINK_PARAMETERS_REQUEST = "<BB"
+LINK_PARAMETERS_RESPONSE = "<BHHH"
+LINK_ROLE_REQUEST = "<BB"
+LINK_ROLE_RESPONSE = "<BB"
+
+# Request parameter formats (unpacked from offset 2 of a command packet)
+REQUEST_PARAMETERS = {
+    CMD_MOTORS: "<B",
+    CMD_FORWARD: "<f",
+    CMD_BACKWARD: "<f",
+    CMD_LEFT: "<f",
+    CMD_RIGHT: "<f",
+    CMD_CIRCLE: "<ff",
+    CMD_SETHEADING: "<f",
+    CMD_SETX: "<f",
+    CMD_SETY: "<f",
+    CMD_SETPOSITION: "<ff",
+    CMD_TOWARDS: "<ff",
+    CMD_RESET_ORIGIN: "<",
+    CMD_HEADING: "<",
+    CMD_POSITION: "<",
+    CMD_PENUP: "<",
+    CMD_PENDOWN: "<",
+    CMD_EYES: "<BBBB",
+    CMD_POWER: "<",
+    CMD_ISDOWN: "<",
+    CMD_SET_LINEAR_VELOCITY: "<ll",
+    CMD_SET_ROTATIONAL_VELOCITY: "<ll",
+    CMD_GET_LINEAR_VELOCITY: "<",
+    CMD_GET_ROTATIONAL_VELOCITY: "<",
+    CMD_SET_WHEEL_DIAMETER_CALIBRATION: "<i",
+    CMD_SET_AXEL_DISTANCE_CALIBRATION: "<i",
+    CMD_GET_WHEEL_DIAMETER_CALIBRATION: "<",
+    CMD_GET_AXEL_DISTANCE_CALIBRATION: "<",
+    CMD_SET_TURTLE_ID: "<B",
+    CMD_GET_TURTLE_ID: "<",
+    CMD_LOAD_CONFIG: "<",
+    CMD_SAVE_CONFIG: "<",
+    CMD_RESET_CONFIG: "<",
+    CMD_PROGRAM_BEGIN: "<I",
+    CMD_PROGRAM_WRITE: "<HB15s",
+    CMD_PROGRAM_END: "<I",
+    CMD_RUN_PROGRAM: "<",
+    CMD_PROGRAM_STATUS: "<",
+    CMD_STOP_PROGRAM: "<",
+    CMD_LINK_PARAMETERS: "<",
+    CMD_LINK_ROLE: "<",
+}
+
+# Response formats and the number of padding bytes needed to fill a packet
+RESPONSE_FORMATS = {
+    CMD_MOTORS: MOTORS_RESPONSE,
+    CMD_FORWARD: FORWARD_RESPONSE,
+    CMD_BACKWARD: BACKWARD_RESPONSE,
+    CMD_LEFT: LEFT_RESPONSE,
+    CMD_RIGHT: RIGHT_RESPONSE,
+    CMD_CIRCLE: CIRCLE_RESPONSE,
+    CMD_SETHEADING: SETHEADING_RESPONSE,
+    CMD_SETX: SETX_RESPONSE,
+    CMD_SETY: SETY_RESPONSE,
+    CMD_SETPOSITION: SETPOSITION_RESPONSE,
+    CMD_TOWARDS: TOWARDS_RESPONSE,
+    CMD_RESET_ORIGIN: RESET_ORIGIN_RESPONSE,
+    CMD_HEADING: HEADING_RESPONSE,
+    CMD_POSITION: POSITION_RESPONSE,
+    CMD_PENUP: PENUP_RESPONSE,
+    CMD_PENDOWN: PENDOWN_RESPONSE,
+    CMD_EYES: EYES_RESPONSE,
+    CMD_POWER: POWER_RESPONSE,
+    CMD_ISDOWN: ISDOWN_RESPONSE,
+    CMD_SET_LINEAR_VELOCITY: SET_LINEAR_VELOCITY_RESPONSE,
+    CMD_SET_ROTATIONAL_VELOCITY: SET_ROTATIONAL_VELOCITY_RESPONSE,
+    CMD_GET_LINEAR_VELOCITY: GET_LINEAR_VELOCITY_RESPONSE,
+    CMD_GET_ROTATIONAL_VELOCITY: GET_ROTATIONAL_VELOCITY_RESPONSE,
+    CMD_SET_WHEEL_DIAMETER_CALIBRATION: SET_WHEEL_DIAMETER_CALIBRATION_RESPONSE,
+    CMD_SET_AXEL_DISTANCE_CALIBRATION: SET_AXEL_DISTANCE_CALIBRATION_RESPONSE,
+    CMD_GET_WHEEL_DIAMETER_CALIBRATION: GET_WHEEL_DIAMETER_CALIBRATION_RESPONSE,
+    CMD_GET_AXEL_DISTANCE_CALIBRATION: GET_AXEL_DISTANCE_CALIBRATION_RESPONSE,
+    CMD_SET_TURTLE_ID: SET_TURTLE_ID_RESPONSE,
+    CMD_GET_TURTLE_ID: GET_TURTLE_ID_RESPONSE,
+    CMD_LOAD_CONFIG: LOAD_CONFIG_RESPONSE,
+    CMD_SAVE_CONFIG: SAVE_CONFIG_RESPONSE,
+    CMD_RESET_CONFIG: RESET_CONFIG_RESPONSE,
+    CMD_PROGRAM_BEGIN: PROGRAM_BEGIN_RESPONSE,
+    CMD_PROGRAM_WRITE: PROGRAM_WRITE_RESPONSE,
+    CMD_PROGRAM_END: PROGRAM_END_RESPONSE,
+    CMD_RUN_PROGRAM: RUN_PROGRAM_RESPONSE,
+    CMD_PROGRAM_STATUS: PROGRAM_STATUS_RESPONSE,
+    CMD_STOP_PROGRAM: STOP_PROGRAM_RESPONSE,
+    CMD_LINK_PARAMETERS: LINK_PARAMETERS_RESPONSE,
+    CMD_LINK_ROLE: LINK_ROLE_RESPONSE,
+}
+RESPONSE_PADDING = {
+    CMD_MOTORS: 19,
+    CMD_FORWARD: 7,
+    CMD_BACKWARD: 7,
+    CMD_LEFT: 7,
+    CMD_RIGHT: 7,
+    CMD_CIRCLE: 7,
+    CMD_SETHEADING: 19,
+    CMD_SETX: 7,
+    CMD_SETY: 7,
+    CMD_SETPOSITION: 7,
+    CMD_TOWARDS: 7,
+    CMD_RESET_ORIGIN: 19,
+    CMD_HEADING: 15,
+    CMD_POSITION: 11,
+    CMD_PENUP: 19,
+    CMD_PENDOWN: 19,
+    CMD_EYES: 19,
+    CMD_POWER: 7,
+    CMD_ISDOWN: 18,
+    CMD_SET_LINEAR_VELOCITY: 19,
+    CMD_SET_ROTATIONAL_VELOCITY: 19,
+    CMD_GET_LINEAR_VELOCITY: 11,
+    CMD_GET_ROTATIONAL_VELOCITY: 11,
+    CMD_SET_WHEEL_DIAMETER_CALIBRATION: 19,
+    CMD_SET_AXEL_DISTANCE_CALIBRATION: 19,
+    CMD_GET_WHEEL_DIAMETER_CALIBRATION: 15,
+    CMD_GET_AXEL_DISTANCE_CALIBRATION: 15,
+    CMD_SET_TURTLE_ID: 19,
+    CMD_GET_TURTLE_ID: 18,
+    CMD_LOAD_CONFIG: 19,
+    CMD_SAVE_CONFIG: 19,
+    CMD_RESET_CONFIG: 19,
+    CMD_PROGRAM_BEGIN: 18,
+    CMD_PROGRAM_WRITE: 16,
+    CMD_PROGRAM_END: 16,
+    CMD_RUN_PROGRAM: 16,
+    CMD_PROGRAM_STATUS: 14,
+    CMD_STOP_PROGRAM: 19,
+    CMD_LINK_PARAMETERS: 13,
+    CMD_LINK_ROLE: 18,
+}
+
+# Command handler owners (see HANDLERS)
+HANDLER_COMMANDS_RX = const(0)
+HANDLER_CONTROL = const(1)
+HANDLER_LINK = const(2)
+
+# Command ID -> (handler owner, handler name).  Handlers are called with the
+# request parameters (link handlers are passed the link first)
+HANDLERS = {
+    CMD_MOTORS: (HANDLER_COMMANDS_RX, "motors"),
+    CMD_FORWARD: (HANDLER_CONTROL, "_forward"),
+    CMD_BACKWARD: (HANDLER_CONTROL, "_backward"),
+    CMD_LEFT: (HANDLER_CONTROL, "_left"),
+    CMD_RIGHT: (HANDLER_CONTROL, "_right"),
+    CMD_CIRCLE: (HANDLER_COMMANDS_RX, "circle"),
+    CMD_SETHEADING: (HANDLER_COMMANDS_RX, "setheading"),
+    CMD_SETX: (HANDLER_COMMANDS_RX, "setx"),
+    CMD_SETY: (HANDLER_COMMANDS_RX, "sety"),
+    CMD_SETPOSITION: (HANDLER_COMMANDS_RX, "setposition"),
+    CMD_TOWARDS: (HANDLER_COMMANDS_RX, "towards"),
+    CMD_RESET_ORIGIN: (HANDLER_COMMANDS_RX, "reset_origin"),
+    CMD_HEADING: (HANDLER_COMMANDS_RX, "heading"),
+    CMD_POSITION: (HANDLER_COMMANDS_RX, "position"),
+    CMD_PENUP: (HANDLER_COMMANDS_RX, "penup"),
+    CMD_PENDOWN: (HANDLER_COMMANDS_RX, "pendown"),
+    CMD_EYES: (HANDLER_COMMANDS_RX, "eyes"),
+    CMD_POWER: (HANDLER_COMMANDS_RX, "power"),
+    CMD_ISDOWN: (HANDLER_COMMANDS_RX, "isdown"),
+    CMD_SET_LINEAR_VELOCITY: (HANDLER_COMMANDS_RX, "set_linear_velocity"),
+    CMD_SET_ROTATIONAL_VELOCITY: (HANDLER_COMMANDS_RX, "set_rotational_velocity"),
+    CMD_GET_LINEAR_VELOCITY: (HANDLER_COMMANDS_RX, "get_linear_velocity"),
+    CMD_GET_ROTATIONAL_VELOCITY: (HANDLER_COMMANDS_RX, "get_rotational_velocity"),
+    CMD_SET_WHEEL_DIAMETER_CALIBRATION: (HANDLER_COMMANDS_RX, "set_wheel_diameter_calibration"),
+    CMD_SET_AXEL_DISTANCE_CALIBRATION: (HANDLER_COMMANDS_RX, "set_axel_distance_calibration"),
+    CMD_GET_WHEEL_DIAMETER_CALIBRATION: (HANDLER_COMMANDS_RX, "get_wheel_diameter_calibration"),
+    CMD_GET_AXEL_DISTANCE_CALIBRATION: (HANDLER_COMMANDS_RX, "get_axel_distance_calibration"),
+    CMD_SET_TURTLE_ID: (HANDLER_COMMANDS_RX, "set_turtle_id"),
+    CMD_GET_TURTLE_ID: (HANDLER_COMMANDS_RX, "get_turtle_id"),
+    CMD_LOAD_CONFIG: (HANDLER_COMMANDS_RX, "load_config"),
+    CMD_SAVE_CONFIG: (HANDLER_COMMANDS_RX, "save_config"),
+    CMD_RESET_CONFIG: (HANDLER_COMMANDS_RX, "reset_config"),
+    CMD_PROGRAM_BEGIN: (HANDLER_CONTROL, "_program_begin"),
+    CMD_PROGRAM_WRITE: (HANDLER_CONTROL, "_program_write"),
+    CMD_PROGRAM_END: (HANDLER_CONTROL, "_program_end"),
+    CMD_RUN_PROGRAM: (HANDLER_CONTROL, "_run_program"),
+    CMD_PROGRAM_STATUS: (HANDLER_CONTROL, "_program_status"),
+    CMD_STOP_PROGRAM: (HANDLER_CONTROL, "_stop_program"),
+    CMD_LINK_PARAMETERS: (HANDLER_LINK, "_link_parameters"),
+    CMD_LINK_ROLE: (HANDLER_LINK, "_link_role"),
+}
@@ -26,6 +26,7 @@
 #************************************************************************
 
 import picolog
+import time
 from pulse_generator import PulseGenerator
 from drv8825 import Drv8825
 
@@ -66,6 +67,10 @@ class Stepper:
         self._actual_acceleration_spi = self._acceleration_spi
         self._actual_target_speed_spi = self._target_speed_spi
 
+        # Expected duration of the current move (from the acceleration plan) and when it started
+        self._planned_duration_ms = 0
+        self._move_start_ms = time.ticks_ms()
+
         # Ensure we have a free state-machine
         if Stepper._sm_counter < 4:
             if self._is_left:
@@ -91,6 +96,13 @@ class Stepper:
     @property
     def direction(self):
         return self._direction
+
+    @property
+    def remaining_ms(self) -> int:
+        """Expected time until the current move completes in milliseconds (0 if idle)"""
+        if not self._is_busy:
+            return 0
+        return max(0, self._planned_duration_ms - time.ticks_diff(time.ticks_ms(), self._move_start_ms))
     
     def set_direction_forwards(self):
         if self._is_left:
@@ -185,6 +197,12 @@ class Stepper:
             self._actual_target_speed_spi = self._total_steps
             picolog.debug(f"Stepper::move - Adjusting target speed to {self._actual_target_speed_spi} steps per interval")
 
+        self._move_start_ms = time.ticks_ms()
+        if one_shot:
+            self._planned_duration_ms = int(self._total_steps * 1000 / self._intervals_per_second)
+        else:
+            self._planned_duration_ms = self.__plan_duration_ms()
+
         if one_shot:
             # One-shot move
             picolog.debug(f"Stepper::move - Performing one-shot move of {self._total_steps} steps at {self._intervals_per_second} steps per second)")
@@ -270,6 +288,46 @@ class Stepper:
         if Stepper.test_only: picolog.debug(f"Stepper::calculate_next_command - Command result: Steps per second = {speed * self._intervals_per_second} ({speed} SPI), Steps = {steps}, Position = {self._track_actual_steps}")
         if not Stepper.test_only: self.pulse_generator.set(int(speed * self._intervals_per_second), steps)
 
+    # Work out how long the move will take by running through the same acceleration,
+    # running and deceleration phases as calculate_next_command (without moving).
+    # Each acceleration and deceleration command lasts one interval; the running
+    # command lasts as long as the running steps take at the running speed
+    def __plan_duration_ms(self) -> int:
+        steps_remaining = self._total_steps
+        current_speed = 0
+        acceleration_steps = 0
+        running_steps = 0
+        final_acceleration_speed = 0
+        intervals = 0.0
+
+        # The loop is limited in case the plan doesn't converge
+        for _ in range(10000):
+            if steps_remaining <= 0:
+                break
+
+            if (steps_remaining - current_speed) > self._maximum_available_acceleration_steps and (current_speed + self._actual_acceleration_spi) < self._actual_target_speed_spi:
+                current_speed = min(current_speed + self._actual_acceleration_spi, self._actual_target_speed_spi)
+                steps_remaining -= current_speed
+                intervals += 1
+                acceleration_steps = self._total_steps - steps_remaining
+                running_steps = self._total_steps - (2 * acceleration_steps)
+                final_acceleration_speed = current_speed
+            elif steps_remaining > acceleration_steps:
+                running_speed = min(current_speed + self._actual_acceleration_spi, self._actual_target_speed_spi)
+                if running_steps <= 0:
+                    # No acceleration phase - assume the rest of the move runs at the target speed
+                    intervals += steps_remaining / running_speed
+                    break
+                steps_remaining -= running_steps
+                intervals += running_steps / running_speed
+                current_speed = final_acceleration_speed
+            else:
+                steps_remaining -= current_speed
+                intervals += 1
+                current_speed = max(current_speed - self._actual_acceleration_spi, 1)
+
+        return int(intervals * 1000 / self._intervals_per_second)
+
     # Callback when pulse generator needs more sequence information
     def callback(self):
         # Only process the callback if the stepper is currently busy
@@ -0,0 +1,398 @@
+#************************************************************************
+#
+#   turtle_vm.py
+#
+#   Compact stack-based bytecode interpreter for turtle programs
+#   Valiant Turtle 2 - Robot firmware
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+import picolog
+import asyncio
+from micropython import const
+
+from commands_rx import CommandsRx
+
+# Opcodes (must match logo_compiler.py in the Linux host software)
+# Stack and variables
+_OP_HALT = const(0x00)
+_OP_PUSH8 = const(0x01)     # int8 operand
+_OP_PUSH16 = const(0x02)    # int16 operand
+_OP_PUSH32 = const(0x03)    # int32 operand
+_OP_LOAD = const(0x04)      # Global variable number operand
+_OP_STORE = const(0x05)     # Global variable number operand
+_OP_LOADL = const(0x06)     # Local variable (or parameter) number operand
+_OP_STOREL = const(0x07)    # Local variable (or parameter) number operand
+_OP_DUP = const(0x08)
+_OP_DROP = const(0x09)
+
+# Arithmetic and comparison (fixed-point values are 16.16)
+_OP_ADD = const(0x10)
+_OP_SUB = const(0x11)
+_OP_MUL = const(0x12)
+_OP_DIV = const(0x13)
+_OP_FMUL = const(0x14)
+_OP_FDIV = const(0x15)
+_OP_NEG = const(0x16)
+_OP_MOD = const(0x17)
+_OP_EQUAL = const(0x18)
+_OP_LESS = const(0x19)
+_OP_GREATER = const(0x1A)
+_OP_NOT = const(0x1B)
+_OP_ITOF = const(0x1C)
+_OP_FTOI = const(0x1D)
+
+# Flow control
+_OP_JMP = const(0x20)       # uint16 address operand
+_OP_JZ = const(0x21)        # uint16 address operand
+_OP_REPEAT = const(0x22)    # Pops the repeat count
+_OP_ENDREP = const(0x23)
+_OP_REPCOUNT = const(0x24)
+_OP_CALL = const(0x25)      # uint16 address, parameter count and local count operands
+_OP_RET = const(0x26)
+_OP_RETV = const(0x27)      # Return the top of stack to the caller
+
+# Turtle primitives (distances and angles are fixed-point)
+_OP_FD = const(0x30)
+_OP_BK = const(0x31)
+_OP_LT = const(0x32)
+_OP_RT = const(0x33)
+_OP_CIRCLE = const(0x34)    # radius, extent
+_OP_SETH = const(0x35)
+_OP_SETX = const(0x36)
+_OP_SETY = const(0x37)
+_OP_SETPOS = const(0x38)    # x, y
+_OP_TOWARDS = const(0x39)   # x, y
+_OP_HOME = const(0x3A)      # Drive back to the origin and set the heading to 0
+_OP_PU = const(0x3B)
+_OP_PD = const(0x3C)
+_OP_EYES = const(0x3D)      # eye, red, green, blue (integers)
+_OP_MOTORS = const(0x3E)    # enable (integer)
+_OP_SETLV = const(0x3F)     # speed, acceleration (integers)
+_OP_SETRV = const(0x40)     # speed, acceleration (integers)
+_OP_HEADING = const(0x41)
+_OP_XCOR = const(0x42)
+_OP_YCOR = const(0x43)
+_OP_WAIT = const(0x44)      # milliseconds (integer)
+
+# Resource limits
+_STACK_SIZE = const(64)
+_CALL_DEPTH = const(16)
+_REPEAT_DEPTH = const(16)
+_GLOBALS_MAX = const(64)
+
+# Number of instructions between yields to other tasks
+_YIELD_INTERVAL = const(64)
+
+class TurtleVmError(Exception):
+    pass
+
+class TurtleVm:
+    """
+    A small stack-based bytecode interpreter for turtle programs.
+
+    A bytecode image is a format byte (FORMAT_BYTECODE), a byte containing the
+    number of global variables and then the code itself.  Code addresses are
+    relative to the start of the code.
+
+    Values on the stack are 32-bit integers; fixed-point values use 16.16 format
+    and are used for all distances and angles.  REPEAT loops keep their counters
+    on a separate loop stack so they can be nested and used inside procedures.
+    Procedures are called with their parameters on the stack, which become the
+    first local variables of the procedure's frame.
+    """
+    def __init__(self, commands_rx :CommandsRx):
+        self._commands_rx = commands_rx
+        self._stop = False
+        self._pc = 0
+        self._instructions = 0
+
+    @property
+    def pc(self) -> int:
+        return self._pc
+
+    @property
+    def instructions(self) -> int:
+        return self._instructions
+
+    def stop(self):
+        self._stop = True
+
+    # Convert between 16.16 fixed-point and float
+    def __to_float(self, value: int) -> float:
+        return value / 65536
+
+    def __to_fixed(self, value: float) -> int:
+        return int(value * 65536)
+
+    async def run(self, image, should_stop = None) -> bool:
+        """
+        Execute a bytecode image.  should_stop is an optional function which is
+        checked before every instruction; if it returns True execution stops.
+        Returns True if the program ran to completion
+        """
+        if len(image) < 2:
+            raise TurtleVmError("Image is too short")
+        global_count = image[1]
+        if global_count > _GLOBALS_MAX:
+            raise TurtleVmError(f"Too many global variables ({global_count})")
+
+        code = memoryview(image)[2:]
+        code_length = len(code)
+        commands_rx = self._commands_rx
+
+        globals_ = [0] * global_count
+        stack = []
+        frames = []     # (return address, frame pointer, repeat depth)
+        repeats = []    # [remaining, loop start address, iteration]
+        fp = 0
+
+        self._stop = False
+        self._pc = 0
+        self._instructions = 0
+        pc = 0
+
+        while True:
+            if self._stop or (should_stop is not None and should_stop()):
+                picolog.info(f"TurtleVm::run - Stopped at address {pc}")
+                return False
+
+            if pc >= code_length:
+                raise TurtleVmError(f"Address {pc} is outside of the program")
+
+            self._pc = pc
+            self._instructions += 1
+            if self._instructions % _YIELD_INTERVAL == 0:
+                await asyncio.sleep(0)
+
+            if len(stack) > _STACK_SIZE:
+                raise TurtleVmError("Stack overflow")
+
+            opcode = code[pc]
+            pc += 1
+
+            if opcode == _OP_HALT:
+                break
+
+            # Stack and variables
+            elif opcode == _OP_PUSH8:
+                value = code[pc]
+                stack.append(value - 256 if value > 127 else value)
+                pc += 1
+            elif opcode == _OP_PUSH16:
+                value = code[pc] | (code[pc + 1] << 8)
+                stack.append(value - 65536 if value > 32767 else value)
+                pc += 2
+            elif opcode == _OP_PUSH32:
+                value = code[pc] | (code[pc + 1] << 8) | (code[pc + 2] << 16) | (code[pc + 3] << 24)
+                stack.append(value - 4294967296 if value > 2147483647 else value)
+                pc += 4
+            elif opcode == _OP_LOAD:
+                stack.append(globals_[code[pc]])
+                pc += 1
+            elif opcode == _OP_STORE:
+                globals_[code[pc]] = stack.pop()
+                pc += 1
+            elif opcode == _OP_LOADL:
+                stack.append(stack[fp + code[pc]])
+                pc += 1
+            elif opcode == _OP_STOREL:
+                stack[fp + code[pc]] = stack.pop()
+                pc += 1
+            elif opcode == _OP_DUP:
+                stack.append(stack[-1])
+            elif opcode == _OP_DROP:
+                stack.pop()
+
+            # Arithmetic and comparison
+            elif opcode == _OP_ADD:
+                b = stack.pop()
+                stack.append(stack.pop() + b)
+            elif opcode == _OP_SUB:
+                b = stack.pop()
+                stack.append(stack.pop() - b)
+            elif opcode == _OP_MUL:
+                b = stack.pop()
+                stack.append(stack.pop() * b)
+            elif opcode == _OP_DIV:
+                b = stack.pop()
+                a = stack.pop()
+                if b == 0:
+                    raise TurtleVmError("Division by zero")
+                # Truncate towards zero
+                stack.append(-(abs(a) // abs(b)) if (a < 0) != (b < 0) else abs(a) // abs(b))
+            elif opcode == _OP_FMUL:
+                b = stack.pop()
+                stack.append((stack.pop() * b) >> 16)
+            elif opcode == _OP_FDIV:
+                b = stack.pop()
+                if b == 0:
+                    raise TurtleVmError("Division by zero")
+                stack.append((stack.pop() << 16) // b)
+            elif opcode == _OP_NEG:
+                stack.append(-stack.pop())
+            elif opcode == _OP_MOD:
+                b = stack.pop()
+                if b == 0:
+                    raise TurtleVmError("Division by zero")
+                stack.append(stack.pop() % b)
+            elif opcode == _OP_EQUAL:
+                b = stack.pop()
+                stack.append(1 if stack.pop() == b else 0)
+            elif opcode == _OP_LESS:
+                b = stack.pop()
+                stack.append(1 if stack.pop() < b else 0)
+            elif opcode == _OP_GREATER:
+                b = stack.pop()
+                stack.append(1 if stack.pop() > b else 0)
+            elif opcode == _OP_NOT:
+                stack.append(0 if stack.pop() else 1)
+            elif opcode == _OP_ITOF:
+                stack.append(stack.pop() << 16)
+            elif opcode == _OP_FTOI:
+                value = stack.pop()
+                stack.append(-((-value) >> 16) if value < 0 else value >> 16)
+
+            # Flow control
+            elif opcode == _OP_JMP:
+                pc = code[pc] | (code[pc + 1] << 8)
+            elif opcode == _OP_JZ:
+                if stack.pop() == 0:
+                    pc = code[pc] | (code[pc + 1] << 8)
+                else:
+                    pc += 2
+            elif opcode == _OP_REPEAT:
+                if len(repeats) >= _REPEAT_DEPTH:
+                    raise TurtleVmError("REPEAT nested too deeply")
+                repeats.append([stack.pop(), pc, 1])
+            elif opcode == _OP_ENDREP:
+                loop = repeats[-1]
+                loop[0] -= 1
+                if loop[0] > 0:
+                    loop[2] += 1
+                    pc = loop[1]
+                else:
+                    repeats.pop()
+            elif opcode == _OP_REPCOUNT:
+                stack.append(repeats[-1][2] if repeats else 0)
+            elif opcode == _OP_CALL:
+                if len(frames) >= _CALL_DEPTH:
+                    raise TurtleVmError("Procedure calls nested too deeply")
+                address = code[pc] | (code[pc + 1] << 8)
+                parameter_count = code[pc + 2]
+                local_count = code[pc + 3]
+                frames.append((pc + 4, fp, len(repeats)))
+                fp = len(stack) - parameter_count
+                if fp < 0:
+                    raise TurtleVmError("Stack underflow")
+                for _ in range(local_count):
+                    stack.append(0)
+                pc = address
+            elif opcode == _OP_RET or opcode == _OP_RETV:
+                if not frames:
+                    raise TurtleVmError("Return without a procedure call")
+                value = stack.pop() if opcode == _OP_RETV else None
+                pc, old_fp, repeat_depth = frames.pop()
+                del stack[fp:]
+                del repeats[repeat_depth:]
+                fp = old_fp
+                if value is not None:
+                    stack.append(value)
+
+            # Turtle primitives (negative distances and angles are performed as the opposite movement)
+            elif opcode == _OP_FD:
+                distance = self.__to_float(stack.pop())
+                if distance >= 0:
+                    await commands_rx.forward(distance)
+                else:
+                    await commands_rx.backward(-distance)
+            elif opcode == _OP_BK:
+                distance = self.__to_float(stack.pop())
+                if distance >= 0:
+                    await commands_rx.backward(distance)
+                else:
+                    await commands_rx.forward(-distance)
+            elif opcode == _OP_LT:
+                angle = self.__to_float(stack.pop())
+                if angle >= 0:
+                    await commands_rx.left(angle)
+                else:
+                    await commands_rx.right(-angle)
+            elif opcode == _OP_RT:
+                angle = self.__to_float(stack.pop())
+                if angle >= 0:
+                    await commands_rx.right(angle)
+                else:
+                    await commands_rx.left(-angle)
+            elif opcode == _OP_CIRCLE:
+                extent = stack.pop()
+                await commands_rx.circle(self.__to_float(stack.pop()), self.__to_float(extent))
+            elif opcode == _OP_SETH:
+                await commands_rx.setheading(self.__to_float(stack.pop()))
+            elif opcode == _OP_SETX:
+                await commands_rx.setx(self.__to_float(stack.pop()))
+            elif opcode == _OP_SETY:
+                await commands_rx.sety(self.__to_float(stack.pop()))
+            elif opcode == _OP_SETPOS:
+                y = stack.pop()
+                await commands_rx.setposition(self.__to_float(stack.pop()), self.__to_float(y))
+            elif opcode == _OP_TOWARDS:
+                y = stack.pop()
+                await commands_rx.towards(self.__to_float(stack.pop()), self.__to_float(y))
+            elif opcode == _OP_HOME:
+                await commands_rx.setposition(0.0, 0.0)
+                await commands_rx.setheading(0.0)
+            elif opcode == _OP_PU:
+                await commands_rx.penup()
+            elif opcode == _OP_PD:
+                await commands_rx.pendown()
+            elif opcode == _OP_EYES:
+                blue = stack.pop()
+                green = stack.pop()
+                red = stack.pop()
+                await commands_rx.eyes(stack.pop(), red, green, blue)
+            elif opcode == _OP_MOTORS:
+                await commands_rx.motors(stack.pop() != 0)
+            elif opcode == _OP_SETLV:
+                acceleration = stack.pop()
+                await commands_rx.set_linear_velocity(stack.pop(), acceleration)
+            elif opcode == _OP_SETRV:
+                acceleration = stack.pop()
+                await commands_rx.set_rotational_velocity(stack.pop(), acceleration)
+            elif opcode == _OP_HEADING:
+                stack.append(self.__to_fixed(await commands_rx.heading()))
+            elif opcode == _OP_XCOR:
+                x, _ = await commands_rx.position()
+                stack.append(self.__to_fixed(x))
+            elif opcode == _OP_YCOR:
+                _, y = await commands_rx.position()
+                stack.append(self.__to_fixed(y))
+            elif opcode == _OP_WAIT:
+                await asyncio.sleep_ms(stack.pop())
+            else:
+                raise TurtleVmError(f"Unknown opcode {opcode:02x} at address {pc - 1}")
+
+        picolog.info(f"TurtleVm::run - Program complete after {self._instructions} instructions")
+        return True
+
+if __name__ == "__main__":
+    from main import main
+    main()
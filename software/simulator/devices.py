@@ -0,0 +1,179 @@
+#************************************************************************
+#
+#   devices.py
+#
+#   Models of the robot's I2C devices
+#   Valiant Turtle 2 - Simulator
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+# Each model answers on the simulated I2C bus (see machine.attach_i2c_device):
+# write(address, data) is an I2C write to the device and read(address, number_of_bytes)
+# an I2C read.  A device that isn't ready raises OSError(ENODEV), as the bus reports
+# a missing acknowledgement
+
+import errno
+import time
+
+class Ina260Model:
+    """
+    Texas Instruments INA260 power monitor.  The first byte written is the register
+    pointer; if two more bytes follow they are written to the register.  Reads return
+    the 16-bit register the pointer points to (big endian).  The measurements come
+    from the voltage_mv and current_ma attributes, sampled when each conversion
+    completes (the conversion time and averaging are set by the configuration
+    register, as on the INA260).  The measurement registers read zero until the
+    first conversion after a reset.
+    """
+    MANUFACTURER_ID = 0x5449
+    DIE_ID = 0x2270
+
+    # Registers
+    CONFIG = 0x00
+    CURRENT = 0x01
+    VOLTAGE = 0x02
+    POWER = 0x03
+    MASK_ENABLE = 0x06
+    ALERT_LIMIT = 0x07
+    MANUFACTURER = 0xFE
+    DIE = 0xFF
+
+    # Value of the configuration register after a reset
+    __CONFIG_DEFAULT = 0x6127
+
+    # Conversion times (in seconds) and number of averages selected by the configuration register
+    __CONVERSION_TIMES = [140e-6, 204e-6, 332e-6, 588e-6, 1.1e-3, 2.116e-3, 4.156e-3, 8.244e-3]
+    __AVERAGES = [1, 4, 16, 64, 128, 256, 512, 1024]
+
+    def __init__(self, voltage_mv: float = 14800.0, current_ma: float = 250.0):
+        self.voltage_mv = voltage_mv
+        self.current_ma = current_ma
+        self._pointer = Ina260Model.CONFIG
+        self._registers = {Ina260Model.CONFIG: Ina260Model.__CONFIG_DEFAULT, Ina260Model.MASK_ENABLE: 0, Ina260Model.ALERT_LIMIT: 0}
+        self.__reset()
+
+    def __reset(self):
+        self._registers[Ina260Model.CONFIG] = Ina260Model.__CONFIG_DEFAULT
+        self._conversion_started = time.monotonic()
+        self._sampled = (0.0, 0.0)
+
+    @property
+    def conversion_period(self) -> float:
+        # Time taken by a conversion of both the bus voltage and the current (with averaging)
+        config = self._registers[Ina260Model.CONFIG]
+        averages = Ina260Model.__AVERAGES[(config >> 9) & 0x7]
+        voltage_time = Ina260Model.__CONVERSION_TIMES[(config >> 6) & 0x7]
+        current_time = Ina260Model.__CONVERSION_TIMES[(config >> 3) & 0x7]
+        return (voltage_time + current_time) * averages
+
+    def write(self, address: int, data: bytes):
+        if len(data) == 0:
+            return
+        self._pointer = data[0]
+        if len(data) >= 3 and self._pointer in self._registers:
+            value = (data[1] << 8) | data[2]
+            if self._pointer == Ina260Model.CONFIG and value & 0x8000:
+                self.__reset()
+            else:
+                self._registers[self._pointer] = value
+
+    def read(self, address: int, number_of_bytes: int) -> bytes:
+        return self.__register(self._pointer).to_bytes(2, "big")[:number_of_bytes]
+
+    def __sample(self) -> tuple[float, float]:
+        # The measurements as of the last completed conversion
+        period = self.conversion_period
+        elapsed = time.monotonic() - self._conversion_started
+        if elapsed >= period:
+            self._conversion_started += elapsed - elapsed % period
+            self._sampled = (self.voltage_mv, self.current_ma)
+        return self._sampled
+
+    def __register(self, register: int) -> int:
+        if register in (Ina260Model.CURRENT, Ina260Model.VOLTAGE, Ina260Model.POWER):
+            voltage_mv, current_ma = self.__sample()
+            if register == Ina260Model.CURRENT:
+                # Two's complement, 1.25 mA per bit
+                return int(current_ma / 1.25) & 0xFFFF
+            if register == Ina260Model.VOLTAGE:
+                # 1.25 mV per bit
+                return min(int(voltage_mv / 1.25), 0xFFFF)
+            # 10 mW per bit
+            return min(int(voltage_mv * abs(current_ma) / 1000 / 10), 0xFFFF)
+        if register == Ina260Model.MANUFACTURER:
+            return Ina260Model.MANUFACTURER_ID
+        if register == Ina260Model.DIE:
+            return Ina260Model.DIE_ID
+        return self._registers.get(register, 0)
+
+class Eeprom24lc16Model:
+    """
+    Microchip 24LC16 2 KB EEPROM.  The memory is eight 256 byte blocks, each on its
+    own I2C address (the base address plus the block number).  A write sets the
+    address from its first byte and writes any further bytes within the 16 byte
+    page (wrapping at the page boundary, as the real part does).  Reads continue
+    from the current address.  A page write starts a write cycle, during which
+    the EEPROM doesn't acknowledge anything.
+    """
+    SIZE = 2048
+    PAGE_SIZE = 16
+
+    # Duration of a write cycle (the maximum for the 24LC16)
+    WRITE_CYCLE_TIME = 5e-3
+
+    def __init__(self, base_address: int = 0x50):
+        self.base_address = base_address
+        self.memory = bytearray(b"\xff" * Eeprom24lc16Model.SIZE)
+        self._address = 0
+        self._busy_until = 0.0
+        self.write_cycles = 0
+
+    @property
+    def addresses(self) -> list[int]:
+        # The I2C addresses the EEPROM answers on
+        return [self.base_address + block for block in range(Eeprom24lc16Model.SIZE // 256)]
+
+    def __acknowledge(self):
+        if time.monotonic() < self._busy_until:
+            raise OSError(errno.ENODEV, "ENODEV")
+
+    def write(self, address: int, data: bytes):
+        self.__acknowledge()
+        if len(data) == 0:
+            return
+        self._address = ((address - self.base_address) << 8) | data[0]
+        if len(data) > 1:
+            self._busy_until = time.monotonic() + Eeprom24lc16Model.WRITE_CYCLE_TIME
+            self.write_cycles += 1
+
+        page_start = self._address - self._address % Eeprom24lc16Model.PAGE_SIZE
+        offset = self._address % Eeprom24lc16Model.PAGE_SIZE
+        for value in data[1:]:
+            self.memory[page_start + offset] = value
+            offset = (offset + 1) % Eeprom24lc16Model.PAGE_SIZE
+
+    def read(self, address: int, number_of_bytes: int) -> bytes:
+        self.__acknowledge()
+        data = bytearray(number_of_bytes)
+        for i in range(number_of_bytes):
+            data[i] = self.memory[self._address]
+            self._address = (self._address + 1) % Eeprom24lc16Model.SIZE
+        return bytes(data)
@@ -0,0 +1,139 @@
+#************************************************************************
+#
+#   environment.py
+#
+#   Runs the robot firmware and the Linux communicator in one CPython process
+#   Valiant Turtle 2 - Simulator
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+# The robot firmware is MicroPython and expects the machine, rp2, neopixel, aioble
+# (etc.) modules; the stand-ins in robot_shims take their place.  The communicator
+# expects bleak; the stand-in in host_shims carries its traffic over radio.Radio.
+#
+# Some module names (protocol, ring_buffer, bulk_transfer) are used by both the
+# robot and the communicator, so each robot's modules are loaded separately by
+# load_robot_modules() and kept out of sys.modules.  Every call loads a fresh copy,
+# so each virtual robot has its own state (state machines, aioble services etc.)
+# use_robot_modules() instead imports the firmware as the robot does, so main.py
+# can be booted unchanged (see vt2_profile.py)
+
+import asyncio
+import builtins
+import importlib
+import os
+import sys
+import tempfile
+import time
+
+SIMULATOR_DIR = os.path.dirname(os.path.abspath(__file__))
+ROBOT_DIR = os.path.normpath(os.path.join(SIMULATOR_DIR, "..", "robot"))
+LINUX_DIR = os.path.normpath(os.path.join(SIMULATOR_DIR, "..", "linux"))
+ROBOT_SHIMS_DIR = os.path.join(SIMULATOR_DIR, "robot_shims")
+HOST_SHIMS_DIR = os.path.join(SIMULATOR_DIR, "host_shims")
+
+# Period of the MicroPython ticks_ms()/ticks_us() counters
+_TICKS_PERIOD = 1 << 30
+
+def install_micropython_compat():
+    """Add the MicroPython extensions to the time and asyncio modules (and the const() builtin)"""
+    time.ticks_ms = lambda: int(time.monotonic() * 1000) % _TICKS_PERIOD
+    time.ticks_us = lambda: int(time.monotonic() * 1000000) % _TICKS_PERIOD
+    time.ticks_add = lambda ticks, delta: (ticks + delta) % _TICKS_PERIOD
+    time.ticks_diff = lambda ticks1, ticks2: ((ticks1 - ticks2 + _TICKS_PERIOD // 2) % _TICKS_PERIOD) - _TICKS_PERIOD // 2
+    time.sleep_ms = lambda ms: time.sleep(ms / 1000)
+    time.sleep_us = lambda us: time.sleep(us / 1000000)
+    asyncio.sleep_ms = lambda ms: asyncio.sleep(ms / 1000)
+    builtins.const = lambda value: value
+
+def firmware_module_names() -> list[str]:
+    """Names of the robot firmware modules (main is left out, as importing it starts the robot)"""
+    return sorted(name[:-3] for name in os.listdir(ROBOT_DIR) if name.endswith(".py") and name != "main.py")
+
+def load_robot_modules(names: list[str] = None) -> dict:
+    """
+    Import a fresh copy of the robot firmware (and the stand-ins it uses).  Returns
+    the modules by name; none of them are left in sys.modules
+    """
+    install_micropython_compat()
+    if names is None:
+        names = firmware_module_names()
+
+    # Set aside anything (such as the communicator's protocol module) that the firmware's modules would clash with
+    saved = {name: module for name, module in sys.modules.items() if name.split(".")[0] in _shadowed_names()}
+    for name in saved:
+        del sys.modules[name]
+
+    sys.path[0:0] = [ROBOT_SHIMS_DIR, ROBOT_DIR]
+    try:
+        for name in names:
+            importlib.import_module(name)
+    finally:
+        sys.path.remove(ROBOT_SHIMS_DIR)
+        sys.path.remove(ROBOT_DIR)
+        modules = {name: module for name, module in sys.modules.items() if _is_robot_module(module)}
+        for name in modules:
+            del sys.modules[name]
+        sys.modules.update(saved)
+    return modules
+
+def use_robot_modules():
+    """
+    Make the robot firmware (and the stand-ins it uses) importable in the usual way,
+    as on the robot, so that robot/main.py can be booted unchanged with "import main".
+    Any modules the firmware's modules would clash with are removed from sys.modules
+    (modules that have already imported them keep their references)
+    """
+    install_micropython_compat()
+    for name in [name for name in sys.modules if name.split(".")[0] in _shadowed_names()]:
+        del sys.modules[name]
+    for path in [ROBOT_DIR, ROBOT_SHIMS_DIR]:
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+def use_host_modules(cache_dir: str = None):
+    """
+    Make the communicator's modules importable, with bleak replaced by the stand-in.
+    The communicator's device cache is kept in cache_dir (a new temporary directory
+    if None) rather than the user's cache
+    """
+    install_micropython_compat()
+    if "bleak" in sys.modules and not _is_host_shim(sys.modules["bleak"]):
+        raise RuntimeError("environment::use_host_modules - The real bleak has already been imported")
+
+    for path in [LINUX_DIR, HOST_SHIMS_DIR, SIMULATOR_DIR]:
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    os.environ["XDG_CACHE_HOME"] = cache_dir if cache_dir is not None else tempfile.mkdtemp(prefix="vt2-sim-")
+
+def _shadowed_names() -> set:
+    names = set(firmware_module_names())
+    for name in os.listdir(ROBOT_SHIMS_DIR):
+        names.add(name[:-3] if name.endswith(".py") else name)
+    return names
+
+def _is_robot_module(module) -> bool:
+    path = getattr(module, "__file__", None)
+    return path is not None and (path.startswith(ROBOT_DIR + os.sep) or path.startswith(ROBOT_SHIMS_DIR + os.sep))
+
+def _is_host_shim(module) -> bool:
+    path = getattr(module, "__file__", None)
+    return path is not None and path.startswith(HOST_SHIMS_DIR + os.sep)
@@ -0,0 +1,145 @@
+#************************************************************************
+#
+#   __init__.py
+#
+#   Stand-in for the bleak library (BLE over the simulator's radio)
+#   Valiant Turtle 2 - Simulator
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+# Only the parts of bleak used by the Linux communicator are provided.  Every
+# scanner and client uses the radio returned by radio.default_radio()
+
+import asyncio
+import time
+
+from radio import LinkError, default_radio
+from .exc import BleakError, BleakDeviceNotFoundError
+from .backends.characteristic import BleakGATTCharacteristic
+from .backends.device import BLEDevice
+from .backends.scanner import AdvertisementData
+
+# How often a scanner checks for new advertisements
+_SCAN_POLL_INTERVAL = 0.01
+
+def _heard(scan_started: float) -> list:
+    heard = []
+    for advertisement in default_radio().advertisements(scan_started):
+        device = BLEDevice(advertisement.address, advertisement.name, None)
+        advertisement_data = AdvertisementData(
+            local_name=advertisement.name,
+            manufacturer_data=dict(advertisement.manufacturer_data),
+            service_data={},
+            service_uuids=list(advertisement.service_uuids),
+            tx_power=None,
+            rssi=advertisement.rssi,
+            platform_data=(),
+        )
+        heard.append((device, advertisement_data))
+    return heard
+
+class BleakScanner:
+    @staticmethod
+    async def find_device_by_filter(filterfunc, timeout: float = 10.0, **kwargs) -> BLEDevice:
+        scan_started = time.monotonic()
+        while True:
+            for device, advertisement_data in _heard(scan_started):
+                if filterfunc(device, advertisement_data):
+                    return device
+            if time.monotonic() - scan_started >= timeout:
+                return None
+            await asyncio.sleep(_SCAN_POLL_INTERVAL)
+
+    @staticmethod
+    async def find_device_by_address(device_identifier: str, timeout: float = 10.0, **kwargs) -> BLEDevice:
+        return await BleakScanner.find_device_by_filter(lambda device, _: device.address.lower() == device_identifier.lower(), timeout)
+
+    @staticmethod
+    async def discover(timeout: float = 5.0, return_adv: bool = False, **kwargs):
+        scan_started = time.monotonic()
+        await asyncio.sleep(timeout)
+        heard = {device.address: (device, advertisement_data) for device, advertisement_data in _heard(scan_started)}
+        return heard if return_adv else [device for device, _ in heard.values()]
+
+class BleakClient:
+    def __init__(self, address_or_ble_device, disconnected_callback=None, services=None, *, timeout: float = 10.0, **kwargs):
+        if isinstance(address_or_ble_device, BLEDevice):
+            self._address = address_or_ble_device.address
+        else:
+            self._address = str(address_or_ble_device)
+        self._timeout = timeout
+        self._link = None
+        self._characteristics = {}
+
+    async def __aenter__(self) -> "BleakClient":
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.disconnect()
+
+    @property
+    def address(self) -> str:
+        return self._address
+
+    @property
+    def is_connected(self) -> bool:
+        return self._link is not None and self._link.connected
+
+    @property
+    def mtu_size(self) -> int:
+        return 23
+
+    async def connect(self, **kwargs) -> bool:
+        try:
+            self._link = await default_radio().connect(self._address, self._timeout)
+        except LinkError as e:
+            raise BleakDeviceNotFoundError(self._address, str(e))
+        return True
+
+    async def disconnect(self) -> bool:
+        if self._link is not None:
+            self._link.disconnect()
+        return True
+
+    async def start_notify(self, char_specifier, callback, **kwargs):
+        characteristic = self.__characteristic(char_specifier)
+        self.__link().on_indicated(characteristic.uuid, lambda data: callback(characteristic, bytearray(data)))
+
+    async def stop_notify(self, char_specifier):
+        self.__link().on_indicated(self.__characteristic(char_specifier).uuid, None)
+
+    async def write_gatt_char(self, char_specifier, data, response: bool = None):
+        try:
+            await self.__link().write(self.__characteristic(char_specifier).uuid, data)
+        except LinkError as e:
+            raise BleakError(str(e))
+
+    def __link(self):
+        if not self.is_connected:
+            raise BleakError("Not connected")
+        return self._link
+
+    def __characteristic(self, char_specifier) -> BleakGATTCharacteristic:
+        uuid = char_specifier.uuid if isinstance(char_specifier, BleakGATTCharacteristic) else str(char_specifier).lower()
+        if uuid not in self._characteristics:
+            self._characteristics[uuid] = BleakGATTCharacteristic(uuid)
+        return self._characteristics[uuid]
@@ -0,0 +1,35 @@
+#************************************************************************
+#
+#   device.py
+#
+#   Stand-in for bleak.backends.device
+#   Valiant Turtle 2 - Simulator
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+class BLEDevice:
+    def __init__(self, address: str, name: str, details, **kwargs):
+        self.address = address
+        self.name = name
+        self.details = details
+
+    def __repr__(self) -> str:
+        return f"BLEDevice({self.address}, {self.name})"
@@ -0,0 +1,34 @@
+#************************************************************************
+#
+#   uuids.py
+#
+#   Stand-in for bleak.uuids
+#   Valiant Turtle 2 - Simulator
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+def normalize_uuid_16(uuid: int) -> str:
+    return f"0000{uuid:04x}-0000-1000-8000-00805f9b34fb"
+
+def normalize_uuid_str(uuid: str) -> str:
+    if len(uuid) == 4:
+        return normalize_uuid_16(int(uuid, 16))
+    return uuid.lower()
@@ -0,0 +1,245 @@
+#************************************************************************
+#
+#   radio.py
+#
+#   In-process BLE radio (joins virtual robots to the host)
+#   Valiant Turtle 2 - Simulator
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+import asyncio
+import random
+import threading
+import time
+
+# How often a connecting central looks for the peripheral's advertisement
+_SCAN_POLL_INTERVAL = 0.01
+
+class LinkError(ConnectionError):
+    """A packet was not acknowledged, or the link has gone"""
+
+class Advertisement:
+    """An advertisement as heard by a scanning central"""
+    def __init__(self, address: str, name: str, service_uuids: list, manufacturer_data: dict, interval_us: int, rssi: int = 0):
+        self.address = address
+        self.name = name
+        self.service_uuids = service_uuids
+        self.manufacturer_data = manufacturer_data
+        self.interval_us = interval_us
+        self.rssi = rssi
+
+class Link:
+    """
+    A connection between a central and a peripheral.  Each side runs on its own
+    event loop (usually in its own thread); a packet arrives on the other side's
+    loop one radio latency after it is sent and is acknowledged one latency later.
+    Both central's writes and the peripheral's indications are acknowledged, so
+    both raise a LinkError if the packet is lost.
+    """
+    def __init__(self, radio: "Radio", handle: int, peripheral_address: str, central_address: str, peripheral_loop, central_loop):
+        self._radio = radio
+        self.handle = handle
+        self.peripheral_address = peripheral_address
+        self.central_address = central_address
+        self._peripheral_loop = peripheral_loop
+        self._central_loop = central_loop
+        self._connected = True
+
+        # Receivers of the packets sent to each side (by characteristic UUID)
+        self._peripheral_receivers = {}
+        self._central_receivers = {}
+
+    @property
+    def connected(self) -> bool:
+        return self._connected
+
+    def on_written(self, uuid: str, receiver):
+        # receiver(data) is called on the peripheral's loop when central writes the characteristic
+        self._peripheral_receivers[uuid] = receiver
+
+    def on_indicated(self, uuid: str, receiver):
+        # receiver(data) is called on central's loop when the peripheral indicates the characteristic
+        self._central_receivers[uuid] = receiver
+
+    async def write(self, uuid: str, data):
+        # Central to peripheral
+        await self.__send(self._peripheral_loop, self._peripheral_receivers, uuid, bytes(data), True)
+
+    async def indicate(self, uuid: str, data):
+        # Peripheral to central
+        await self.__send(self._central_loop, self._central_receivers, uuid, bytes(data), False)
+
+    def disconnect(self):
+        self._connected = False
+
+    async def __send(self, loop, receivers: dict, uuid: str, data: bytes, to_peripheral: bool):
+        if not self._connected:
+            raise LinkError("Not connected")
+
+        latency = self._radio.latency
+        await asyncio.sleep(latency)
+        if self._radio._transmitted(to_peripheral, len(data)):
+            receiver = receivers.get(uuid)
+            if receiver is not None:
+                try:
+                    loop.call_soon_threadsafe(receiver, data)
+                except RuntimeError:
+                    # The other side's event loop has stopped
+                    self._connected = False
+            await asyncio.sleep(latency)
+            if not self._connected:
+                raise LinkError("Disconnected before the packet was acknowledged")
+        else:
+            await asyncio.sleep(latency)
+            raise LinkError("Packet lost")
+
+class Radio:
+    """
+    The air between the virtual robots and the host.  Peripherals advertise on it,
+    centrals scan it and connect to the peripherals, and the resulting links carry
+    packets with a fixed latency (each way) and an optional random packet loss.
+    Any number of virtual robots and centrals can share a radio; it is thread safe.
+    """
+    # Address of the host's BLE adapter
+    CENTRAL_ADDRESS = "c0:ff:ee:00:00:01"
+
+    def __init__(self, latency: float = 0.0075, loss: float = 0.0, rssi: int = -50, seed: int = None):
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self.latency = latency
+        self.loss = loss
+        self._rssi = rssi
+
+        # Connection parameters reported to the peripheral (interval in 1.25 ms units,
+        # peripheral latency and supervision timeout in 10 ms units)
+        self.connection_parameters = (max(int(latency * 2 / 0.00125), 6), 0, 200)
+
+        # Advertising peripherals (by address)
+        self._advertisers = {}
+        self._next_handle = 1
+        self.reset_stats()
+
+    @property
+    def latency(self) -> float:
+        return self._latency
+
+    @latency.setter
+    def latency(self, value: float):
+        if value < 0:
+            raise ValueError("Radio::latency - Latency must not be negative")
+        self._latency = value
+
+    @property
+    def loss(self) -> float:
+        return self._loss
+
+    @loss.setter
+    def loss(self, value: float):
+        if value < 0 or value >= 1:
+            raise ValueError("Radio::loss - Loss must be at least 0 and less than 1")
+        self._loss = value
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {"connections": 0, "c2p_packets": 0, "p2c_packets": 0, "c2p_bytes": 0, "p2c_bytes": 0, "lost_packets": 0}
+
+    def start_advertising(self, address: str, name: str, service_uuids: list, manufacturer_data: dict, interval_us: int, on_connect):
+        # Called by a peripheral (on its event loop).  on_connect(link) is called on
+        # the same loop when a central connects
+        advertisement = Advertisement(address, name, service_uuids, manufacturer_data, interval_us)
+        with self._lock:
+            self._advertisers[address] = (advertisement, asyncio.get_running_loop(), on_connect, time.monotonic())
+
+    def stop_advertising(self, address: str) -> bool:
+        # Returns False if a central connected before advertising could be stopped
+        with self._lock:
+            return self._advertisers.pop(address, None) is not None
+
+    def advertisements(self, scan_started: float) -> list:
+        # The advertisements heard by a scan that started at scan_started (time.monotonic()).
+        # A peripheral is heard once it has been advertising for one advertising interval
+        # whilst the scan has been running
+        now = time.monotonic()
+        heard = []
+        with self._lock:
+            for advertisement, _, _, started in self._advertisers.values():
+                if now - max(started, scan_started) >= advertisement.interval_us / 1000000:
+                    heard.append(Advertisement(advertisement.address, advertisement.name, advertisement.service_uuids,
+                        advertisement.manufacturer_data, advertisement.interval_us, self._rssi + self._random.randint(-3, 3)))
+        return heard
+
+    async def connect(self, address: str, timeout: float) -> Link:
+        # Called by a central (on its event loop).  Waits for the peripheral to be heard
+        # advertising and then connects to it
+        loop = asyncio.get_running_loop()
+        scan_started = time.monotonic()
+        while True:
+            if any(advertisement.address == address for advertisement in self.advertisements(scan_started)):
+                with self._lock:
+                    advertiser = self._advertisers.pop(address, None)
+                if advertiser is not None:
+                    break
+            if time.monotonic() - scan_started >= timeout:
+                raise LinkError(f"Device with address {address} was not found")
+            await asyncio.sleep(_SCAN_POLL_INTERVAL)
+
+        _, peripheral_loop, on_connect, _ = advertiser
+        with self._lock:
+            handle = self._next_handle
+            self._next_handle += 1
+            self._stats["connections"] += 1
+
+        # Connection request and the first connection event
+        await asyncio.sleep(self._latency * 2)
+        link = Link(self, handle, address, Radio.CENTRAL_ADDRESS, peripheral_loop, loop)
+        try:
+            peripheral_loop.call_soon_threadsafe(on_connect, link)
+        except RuntimeError:
+            raise LinkError(f"Device with address {address} has stopped")
+        return link
+
+    def _transmitted(self, to_peripheral: bool, length: int) -> bool:
+        # Count a packet and decide whether it gets through
+        direction = "c2p" if to_peripheral else "p2c"
+        with self._lock:
+            self._stats[direction + "_packets"] += 1
+            self._stats[direction + "_bytes"] += length
+            if self._loss > 0 and self._random.random() < self._loss:
+                self._stats["lost_packets"] += 1
+                return False
+        return True
+
+# Radio used by the bleak stand-in (see default_radio)
+_default_radio = None
+
+def default_radio() -> Radio:
+    global _default_radio
+    if _default_radio is None:
+        _default_radio = Radio()
+    return _default_radio
+
+def set_default_radio(radio: Radio):
+    global _default_radio
+    _default_radio = radio
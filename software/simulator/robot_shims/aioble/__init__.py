@@ -0,0 +1,35 @@
+#************************************************************************
+#
+#   __init__.py
+#
+#   Stand-in for the aioble library (BLE over the simulator's radio)
+#   Valiant Turtle 2 - Simulator
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+# Only the peripheral role is provided.  The robot's BLE traffic goes over a
+# simulator Radio (see radio.py); core.attach() chooses the radio and the robot's
+# BLE address before the firmware starts advertising
+
+from .core import GattError, register_irq_handler
+from .device import Device, DeviceConnection, DeviceDisconnectedError
+from .peripheral import advertise
+from .server import Service, Characteristic, BufferedCharacteristic, register_services
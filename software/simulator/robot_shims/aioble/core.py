@@ -0,0 +1,57 @@
+#************************************************************************
+#
+#   core.py
+#
+#   Stand-in for aioble.core
+#   Valiant Turtle 2 - Simulator
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+# The radio the robot is on and the robot's BLE address (see attach)
+_radio = None
+_address = "56:54:32:00:00:00"
+
+# Handlers for BLE IRQ events (see register_irq_handler)
+_irq_handlers = []
+
+class GattError(Exception):
+    def __init__(self, status: int):
+        self._status = status
+
+def attach(radio, address: str):
+    global _radio, _address
+    _radio = radio
+    _address = address
+
+def radio():
+    if _radio is None:
+        raise RuntimeError("aioble.core::radio - No radio has been attached")
+    return _radio
+
+def address() -> str:
+    return _address
+
+def register_irq_handler(irq, shutdown=None):
+    _irq_handlers.append(irq)
+
+def raise_irq(event: int, data):
+    for handler in _irq_handlers:
+        handler(event, data)
@@ -0,0 +1,65 @@
+#************************************************************************
+#
+#   device.py
+#
+#   Stand-in for aioble.device
+#   Valiant Turtle 2 - Simulator
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+import asyncio
+
+class DeviceDisconnectedError(Exception):
+    pass
+
+class Device:
+    ADDR_PUBLIC = 0
+    ADDR_RANDOM = 1
+
+    def __init__(self, addr_type: int, addr: str):
+        self.addr_type = addr_type
+        self.addr = addr
+
+    def __repr__(self) -> str:
+        return f"Device({self.addr_type}, {self.addr})"
+
+    def addr_hex(self) -> str:
+        return self.addr.lower()
+
+class DeviceConnection:
+    # A connection from a central, carried by a radio Link
+    def __init__(self, link):
+        self._link = link
+        self._conn_handle = link.handle
+        self.device = Device(Device.ADDR_PUBLIC, link.central_address)
+
+    def is_connected(self) -> bool:
+        return self._link.connected
+
+    async def disconnect(self, timeout_ms: int = 2000):
+        self._link.disconnect()
+
+    async def l2cap_accept(self, psm: int, mtu: int, timeout_ms: int = None):
+        # The radio has no L2CAP channels, so nothing is ever accepted; the
+        # connection closing is reported the way aioble reports it
+        while self._link.connected:
+            await asyncio.sleep(0.25)
+        raise DeviceDisconnectedError()
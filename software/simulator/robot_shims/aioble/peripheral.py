@@ -0,0 +1,71 @@
+#************************************************************************
+#
+#   peripheral.py
+#
+#   Stand-in for aioble.peripheral
+#   Valiant Turtle 2 - Simulator
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+import asyncio
+import bluetooth
+
+from . import core
+from . import server
+from .device import DeviceConnection
+
+# BLE IRQ event raised when the connection parameters change
+_IRQ_CONNECTION_UPDATE = 27
+
+async def advertise(interval_us: int, adv_data=None, resp_data=None, connectable: bool = True, limited_disc: bool = False,
+                    include_tx_power: bool = False, name: str = None, services: list = None, appearance: int = 0,
+                    manufacturer: tuple = None, timeout_ms: int = None) -> DeviceConnection:
+    radio = core.radio()
+    loop = asyncio.get_running_loop()
+    connected = loop.create_future()
+
+    def on_connect(link):
+        if not connected.done():
+            connected.set_result(link)
+
+    manufacturer_data = {} if manufacturer is None else {manufacturer[0]: bytes(manufacturer[1])}
+    service_uuids = [str(bluetooth.UUID(uuid)) for uuid in services or []]
+    radio.start_advertising(core.address(), name, service_uuids, manufacturer_data, interval_us, on_connect)
+
+    try:
+        link = await asyncio.wait_for(asyncio.shield(connected), None if timeout_ms is None else timeout_ms / 1000)
+    except asyncio.TimeoutError:
+        if radio.stop_advertising(core.address()):
+            raise
+        # A central connected just as advertising timed out
+        link = await connected
+    except asyncio.CancelledError:
+        # Cancelling stops advertising (as aioble does).  A central that connected
+        # just as advertising was cancelled is disconnected
+        if not radio.stop_advertising(core.address()):
+            connected.add_done_callback(lambda future: future.result().disconnect())
+        raise
+
+    connection = DeviceConnection(link)
+    server.attach(connection)
+    interval, latency, supervision_timeout = radio.connection_parameters
+    core.raise_irq(_IRQ_CONNECTION_UPDATE, (link.handle, interval, latency, supervision_timeout, 0))
+    return connection
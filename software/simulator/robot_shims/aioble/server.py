@@ -0,0 +1,115 @@
+#************************************************************************
+#
+#   server.py
+#
+#   Stand-in for aioble.server
+#   Valiant Turtle 2 - Simulator
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+import asyncio
+import bluetooth
+from collections import deque
+
+from .core import GattError
+
+# aioble keeps the last 10 captured writes (older writes are dropped)
+_WRITE_CAPTURE_QUEUE_LIMIT = 10
+
+# Characteristics of the registered services
+_characteristics = []
+
+class Service:
+    def __init__(self, uuid):
+        self.uuid = uuid
+        self.characteristics = []
+
+class Characteristic:
+    def __init__(self, service: Service, uuid, read: bool = False, write: bool = False, write_no_response: bool = False,
+                 notify: bool = False, indicate: bool = False, initial=None, capture: bool = False):
+        service.characteristics.append(self)
+        self.uuid = uuid
+        self._write = write or write_no_response
+        self._capture = capture
+        self._value = bytes(initial) if initial is not None else b""
+        self._write_queue = deque((), _WRITE_CAPTURE_QUEUE_LIMIT)
+        self._write_event = None
+
+    def read(self) -> bytes:
+        return self._value
+
+    def write(self, data, send_update: bool = False):
+        self._value = bytes(data)
+
+    def _remote_write(self, connection, data: bytes):
+        # Called on the robot's event loop when central writes the characteristic
+        self._value = data
+        self._write_queue.append((connection, data))
+        if self._write_event is not None:
+            self._write_event.set()
+
+    async def written(self, timeout_ms: int = None):
+        if self._write_event is None:
+            self._write_event = asyncio.Event()
+        while not self._write_queue:
+            self._write_event.clear()
+            await asyncio.wait_for(self._write_event.wait(), None if timeout_ms is None else timeout_ms / 1000)
+        connection, data = self._write_queue.popleft()
+        return (connection, data) if self._capture else connection
+
+    async def notify(self, connection, data=None):
+        if data is not None:
+            self.write(data)
+        await self.__send(connection, self._value, None)
+
+    async def indicate(self, connection, data=None, timeout_ms: int = 1000):
+        if data is not None:
+            self.write(data)
+        await self.__send(connection, self._value, timeout_ms)
+
+    async def __send(self, connection, data: bytes, timeout_ms: int):
+        if not connection.is_connected():
+            raise ValueError("Not connected")
+        try:
+            await asyncio.wait_for(connection._link.indicate(str(self.uuid), data), None if timeout_ms is None else timeout_ms / 1000)
+        except ConnectionError:
+            # Not acknowledged
+            raise GattError(0)
+
+class BufferedCharacteristic(Characteristic):
+    def __init__(self, service: Service, uuid, max_len: int = 20, append: bool = False, **kwargs):
+        super().__init__(service, uuid, **kwargs)
+        self._max_len = max_len
+        self._append = append
+
+    def write(self, data, send_update: bool = False):
+        self._value = bytes(data)[:self._max_len]
+
+def register_services(*services):
+    _characteristics.clear()
+    for service in services:
+        _characteristics.extend(service.characteristics)
+
+def attach(connection):
+    # Route central's writes on a new connection to the characteristics
+    for characteristic in _characteristics:
+        if characteristic._write:
+            connection._link.on_written(str(characteristic.uuid), lambda data, characteristic=characteristic: characteristic._remote_write(connection, data))
@@ -0,0 +1,51 @@
+#************************************************************************
+#
+#   bluetooth.py
+#
+#   Stand-in for the MicroPython bluetooth module
+#   Valiant Turtle 2 - Simulator
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+# Only UUIDs are needed (the BLE stack itself is replaced by the aioble stand-in)
+
+# Base of the 128-bit form of 16-bit UUIDs
+_BASE_UUID = "0000{:04x}-0000-1000-8000-00805f9b34fb"
+
+class UUID:
+    def __init__(self, value):
+        if isinstance(value, UUID):
+            value = value._value
+        if isinstance(value, int):
+            value = _BASE_UUID.format(value)
+        self._value = str(value).lower()
+
+    def __str__(self) -> str:
+        return self._value
+
+    def __repr__(self) -> str:
+        return f"UUID('{self._value}')"
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, UUID) and other._value == self._value
+
+    def __hash__(self) -> int:
+        return hash(self._value)
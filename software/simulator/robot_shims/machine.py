@@ -0,0 +1,174 @@
+#************************************************************************
+#
+#   machine.py
+#
+#   Stand-in for the MicroPython machine module (runs the robot firmware on CPython)
+#   Valiant Turtle 2 - Simulator
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+# Only the parts of the module used by the robot firmware are provided.  I2C
+# peripherals are modelled by devices attached to a bus (see attach_i2c_device);
+# a device provides write(address, data) and read(address, number_of_bytes) methods
+# (a device can answer on more than one address), and raises OSError(ENODEV) if it
+# doesn't acknowledge.  Transfers block for as long as they take on the bus
+
+import errno
+import time
+
+# Unique ID of the board (the robot's serial number)
+_unique_id = bytes([0x56, 0x54, 0x32, 0x00, 0x00, 0x00, 0x00, 0x00])
+
+# I2C devices by bus ID and address
+_i2c_devices = {0: {}, 1: {}}
+
+def unique_id() -> bytes:
+    return _unique_id
+
+def set_unique_id(value: bytes):
+    global _unique_id
+    _unique_id = bytes(value)
+
+def attach_i2c_device(bus_id: int, address: int, device):
+    _i2c_devices[bus_id][address] = device
+
+def freq(hz: int = None) -> int:
+    return 125000000
+
+def reset():
+    raise SystemExit("machine.reset()")
+
+class Pin:
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    ALT = 3
+    PULL_UP = 1
+    PULL_DOWN = 2
+
+    def __init__(self, id, mode: int = -1, pull: int = -1, value: int = None):
+        # A Pin can be made from another Pin (the firmware sometimes passes one through)
+        self._id = id._id if isinstance(id, Pin) else id
+        self._mode = mode
+        self._value = 0 if value is None else int(bool(value))
+
+    def __repr__(self) -> str:
+        return f"Pin({self._id})"
+
+    def init(self, mode: int = -1, pull: int = -1, value: int = None):
+        self._mode = mode
+        if value is not None:
+            self._value = int(bool(value))
+
+    def value(self, value: int = None):
+        if value is None:
+            return self._value
+        self._value = int(bool(value))
+
+    def __call__(self, value: int = None):
+        return self.value(value)
+
+    def on(self):
+        self._value = 1
+
+    def off(self):
+        self._value = 0
+
+    def high(self):
+        self._value = 1
+
+    def low(self):
+        self._value = 0
+
+    def toggle(self):
+        self._value ^= 1
+
+class PWM:
+    def __init__(self, pin: Pin, freq: int = 0, duty_u16: int = 0):
+        self._pin = pin
+        self._freq = freq
+        self._duty_u16 = duty_u16
+
+    def freq(self, value: int = None):
+        if value is None:
+            return self._freq
+        self._freq = value
+
+    def duty_u16(self, value: int = None):
+        if value is None:
+            return self._duty_u16
+        self._duty_u16 = value
+
+    def duty_ns(self, value: int = None):
+        period_ns = 1000000000 // self._freq if self._freq else 0
+        if value is None:
+            return self._duty_u16 * period_ns // 65535
+        self._duty_u16 = value * 65535 // period_ns if period_ns else 0
+
+    def deinit(self):
+        self._duty_u16 = 0
+
+class I2C:
+    def __init__(self, id: int, scl: Pin = None, sda: Pin = None, freq: int = 400000, timeout: int = 50000):
+        self._id = id
+        self._freq = freq
+
+    def __transfer(self, address: int, number_of_bytes: int):
+        # A start, the address byte, the data bytes (nine clocks each, with the acknowledge) and a stop
+        time.sleep((2 + 9 * (number_of_bytes + 1)) / self._freq)
+        device = _i2c_devices[self._id].get(address)
+        if device is None:
+            # No acknowledgement from the address
+            raise OSError(errno.ENODEV, "ENODEV")
+        return device
+
+    def scan(self) -> list:
+        found = []
+        for address in range(0x08, 0x78):
+            try:
+                self.__transfer(address, 0)
+                found.append(address)
+            except OSError:
+                pass
+        return found
+
+    def writeto(self, address: int, buffer, stop: bool = True) -> int:
+        self.__transfer(address, len(buffer)).write(address, bytes(buffer))
+        return len(buffer)
+
+    def readfrom(self, address: int, number_of_bytes: int, stop: bool = True) -> bytes:
+        return bytes(self.__transfer(address, number_of_bytes).read(address, number_of_bytes))
+
+    def readfrom_into(self, address: int, buffer, stop: bool = True):
+        buffer[:] = self.readfrom(address, len(buffer), stop)
+
+class UART:
+    def __init__(self, id: int, baudrate: int = 115200, **kwargs):
+        self._id = id
+
+    def write(self, buffer) -> int:
+        return len(buffer)
+
+    def read(self, number_of_bytes: int = -1):
+        return None
+
+    def any(self) -> int:
+        return 0
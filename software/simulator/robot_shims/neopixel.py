@@ -0,0 +1,74 @@
+#************************************************************************
+#
+#   neopixel.py
+#
+#   Stand-in for the MicroPython neopixel module
+#   Valiant Turtle 2 - Simulator
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+# The buffer holds the bytes in the order they are sent down the wire (GRB for the
+# WS2812).  write() takes as long as sending them does (1.25 us a bit at 800 kHz,
+# plus the reset time) and then shows them: frame is what the LEDs are showing
+
+import time
+
+# Time taken to send a bit and the reset (latch) time
+_BIT_TIME = 1.25e-6
+_RESET_TIME = 280e-6
+
+class NeoPixel:
+    # Colour order of the WS2812
+    ORDER = (1, 0, 2, 3)
+
+    def __init__(self, pin, n: int, bpp: int = 3, timing: int = 1):
+        self.pin = pin
+        self.n = n
+        self.bpp = bpp
+        self.buf = bytearray(n * bpp)
+        self.frame = bytes(n * bpp)
+        self.writes = 0
+
+    def __len__(self) -> int:
+        return self.n
+
+    def __setitem__(self, index: int, value):
+        offset = index * self.bpp
+        for i in range(self.bpp):
+            self.buf[offset + self.ORDER[i]] = value[i]
+
+    def __getitem__(self, index: int) -> tuple:
+        offset = index * self.bpp
+        return tuple(self.buf[offset + self.ORDER[i]] for i in range(self.bpp))
+
+    def fill(self, value):
+        for index in range(self.n):
+            self[index] = value
+
+    def write(self):
+        time.sleep(len(self.buf) * 8 * _BIT_TIME + _RESET_TIME)
+        self.frame = bytes(self.buf)
+        self.writes += 1
+
+    def shown(self, index: int) -> tuple:
+        # The colour the LED is showing (as of the last write)
+        offset = index * self.bpp
+        return tuple(self.frame[offset + self.ORDER[i]] for i in range(self.bpp))
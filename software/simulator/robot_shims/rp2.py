@@ -0,0 +1,424 @@
+#************************************************************************
+#
+#   rp2.py
+#
+#   Stand-in for the MicroPython rp2 module (PIO state machines)
+#   Valiant Turtle 2 - Simulator
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+# PIO programs are assembled (as asm_pio does it on the RP2040) and run by a state
+# machine emulator, a thread per state machine.  The emulator counts PIO clock
+# cycles: every instruction takes one cycle plus its delay, a pull from an empty TX
+# FIFO stalls until the CPU puts a word, and the TX FIFO holds four words (put()
+# blocks whilst it is full).  Pull and IRQ instructions wait until the wall clock
+# has caught up with the state machine's cycle count, so the CPU sees the FIFO
+# drain and the IRQs fire when it would on the robot.  Delay loops (a jmp with a
+# decrement to itself) are run in one step, so long pulses cost no more than short
+# ones.
+#
+# IRQ handlers are called on a thread of their own, like MicroPython's scheduled
+# (soft) IRQ handlers they can run whilst the firmware busy-waits
+
+import queue
+import threading
+import time
+from collections import deque
+
+# Instruction operands
+_OPERANDS = [
+    "block", "noblock", "iffull", "ifempty", "clear", "x", "y", "osr", "isr", "pins", "pindirs", "pc", "null",
+    "status", "exec", "not_x", "x_dec", "not_y", "y_dec", "x_not_y", "pin", "not_osre", "gpio", "irq",
+]
+
+_MASK = 0xFFFFFFFF
+
+# A profiler (such as a cProfile.Profile) that IRQ handlers are run under, if set
+profiler = None
+
+class PIO:
+    OUT_LOW = 0
+    OUT_HIGH = 1
+    IN_LOW = 0
+    IN_HIGH = 1
+    SHIFT_LEFT = 0
+    SHIFT_RIGHT = 1
+    JOIN_NONE = 0
+    JOIN_TX = 1
+    JOIN_RX = 2
+    IRQ_SM0 = 0x100
+    IRQ_SM1 = 0x200
+    IRQ_SM2 = 0x400
+    IRQ_SM3 = 0x800
+
+    def __init__(self, id: int):
+        self._id = id
+
+    def state_machine(self, id: int, program=None, **kwargs) -> "StateMachine":
+        return StateMachine(self._id * 4 + id, program, **kwargs)
+
+class _Instruction:
+    def __init__(self, op: str, operands: tuple):
+        self.op = op
+        self.operands = operands
+        self.delay_cycles = 0
+        self.side_value = None
+        self.target = None
+
+    def __getitem__(self, delay: int) -> "_Instruction":
+        # instruction [delay]
+        self.delay_cycles = delay
+        return self
+
+    def side(self, value: int) -> "_Instruction":
+        self.side_value = value
+        return self
+
+    def delay(self, delay: int) -> "_Instruction":
+        self.delay_cycles = delay
+        return self
+
+class _Program:
+    def __init__(self, name: str, options: dict):
+        self.name = name
+        self.options = options
+        self.instructions = []
+        self.labels = {}
+        self.wrap_target = 0
+        self.wrap = None
+
+    def namespace(self) -> dict:
+        # The names a PIO program's function body can use
+        def instruction(op: str):
+            def add(*operands) -> _Instruction:
+                added = _Instruction(op, operands)
+                self.instructions.append(added)
+                return added
+            return add
+
+        def label(name):
+            self.labels[name] = len(self.instructions)
+
+        def wrap_target():
+            self.wrap_target = len(self.instructions)
+
+        def wrap():
+            self.wrap = len(self.instructions) - 1
+
+        namespace = {name: name for name in _OPERANDS}
+        namespace.update({
+            "label": label,
+            "wrap_target": wrap_target,
+            "wrap": wrap,
+            "rel": lambda index: ("rel", index),
+            "invert": lambda source: ("invert", source),
+            "reverse": lambda source: ("reverse", source),
+            "in_": instruction("in"),
+        })
+        for op in ["jmp", "wait", "out", "push", "pull", "mov", "irq", "set", "nop", "word"]:
+            namespace[op] = instruction(op)
+        return namespace
+
+    def resolve(self):
+        # Resolve the jump targets
+        if self.wrap is None:
+            self.wrap = len(self.instructions) - 1
+        for instruction in self.instructions:
+            if instruction.op == "jmp":
+                target = instruction.operands[-1]
+                instruction.target = self.labels[target] if isinstance(target, str) else target
+
+def asm_pio(**kwargs):
+    # Assemble the program by running its body with the PIO instructions in scope
+    def decorator(function) -> _Program:
+        program = _Program(function.__name__, kwargs)
+        namespace = dict(function.__globals__)
+        namespace.update(program.namespace())
+        exec(function.__code__, namespace)
+        program.resolve()
+        return program
+    return decorator
+
+class _IrqDispatcher:
+    # Calls the IRQ handlers in the order the IRQs fire
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def raise_irq(self, handler, state_machine: "StateMachine"):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.__run, name="pio-irq", daemon=True)
+                self._thread.start()
+        self._queue.put((handler, state_machine))
+
+    def __run(self):
+        while True:
+            handler, state_machine = self._queue.get()
+            if profiler is not None:
+                profiler.runcall(handler, state_machine)
+            else:
+                handler(state_machine)
+
+_irq_dispatcher = _IrqDispatcher()
+
+class StateMachine:
+    # Speeds up (or slows down) the state machines; 1.0 is real time.  Read when a state machine is made active
+    time_scale = 1.0
+
+    # Depth of each FIFO (doubled if the FIFOs are joined)
+    FIFO_DEPTH = 4
+
+    def __init__(self, id: int, program: _Program = None, freq: int = 125000000, set_base=None, out_base=None, **kwargs):
+        self._id = id
+        self._condition = threading.Condition()
+        self._thread = None
+        self._active = False
+        self._handler = None
+        self._tx_fifo = deque()
+        self._rx_fifo = deque()
+        self._epoch = time.monotonic()
+        self._cycles_per_second = float(freq)
+        self.init(program, freq, set_base=set_base, out_base=out_base)
+
+        # Instrumentation: rising edges on the set pins and the cycles spent stalled on an empty TX FIFO
+        self.pulses = 0
+        self.stalled_cycles = 0
+
+    def init(self, program: _Program = None, freq: int = None, set_base=None, out_base=None, **kwargs):
+        with self._condition:
+            if program is not None:
+                self._program = program
+                self._fifo_depth = StateMachine.FIFO_DEPTH * (2 if program.options.get("fifo_join") == PIO.JOIN_TX else 1)
+            if freq is not None:
+                self._freq = freq
+            self._set_base = set_base
+            self._out_base = out_base
+            self.__reset()
+
+    def __reset(self):
+        self._pc = self._program.wrap_target if self._program is not None else 0
+        self._x = 0
+        self._y = 0
+        self._osr = 0
+        self._isr = 0
+        self._cycle = 0
+        self._tx_fifo.clear()
+        self._rx_fifo.clear()
+
+    def irq(self, handler=None, trigger: int = 0, hard: bool = False):
+        self._handler = handler
+
+    def active(self, value: int = None):
+        if value is None:
+            return self._active
+        with self._condition:
+            if value and not self._active:
+                # The state machine's clock starts (again) now
+                self._cycles_per_second = self._freq * StateMachine.time_scale
+                self._epoch = time.monotonic() - self._cycle / self._cycles_per_second
+            self._active = bool(value)
+            if self._active and self._thread is None and self._program is not None:
+                self._thread = threading.Thread(target=self.__run, name=f"pio-sm{self._id}", daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+
+    def restart(self):
+        with self._condition:
+            self.__reset()
+            self._epoch = time.monotonic()
+            self._condition.notify_all()
+
+    def exec(self, instruction):
+        pass
+
+    def put(self, value, shift: int = 0):
+        # Blocks whilst the TX FIFO is full (as it does on the RP2040)
+        values = value if isinstance(value, (bytes, bytearray, list, tuple)) else [value]
+        with self._condition:
+            for word in values:
+                while len(self._tx_fifo) >= self._fifo_depth:
+                    self._condition.wait()
+                self._tx_fifo.append((int(word) >> shift) & _MASK)
+                self._condition.notify_all()
+
+    def get(self, buffer=None, shift: int = 0):
+        with self._condition:
+            while not self._rx_fifo:
+                self._condition.wait()
+            value = self._rx_fifo.popleft() >> shift
+            self._condition.notify_all()
+        return value
+
+    def tx_fifo(self) -> int:
+        return len(self._tx_fifo)
+
+    def rx_fifo(self) -> int:
+        return len(self._rx_fifo)
+
+    def __cycle_now(self) -> int:
+        return int((time.monotonic() - self._epoch) * self._cycles_per_second)
+
+    def __catch_up(self):
+        # Wait until the wall clock reaches the state machine's cycle count
+        while True:
+            delay = self._epoch + self._cycle / self._cycles_per_second - time.monotonic()
+            if delay <= 0:
+                return
+            self._condition.wait(delay)
+
+    def __pull(self, operands: tuple) -> bool:
+        # Returns False if the state machine was stopped whilst stalled
+        self.__catch_up()
+        while not self._tx_fifo:
+            if "noblock" in operands:
+                self._osr = self._x
+                return True
+            stalled_at = self._cycle
+            self._condition.wait()
+            if not self._active:
+                return False
+            self._cycle = max(self._cycle, self.__cycle_now())
+            self.stalled_cycles += self._cycle - stalled_at
+        self._osr = self._tx_fifo.popleft()
+        self._condition.notify_all()
+        return True
+
+    def __read(self, source) -> int:
+        if isinstance(source, tuple):
+            kind, inner = source
+            value = self.__read(inner)
+            if kind == "invert":
+                return ~value & _MASK
+            return int(f"{value:032b}"[::-1], 2)
+        if source == "x":
+            return self._x
+        if source == "y":
+            return self._y
+        if source == "osr":
+            return self._osr
+        if source == "isr":
+            return self._isr
+        if source == "status":
+            return _MASK if len(self._tx_fifo) < self._fifo_depth else 0
+        if source == "pins":
+            return self._set_base.value() if self._set_base is not None else 0
+        return 0
+
+    def __write(self, destination, value: int):
+        value &= _MASK
+        if destination == "x":
+            self._x = value
+        elif destination == "y":
+            self._y = value
+        elif destination == "osr":
+            self._osr = value
+        elif destination == "isr":
+            self._isr = value
+        elif destination == "pc":
+            self._pc = value
+        elif destination == "pins":
+            self.__set_pin(value & 1)
+
+    def __set_pin(self, value: int):
+        if self._set_base is None:
+            return
+        if value and not self._set_base.value():
+            self.pulses += 1
+        self._set_base.value(value)
+
+    def __condition_met(self, condition) -> bool:
+        if condition == "not_x":
+            return self._x == 0
+        if condition == "not_y":
+            return self._y == 0
+        if condition == "x_dec":
+            taken = self._x != 0
+            self._x = (self._x - 1) & _MASK
+            return taken
+        if condition == "y_dec":
+            taken = self._y != 0
+            self._y = (self._y - 1) & _MASK
+            return taken
+        if condition == "x_not_y":
+            return self._x != self._y
+        if condition == "not_osre":
+            return True
+        return True
+
+    def __run(self):
+        program = self._program
+        instructions = program.instructions
+        with self._condition:
+            while True:
+                while not self._active:
+                    self._condition.wait()
+
+                instruction = instructions[self._pc]
+                op = instruction.op
+                operands = instruction.operands
+                next_pc = program.wrap_target if self._pc == program.wrap else self._pc + 1
+                cycles = 1 + instruction.delay_cycles
+
+                if op == "jmp":
+                    condition = operands[0] if len(operands) > 1 else None
+                    if instruction.target == self._pc and condition in ("x_dec", "y_dec"):
+                        # A delay loop - runs until the register is zero (then once more)
+                        register = "_x" if condition == "x_dec" else "_y"
+                        count = getattr(self, register)
+                        cycles *= count + 1
+                        setattr(self, register, _MASK)
+                    elif condition is None or self.__condition_met(condition):
+                        next_pc = instruction.target
+                elif op == "pull":
+                    if not self.__pull(operands):
+                        continue
+                elif op == "push":
+                    self._rx_fifo.append(self._isr)
+                    self._isr = 0
+                    self._condition.notify_all()
+                elif op == "mov":
+                    self.__write(operands[0], self.__read(operands[1]))
+                elif op == "set":
+                    self.__write(operands[0], operands[1])
+                elif op == "out":
+                    destination, bit_count = operands
+                    mask = (1 << bit_count) - 1 if bit_count < 32 else _MASK
+                    self.__write(destination, self._osr & mask)
+                    self._osr = (self._osr >> bit_count) & _MASK
+                elif op == "in":
+                    source, bit_count = operands
+                    mask = (1 << bit_count) - 1 if bit_count < 32 else _MASK
+                    self._isr = ((self._isr << bit_count) | (self.__read(source) & mask)) & _MASK
+                elif op == "irq":
+                    index = operands[-1]
+                    if "clear" not in operands and self._handler is not None:
+                        self.__catch_up()
+                        if isinstance(index, tuple):
+                            index = (index[1] + self._id) % 4
+                        if index < 4:
+                            _irq_dispatcher.raise_irq(self._handler, self)
+
+                if op == "mov" and operands[0] == "pc":
+                    next_pc = self._pc
+                self._cycle += cycles
+                self._pc = next_pc
@@ -0,0 +1,239 @@
+#************************************************************************
+#
+#   virtual_robot.py
+#
+#   A robot running the real firmware on CPython
+#   Valiant Turtle 2 - Simulator
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+import asyncio
+import logging
+import os
+import tempfile
+import threading
+
+import environment
+from devices import Ina260Model, Eeprom24lc16Model
+from radio import Radio, default_radio
+
+# GPIO hardware mapping (as robot/main.py)
+_GPIO_LEDS = 7
+_GPIO_PEN = 16
+_GPIO_SDA0 = 8
+_GPIO_SCL0 = 9
+_GPIO_LM_STEP = 2
+_GPIO_RM_STEP = 3
+_GPIO_LM_DIR = 4
+_GPIO_RM_DIR = 5
+_GPIO_ENABLE = 6
+_GPIO_M0 = 12
+_GPIO_M1 = 13
+_GPIO_M2 = 14
+
+# Battery voltage below which the robot reports low power (as robot/main.py)
+_POWER_LOW_MV = 12000
+
+# How often the power monitor updates the advertised status
+_POWER_MONITOR_INTERVAL = 1.0
+
+class VirtualRobot:
+    """
+    A robot made from the real firmware modules (BLE peripheral, control, commands,
+    differential drive, steppers...) running on CPython, with the hardware replaced
+    by the stand-ins in robot_shims and the BLE stack by a radio.Radio.  The robot is
+    put together as robot/main.py does it and runs on an event loop in its own
+    thread, so a communicator (CommandsTx, Fleet etc.) can drive it from the host
+    side as it would a real robot:
+
+        robot = VirtualRobot(turtle_id=1)
+        robot.start()
+        ...
+        robot.stop()
+
+    time_scale speeds up the motors (a time_scale of 10 makes every move take a
+    tenth of the time).  The firmware's log goes to stdout at log_level (a picolog
+    level).
+    """
+    def __init__(self, turtle_id: int = 0, radio: Radio = None, time_scale: float = 1.0, log_level: int = 30):
+        if turtle_id < 0 or turtle_id > 7:
+            raise ValueError("VirtualRobot::__init__ - turtle_id must be an integer between 0 and 7")
+        if time_scale <= 0:
+            raise ValueError("VirtualRobot::__init__ - time_scale must be greater than 0")
+
+        self._turtle_id = turtle_id
+        self._radio = radio if radio is not None else default_radio()
+        self._time_scale = time_scale
+        self._log_level = log_level
+        self._address = f"56:54:32:00:00:{turtle_id + 1:02x}"
+
+        self._modules = environment.load_robot_modules()
+        self._program_dir = tempfile.mkdtemp(prefix="vt2-robot-")
+
+        # Hardware models
+        self.ina260 = Ina260Model()
+        self.eeprom = Eeprom24lc16Model()
+
+        # Firmware objects (available once the robot has started)
+        self.pen = None
+        self.led_fx = None
+        self.diff_drive = None
+        self.configuration = None
+        self.ble_peripheral = None
+        self.control = None
+
+        self._thread = None
+        self._loop = None
+        self._main_task = None
+        self._started = threading.Event()
+        self._error = None
+
+    @property
+    def turtle_id(self) -> int:
+        return self._turtle_id
+
+    @property
+    def address(self) -> str:
+        return self._address
+
+    @property
+    def modules(self) -> dict:
+        # The robot's copy of the firmware modules (by name)
+        return self._modules
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the robot and wait until it is running"""
+        if self.running:
+            return
+        self._started.clear()
+        self._error = None
+        self._thread = threading.Thread(target=self.__thread, name=f"vt2-robot-{self._turtle_id}", daemon=True)
+        self._thread.start()
+        self._started.wait()
+        if self._error is not None:
+            raise RuntimeError(f"VirtualRobot::start - The robot failed to start: {self._error}")
+
+    def stop(self):
+        """Stop the robot (its connections drop as if it had been switched off)"""
+        if not self.running:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._main_task.cancel)
+        except RuntimeError:
+            pass
+        self._thread.join()
+
+    def __thread(self):
+        try:
+            asyncio.run(self.__run())
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logging.exception(f"VirtualRobot::__thread - Turtle ID {self._turtle_id} stopped with an exception")
+            self._error = e
+        finally:
+            self._started.set()
+
+    async def __run(self):
+        self._loop = asyncio.get_running_loop()
+        self._main_task = asyncio.current_task()
+        try:
+            tasks = self.__build()
+        except Exception as e:
+            self._error = e
+            return
+        self._started.set()
+
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.__switch_off()
+
+    def __build(self) -> list:
+        # Put the robot together (as robot/main.py does) and return its tasks
+        m = self._modules
+        machine = m["machine"]
+        m["picolog"].basicConfig(level=self._log_level)
+        machine.set_unique_id(bytes([0x56, 0x54, 0x32, 0x00, 0x00, 0x00, 0x00, self._turtle_id + 1]))
+        machine.attach_i2c_device(0, 0x40, self.ina260)
+        for address in self.eeprom.addresses:
+            machine.attach_i2c_device(0, address, self.eeprom)
+        m["aioble.core"].attach(self._radio, self._address)
+        m["rp2"].StateMachine.time_scale = self._time_scale
+
+        self.pen = m["pen"].Pen(machine.Pin(_GPIO_PEN))
+        self.pen.up()
+
+        i2c_internal = machine.I2C(0, scl=machine.Pin(_GPIO_SCL0), sda=machine.Pin(_GPIO_SDA0), freq=400000)
+        ina260 = m["ina260"].Ina260(i2c_internal, 0x40)
+        power_low_event = asyncio.Event()
+        eeprom = m["eeprom"].Eeprom(i2c_internal, 0x50)
+
+        self.ble_peripheral = m["ble_peripheral"].BlePeripheral()
+        self.led_fx = m["led_fx"].LedFx(5, _GPIO_LEDS)
+        self.diff_drive = m["diffdrive"].DiffDrive(_GPIO_ENABLE, _GPIO_M0, _GPIO_M1, _GPIO_M2, _GPIO_LM_STEP, _GPIO_LM_DIR, _GPIO_RM_STEP, _GPIO_RM_DIR)
+
+        # The turtle ID is stored in the EEPROM like any other setting
+        self.configuration = m["configuration"].Configuration()
+        if not self.configuration.unpack(eeprom.read(0, self.configuration.pack_size)):
+            self.configuration.turtle_id = self._turtle_id
+            eeprom.write(0, self.configuration.pack())
+
+        commands = m["commands_rx"].CommandsRx(self.pen, ina260, eeprom, self.led_fx, self.diff_drive, self.configuration)
+        program_store = m["program_store"].ProgramStore(os.path.join(self._program_dir, "program.bin"))
+        self.control = m["control"].Control(self.ble_peripheral, commands, power_low_event, program_store)
+        bulk_transfer = m["bulk_transfer"].BulkTransfer(self.ble_peripheral, program_store, self.control)
+
+        self.__update_status(ina260, power_low_event)
+        return [
+            asyncio.create_task(self.ble_peripheral.run()),
+            asyncio.create_task(self.control.run()),
+            asyncio.create_task(bulk_transfer.run()),
+            asyncio.create_task(self.led_fx.run()),
+            asyncio.create_task(self.__power_monitor(ina260, power_low_event)),
+        ]
+
+    async def __power_monitor(self, ina260, power_low_event: asyncio.Event):
+        while True:
+            await asyncio.sleep(_POWER_MONITOR_INTERVAL)
+            self.__update_status(ina260, power_low_event)
+
+    def __update_status(self, ina260, power_low_event: asyncio.Event):
+        voltage = ina260.voltage_mV
+        if voltage < _POWER_LOW_MV:
+            power_low_event.set()
+        else:
+            power_low_event.clear()
+        busy = self.control.program_running or self.diff_drive.is_moving
+        self.ble_peripheral.set_status(self.configuration.turtle_id, int(voltage), busy, power_low_event.is_set())
+
+    def __switch_off(self):
+        # Drop the robot's connections and stop advertising
+        self._radio.stop_advertising(self._address)
+        for link in self.ble_peripheral.links:
+            if link.is_connected:
+                link._connection._link.disconnect()
@@ -0,0 +1,245 @@
+#************************************************************************
+#
+#   vt2_benchmark.py
+#
+#   Benchmarks of the communicator and firmware over the simulator
+#   Valiant Turtle 2 - Simulator
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import statistics
+import sys
+import time
+
+import environment
+environment.use_host_modules()
+
+from radio import Radio, set_default_radio
+from virtual_robot import VirtualRobot
+from async_commands_tx import AsyncCommandsTx
+from commands_tx import CommandsTx
+from floor_turtle import FloorTurtle
+from cat import Cat
+from logotype import Logotype
+from calitest import Calitest1, Calitest2
+
+DRAWINGS = {"cat": Cat, "logotype": Logotype, "calitest1": Calitest1, "calitest2": Calitest2}
+
+# Turtle ID of the virtual robot used by the benchmarks
+_TURTLE_ID = 1
+
+def percentiles(samples: list[float]) -> dict:
+    """Summary of a latency distribution (in ms)"""
+    if len(samples) < 2:
+        return {"count": len(samples)}
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "count": len(samples),
+        "min_ms": round(min(samples), 2),
+        "mean_ms": round(statistics.fmean(samples), 2),
+        "p50_ms": round(cuts[49], 2),
+        "p90_ms": round(cuts[89], 2),
+        "p99_ms": round(cuts[98], 2),
+        "max_ms": round(max(samples), 2),
+    }
+
+async def connect(robot: VirtualRobot) -> AsyncCommandsTx:
+    commands = AsyncCommandsTx()
+    await commands.connect(robot.turtle_id)
+    if not await commands.wait_for_connection(30):
+        await commands.disconnect()
+        raise RuntimeError(f"Unable to connect to the virtual robot (turtle ID {robot.turtle_id})")
+    return commands
+
+async def benchmark_throughput(robot: VirtualRobot, count: int) -> dict:
+    """Commands per second, sending queries one at a time and pipelined (see AsyncCommandsTx.submit)"""
+    commands = await connect(robot)
+    try:
+        start = time.monotonic()
+        for _ in range(count):
+            await commands.heading()
+        sequential = count / (time.monotonic() - start)
+
+        start = time.monotonic()
+        for _ in range(count):
+            commands.submit("heading")
+        succeeded = await commands.flush()
+        pipelined = count / (time.monotonic() - start)
+        link_stats = commands.link_stats()
+    finally:
+        await commands.disconnect()
+
+    return {
+        "sequential_commands_per_s": round(sequential, 1),
+        "pipelined_commands_per_s": round(pipelined, 1),
+        "pipelined_succeeded": succeeded,
+        "retransmissions": link_stats["retransmissions"],
+        "timeouts": link_stats["timeouts"],
+    }
+
+async def benchmark_latency(robot: VirtualRobot, count: int) -> dict:
+    """Round trip time of single commands (a query and a short move)"""
+    commands = await connect(robot)
+    query_ms = []
+    move_ms = []
+    try:
+        await commands.motors(True)
+        for _ in range(count):
+            start = time.monotonic()
+            await commands.heading()
+            query_ms.append((time.monotonic() - start) * 1000)
+        for _ in range(max(count // 10, 2)):
+            start = time.monotonic()
+            await commands.forward(1)
+            move_ms.append((time.monotonic() - start) * 1000)
+        await commands.motors(False)
+        link_stats = commands.link_stats()
+    finally:
+        await commands.disconnect()
+
+    return {
+        "query": percentiles(query_ms),
+        "move_1mm": percentiles(move_ms),
+        "retransmissions": link_stats["retransmissions"],
+        "timeouts": link_stats["timeouts"],
+    }
+
+def benchmark_drawing(drawing: str, pipelined: bool) -> dict:
+    """Time taken to draw one of the demonstration drawings (including connecting)"""
+    commands_tx = CommandsTx()
+    turtle = FloorTurtle(commands_tx, pipelined)
+    start = time.monotonic()
+    # The drawings (and FloorTurtle) print every command
+    with contextlib.redirect_stdout(io.StringIO()):
+        DRAWINGS[drawing](turtle, 9).render()
+    elapsed = time.monotonic() - start
+    link_stats = commands_tx.link_stats()
+    return {
+        "drawing": drawing,
+        "pipelined": pipelined,
+        "completion_s": round(elapsed, 2),
+        "succeeded": link_stats["timeouts"] == 0,
+        "commands": link_stats["commands"],
+        "retransmissions": link_stats["retransmissions"],
+        "timeouts": link_stats["timeouts"],
+    }
+
+def run_benchmark(name: str, radio: Radio, time_scale: float, benchmark, *args) -> dict:
+    # Each benchmark gets a freshly started robot
+    robot = VirtualRobot(_TURTLE_ID, radio, time_scale)
+    robot.start()
+    radio.reset_stats()
+    try:
+        if asyncio.iscoroutinefunction(benchmark):
+            result = asyncio.run(benchmark(robot, *args))
+        else:
+            result = benchmark(*args)
+    finally:
+        robot.stop()
+    result["radio"] = radio.stats()
+    print(f"{name}: {json.dumps(result)}")
+    return result
+
+def main():
+    # Configure the logging module
+    log_format = "[%(asctime)s %(filename)s::%(funcName)s():%(lineno)s]%(levelname)s: %(message)s"
+    logging.basicConfig(level=logging.INFO, format=log_format, filename="vt2_benchmark.log")
+
+    parser = argparse.ArgumentParser(description="Benchmark the communicator and robot firmware against a virtual robot.")
+    parser.add_argument(
+        "-b", "--benchmarks",
+        choices=["throughput", "latency", "drawing"],
+        nargs="+",
+        default=["throughput", "latency", "drawing"],
+        help="Benchmarks to run. Default is all of them."
+    )
+    parser.add_argument(
+        "-n", "--count",
+        type=int,
+        default=200,
+        help="Number of commands sent by the throughput and latency benchmarks. Default is 200."
+    )
+    parser.add_argument(
+        "-d", "--drawing",
+        choices=list(DRAWINGS),
+        default="logotype",
+        help="Drawing used by the drawing benchmark. Default is 'logotype'."
+    )
+    parser.add_argument(
+        "-l", "--latency",
+        type=float,
+        default=7.5,
+        help="Radio latency (each way) in ms. Default is 7.5."
+    )
+    parser.add_argument(
+        "--loss",
+        type=float,
+        default=0.0,
+        help="Fraction of radio packets lost (0 to 1). Default is 0."
+    )
+    parser.add_argument(
+        "-t", "--time-scale",
+        type=float,
+        default=20.0,
+        help="How much faster than real time the robot's motors run. Default is 20."
+    )
+    parser.add_argument(
+        "-o", "--output",
+        help="Write the results to this file (as JSON)."
+    )
+    args = parser.parse_args()
+
+    radio = Radio(latency=args.latency / 1000, loss=args.loss, seed=0)
+    set_default_radio(radio)
+
+    results = {"latency_ms": args.latency, "loss": args.loss, "time_scale": args.time_scale}
+    if "throughput" in args.benchmarks:
+        results["throughput"] = run_benchmark("throughput", radio, args.time_scale, benchmark_throughput, args.count)
+    if "latency" in args.benchmarks:
+        results["latency"] = run_benchmark("latency", radio, args.time_scale, benchmark_latency, args.count)
+    if "drawing" in args.benchmarks:
+        results["drawing"] = run_benchmark("drawing", radio, args.time_scale, benchmark_drawing, args.drawing, False)
+        results["drawing_pipelined"] = run_benchmark("drawing_pipelined", radio, args.time_scale, benchmark_drawing, args.drawing, True)
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=4)
+
+    # Exit with an error if a pipelined run or a drawing didn't complete
+    failed = [name for name, result in results.items() if isinstance(result, dict) and not result.get("succeeded", result.get("pipelined_succeeded", True))]
+    if failed:
+        sys.exit(f"Failed benchmarks: {', '.join(failed)}")
+
+    # Without packet loss every response arrives, so a retransmission means the retry
+    # interval was too short
+    if args.loss == 0:
+        retransmitted = [name for name, result in results.items() if isinstance(result, dict) and result.get("retransmissions", 0) > 0]
+        if retransmitted:
+            sys.exit(f"Retransmissions on a lossless link: {', '.join(retransmitted)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+#************************************************************************
+#
+#   vt2_profile.py
+#
+#   Boots the robot firmware (robot/main.py) on CPython for profiling
+#   Valiant Turtle 2 - Simulator
+#   Copyright (C) 2024 Simon Inns
+#
+#   This file is part of Valiant Turtle 2
+#
+#   This is free software: you can redistribute it and/or
+#   modify it under the terms of the GNU General Public License as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License
+#   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#   Email: simon.inns@gmail.com
+#
+#************************************************************************
+
+import _thread
+import argparse
+import contextlib
+import cProfile
+import importlib
+import logging
+import pstats
+import threading
+import tracemalloc
+
+import environment
+environment.use_host_modules()
+
+from radio import default_radio
+from devices import Ina260Model, Eeprom24lc16Model
+from commands_tx import CommandsTx
+from floor_turtle import FloorTurtle
+from vt2_benchmark import DRAWINGS
+
+# BLE address of the booted robot
+_ROBOT_ADDRESS = "56:54:32:00:00:01"
+
+def prepare_robot(turtle_id: int, time_scale: float):
+    """
+    Set up the hardware robot/main.py expects: the INA260 and a 24LC16 holding a
+    configuration with the turtle ID on the internal I2C bus, the radio and the
+    state machine time scale.  Returns the rp2 stand-in
+    """
+    environment.use_robot_modules()
+    machine = importlib.import_module("machine")
+    rp2 = importlib.import_module("rp2")
+    aioble_core = importlib.import_module("aioble.core")
+
+    configuration = importlib.import_module("configuration").Configuration()
+    configuration.turtle_id = turtle_id
+    image = configuration.pack()
+    eeprom = Eeprom24lc16Model()
+    eeprom.memory[0:len(image)] = image
+
+    machine.attach_i2c_device(0, 0x40, Ina260Model())
+    for address in eeprom.addresses:
+        machine.attach_i2c_device(0, address, eeprom)
+    aioble_core.attach(default_radio(), _ROBOT_ADDRESS)
+    rp2.StateMachine.time_scale = time_scale
+    return rp2
+
+def drive(drawing: str, pipelined: bool):
+    # Draw with the communicator (in its own thread) and then stop the robot
+    try:
+        DRAWINGS[drawing](FloorTurtle(CommandsTx(), pipelined), 9).render()
+    except Exception:
+        logging.exception("drive - The drawing failed")
+    finally:
+        _thread.interrupt_main()
+
+def boot(seconds: float, drawing: str, pipelined: bool):
+    """Boot robot/main.py (unchanged) in this thread and run it until the time is up or the drawing is done"""
+    if drawing is None:
+        stopper = threading.Timer(seconds, _thread.interrupt_main)
+    else:
+        stopper = threading.Thread(target=drive, args=(drawing, pipelined), daemon=True)
+    stopper.start()
+    try:
+        importlib.import_module("main")
+    except KeyboardInterrupt:
+        pass
+
+def main():
+    # Configure the logging module
+    log_format = "[%(asctime)s %(filename)s::%(funcName)s():%(lineno)s]%(levelname)s: %(message)s"
+    logging.basicConfig(level=logging.INFO, format=log_format, filename="vt2_profile.log")
+
+    parser = argparse.ArgumentParser(description="Boot the robot firmware on CPython and profile it.")
+    parser.add_argument(
+        "-p", "--profiler",
+        choices=["cprofile", "tracemalloc", "both"],
+        default="cprofile",
+        help="Profile the CPU time (cprofile), the memory allocations (tracemalloc) or both. Default is 'cprofile'."
+    )
+    parser.add_argument(
+        "-s", "--seconds",
+        type=float,
+        default=10,
+        help="How long to run the firmware for (when no drawing is given). Default is 10."
+    )
+    parser.add_argument(
+        "-d", "--drawing",
+        choices=list(DRAWINGS),
+        help="Connect to the firmware and draw this drawing (the firmware stops when it is done)."
+    )
+    parser.add_argument(
+        "--pipelined",
+        action="store_true",
+        help="Send the drawing's commands pipelined."
+    )
+    parser.add_argument(
+        "-t", "--time-scale",
+        type=float,
+        default=1.0,
+        help="How much faster than real time the robot's motors run. Default is 1."
+    )
+    parser.add_argument(
+        "-i", "--turtle-id",
+        type=int,
+        default=0,
+        help="Turtle ID stored in the robot's EEPROM. Default is 0."
+    )
+    parser.add_argument(
+        "-n", "--top",
+        type=int,
+        default=25,
+        help="Number of entries to show. Default is 25."
+    )
+    parser.add_argument(
+        "--sort",
+        choices=["tottime", "cumulative", "ncalls"],
+        default="tottime",
+        help="Order of the cProfile statistics. Default is 'tottime'."
+    )
+    parser.add_argument(
+        "-o", "--output",
+        help="Save the cProfile statistics to this file (for pstats or snakeviz)."
+    )
+    parser.add_argument(
+        "-l", "--firmware-log",
+        default="vt2_firmware.log",
+        help="File the firmware's output (and the drawing's) goes to. Default is 'vt2_firmware.log'."
+    )
+    args = parser.parse_args()
+
+    rp2 = prepare_robot(args.turtle_id, args.time_scale)
+    use_cprofile = args.profiler in ("cprofile", "both")
+    use_tracemalloc = args.profiler in ("tracemalloc", "both")
+
+    # The IRQ handlers run on their own thread, so they get a profiler of their own
+    profiler = cProfile.Profile()
+    if use_cprofile:
+        rp2.profiler = cProfile.Profile()
+    if use_tracemalloc:
+        tracemalloc.start(10)
+
+    with open(args.firmware_log, "w") as firmware_log, contextlib.redirect_stdout(firmware_log):
+        if use_cprofile:
+            profiler.enable()
+        boot(args.seconds, args.drawing, args.pipelined)
+        if use_cprofile:
+            profiler.disable()
+
+    if use_tracemalloc:
+        snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(True, environment.ROBOT_DIR + "/*")])
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"Memory traced: {current / 1024:.1f} KiB now, {peak / 1024:.1f} KiB at peak (all of the process)")
+        print(f"Top {args.top} allocation sites in the firmware:")
+        for statistic in snapshot.statistics("lineno")[:args.top]:
+            print(f"  {statistic}")
+
+    if use_cprofile:
+        profiler.create_stats()
+        rp2.profiler.create_stats()
+        stats = pstats.Stats(profiler)
+        if rp2.profiler.stats:
+            stats.add(rp2.profiler)
+        if args.output:
+            stats.dump_stats(args.output)
+        stats.sort_stats(args.sort).print_stats(args.top)
+
+if __name__ == "__main__":
+    main()